@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+最小代价分配
+匈牙利算法（Kuhn-Munkres，带势函数的最短增广路版本），纯Python实现，
+n行m列 (n <= m) 的代价矩阵复杂度为 O(n²m)；用于把窗口分配到布局槽位，使总移动量最小
+"""
+
+from typing import List, Sequence
+
+from window_backend import Rect
+
+
+def move_cost(current: Rect, target: Rect) -> int:
+    """窗口从current移动到target的代价: 位移加尺寸变化 (|dx| + |dy| + |dw| + |dh|)"""
+    return (abs(current[0] - target[0]) + abs(current[1] - target[1])
+            + abs(current[2] - target[2]) + abs(current[3] - target[3]))
+
+
+def min_cost_assignment(cost: Sequence[Sequence[float]]) -> List[int]:
+    """
+    为每一行分配互不相同的一列，使总代价最小
+    要求行数不多于列数；返回每行分配到的列下标
+    """
+    n = len(cost)
+    if n == 0:
+        return []
+    m = len(cost[0])
+    if n > m:
+        raise ValueError(f"行数 ({n}) 不能多于列数 ({m})")
+    inf = float('inf')
+    # 下标从1开始，0号列为增广路的虚拟起点
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    owner = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    reduced = row[j - 1] - ui0 - v[j]
+                    if reduced < minv[j]:
+                        minv[j] = reduced
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        # 沿增广路翻转匹配
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+    result = [0] * n
+    for j in range(1, m + 1):
+        if owner[j]:
+            result[owner[j] - 1] = j - 1
+    return result
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+标题匹配基准
+比较编译后的查询与原先逐个关键字、每次转换大小写的子串匹配:
+  python bench_matcher.py
+  python bench_matcher.py --sizes 10 1000 --repeat 50
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List, Sequence
+
+from title_matcher import compile_query
+
+PREFIXES = ["gas", "gcc", "gds", "node", "python", "java", "cargo", "npm", "ssh", "vim"]
+SUFFIXES = ["PowerShell", "Command Prompt", "Windows Terminal", "bash", "logs"]
+
+# (说明, 查询, 等价的逐关键字子串列表，None表示原实现不支持)
+QUERIES = [
+    ("单个子串", "gas", ["gas"]),
+    ("8个子串", "gas|gcc|gds|node|python|java|cargo|npm", PREFIXES[:8]),
+    ("通配符+子串", "gcc*-*|gds", None),
+    ("正则", "re:gas[0-9]+", None),
+    ("包含+排除", "g,!gds,!gcc", None),
+]
+
+
+def make_titles(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [f"{rng.choice(PREFIXES)}{rng.randint(0, 99)}-{rng.choice(['build', 'dev', 'test'])}"
+            f" - {rng.choice(SUFFIXES)}" for _ in range(count)]
+
+
+def naive_select(titles: Sequence[str], keywords: Sequence[str]) -> List[int]:
+    """原实现: 每个关键字各扫描一遍，每次比较都转换大小写"""
+    found = set()
+    for keyword in keywords:
+        for i, title in enumerate(titles):
+            if keyword.lower() in title.lower():
+                found.add(i)
+    return sorted(found)
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标题匹配基准")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help='标题数量 (默认 10 100 1000 10000)')
+    parser.add_argument('--repeat', type=int, default=20, help='每项重复次数，取最快一次')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for _, query, _ in QUERIES:
+        compile_query.cache_clear()
+        compile_query(query)
+    print(f"编译全部查询: {(time.perf_counter() - start) * 1e6:.0f} us")
+
+    print(f"{'标题数':>7}  {'查询':<10} {'匹配':>6} {'编译后(us)':>11} {'原实现(us)':>11} {'加速':>6}")
+    for size in args.sizes:
+        titles = make_titles(size)
+        lower_titles = [title.lower() for title in titles]
+        for label, query, keywords in QUERIES:
+            matcher = compile_query(query)
+            matched = matcher.select(titles, lower_titles)
+            compiled = best_time(lambda: matcher.select(titles, lower_titles), args.repeat)
+            if keywords is None:
+                print(f"{size:>7}  {label:<10} {len(matched):>6} {compiled * 1e6:>11.1f} {'-':>11} {'-':>6}")
+                continue
+            assert naive_select(titles, keywords) == matched, query
+            naive = best_time(lambda: naive_select(titles, keywords), args.repeat)
+            print(f"{size:>7}  {label:<10} {len(matched):>6} {compiled * 1e6:>11.1f} "
+                  f"{naive * 1e6:>11.1f} {naive / compiled:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+重新布局移动量基准
+模拟一个会话: 终端逐个加入或离开分组，其间窗口被激活改变枚举顺序（Z序），
+每次变化后重新平铺，比较完整重新布局与增量布局 (--incremental) 移动的窗口数和总移动量:
+  python bench_relayout.py
+  python bench_relayout.py --sizes 4 9 16 --steps 50 --horizontal --output relayout.json
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+from typing import Dict, List
+
+from assignment import move_cost
+from output import Reporter
+from terminal_tiler import TerminalTiler
+from window_backend import FakeWindowBackend
+
+DEFAULT_SIZES = [4, 8, 16, 32]
+
+
+def _activate(backend: FakeWindowBackend, hwnd: int):
+    """把窗口移到Z序最前面（假后端按字典顺序枚举）"""
+    window = backend.windows.pop(hwnd)
+    backend.windows = {hwnd: window, **backend.windows}
+
+
+def simulate(count: int, steps: int, incremental: bool, seed: int = 0,
+             horizontal: bool = False) -> Dict[str, int]:
+    """
+    从count个终端开始，随机加入/离开/激活窗口steps次，每次变化后重新平铺
+    返回 {'moved': 被移动或调整大小的窗口数, 'displacement': 总移动量（像素）, 'retiles': 平铺次数}
+    同样的种子产生同样的事件序列，两种模式可以直接比较
+    """
+    rng = random.Random(seed)
+    backend = FakeWindowBackend()
+    names = iter(range(10 ** 6))
+    for _ in range(count):
+        backend.add_window(f"gas{next(names)} - PowerShell")
+    tiler = TerminalTiler(backend)
+    tiler.incremental = incremental
+    tiler.out = Reporter(stream=io.StringIO())
+
+    def retile():
+        tiler.index.invalidate()
+        windows = tiler.find_terminal_windows("gas")
+        if horizontal:
+            tiler.tile_windows_horizontal(windows)
+        else:
+            tiler.tile_windows_vertical(windows)
+        tiler.out.flush()
+
+    retile()
+    stats = {'moved': 0, 'displacement': 0, 'retiles': steps}
+    low, high = max(1, count // 2), count + count // 2 + 1
+    for _ in range(steps):
+        hwnds = list(backend.windows)
+        # 用户切换窗口改变Z序
+        for _ in range(rng.randint(0, 3)):
+            _activate(backend, rng.choice(hwnds))
+        if len(hwnds) > low and (len(hwnds) >= high or rng.random() < 0.5):
+            backend.remove_window(rng.choice(hwnds))
+        else:
+            backend.add_window(f"gas{next(names)} - PowerShell", rect=(rng.randrange(0, 1200),
+                                                                     rng.randrange(0, 600), 800, 600))
+        before = {hwnd: window.rect for hwnd, window in backend.windows.items()}
+        retile()
+        for hwnd, window in backend.windows.items():
+            if window.rect != before[hwnd]:
+                stats['moved'] += 1
+                stats['displacement'] += move_cost(before[hwnd], window.rect)
+    return stats
+
+
+def run_comparison(sizes: List[int], steps: int, seed: int = 0, horizontal: bool = False) -> dict:
+    results = {}
+    for count in sizes:
+        results[str(count)] = {
+            mode: simulate(count, steps, mode == 'incremental', seed, horizontal)
+            for mode in ('full', 'incremental')
+        }
+    return {'version': 1, 'steps': steps, 'seed': seed,
+            'orientation': 'horizontal' if horizontal else 'vertical', 'results': results}
+
+
+def print_table(report: dict):
+    print(f"{'窗口数':>6} {'完整移动':>10} {'增量移动':>10} {'完整位移(px)':>14} {'增量位移(px)':>14}")
+    for count, modes in report['results'].items():
+        full, incremental = modes['full'], modes['incremental']
+        print(f"{count:>6} {full['moved']:>10} {incremental['moved']:>10} "
+              f"{full['displacement']:>14} {incremental['displacement']:>14}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="重新布局移动量基准")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='初始终端数 (默认 4 8 16 32)')
+    parser.add_argument('--steps', type=int, default=40, help='加入/离开事件数 (默认40)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--horizontal', action='store_true', help='水平平铺')
+    parser.add_argument('--output', help='结果JSON的保存路径')
+    args = parser.parse_args()
+
+    report = run_comparison(args.sizes, args.steps, args.seed, args.horizontal)
+    print_table(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"结果已保存: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+终端平铺管理器冷启动基准
+测量 `terminal_tiler.py` 相对空解释器的启动开销，并给出 -X importtime 的导入耗时分解，
+超过预算时以非零状态退出:
+  python bench_startup.py                  # 默认测量 --list，预算60ms
+  python bench_startup.py --budget-ms 40 --runs 20 -- gas --hide
+"""
+
+import argparse
+import atexit
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, 'terminal_tiler.py')
+
+
+_CACHE_DIR: List[str] = []
+
+
+def _cache_dir() -> str:
+    """本进程共用的临时缓存目录，退出时删除"""
+    if not _CACHE_DIR:
+        _CACHE_DIR.append(tempfile.mkdtemp(prefix='tiler-bench-'))
+        atexit.register(shutil.rmtree, _CACHE_DIR[0], True)
+    return _CACHE_DIR[0]
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    # 使用假后端，测量结果不受桌面窗口数量影响
+    env.setdefault('TERMINAL_TILER_BACKEND', 'fake')
+    # 句柄缓存、运行队列等写到临时目录，不写指标，不影响用户真实的缓存
+    env['TERMINAL_TILER_CACHE'] = _cache_dir()
+    env['TERMINAL_TILER_METRICS'] = 'off'
+    # 与日常使用一样使用缓存的字节码（由预热运行写出），不测量编译时间
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return env
+
+
+def time_command(cmd: List[str], runs: int) -> float:
+    """多次运行命令，返回耗时中位数（秒）"""
+    samples = []
+    env = _env()
+    # 预热: 写出字节码缓存、创建缓存目录
+    subprocess.run(cmd, cwd=HERE, env=env, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL, check=True)
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=HERE, env=env, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def import_breakdown(argv: List[str]) -> List[Tuple[str, int, int]]:
+    """
+    以 -X importtime 运行一次，返回 [(模块, 自身耗时us, 累计耗时us), ...]
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', SCRIPT] + argv,
+                          cwd=HERE, env=_env(), stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def imported_modules(argv: List[str]) -> List[str]:
+    """运行给定参数时导入过的模块名"""
+    return [name.strip() for name, _, _ in import_breakdown(argv)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="终端平铺管理器冷启动基准")
+    parser.add_argument('--runs', type=int, default=10, help='每项测量的运行次数 (默认10)')
+    parser.add_argument('--budget-ms', type=float, default=60.0,
+                        help='相对空解释器允许的启动开销 (毫秒，默认60)')
+    parser.add_argument('--top', type=int, default=15, help='显示耗时最多的前N个导入')
+    parser.add_argument('argv', nargs='*', default=['--list'],
+                        help='传给terminal_tiler.py的参数 (默认 --list)')
+    args = parser.parse_args()
+
+    baseline = time_command([sys.executable, '-c', 'pass'], args.runs)
+    total = time_command([sys.executable, SCRIPT] + args.argv, args.runs)
+    overhead_ms = (total - baseline) * 1000
+
+    print(f"命令: terminal_tiler.py {' '.join(args.argv)}")
+    print(f"空解释器: {baseline * 1000:.1f} ms")
+    print(f"冷启动总耗时: {total * 1000:.1f} ms")
+    print(f"启动开销: {overhead_ms:.1f} ms (预算 {args.budget_ms:.0f} ms)")
+
+    # 只统计顶层导入（缩进最少的行），避免重复计算
+    rows = import_breakdown(args.argv)
+    top_level = [row for row in rows if not row[0].startswith('  ')]
+    top_level.sort(key=lambda row: row[2], reverse=True)
+    print(f"\n导入耗时分解 (前{args.top}个顶层导入，累计us):")
+    for name, self_us, cumulative_us in top_level[:args.top]:
+        print(f"  {cumulative_us:>8} {self_us:>8}  {name.strip()}")
+
+    if overhead_ms > args.budget_ms:
+        print(f"\n✗ 冷启动开销超出预算 {overhead_ms - args.budget_ms:.1f} ms")
+        return 1
+    print("\n✓ 冷启动开销在预算内")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+终端平铺管理器分阶段基准
+在模拟窗口管理器上生成N个窗口，分别测量 枚举 / 匹配 / 规划 / 应用 各阶段耗时，
+结果保存为JSON，并与基线比较，变慢超过阈值时以非零状态退出:
+  python bench_tiler.py                                 # 默认规模，与 bench_baseline.json 比较
+  python bench_tiler.py --sizes 10 100 --repeat 3 --output result.json
+  python bench_tiler.py --move-latency-us 300 --save-baseline bench_baseline.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, Optional, Tuple
+
+from layout_planner import HORIZONTAL, VERTICAL
+from simulated_wm import Latency, SimulatedWindowManager
+from terminal_tiler import TerminalTiler
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, 'bench_baseline.json')
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+
+
+def _time(func: Callable[[], object], setup: Callable[[], object], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_size(count: int, latency: Latency, repeat: int, keyword: str = 'gas',
+               seed: int = 0) -> Dict[str, List[float]]:
+    """
+    测量一个规模下各方向各阶段的耗时
+    返回 {"vertical/1000/enumerate": [秒, ...], ...}
+    """
+    backend = SimulatedWindowManager.generate(count, seed=seed, latency=latency)
+    tiler = TerminalTiler(backend)
+    samples: Dict[str, List[float]] = {}
+    # 平铺过程中的输出不计入（也不显示）
+    with redirect_stdout(io.StringIO()):
+        windows = tiler.find_terminal_windows(keyword)
+        for orientation in (VERTICAL, HORIZONTAL):
+            prefix = f"{orientation}/{count}"
+            samples[f"{prefix}/enumerate"] = _time(
+                lambda: tiler.index.snapshot(refresh=True), lambda: None, repeat)
+            samples[f"{prefix}/match"] = _time(
+                lambda: tiler.index.find(keyword), lambda: None, repeat)
+            samples[f"{prefix}/plan"] = _time(
+                lambda: tiler._plan_placements(windows, 5, orientation), lambda: None, repeat)
+            placements = tiler._plan_placements(windows, 5, orientation)
+            samples[f"{prefix}/apply"] = _time(
+                lambda: tiler._apply_placements(placements), backend.reset_rects, repeat)
+        samples[f"hide/{count}/hide"] = _time(
+            lambda: tiler.hide_windows(windows), backend.reset_rects, repeat)
+    return samples
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    return {key: {'median_ms': round(statistics.median(values) * 1000, 4),
+                  'min_ms': round(min(values) * 1000, 4)}
+            for key, values in samples.items()}
+
+
+def run_suite(sizes: List[int], latency: Latency, repeat: int) -> dict:
+    results: Dict[str, Dict[str, float]] = {}
+    for count in sizes:
+        results.update(summarize(bench_size(count, latency, repeat)))
+    return {
+        'version': 1,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'latency_us': {name: value * 1e6 for name, value in latency._asdict().items()},
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.5,
+            min_delta_ms: float = 0.2) -> List[Tuple[str, float, float]]:
+    """
+    找出比基线慢的项: 中位数超过基线 (1 + threshold) 倍且差值大于min_delta_ms
+    返回 [(项, 基线ms, 当前ms), ...]；模拟延迟不同的结果不可比较，返回空列表
+    """
+    if current.get('latency_us') != baseline.get('latency_us'):
+        return []
+    regressions = []
+    for key, value in current['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        now, before = value['median_ms'], base['median_ms']
+        if now > before * (1 + threshold) and now - before > min_delta_ms:
+            regressions.append((key, before, now))
+    return regressions
+
+
+def print_table(report: dict, baseline: Optional[dict]):
+    print(f"{'阶段':<28} {'中位数(ms)':>11} {'最小(ms)':>10} {'基线(ms)':>10}")
+    for key, value in report['results'].items():
+        base = baseline['results'].get(key) if baseline else None
+        base_text = f"{base['median_ms']:.3f}" if base else '-'
+        print(f"{key:<28} {value['median_ms']:>11.3f} {value['min_ms']:>10.3f} {base_text:>10}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="终端平铺管理器分阶段基准")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='窗口总数 (默认 10 100 1000 5000)')
+    parser.add_argument('--repeat', type=int, default=5, help='每项重复次数 (默认5)')
+    parser.add_argument('--enum-latency-us', type=float, default=0.0, help='枚举时每个窗口的延迟 (微秒)')
+    parser.add_argument('--query-latency-us', type=float, default=0.0, help='每次属性查询的延迟 (微秒)')
+    parser.add_argument('--move-latency-us', type=float, default=0.0, help='每个窗口移动的延迟 (微秒)')
+    parser.add_argument('--show-latency-us', type=float, default=0.0, help='每次最小化/还原的延迟 (微秒)')
+    parser.add_argument('--output', help='结果JSON的保存路径')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='用于比较的基线JSON')
+    parser.add_argument('--save-baseline', metavar='PATH', help='把本次结果保存为基线')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='判定为退化的相对变慢比例 (默认0.5，即慢50%%)')
+    args = parser.parse_args()
+
+    latency = Latency(args.enum_latency_us / 1e6, args.query_latency_us / 1e6,
+                      args.move_latency_us / 1e6, args.show_latency_us / 1e6)
+    report = run_suite(args.sizes, latency, args.repeat)
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_table(report, baseline)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=1)
+            print(f"结果已保存: {path}")
+
+    if baseline is None or args.save_baseline:
+        return 0
+    if baseline.get('latency_us') != report['latency_us']:
+        print("\n基线的模拟延迟与本次不同，跳过比较")
+        return 0
+    regressions = compare(report, baseline, args.threshold)
+    if regressions:
+        print(f"\n✗ {len(regressions)} 项比基线慢 {args.threshold:.0%} 以上:")
+        for key, before, now in regressions:
+            print(f"  {key}: {before:.3f} ms -> {now:.3f} ms")
+        return 1
+    print("\n✓ 没有发现性能退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
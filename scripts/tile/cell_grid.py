@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+字符网格对齐
+终端窗口的客户区按字体的字符单元对齐，宽度每次变化都会按新的列数重排整个滚动缓冲区。
+按窗口类缓存字符单元大小和不属于网格的部分（边框、内边距、滚动条），
+把目标矩形取整到整行整列；行列数不变的调整大小直接跳过，避免终端重排和闪烁
+
+字符单元大小的来源:
+  查询: 后端能读取窗口的尺寸增量时（X11的WM_NORMAL_HINTS）直接使用
+  学习: 否则观察平铺后窗口的实际大小，窗口自行对齐到与请求不同的尺寸时记录下来，
+        同一窗口类的多个不同尺寸之差的最大公约数即为字符单元大小。两个尺寸之差可能是
+        字符单元的整数倍（8像素的字体相差16像素），因此每个方向至少需要三个不同尺寸、
+        且去掉最新的样本时公约数不变；推算出的网格先作为候选，之后又一个自行对齐的
+        尺寸落在网格上才缓存。已缓存的网格继续核对，窗口不落在网格上时（字体或缩放变化）
+        丢弃并重新学习；
+        窗口从未自行对齐、且多次接受了请求的不同尺寸时记为不按网格对齐，不再观察
+"""
+
+import os
+from math import gcd
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from window_backend import Rect
+
+FORMAT_VERSION = 2
+# 合理的字符单元大小范围（像素），学习结果不在范围内时视为不按网格对齐
+MIN_CELL = 4
+MAX_CELL = 64
+# 推算字符单元大小时每个方向至少需要的不同尺寸数
+MIN_SAMPLES = 3
+# 每个窗口类最多保留的观察样本数
+MAX_SAMPLES = 8
+# 接受了多少个不同的请求尺寸后视为不按网格对齐（请求的尺寸可能恰好已对齐）
+FREE_AFTER = 3
+
+
+class CellMetrics(NamedTuple):
+    """窗口类的字符网格: 整个窗口宽为 base_width + 列数 * cell_width，高度同理"""
+    cell_width: int
+    cell_height: int
+    base_width: int
+    base_height: int
+
+
+def default_cell_cache_path() -> str:
+    """字符网格缓存文件，与进程缓存在同一目录"""
+    from processes import default_cache_path
+    return os.path.join(os.path.dirname(default_cache_path()), 'cells.json')
+
+
+def grid_size(width: int, height: int, metrics: CellMetrics) -> Tuple[int, int]:
+    """整个窗口为 width x height 时的 (列数, 行数)，至少为1"""
+    return (max(1, (width - metrics.base_width) // metrics.cell_width),
+            max(1, (height - metrics.base_height) // metrics.cell_height))
+
+
+def align_rect(rect: Rect, metrics: CellMetrics) -> Rect:
+    """把矩形的宽高向下取整到整列整行（不超出原矩形），位置不变"""
+    x, y, width, height = rect
+    cols, rows = grid_size(width, height, metrics)
+    return (x, y, metrics.base_width + cols * metrics.cell_width,
+            metrics.base_height + rows * metrics.cell_height)
+
+
+def same_grid(current: Rect, target: Rect, metrics: CellMetrics) -> bool:
+    """两个矩形的行列数是否相同（调整大小不会让终端重排）"""
+    return grid_size(current[2], current[3], metrics) == grid_size(target[2], target[3], metrics)
+
+
+def on_grid(width: int, height: int, metrics: CellMetrics) -> bool:
+    """尺寸是否恰好为整行整列"""
+    return (width - metrics.base_width) % metrics.cell_width == 0 and \
+        (height - metrics.base_height) % metrics.cell_height == 0
+
+
+def _cell_size(values: List[int]) -> int:
+    """多个尺寸之差的最大公约数，只有一个不同尺寸时为0"""
+    cell = 0
+    for value in values[1:]:
+        cell = gcd(cell, value - values[0])
+    return cell
+
+
+def learn_metrics(sizes: List[Tuple[int, int]]) -> Optional[CellMetrics]:
+    """
+    从同一窗口类自行对齐后的多个实际尺寸（按观察顺序）推算字符网格，
+    样本不足、去掉最新的样本时结果不同或结果不合理时返回None
+    """
+    cells = []
+    for axis in (0, 1):
+        values = [size[axis] for size in sizes]
+        if len(set(values)) < MIN_SAMPLES:
+            return None
+        cell = _cell_size(values)
+        if cell != _cell_size(values[:-1]) or not MIN_CELL <= cell <= MAX_CELL:
+            return None
+        cells.append(cell)
+    width, height = sizes[0]
+    return CellMetrics(cells[0], cells[1], width % cells[0], height % cells[1])
+
+
+class CellCache:
+    """
+    窗口类 -> 字符网格的缓存
+    path不为None时从文件加载，save()写回；free记录接受任意尺寸、不需要对齐的窗口类，
+    learned记录从观察学到（而不是向后端查询到）的网格，这些网格需要继续核对
+    """
+
+    def __init__(self, path: Optional[str] = None, backend: str = ''):
+        self.path = path
+        self.backend = backend
+        self._metrics: Dict[str, CellMetrics] = {}
+        # 自行对齐后的实际尺寸 / 原样接受的请求尺寸
+        self._samples: Dict[str, List[Tuple[int, int]]] = {}
+        self._exact: Dict[str, List[Tuple[int, int]]] = {}
+        # 从样本推算出、还没有被之后的观察证实的网格
+        self._provisional: Dict[str, CellMetrics] = {}
+        self.learned = set()
+        self.free = set()
+        # 本次运行中已查询过（后端无法提供）的窗口类
+        self._queried = set()
+        self.dirty = False
+        if path is not None:
+            self.load()
+
+    def metrics(self, class_name: str, hwnd: int, backend) -> Optional[CellMetrics]:
+        """窗口类的字符网格；未缓存时向后端查询一次（用hwnd作为该类的代表窗口）"""
+        metrics = self._metrics.get(class_name)
+        if metrics is not None or class_name in self.free or class_name in self._queried:
+            return metrics
+        self._queried.add(class_name)
+        try:
+            metrics = backend.cell_metrics(hwnd)
+        except Exception:
+            metrics = None
+        if metrics is not None:
+            self._metrics[class_name] = metrics
+            self.dirty = True
+        return metrics
+
+    def needs_samples(self, class_name: str) -> bool:
+        """是否还需要观察该窗口类的实际尺寸（还在学习，或核对学到的网格）"""
+        if class_name in self.free:
+            return False
+        return class_name not in self._metrics or class_name in self.learned
+
+    def observe(self, class_name: str, requested: Rect, actual: Rect):
+        """记录一次调整大小的结果: 请求的矩形和窗口最终的矩形"""
+        if not self.needs_samples(class_name):
+            return
+        size = (actual[2], actual[3])
+        exact = size == (requested[2], requested[3])
+        learned = self._metrics.get(class_name)
+        if learned is not None:
+            if on_grid(*size, learned):
+                return
+            # 窗口不落在学到的网格上（字体或缩放变化，或学错了）: 丢弃并重新学习
+            del self._metrics[class_name]
+            self.learned.discard(class_name)
+            self.dirty = True
+        provisional = self._provisional.get(class_name)
+        if provisional is not None and not on_grid(*size, provisional):
+            del self._provisional[class_name]
+            provisional = None
+        samples = (self._exact if exact else self._samples).setdefault(class_name, [])
+        if size in samples:
+            return
+        samples.append(size)
+        del samples[:-MAX_SAMPLES]
+        self.dirty = True
+        if exact:
+            if len(samples) >= FREE_AFTER and class_name not in self._samples:
+                self.free.add(class_name)
+                del self._exact[class_name]
+            return
+        if provisional is not None:
+            # 新的自行对齐尺寸落在候选网格上: 证实后缓存
+            self._metrics[class_name] = provisional
+            self.learned.add(class_name)
+            del self._provisional[class_name]
+            del self._samples[class_name]
+            self._exact.pop(class_name, None)
+            return
+        metrics = learn_metrics(samples)
+        if metrics is not None:
+            self._provisional[class_name] = metrics
+
+    def load(self):
+        import json
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != FORMAT_VERSION or data.get('backend') != self.backend:
+            return
+        try:
+            for class_name, values in data.get('metrics', {}).items():
+                self._metrics[class_name] = CellMetrics(*(int(value) for value in values))
+            for key, samples in (('samples', self._samples), ('exact', self._exact)):
+                for class_name, sizes in data.get(key, {}).items():
+                    samples[class_name] = [(int(width), int(height)) for width, height in sizes]
+            self.learned = {str(class_name) for class_name in data.get('learned', [])} & set(self._metrics)
+            self.free = {str(class_name) for class_name in data.get('free', [])}
+        except (TypeError, ValueError):
+            self._metrics.clear()
+            self._samples.clear()
+            self._exact.clear()
+            self.learned = set()
+            self.free = set()
+            return
+        for class_name, sizes in self._samples.items():
+            metrics = learn_metrics(sizes)
+            if metrics is not None:
+                self._provisional[class_name] = metrics
+
+    def save(self):
+        """有变化时写回文件（先写临时文件再替换）"""
+        if self.path is None or not self.dirty:
+            return
+        import json
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {'version': FORMAT_VERSION, 'backend': self.backend,
+                'metrics': {name: list(metrics) for name, metrics in self._metrics.items()},
+                'learned': sorted(self.learned), 'samples': self._samples, 'exact': self._exact,
+                'free': sorted(self.free)}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.path)
+        self.dirty = False
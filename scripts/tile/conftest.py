@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+测试共用的配置、辅助函数与fixture
+各测试文件的 __main__ 直接导入这里的辅助函数，不经过pytest也能运行
+"""
+
+import io
+import json
+from typing import List, NamedTuple, Optional, Sequence
+
+import pytest
+
+from output import JsonReporter, Reporter
+from terminal_tiler import TerminalTiler, build_parser, execute
+from window_backend import FakeWindowBackend
+
+
+class FakeClock:
+    """手动拨动的时钟，测试直接修改now"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class StepClock:
+    """每次读取前进step的时钟（默认1ms，单位为纳秒）"""
+
+    def __init__(self, step: int = 1_000_000):
+        self.now = 0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+class CliRun(NamedTuple):
+    """一次命令的执行摘要和输出"""
+    summary: dict
+    output: str
+
+    @property
+    def events(self) -> List[dict]:
+        """JSON报告器输出的事件"""
+        return json.loads(self.output)['events']
+
+    @property
+    def found(self) -> List[str]:
+        """找到的窗口标题"""
+        return [event['title'] for event in self.events if event['type'] == 'found']
+
+
+def run_cli(argv: Sequence[str], tiler: Optional[TerminalTiler] = None,
+            reporter=JsonReporter) -> CliRun:
+    """
+    像命令行一样执行一次: 解析参数、configure、换成写入内存流的报告器、execute
+    tiler默认为演示窗口上的新平铺器
+    """
+    tiler = tiler or TerminalTiler(FakeWindowBackend.demo())
+    args = build_parser().parse_args(list(argv))
+    tiler.configure(args)
+    stream = io.StringIO()
+    tiler.out = reporter(stream=stream)
+    summary = execute(tiler, args)
+    return CliRun(summary, stream.getvalue())
+
+
+def fake_tiler(count: Optional[int] = None, title: str = "gas{i} - PowerShell",
+               backend: Optional[FakeWindowBackend] = None, monitors=None, **window) -> TerminalTiler:
+    """
+    假后端上的平铺器，输出写入内存流（tiler.backend为假后端）
+    count为None时使用backend或演示窗口，否则添加count个标题为 title.format(i=序号) 的终端，
+    window为传给add_window的其他参数
+    """
+    if backend is None:
+        if count is None:
+            backend = FakeWindowBackend.demo()
+        else:
+            backend = FakeWindowBackend(monitors=monitors)
+    for i in range(count or 0):
+        backend.add_window(title.format(i=i), **window)
+    tiler = TerminalTiler(backend)
+    tiler.out = Reporter(stream=io.StringIO())
+    return tiler
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """缓存、运行队列和指标写到临时目录，测试不影响用户真实的缓存"""
+    directory = tmp_path / 'cache'
+    monkeypatch.setenv('TERMINAL_TILER_CACHE', str(directory))
+    monkeypatch.setenv('TERMINAL_TILER_METRICS', 'off')
+    return directory
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def step_clock() -> StepClock:
+    return StepClock()
+
+
+@pytest.fixture
+def run():
+    """run(argv, tiler=None, reporter=JsonReporter) -> CliRun，见 run_cli"""
+    return run_cli
+
+
+@pytest.fixture
+def make_tiler():
+    """make_tiler(count=None, title=..., backend=None, monitors=None, **window)，见 fake_tiler"""
+    return fake_tiler
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+窗口几何批量提交
+先生成完整的布局方案，再通过后端的延迟提交接口一次性应用，
+整批生效后统一重绘，并以实际位置稳定作为完成条件代替固定等待。
+另提供异步放置模式，容忍无响应的窗口
+"""
+
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from metrics import NULL_METRICS
+from profiler import NULL_PROFILER
+from window_backend import Rect, WindowBackend
+
+if TYPE_CHECKING:
+    # 只有已知字符网格的窗口才用到，隐藏窗口等不需要导入
+    from cell_grid import CellMetrics
+
+
+class Placement(NamedTuple):
+    """布局方案中的一个窗口目标位置"""
+    hwnd: int
+    title: str
+    rect: Rect
+    # 用于输出的位置描述，如"第1列第2行"
+    label: str = ""
+    # 窗口的字符网格，rect已对齐到整行整列；行列数不变时不调整大小
+    cells: Optional['CellMetrics'] = None
+    # 窗口类名，用作指标的标签
+    class_name: str = ""
+
+
+class CommitResult:
+    """一次批量提交的结果"""
+
+    def __init__(self):
+        # 实际发出了操作的窗口（含仅调整Z序的窗口）
+        self.placed: List[Placement] = []
+        # 已在目标位置、无需任何操作的窗口
+        self.skipped: List[Placement] = []
+        # 位置正确、只因被遮挡而重新置顶的窗口
+        self.raised: List[Placement] = []
+        self.failed: Dict[int, str] = {}
+        # 超时仍未到达目标位置的窗口
+        self.unsettled: List[int] = []
+        # 异步模式下超过截止时间仍未响应的窗口
+        self.stragglers: List[int] = []
+        # 实际调用提交接口的次数
+        self.commits = 0
+        self.elapsed = 0.0
+
+    @property
+    def moved(self) -> int:
+        """移动或调整了大小的窗口数"""
+        return len(self.placed) - len(self.raised)
+
+
+class Change(NamedTuple):
+    """差异计算得到的一项待执行操作"""
+    placement: Placement
+    # 实际提交的矩形，仅置顶时为窗口当前矩形
+    rect: Rect
+    # 窗口当前处于最小化状态，需要先还原；None表示提交时再检查
+    restore: Optional[bool]
+
+
+def _intersects(a: Rect, b: Rect) -> bool:
+    return (a[0] < b[0] + b[2] and b[0] < a[0] + a[2]
+            and a[1] < b[1] + b[3] and b[1] < a[1] + a[3])
+
+
+def diff_placements(backend: WindowBackend, placements: Sequence[Placement],
+                    tolerance: int, result: CommitResult) -> List[Change]:
+    """
+    对比窗口当前状态与布局方案，只为矩形、显示状态或Z序确实不同的窗口生成操作
+    矩形各分量相差不超过tolerance像素视为一致；
+    位置一致但被组外窗口遮挡时只置顶，不改变大小（避免终端重排滚动缓冲区）；
+    已知字符网格的窗口行列数不变时只比较位置，需要移动时保持当前大小
+    """
+    group = {placement.hwnd for placement in placements}
+    try:
+        zorder = backend.list_windows()
+    except Exception:
+        zorder = []
+    rank = {hwnd: i for i, hwnd in enumerate(zorder)}
+    rects: Dict[int, Rect] = {}
+    # 支持流水线的后端一次读取所有窗口的状态，而不是每个窗口一次往返
+    backend.prefetch(list(group | set(zorder)))
+
+    def occluded(hwnd: int, rect: Rect) -> bool:
+        for other in zorder[:rank.get(hwnd, 0)]:
+            if other in group:
+                continue
+            if other not in rects:
+                try:
+                    rects[other] = backend.get_rect(other)
+                except Exception:
+                    rects[other] = (0, 0, 0, 0)
+            if _intersects(rect, rects[other]):
+                return True
+        return False
+
+    changes: List[Change] = []
+    for placement in placements:
+        try:
+            minimized = backend.is_minimized(placement.hwnd)
+            current = backend.get_rect(placement.hwnd)
+        except Exception as e:
+            result.failed[placement.hwnd] = str(e)
+            continue
+        target = placement.rect
+        if minimized:
+            changes.append(Change(placement, target, True))
+            continue
+        if placement.cells is not None:
+            from cell_grid import same_grid
+            if same_grid(current, target, placement.cells):
+                target = target[:2] + current[2:]
+        if any(abs(a - b) > tolerance for a, b in zip(current, target)):
+            changes.append(Change(placement, target, False))
+        elif occluded(placement.hwnd, current):
+            changes.append(Change(placement, current, False))
+            result.raised.append(placement)
+        else:
+            result.skipped.append(placement)
+    return changes
+
+
+class GeometryCommitter:
+    """
+    窗口几何提交器
+    settle_timeout: 等待窗口位置稳定的最长时间（秒）
+    poll_interval: 检测位置稳定的轮询间隔（秒）
+    tolerance: 差异比较的像素容差，为None时不做差异比较、总是提交全部窗口
+    """
+
+    def __init__(self, backend: WindowBackend, settle_timeout: float = 0.5,
+                 poll_interval: float = 0.01, tolerance: Optional[int] = 2,
+                 clock: Callable[[], float] = time.perf_counter,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.backend = backend
+        self.settle_timeout = settle_timeout
+        self.poll_interval = poll_interval
+        self.tolerance = tolerance
+        self._clock = clock
+        self._sleep = sleep
+        self.profiler = NULL_PROFILER
+        self.metrics = NULL_METRICS
+
+    def commit(self, placements: Sequence[Placement]) -> CommitResult:
+        """一次性应用整个布局方案"""
+        result = CommitResult()
+        start = self._clock()
+        if not placements:
+            return result
+
+        backend = self.backend
+        profiler = self.profiler
+        if self.tolerance is None:
+            changes = [Change(placement, placement.rect, None) for placement in placements]
+        else:
+            with profiler.phase('diff'):
+                changes = diff_placements(backend, placements, self.tolerance, result)
+
+        pending: List[Placement] = []
+        for change in changes:
+            placement = change.placement
+            try:
+                # 最小化的窗口需先还原，延迟提交不会改变窗口的显示状态
+                restore = change.restore
+                if restore is None:
+                    restore = backend.is_minimized(placement.hwnd)
+                if restore:
+                    backend.restore(placement.hwnd)
+                pending.append(placement._replace(rect=change.rect))
+            except Exception as e:
+                result.failed[placement.hwnd] = str(e)
+
+        with profiler.phase('batch'):
+            self._commit_batch(pending, result)
+
+        with profiler.phase('settle'):
+            result.unsettled = self.wait_settled(result.placed)
+        result.elapsed = self._clock() - start
+        return result
+
+    def _commit_batch(self, pending: List[Placement], result: CommitResult):
+        backend = self.backend
+        metrics = self.metrics
+        if not pending:
+            return
+        try:
+            batch = backend.begin_batch(len(pending))
+            for placement in pending:
+                batch = backend.defer_window_pos(batch, placement.hwnd, placement.rect)
+            # 整批在一次调用中生效，无法按窗口类区分；各窗口类的耗时见 tiler_settle_seconds
+            with metrics.time('tiler_backend_call_seconds', call='end_batch'):
+                backend.end_batch(batch)
+            result.commits += 1
+            result.placed.extend(pending)
+            return
+        except Exception:
+            # 批次中有无效窗口时整批失败，退回逐个移动以隔离出错的窗口
+            pass
+
+        for placement in pending:
+            try:
+                x, y, width, height = placement.rect
+                with metrics.time('tiler_backend_call_seconds', call='move_window',
+                                  window_class=placement.class_name):
+                    backend.move_window(placement.hwnd, x, y, width, height)
+                result.commits += 1
+                result.placed.append(placement)
+            except Exception as e:
+                result.failed[placement.hwnd] = str(e)
+
+    def wait_settled(self, placements: Sequence[Placement]) -> List[int]:
+        """
+        等待窗口到达目标位置
+        位置与目标一致，或连续两次读取不再变化（窗口自行调整了尺寸）即视为稳定
+        返回超时仍未稳定的窗口句柄
+        """
+        backend = self.backend
+        metrics = self.metrics
+        last_seen: Dict[int, Rect] = {}
+        pending = {placement.hwnd: placement.rect for placement in placements}
+        classes = {placement.hwnd: placement.class_name for placement in placements}
+        start = self._clock()
+        deadline = start + self.settle_timeout
+        while pending:
+            backend.prefetch(list(pending))
+            for hwnd, target in list(pending.items()):
+                try:
+                    rect = backend.get_rect(hwnd)
+                except Exception:
+                    # 窗口已关闭，无需再等待
+                    del pending[hwnd]
+                    continue
+                if rect == target or last_seen.get(hwnd) == rect:
+                    del pending[hwnd]
+                    metrics.observe('tiler_settle_seconds', self._clock() - start,
+                                    window_class=classes[hwnd])
+                else:
+                    last_seen[hwnd] = rect
+            if not pending or self._clock() >= deadline:
+                break
+            self._sleep(self.poll_interval)
+        return list(pending)
+
+
+class AsyncPlacer:
+    """
+    异步窗口放置器
+    每个窗口的操作在后台线程中以异步方式发出，不等待目标窗口处理完成；
+    每个窗口有独立的截止时间（从派发到线程时开始计算），超时的窗口记为掉队者而不阻塞整体，
+    卡住的线程由新线程替换，排在后面的窗口不会因为前面的无响应窗口而超时
+    max_hung: 仍卡在无响应窗口上的线程上限（跨多次调用累计，守护进程中长期有效）；
+              达到上限后不再替换线程，剩余窗口记为失败；已有线程卡住的窗口不再派发新的操作
+    """
+
+    def __init__(self, backend: WindowBackend, deadline: float = 1.0,
+                 max_workers: int = 16, poll_interval: float = 0.01,
+                 tolerance: Optional[int] = 2,
+                 clock: Callable[[], float] = time.monotonic, max_hung: int = 32):
+        self.backend = backend
+        self.deadline = deadline
+        self.max_workers = max_workers
+        self.max_hung = max_hung
+        # 仍卡在其中的线程未返回的窗口，由 _hung_lock 保护（首次运行时创建）
+        self._hung: Set[int] = set()
+        self._hung_lock = None
+        self.poll_interval = poll_interval
+        self.tolerance = tolerance
+        self._clock = clock
+        self.metrics = NULL_METRICS
+
+    def place(self, placements: Sequence[Placement],
+              deadlines: Optional[Dict[int, float]] = None) -> CommitResult:
+        """异步移动所有窗口，deadlines可为单个窗口指定截止时间（秒）"""
+        result = CommitResult()
+        if self.tolerance is None:
+            pending = list(placements)
+        else:
+            # 差异比较只读取窗口状态，不会阻塞在无响应的窗口上
+            pending = [change.placement._replace(rect=change.rect) for change in
+                       diff_placements(self.backend, placements, self.tolerance, result)]
+        tasks = [(placement.hwnd, self._place_task(placement)) for placement in pending]
+        run = self._run(tasks, deadlines or {})
+        result.failed.update(run.failed)
+        result.stragglers = run.stragglers
+        result.commits = run.commits
+        result.elapsed = run.elapsed
+        result.placed = [placement for placement in pending
+                         if placement.hwnd not in result.failed
+                         and placement.hwnd not in result.stragglers]
+        return result
+
+    def hide(self, hwnds: Sequence[int],
+             deadlines: Optional[Dict[int, float]] = None) -> CommitResult:
+        """异步最小化所有窗口"""
+        tasks = [(hwnd, self._hide_task(hwnd)) for hwnd in hwnds]
+        return self._run(tasks, deadlines or {})
+
+    def _place_task(self, placement: Placement) -> Callable[[float], bool]:
+        backend = self.backend
+        metrics = self.metrics
+
+        def task(deadline: float) -> bool:
+            started = time.perf_counter()
+            if backend.is_minimized(placement.hwnd):
+                backend.restore_async(placement.hwnd)
+            with metrics.time('tiler_backend_call_seconds', call='move_window_async',
+                              window_class=placement.class_name):
+                backend.move_window_async(placement.hwnd, placement.rect)
+            # 异步调用立即返回，位置到达目标且尺寸稳定后才算完成
+            target_pos = placement.rect[:2]
+            last = None
+            while True:
+                rect = backend.get_rect(placement.hwnd)
+                if rect == placement.rect or (rect[:2] == target_pos and rect == last):
+                    metrics.observe('tiler_settle_seconds', time.perf_counter() - started,
+                                    window_class=placement.class_name)
+                    return True
+                if self._clock() >= deadline:
+                    return False
+                last = rect
+                time.sleep(self.poll_interval)
+
+        return task
+
+    def _hide_task(self, hwnd: int) -> Callable[[float], bool]:
+        backend = self.backend
+
+        def task(deadline: float) -> bool:
+            backend.minimize_async(hwnd)
+            while not backend.is_minimized(hwnd):
+                if self._clock() >= deadline:
+                    return False
+                time.sleep(self.poll_interval)
+            return True
+
+        return task
+
+    @property
+    def hung(self) -> int:
+        """仍卡在无响应窗口上的线程数"""
+        return len(self._hung)
+
+    def _run(self, tasks: List[Tuple[int, Callable[[float], bool]]],
+             deadlines: Dict[int, float]) -> CommitResult:
+        # 仅异步模式需要线程，按需导入以缩短启动时间
+        import queue
+        import threading
+
+        result = CommitResult()
+        start = self._clock()
+        if not tasks:
+            return result
+        if self._hung_lock is None:
+            self._hung_lock = threading.Lock()
+        hung_lock = self._hung_lock
+
+        cond = threading.Condition()
+        work: "queue.Queue[Tuple[int, Callable[[float], bool]]]" = queue.Queue()
+        with hung_lock:
+            # 上一次的操作仍卡在这些窗口上: 直接记为掉队者，不再占用新的线程
+            blocked = {hwnd for hwnd, _ in tasks if hwnd in self._hung}
+        for item in tasks:
+            if item[0] not in blocked:
+                work.put(item)
+        # 已派发窗口的截止时间 / 已返回的结果 / 超过截止时间被视为卡住的窗口
+        due: Dict[int, float] = {}
+        done: Dict[int, Optional[str]] = {}
+        overdue: Set[int] = set()
+        # 未卡住的工作线程数
+        active = [0]
+
+        def worker():
+            while True:
+                with cond:
+                    try:
+                        hwnd, task = work.get_nowait()
+                    except queue.Empty:
+                        active[0] -= 1
+                        cond.notify()
+                        return
+                    # 截止时间从派发时开始，排队等待的时间不计入
+                    deadline = due[hwnd] = self._clock() + deadlines.get(hwnd, self.deadline)
+                    cond.notify()
+                try:
+                    ok = task(deadline) and self._clock() <= deadline
+                    error = None if ok else "timeout"
+                except Exception as e:
+                    error = str(e)
+                with cond:
+                    done[hwnd] = error
+                    replaced = hwnd in overdue
+                    cond.notify()
+                if replaced:
+                    # 已由新线程替换: 释放名额后退出
+                    with hung_lock:
+                        self._hung.discard(hwnd)
+                    return
+
+        def spawn():
+            active[0] += 1
+            # 守护线程: 卡在无响应窗口上的线程不会阻止进程退出
+            threading.Thread(target=worker, daemon=True).start()
+
+        with cond:
+            for _ in range(min(self.max_workers, work.qsize())):
+                spawn()
+            while True:
+                now = self._clock()
+                waiting = []
+                for hwnd, when in due.items():
+                    if hwnd in done or hwnd in overdue:
+                        continue
+                    if when > now:
+                        waiting.append(when)
+                        continue
+                    # 超过截止时间仍未返回: 线程卡住，未达上限时换一个新线程处理排队的窗口
+                    overdue.add(hwnd)
+                    active[0] -= 1
+                    with hung_lock:
+                        self._hung.add(hwnd)
+                        room = len(self._hung) < self.max_hung
+                    if room and not work.empty():
+                        spawn()
+                if work.empty() and not waiting and all(hwnd in done or hwnd in overdue for hwnd in due):
+                    break
+                if active[0] <= 0 and not work.empty():
+                    # 卡住的线程达到上限: 剩余窗口不再派发
+                    break
+                cond.wait(max(min(waiting) - now, 0) if waiting else self.poll_interval)
+            while not work.empty():
+                work.get_nowait()
+            finished = {hwnd: ("timeout" if hwnd in overdue else error) for hwnd, error in done.items()}
+            finished.update((hwnd, "timeout") for hwnd in overdue)
+            dispatched = set(due)
+
+        for hwnd, _ in tasks:
+            if hwnd in blocked or finished.get(hwnd, None) == "timeout":
+                result.stragglers.append(hwnd)
+            elif hwnd not in dispatched:
+                result.failed[hwnd] = "无响应的窗口过多，未执行"
+            elif finished.get(hwnd) is not None:
+                result.failed[hwnd] = finished[hwnd]
+        result.commits = len(dispatched)
+        result.elapsed = self._clock() - start
+        return result
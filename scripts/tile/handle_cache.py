@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+跨运行的窗口句柄缓存
+按关键字（分组）保存上次匹配到的终端窗口 (句柄, 标题, 类名, pid)，
+下一次运行只需校验这k个窗口: 仍然存在、类名和所属进程未变（句柄未被复用）、标题仍匹配同一分组，
+不必查询所有顶层窗口的标题、类名和进程；
+可见顶层窗口集合变化（只枚举句柄，比较签名，可以发现在后台打开的终端）、校验失败、缓存过期
+或前台出现未缓存的匹配终端（已有窗口改名）时回退为完整枚举。
+已有的后台窗口改名后才匹配时窗口集合不变，最多在max_age秒内不会被发现
+"""
+
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from title_matcher import compile_query
+from window_backend import WindowBackend, WindowRecord, window_signature
+
+FORMAT_VERSION = 2
+# 缓存结果最长使用的秒数，超过后强制完整枚举一次
+DEFAULT_MAX_AGE = 300.0
+
+Signature = Tuple[int, int]
+
+
+def default_handle_cache_path() -> str:
+    """句柄缓存文件，与进程缓存在同一目录"""
+    from processes import default_cache_path
+    return os.path.join(os.path.dirname(default_cache_path()), 'handles.json')
+
+
+def _group_of(title: str, matchers) -> Optional[int]:
+    """标题所属的分组（第一个匹配的关键字），都不匹配时返回None"""
+    for index, matcher in enumerate(matchers):
+        if matcher.matches(title):
+            return index
+    return None
+
+
+class HandleCache:
+    """
+    (关键字, ...) -> 各分组窗口的缓存
+    path不为None时从文件加载，save()写回（只保留最近使用的max_queries个查询）
+    backend为后端名称，不同后端的句柄互不通用
+    """
+
+    def __init__(self, path: Optional[str] = None, backend: str = '',
+                 max_age: float = DEFAULT_MAX_AGE, max_queries: int = 64,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.backend = backend
+        self.max_age = max_age
+        self.max_queries = max_queries
+        self._clock = clock
+        # 查询 -> (保存时间, 可见顶层窗口集合的签名, 每个分组的 [[句柄, 标题, 类名, pid], ...])
+        self._entries: 'OrderedDict[Tuple[str, ...], Tuple[float, Optional[Signature], List[List[list]]]]' = OrderedDict()
+        # 统计: 校验通过 / 没有可用的缓存（不存在或已过期）/ 校验失败
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.dirty = False
+        if path is not None:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, keywords: Sequence[str], backend: WindowBackend) -> Optional[List[List[WindowRecord]]]:
+        """
+        校验并返回缓存的各分组窗口（按keywords顺序），需要完整枚举时返回None
+        每个缓存的窗口重新读取一次记录，返回的标题和位置总是最新的
+        """
+        key = tuple(keywords)
+        entry = self._entries.get(key)
+        if entry is None or not 0 <= self._clock() - entry[0] <= self.max_age:
+            self.misses += 1
+            return None
+        _, signature, groups = entry
+        # 只枚举句柄（不查询标题等属性）: 有窗口打开或关闭时重新枚举
+        if signature is None or window_signature(backend.list_windows()) != signature:
+            return self._drop(key)
+        fresh = {record.hwnd: record for record in
+                 backend.terminal_records([item[0] for group in groups for item in group])}
+        matchers = [compile_query(keyword) for keyword in keywords]
+        result = []
+        for index, group in enumerate(groups):
+            records = []
+            for hwnd, _, class_name, pid in group:
+                record = fresh.get(hwnd)
+                if (record is None or record.class_name != class_name or record.pid != pid
+                        or _group_of(record.title, matchers) != index):
+                    return self._drop(key)
+                records.append(record)
+            result.append(records)
+        if self._new_window_suspected(backend, fresh, matchers):
+            return self._drop(key)
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return result
+
+    def _new_window_suspected(self, backend: WindowBackend, cached, matchers) -> bool:
+        """新打开的终端通常在前台: 前台窗口是未缓存的匹配终端时需要重新枚举"""
+        hwnd = backend.foreground_window()
+        if hwnd is None or hwnd in cached:
+            return False
+        records = backend.terminal_records([hwnd])
+        return bool(records) and _group_of(records[0].title, matchers) is not None
+
+    def _drop(self, key: Tuple[str, ...]) -> None:
+        self.stale += 1
+        del self._entries[key]
+        self.dirty = True
+        return None
+
+    def store(self, keywords: Sequence[str], groups: Sequence[Sequence[WindowRecord]],
+              signature: Optional[Signature] = None):
+        """
+        保存完整枚举的结果及枚举时的窗口集合签名；没有匹配窗口时不缓存（下一次很可能有新窗口）
+        没有签名时无法确认窗口集合未变，下一次运行不会使用该结果
+        """
+        key = tuple(keywords)
+        if not any(groups):
+            if self._entries.pop(key, None) is not None:
+                self.dirty = True
+            return
+        self._entries[key] = (self._clock(), signature, [
+            [[record.hwnd, record.title, record.class_name, record.pid] for record in group]
+            for group in groups])
+        self._entries.move_to_end(key)
+        self.dirty = True
+
+    def invalidate(self, keywords: Optional[Sequence[str]] = None):
+        """丢弃一个查询（默认全部）的缓存"""
+        if keywords is None:
+            self.dirty = self.dirty or bool(self._entries)
+            self._entries.clear()
+        elif self._entries.pop(tuple(keywords), None) is not None:
+            self.dirty = True
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != FORMAT_VERSION or data.get('backend') != self.backend:
+            return
+        for entry in data.get('queries', []):
+            try:
+                groups = [[[int(hwnd), str(title), str(class_name), int(pid)]
+                           for hwnd, title, class_name, pid in group] for group in entry['groups']]
+                if len(groups) != len(entry['keywords']):
+                    continue
+                count, digest = entry['signature']
+                self._entries[tuple(entry['keywords'])] = (float(entry['time']), (int(count), int(digest)),
+                                                           groups)
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    def save(self):
+        """有变化时写回文件（先写临时文件再替换）"""
+        if self.path is None or not self.dirty:
+            return
+        while len(self._entries) > self.max_queries:
+            self._entries.popitem(last=False)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        queries = [{'keywords': list(key), 'time': saved_at, 'signature': list(signature), 'groups': groups}
+                   for key, (saved_at, signature, groups) in self._entries.items() if signature is not None]
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION, 'backend': self.backend, 'queries': queries},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.path)
+        self.dirty = False
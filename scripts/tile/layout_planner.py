@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+布局规划器
+纯函数: (窗口数量, 工作区, 间距, 尺寸约束, 方向) -> 每个窗口的矩形
+不涉及任何窗口操作或输出；整组矩形批量计算，窗口很多时使用NumPy（可选），
+结果按输入缓存
+列数由约束求解器选择: 在所有窗口都放得下的方案中使窗口可用面积最大
+增量布局 (plan_incremental) 按窗口的当前位置分配槽位，使窗口加入/离开时其余窗口移动最少
+"""
+
+import math
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from assignment import min_cost_assignment, move_cost
+from window_backend import Rect
+
+VERTICAL = 'vertical'
+HORIZONTAL = 'horizontal'
+
+# 窗口数达到该值且安装了NumPy时使用向量化计算
+NUMPY_THRESHOLD = 256
+
+# 终端窗口的目标宽高比（80x24字符在常见等宽字体下约为1.6）
+TERMINAL_ASPECT = 1.6
+# 宽高比偏离目标时可用面积的折算指数，0为不考虑宽高比
+ASPECT_WEIGHT = 0.5
+# calculate_grid 的手工方案放得下、且评分不低于最优方案的 (1 - LEGACY_SLACK) 时保留手工方案
+LEGACY_SLACK = 0.15
+# 增量布局最多保留的空槽位数: 窗口离开时可以保留原来的网格，其余窗口不必移动
+HOLE_SLACK = 1
+# 窗口左上角与槽位相差不超过该值（像素）时视为已在槽位中
+SLOT_TOLERANCE = 2
+# 窗口数超过该值时增量布局不再求解分配（O(n³)），按窗口顺序放置
+ASSIGNMENT_LIMIT = 256
+# 层叠时相邻窗口的偏移（像素，按DPI缩放），露出每个窗口的标题栏
+CASCADE_OFFSET = 32
+
+
+class LayoutConstraints(NamedTuple):
+    """窗口尺寸约束，None表示不限制"""
+    min_width: int = 0
+    max_width: Optional[int] = None
+    min_height: int = 0
+    max_height: Optional[int] = None
+
+
+# 垂直平铺: 限制高度，适合查看日志
+VERTICAL_CONSTRAINTS = LayoutConstraints(min_width=300, min_height=200, max_height=600)
+# 水平平铺: 限制宽度，保证终端可读性又避免过宽
+HORIZONTAL_CONSTRAINTS = LayoutConstraints(min_width=300, max_width=800)
+
+
+class LayoutPlan(NamedTuple):
+    """一次布局规划的结果"""
+    cols: int
+    # 每列的窗口数
+    rows_per_col: Tuple[int, ...]
+    window_width: int
+    window_height: int
+    # 按窗口顺序排列的 (列, 行) 槽位与矩形
+    slots: Tuple[Tuple[int, int], ...]
+    rects: Tuple[Rect, ...]
+
+    @property
+    def max_rows(self) -> int:
+        return max(self.rows_per_col) if self.rows_per_col else 0
+
+
+def _spread(num_windows: int, cols: int) -> List[int]:
+    """把窗口平均分配到各列，余数分配给前面的列"""
+    base_count = num_windows // cols
+    remainder = num_windows % cols
+    col_counts = [base_count] * cols
+    for i in range(remainder):
+        col_counts[i] += 1
+    return col_counts
+
+
+def calculate_grid(num_windows: int, prefer_vertical: bool = True) -> Tuple[int, List[int]]:
+    """
+    计算最优的网格布局
+
+    Args:
+        num_windows: 窗口总数
+        prefer_vertical: 是否优先垂直排列
+
+    Returns:
+        (列数, 每列的行数列表)
+    """
+    if num_windows <= 0:
+        return (0, [])
+
+    if num_windows == 1:
+        return (1, [1])
+
+    if num_windows == 2:
+        return (1, [2]) if prefer_vertical else (2, [1, 1])
+
+    # 对于3个或更多窗口，使用智能布局
+    if prefer_vertical:
+        # 垂直优先：尽量少列，但避免单列过挤
+        if num_windows == 3:
+            # 3个窗口：优先2列布局，避免单列过长
+            return (2, [2, 1])  # 第一列2个，第二列1个
+        elif num_windows <= 6:
+            # 4-6个窗口用2列
+            return (2, _spread(num_windows, 2))
+        elif num_windows <= 9:
+            # 7-9个窗口用3列
+            return (3, _spread(num_windows, 3))
+        else:
+            # 更多窗口，计算合适的列数
+            cols = min(4, (num_windows + 2) // 3)  # 最多4列，每列大约3个
+            return (cols, _spread(num_windows, cols))
+    else:
+        # 水平优先：尽量多列，少行
+        cols = min(num_windows, int(math.ceil(math.sqrt(num_windows))))
+        return (cols, _spread(num_windows, cols))
+
+
+def _clamp(value: int, low: int, high: Optional[int]) -> int:
+    if high is not None:
+        value = min(high, value)
+    return max(low, value)
+
+
+def _cell_size(count: int, cols: int, width: int, height: int, gap: int) -> Tuple[int, int]:
+    """cols列均分count个窗口时每个窗口可用的 (宽, 高)，未应用约束"""
+    rows = -(-count // cols)
+    return (width - gap * (cols + 1)) // cols, (height - gap * (rows + 1)) // rows
+
+
+def _grid_score(count: int, cols: int, width: int, height: int, gap: int,
+                constraints: LayoutConstraints, aspect: float) -> Optional[float]:
+    """
+    方案评分: 窗口面积按宽高比偏离目标的程度折算（所有窗口尺寸相同，即最小窗口的可用面积）
+    窗口小于最小尺寸（会超出工作区）时返回None
+    """
+    cell_width, cell_height = _cell_size(count, cols, width, height, gap)
+    if cell_width < max(constraints.min_width, 1) or cell_height < max(constraints.min_height, 1):
+        return None
+    # 超过最大尺寸的部分用不上
+    if constraints.max_width is not None:
+        cell_width = min(cell_width, constraints.max_width)
+    if constraints.max_height is not None:
+        cell_height = min(cell_height, constraints.max_height)
+    ratio = cell_width / cell_height
+    fit = min(ratio, aspect) / max(ratio, aspect)
+    return cell_width * cell_height * fit ** ASPECT_WEIGHT
+
+
+def _overflow_ratio(count: int, cols: int, width: int, height: int, gap: int,
+                    constraints: LayoutConstraints) -> float:
+    """放不下时，可用尺寸与最小尺寸之比中较小的一个（越接近1越接近放得下）"""
+    cell_width, cell_height = _cell_size(count, cols, width, height, gap)
+    return min(cell_width / max(constraints.min_width, 1),
+               cell_height / max(constraints.min_height, 1))
+
+
+@lru_cache(maxsize=1024)
+def solve_grid(count: int, width: int, height: int, gap: int = 5,
+               constraints: Optional[LayoutConstraints] = None,
+               orientation: str = VERTICAL,
+               aspect: float = TERMINAL_ASPECT) -> Tuple[int, Tuple[int, ...]]:
+    """
+    为width x height的工作区选择列数与每列窗口数
+    在窗口不小于最小尺寸（全部在工作区内）的方案中选评分最高的；
+    calculate_grid 的手工方案放得下且接近最优时保留，使常见数量的布局保持不变；
+    没有放得下的方案时选最接近放得下的，由调用方（如按容量分布到其他显示器）处理
+
+    Returns:
+        (列数, 每列的行数)
+    """
+    if count <= 0:
+        return (0, ())
+    vertical = orientation == VERTICAL
+    if constraints is None:
+        constraints = VERTICAL_CONSTRAINTS if vertical else HORIZONTAL_CONSTRAINTS
+
+    best_cols, best_score = 0, 0.0
+    for cols in range(1, count + 1):
+        # 行数相同时列数更多只会让窗口更窄
+        if cols > 1 and -(-count // cols) == -(-count // (cols - 1)):
+            continue
+        score = _grid_score(count, cols, width, height, gap, constraints, aspect)
+        if score is not None and score > best_score:
+            best_cols, best_score = cols, score
+
+    legacy_cols, legacy_rows = calculate_grid(count, prefer_vertical=vertical)
+    if best_cols == 0:
+        best_cols = max(range(1, count + 1),
+                        key=lambda cols: _overflow_ratio(count, cols, width, height, gap, constraints))
+    else:
+        legacy_score = _grid_score(count, legacy_cols, width, height, gap, constraints, aspect)
+        if legacy_score is not None and legacy_score >= best_score * (1 - LEGACY_SLACK):
+            return (legacy_cols, tuple(legacy_rows))
+    return (best_cols, tuple(_spread(count, best_cols)))
+
+
+def _slots_python(rows_per_col: Tuple[int, ...], vertical: bool) -> List[Tuple[int, int]]:
+    if vertical:
+        # 按列填充
+        return [(col, row) for col, count in enumerate(rows_per_col) for row in range(count)]
+    # 按行填充（水平平铺）
+    max_rows = max(rows_per_col)
+    return [(col, row) for row in range(max_rows)
+            for col, count in enumerate(rows_per_col) if row < count]
+
+
+def _rects_numpy(np, rows_per_col: Tuple[int, ...], vertical: bool, origin: Tuple[int, int],
+                 gap: int, width: int, height: int):
+    counts = np.asarray(rows_per_col)
+    if vertical:
+        cols = np.repeat(np.arange(len(counts)), counts)
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.arange(int(counts.sum())) - starts
+    else:
+        mask = np.arange(int(counts.max()))[:, None] < counts[None, :]
+        rows, cols = np.nonzero(mask)
+    xs = origin[0] + gap + cols * (width + gap)
+    ys = origin[1] + gap + rows * (height + gap)
+    n = len(xs)
+    rects = np.stack([xs, ys, np.full(n, width), np.full(n, height)], axis=1)
+    return (tuple(zip(cols.tolist(), rows.tolist())),
+            tuple(map(tuple, rects.tolist())))
+
+
+_np = None
+
+
+def _numpy():
+    """按需导入NumPy，未安装时返回None"""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = False
+    return _np or None
+
+
+@lru_cache(maxsize=256)
+def plan_layout(count: int, work_area: Rect, gap: int = 5,
+                constraints: Optional[LayoutConstraints] = None,
+                orientation: str = VERTICAL) -> LayoutPlan:
+    """
+    规划count个窗口在工作区内的布局
+    work_area为 (x, y, 宽, 高)；constraints为None时按方向使用默认约束
+    """
+    vertical = orientation == VERTICAL
+    if constraints is None:
+        constraints = VERTICAL_CONSTRAINTS if vertical else HORIZONTAL_CONSTRAINTS
+    area_x, area_y, area_width, area_height = work_area
+    cols, rows_per_col = solve_grid(count, area_width, area_height, gap, constraints, orientation)
+    if cols == 0:
+        return LayoutPlan(0, (), 0, 0, (), ())
+
+    max_rows = max(rows_per_col)
+    available_width = area_width - gap * (cols + 1)
+    available_height = area_height - gap * (max_rows + 1)
+    width = _clamp(available_width // cols, constraints.min_width, constraints.max_width)
+    height = _clamp(available_height // max_rows, constraints.min_height, constraints.max_height)
+
+    np = _numpy() if count >= NUMPY_THRESHOLD else None
+    if np is not None:
+        slots, rects = _rects_numpy(np, rows_per_col, vertical, (area_x, area_y),
+                                    gap, width, height)
+    else:
+        slots = tuple(_slots_python(rows_per_col, vertical))
+        rects = tuple((area_x + gap + col * (width + gap),
+                       area_y + gap + row * (height + gap),
+                       width, height) for col, row in slots)
+    return LayoutPlan(cols, rows_per_col, width, height, slots, rects)
+
+
+def scale_constraints(constraints: LayoutConstraints, scale: float) -> LayoutConstraints:
+    """按显示器DPI缩放尺寸约束"""
+    if scale == 1:
+        return constraints
+    return LayoutConstraints(*(None if value is None else int(value * scale)
+                               for value in constraints))
+
+
+def plan_fits(plan: LayoutPlan, work_area: Rect) -> bool:
+    """布局中的所有窗口是否都在工作区内"""
+    right = work_area[0] + work_area[2]
+    bottom = work_area[1] + work_area[3]
+    return all(x + width <= right and y + height <= bottom for x, y, width, height in plan.rects)
+
+
+@lru_cache(maxsize=64)
+def capacity(work_area: Rect, gap: int = 5, constraints: Optional[LayoutConstraints] = None,
+             orientation: str = VERTICAL, limit: int = 64) -> int:
+    """工作区内不超出边界、且满足最小尺寸约束时最多能放下的窗口数"""
+    best = 0
+    for count in range(1, limit + 1):
+        if plan_fits(plan_layout(count, work_area, gap, constraints, orientation), work_area):
+            best = count
+    return best
+
+
+def distribute(count: int, capacities: List[int]) -> List[int]:
+    """
+    按容量比例把count个窗口分配到多个区域（最大余数法）
+    总容量不足时超出部分同样按比例分配
+    """
+    total = sum(capacities)
+    if count <= 0 or not capacities:
+        return [0] * len(capacities)
+    if total <= 0:
+        capacities = [1] * len(capacities)
+        total = len(capacities)
+    shares = [count * cap / total for cap in capacities]
+    result = [int(share) for share in shares]
+    remainders = sorted(range(len(shares)), key=lambda i: shares[i] - result[i], reverse=True)
+    for i in remainders[:count - sum(result)]:
+        result[i] += 1
+    return result
+
+
+def split_regions(work_area: Rect, weights: Sequence[float], gap: int = 5,
+                  orientation: str = VERTICAL) -> List[Rect]:
+    """
+    按权重把工作区切分为相邻的区域: 竖向平铺时为左右排列的列，水平平铺时为上下排列的行
+    相邻区域重叠gap像素，使区域之间与区域内部的窗口间距一致
+    """
+    if not weights:
+        return []
+    area_x, area_y, area_width, area_height = work_area
+    vertical = orientation == VERTICAL
+    length = area_width if vertical else area_height
+    sizes = distribute(length + gap * (len(weights) - 1), list(weights))
+    regions = []
+    offset = 0
+    for size in sizes:
+        if vertical:
+            regions.append((area_x + offset, area_y, size, area_height))
+        else:
+            regions.append((area_x, area_y + offset, area_width, size))
+        offset += size - gap
+    return regions
+
+
+def plan_incremental(current: Sequence[Optional[Rect]], work_area: Rect, gap: int = 5,
+                     constraints: Optional[LayoutConstraints] = None,
+                     orientation: str = VERTICAL,
+                     slack: int = HOLE_SLACK) -> Tuple[LayoutPlan, List[int]]:
+    """
+    增量布局: 在count到count+slack个槽位的候选布局中，按窗口的当前矩形分配槽位，使总移动代价最小
+    current为各窗口当前的矩形，None表示未知（如最小化的窗口），放到任何槽位代价相同；
+    只有比不留空位的布局保住更多已在槽位中的窗口时才考虑留空位，每个空槽位按一个槽位的面积计代价。
+    没有窗口已在槽位中（首次平铺或窗口已被打乱）时与普通平铺相同，按窗口顺序放置
+    返回 (布局, 每个窗口的槽位下标)
+    """
+    count = len(current)
+    exact = plan_layout(count, work_area, gap, constraints, orientation)
+    if count == 0 or count > ASSIGNMENT_LIMIT:
+        return exact, list(range(count))
+    seated = _seated(current, exact.rects)
+    best = None
+    for slots in range(count, count + slack + 1):
+        plan = exact if slots == count else plan_layout(slots, work_area, gap, constraints, orientation)
+        if len(plan.rects) < count:
+            continue
+        if slots > count:
+            if not plan_fits(plan, work_area):
+                continue
+            if _seated(current, plan.rects) <= seated:
+                continue
+        cost = [[0 if rect is None else move_cost(rect, target) for target in plan.rects]
+                for rect in current]
+        order = min_cost_assignment(cost)
+        total = (sum(row[slot] for row, slot in zip(cost, order))
+                 + (slots - count) * plan.window_width * plan.window_height)
+        if best is None or total < best[0]:
+            best = (total, plan, order)
+    total, plan, order = best
+    if plan is exact and not seated:
+        return exact, list(range(count))
+    return plan, order
+
+
+def _in_slot(rect: Rect, slot: Rect, tolerance: int = SLOT_TOLERANCE) -> bool:
+    """窗口是否已在槽位中: 左上角对齐，大小不超出槽位（按字符网格对齐的终端比槽位略小）"""
+    return (abs(rect[0] - slot[0]) <= tolerance and abs(rect[1] - slot[1]) <= tolerance
+            and slot[2] // 2 <= rect[2] <= slot[2] + tolerance
+            and slot[3] // 2 <= rect[3] <= slot[3] + tolerance)
+
+
+def _seated(current: Sequence[Optional[Rect]], slots: Sequence[Rect]) -> int:
+    """已在某个槽位中的窗口数"""
+    return sum(1 for rect in current
+               if rect is not None and any(_in_slot(rect, slot) for slot in slots))
+
+
+def cascade_rects(slot: Rect, depth: int, offset: int = CASCADE_OFFSET) -> List[Rect]:
+    """
+    把depth个窗口层叠在一个槽位内: 每层向右下偏移offset，整叠不超出槽位
+    层数很多时缩小偏移，保证每个窗口至少有槽位一半的宽和高
+    """
+    x, y, width, height = slot
+    if depth <= 1:
+        return [slot][:depth]
+    offset = max(1, min(offset, (width // 2) // (depth - 1), (height // 2) // (depth - 1)))
+    span = offset * (depth - 1)
+    return [(x + i * offset, y + i * offset, width - span, height - span) for i in range(depth)]
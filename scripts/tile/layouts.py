@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+布局快照
+保存匹配窗口的身份（标题、类名、进程）与位置/状态，之后一次枚举重新找到这些窗口，
+并把全部位置作为一个批次提交
+
+存储格式: 每个快照一个紧凑JSON文件
+  {"version": 1, "saved_at": 1700000000.0,
+   "windows": [["gas1 - PowerShell", "ConsoleWindowClass", 1234, [5, 5, 950, 532], 0], ...]}
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from window_backend import Rect, WindowRecord
+
+FORMAT_VERSION = 1
+_NAME_PATTERN = re.compile(r'^[\w.-]+$')
+
+
+class SnapshotEntry(NamedTuple):
+    """快照中的一个窗口"""
+    title: str
+    class_name: str
+    pid: int
+    rect: Rect
+    minimized: bool = False
+
+
+def default_directory() -> str:
+    """快照目录: 环境变量 TERMINAL_TILER_LAYOUTS，否则为用户配置目录"""
+    override = os.environ.get('TERMINAL_TILER_LAYOUTS')
+    if override:
+        return override
+    if sys.platform == 'win32':
+        base = os.environ.get('APPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(base, 'lch-terminal-tiler', 'layouts')
+
+
+def title_stem(title: str) -> str:
+    """标题中 ' - ' 之前的部分（终端名），进程内执行的命令改变标题时通常保持不变"""
+    return title.split(' - ', 1)[0].strip().lower()
+
+
+class LayoutStore:
+    """按名称读写布局快照"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or default_directory()
+
+    def path(self, name: str) -> str:
+        if not _NAME_PATTERN.match(name):
+            raise ValueError(f"无效的布局名称: {name} (只能包含字母、数字、下划线、点和短横线)")
+        return os.path.join(self.directory, name + '.json')
+
+    def save(self, name: str, entries: Sequence[SnapshotEntry]):
+        path = self.path(name)
+        os.makedirs(self.directory, exist_ok=True)
+        data = {
+            'version': FORMAT_VERSION,
+            'saved_at': round(time.time(), 3),
+            'windows': [[e.title, e.class_name, e.pid, list(e.rect), int(e.minimized)]
+                        for e in entries],
+        }
+        # 先写临时文件再替换，避免写到一半的快照
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    def load(self, name: str) -> List[SnapshotEntry]:
+        path = self.path(name)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"布局 '{name}' 不存在")
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError(f"不支持的布局格式版本: {data.get('version')}")
+        return [SnapshotEntry(title, class_name, pid, tuple(rect), bool(minimized))
+                for title, class_name, pid, rect, minimized in data['windows']]
+
+    def names(self) -> List[str]:
+        try:
+            files = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len('.json')] for name in files if name.endswith('.json'))
+
+
+def resolve(entries: Sequence[SnapshotEntry], records: Sequence[WindowRecord]
+            ) -> Tuple[List[Tuple[SnapshotEntry, WindowRecord]], List[SnapshotEntry]]:
+    """
+    把快照条目对应到当前窗口，每个窗口最多对应一个条目
+    依次按 标题完全相同 / 同一进程 / 终端名相同 匹配（类名都必须相同）
+    返回 ([(条目, 窗口), ...], 未找到的条目)
+    """
+    keys = [
+        lambda title, class_name, pid: (title, class_name),
+        lambda title, class_name, pid: (pid, class_name),
+        lambda title, class_name, pid: (title_stem(title), class_name),
+    ]
+    matched: Dict[int, WindowRecord] = {}
+    used = set()
+    for key in keys:
+        available: Dict[tuple, List[WindowRecord]] = {}
+        for record in records:
+            if record.hwnd not in used:
+                available.setdefault(key(record.title, record.class_name, record.pid), []).append(record)
+        for i, entry in enumerate(entries):
+            if i in matched:
+                continue
+            candidates = available.get(key(entry.title, entry.class_name, entry.pid))
+            if candidates:
+                record = candidates.pop(0)
+                matched[i] = record
+                used.add(record.hwnd)
+    pairs = [(entry, matched[i]) for i, entry in enumerate(entries) if i in matched]
+    missing = [entry for i, entry in enumerate(entries) if i not in matched]
+    return pairs, missing
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+长期运行指标
+在内存中记录延迟直方图和计数器，每次运行（守护进程/监视模式为每个请求/每批事件）结束时
+写到本地文件，用于观察数周内平铺失败的频率、各窗口类的放置耗时、枚举耗时随桌面窗口数的变化:
+  jsonl(默认): 每次写出追加一行本次的增量，文件超过大小上限时轮转 (metrics.jsonl.1, .2 ...)
+  prom       : Prometheus文本格式的累计值，与文件中已有的值相加后整体替换
+               (可由node_exporter的textfile collector采集)
+
+记录只把 (名称, 标签, 值) 追加到deque（CPython中是原子操作，无需加锁，后台线程也可记录），
+汇总到直方图和计数器推迟到写出时，在热点的放置循环中保持启用也只有一次追加的开销
+
+指标:
+  tiler_operation_seconds{operation}            直方图: 整次运行（operation为tile / hide / list等）及 plan / apply 阶段耗时
+  tiler_enumerate_seconds{desktop}              直方图: 完整枚举耗时，desktop为顶层窗口数的区间
+  tiler_backend_call_seconds{call[,window_class]} 直方图: end_batch / move_window / move_window_async / minimize_batch
+  tiler_settle_seconds{window_class}            直方图: 提交后窗口到达目标位置的耗时
+  tiler_windows_total{result}                   计数器: matched / moved / raised / skipped / failed / stragglers / hidden
+  tiler_failures_total{action,window_class}     计数器: 平铺窗口出错 (tile) / 超时 (tile_timeout) / 最小化失败 (hide)
+  tiler_runs_total{action}                      计数器: 各类操作的执行次数（监视模式为每次重新平铺）
+"""
+
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 默认的直方图区间上限（秒），另有 +Inf
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 未汇总的记录最多保留的条数，超过时丢弃最早的记录（正常使用中每次运行都会写出）
+MAX_PENDING = 100_000
+# jsonl文件轮转的大小上限（字节）与保留的旧文件数
+DEFAULT_MAX_BYTES = 1 << 20
+DEFAULT_BACKUPS = 3
+FORMATS = ('jsonl', 'prom')
+
+_COUNTER = 0
+_HISTOGRAM = 1
+
+Labels = Tuple[Tuple[str, str], ...]
+Key = Tuple[str, Labels]
+
+
+def default_metrics_path(fmt: str) -> str:
+    """指标文件，与进程缓存在同一目录"""
+    from processes import default_cache_path
+    name = 'metrics.prom' if fmt == 'prom' else 'metrics.jsonl'
+    return os.path.join(os.path.dirname(default_cache_path()), name)
+
+
+def desktop_class(windows: int) -> str:
+    """顶层窗口数的区间标签"""
+    for limit in (64, 256, 1024):
+        if windows < limit:
+            return f"<{limit}"
+    return ">=1024"
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'labels', 'start')
+
+    def __init__(self, metrics: 'Metrics', name: str, labels: dict):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._pending.append((_HISTOGRAM, self.name, self.labels, time.perf_counter() - self.start))
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics:
+    """未启用时的空实现"""
+
+    enabled = False
+
+    def inc(self, name: str, value: float = 1, **labels):
+        pass
+
+    def observe(self, name: str, value: float, **labels):
+        pass
+
+    def time(self, name: str, **labels):
+        return _NULL_TIMER
+
+
+NULL_METRICS = NullMetrics()
+
+
+class Delta:
+    """一段时间内汇总的指标: 计数器 {键: 值}，直方图 {键: [各区间计数..., 总和, 次数]}"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters: Dict[Key, float] = {}
+        self.histograms: Dict[Key, List[float]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.counters or self.histograms)
+
+    def add_count(self, key: Key, value: float):
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_sample(self, key: Key, value: float):
+        state = self.histograms.get(key)
+        if state is None:
+            state = self.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        buckets = self.buckets
+        index = 0
+        while index < len(buckets) and value > buckets[index]:
+            index += 1
+        state[index] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def merge(self, other: 'Delta'):
+        for key, value in other.counters.items():
+            self.add_count(key, value)
+        for key, state in other.histograms.items():
+            mine = self.histograms.get(key)
+            if mine is None:
+                self.histograms[key] = list(state)
+            else:
+                for i, value in enumerate(state):
+                    mine[i] += value
+
+    def to_json(self) -> dict:
+        return {
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in sorted(self.counters.items())],
+            'histograms': [{'name': name, 'labels': dict(labels), 'buckets': list(self.buckets),
+                            'counts': state[:-2], 'sum': round(state[-2], 9), 'count': state[-1]}
+                           for (name, labels), state in sorted(self.histograms.items())],
+        }
+
+
+class Metrics(NullMetrics):
+    """
+    内存中的指标
+    用法: metrics.inc('tiler_windows_total', 3, result='moved')
+          metrics.observe('tiler_settle_seconds', 0.012, window_class='XTerm')
+          with metrics.time('tiler_operation_seconds', operation='plan'): ...
+    drain() 汇总自上次以来的记录并返回增量，同时累加到 totals
+    """
+
+    enabled = True
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, max_pending: int = MAX_PENDING):
+        self.buckets = tuple(buckets)
+        self._pending: deque = deque(maxlen=max_pending)
+        self.totals = Delta(self.buckets)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        self._pending.append((_COUNTER, name, labels, value))
+
+    def observe(self, name: str, value: float, **labels):
+        self._pending.append((_HISTOGRAM, name, labels, value))
+
+    def time(self, name: str, **labels) -> _Timer:
+        return _Timer(self, name, labels)
+
+    def drain(self) -> Delta:
+        """汇总未处理的记录（其他线程可同时继续记录）"""
+        delta = Delta(self.buckets)
+        pending = self._pending
+        while True:
+            try:
+                kind, name, labels, value = pending.popleft()
+            except IndexError:
+                break
+            key = (name, tuple(sorted((label, str(text)) for label, text in labels.items())))
+            if kind == _COUNTER:
+                delta.add_count(key, value)
+            else:
+                delta.add_sample(key, value)
+        self.totals.merge(delta)
+        return delta
+
+    def value(self, name: str, **labels) -> float:
+        """计数器的累计值，或直方图的累计次数（用于测试和诊断）"""
+        self.drain()
+        key = (name, tuple(sorted((label, str(text)) for label, text in labels.items())))
+        if key in self.totals.histograms:
+            return self.totals.histograms[key][-1]
+        return self.totals.counters.get(key, 0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _series(name: str, labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return name
+    return name + '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in pairs) + '}'
+
+
+def _format_le(bound: float) -> str:
+    return repr(float(bound)) if bound != int(bound) else f"{bound:.1f}"
+
+
+def prometheus_samples(delta: Delta) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """增量展开为Prometheus样本 {序列: 值} 和各指标的类型"""
+    samples: Dict[str, float] = {}
+    types: Dict[str, str] = {}
+    for (name, labels), value in delta.counters.items():
+        types[name] = 'counter'
+        samples[_series(name, labels)] = value
+    for (name, labels), state in delta.histograms.items():
+        types[name] = 'histogram'
+        cumulative = 0
+        for bound, count in zip(delta.buckets + (None,), state[:-2]):
+            cumulative += count
+            le = '+Inf' if bound is None else _format_le(bound)
+            samples[_series(name + '_bucket', labels, (('le', le),))] = cumulative
+        samples[_series(name + '_sum', labels)] = state[-2]
+        samples[_series(name + '_count', labels)] = state[-1]
+    return samples, types
+
+
+def parse_prometheus(text: str) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """解析本模块写出的Prometheus文本（每行 `序列 值`）"""
+    samples: Dict[str, float] = {}
+    types: Dict[str, str] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('# TYPE '):
+            parts = line.split()
+            if len(parts) == 4:
+                types[parts[2]] = parts[3]
+            continue
+        if not line or line.startswith('#'):
+            continue
+        series, _, value = line.rpartition(' ')
+        try:
+            samples[series] = float(value)
+        except ValueError:
+            continue
+    return samples, types
+
+
+def _metric_name(series: str, types: Dict[str, str]) -> str:
+    name = series.split('{', 1)[0]
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and types.get(name[:-len(suffix)]) == 'histogram':
+            return name[:-len(suffix)]
+    return name
+
+
+def render_prometheus(samples: Dict[str, float], types: Dict[str, str]) -> str:
+    groups: Dict[str, List[str]] = {}
+    for series in samples:
+        groups.setdefault(_metric_name(series, types), []).append(series)
+    lines = []
+    for name in sorted(groups):
+        if name in types:
+            lines.append(f"# TYPE {name} {types[name]}")
+        for series in groups[name]:
+            value = samples[series]
+            lines.append(f"{series} {int(value) if float(value).is_integer() else repr(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsFile:
+    """
+    把指标增量写到本地文件
+    多个命令行实例可能同时写出，写入和轮转在文件锁 (路径.lock) 内进行
+    """
+
+    def __init__(self, path: Optional[str] = None, fmt: str = 'jsonl',
+                 max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS):
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的指标格式: {fmt}")
+        self.format = fmt
+        self.path = path or default_metrics_path(fmt)
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    def write(self, delta: Delta):
+        if not delta:
+            return
+        from run_queue import FileLock
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with FileLock(self.path + '.lock'):
+            if self.format == 'prom':
+                self._write_prometheus(delta)
+            else:
+                self._append_line(delta)
+
+    def _append_line(self, delta: Delta):
+        import json
+        line = json.dumps(dict(time=round(time.time(), 3), pid=os.getpid(), **delta.to_json()),
+                          ensure_ascii=False, separators=(',', ':')) + '\n'
+        # 标签中可能有中文等非ASCII字符，按写入的字节数判断是否轮转
+        data = line.encode('utf-8')
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size and size + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.path, 'ab') as f:
+            f.write(data)
+
+    def _rotate(self):
+        """metrics.jsonl -> .1 -> .2 ...，超过backups个的旧文件被覆盖"""
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _write_prometheus(self, delta: Delta):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                samples, types = parse_prometheus(f.read())
+        except OSError:
+            samples, types = {}, {}
+        added, added_types = prometheus_samples(delta)
+        for series, value in added.items():
+            samples[series] = samples.get(series, 0) + value
+        types.update(added_types)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(render_prometheus(samples, types))
+        os.replace(tmp, self.path)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+显示器拓扑
+枚举所有显示器及其工作区（不含任务栏），结果缓存；
+通过廉价的拓扑签名检测显示器变化，也可在收到显示变化事件时主动失效
+"""
+
+import time
+from typing import Callable, Hashable, List, NamedTuple, Optional, Sequence
+
+from window_backend import Rect
+
+# 布局约束以96 DPI为基准
+BASE_DPI = 96
+
+
+class Monitor(NamedTuple):
+    """一个显示器"""
+    index: int
+    # 整个显示器区域与工作区，均为虚拟屏幕坐标 (x, y, 宽, 高)
+    rect: Rect
+    work_area: Rect
+    primary: bool = False
+    dpi: int = BASE_DPI
+
+    @property
+    def scale(self) -> float:
+        return self.dpi / BASE_DPI
+
+
+class MonitorSource:
+    """显示器信息来源接口"""
+
+    def enumerate(self) -> List[Monitor]:
+        """返回所有显示器，主显示器在前"""
+        raise NotImplementedError
+
+    def signature(self) -> Hashable:
+        """
+        拓扑签名，只需廉价的系统调用即可得到
+        签名变化意味着需要重新枚举
+        """
+        raise NotImplementedError
+
+
+class Win32MonitorSource(MonitorSource):
+    """基于EnumDisplayMonitors/GetMonitorInfo的显示器来源"""
+
+    def __init__(self):
+        import win32api
+        import win32con
+        self._win32api = win32api
+        self._win32con = win32con
+
+    def _dpi(self, hmonitor) -> int:
+        # Windows 8.1+ 提供每显示器DPI，旧系统退回96
+        try:
+            import ctypes
+            dpi_x, dpi_y = ctypes.c_uint(), ctypes.c_uint()
+            ctypes.windll.shcore.GetDpiForMonitor(int(hmonitor), 0,
+                                                  ctypes.byref(dpi_x), ctypes.byref(dpi_y))
+            return dpi_x.value or BASE_DPI
+        except Exception:
+            return BASE_DPI
+
+    def _query(self) -> List[tuple]:
+        """每个显示器的 (显示器区域, 工作区, 是否主显示器, DPI)，按系统枚举的顺序"""
+        win32api, win32con = self._win32api, self._win32con
+        found = []
+        for hmonitor, _, _ in win32api.EnumDisplayMonitors(None, None):
+            info = win32api.GetMonitorInfo(hmonitor)
+            left, top, right, bottom = info['Monitor']
+            work_left, work_top, work_right, work_bottom = info['Work']
+            found.append((
+                (left, top, right - left, bottom - top),
+                (work_left, work_top, work_right - work_left, work_bottom - work_top),
+                bool(info['Flags'] & win32con.MONITORINFOF_PRIMARY),
+                self._dpi(hmonitor),
+            ))
+        return found
+
+    def enumerate(self) -> List[Monitor]:
+        found = self._query()
+        # 主显示器在前，其余按从左到右、从上到下
+        found.sort(key=lambda item: (not item[2], item[0][0], item[0][1]))
+        return [Monitor(i, *item) for i, item in enumerate(found)]
+
+    def signature(self) -> Hashable:
+        # 包含每个显示器的工作区和DPI: 移动任务栏、调整缩放比例时显示器数量和虚拟屏幕范围都不变
+        return tuple(self._query())
+
+
+class StaticMonitorSource(MonitorSource):
+    """固定的显示器列表，用于无法枚举显示器的后端和测试；修改monitors后签名随之变化"""
+
+    def __init__(self, monitors: Sequence[Monitor]):
+        self.monitors = list(monitors)
+        self.enumerations = 0
+
+    @classmethod
+    def single(cls, width: int, height: int, taskbar: int = 0) -> 'StaticMonitorSource':
+        """单显示器，底部有taskbar像素高的任务栏"""
+        return cls([Monitor(0, (0, 0, width, height), (0, 0, width, height - taskbar), True)])
+
+    def enumerate(self) -> List[Monitor]:
+        self.enumerations += 1
+        return list(self.monitors)
+
+    def signature(self) -> Hashable:
+        return tuple(self.monitors)
+
+
+class MonitorTopology:
+    """
+    缓存的显示器拓扑
+    check_interval秒内直接使用缓存；超过后先比较签名，签名不变则不重新枚举
+    """
+
+    def __init__(self, source: MonitorSource, check_interval: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.source = source
+        self.check_interval = check_interval
+        self._clock = clock
+        self._monitors: Optional[List[Monitor]] = None
+        self._signature: Hashable = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        """丢弃缓存（收到显示变化事件时调用）"""
+        self._monitors = None
+
+    def monitors(self) -> List[Monitor]:
+        now = self._clock()
+        if self._monitors is not None and now - self._checked_at < self.check_interval:
+            return self._monitors
+        signature = self.source.signature()
+        if self._monitors is None or signature != self._signature:
+            self._monitors = self.source.enumerate()
+            self._signature = signature
+        self._checked_at = now
+        return self._monitors
+
+    def primary(self) -> Monitor:
+        monitors = self.monitors()
+        return next((monitor for monitor in monitors if monitor.primary), monitors[0])
+
+    def get(self, index: int) -> Monitor:
+        """按序号（0为主显示器）获取显示器"""
+        monitors = self.monitors()
+        if not 0 <= index < len(monitors):
+            raise ValueError(f"显示器序号超出范围: {index + 1} (共 {len(monitors)} 个)")
+        return monitors[index]
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+输出层
+平铺过程只产生结构化事件，由报告器决定如何输出:
+  文本（默认）: 格式化为中文提示，整次运行结束时一次性写出
+  --quiet     : 只输出错误（写到stderr）
+  --json      : 结束时输出一个JSON文档 {"version": 1, "events": [...], "summary": {...}}
+  --json-lines: 每个事件一行JSON，最后一行为 {"type": "summary", ...}
+
+事件类型与字段（稳定的结构，供扩展等调用方解析）:
+  found        hwnd, title, class_name[, group] 找到的匹配窗口，多个分组时附带所属分组
+  terminal     hwnd, title, class_name          --list 列出的终端
+  plan         monitor, orientation, cols, rows, width, height[, group]
+  placed       hwnd, title, label, rect         rect为 [x, y, 宽, 高]
+  skipped      hwnd, title, label               已在目标位置
+  hidden       hwnd, title
+  failed       hwnd, title, action, error       action为 tile / hide
+  timeout      hwnd, title, action
+  unsettled    count, timeout
+  result       moved, raised, skipped
+  layout_saved name, count, path
+  layout_restored name, found, total
+  layout_missing  title, class_name
+  retile       keyword, count                   监视模式重新平铺
+  page         page, pages, count, total        --overflow page 显示的页（从1开始）
+  coalesced    count                            本次运行合并了count个排队的同分组请求，执行最后一个
+  served       pid, count                       请求已由pid进程的运行完成，摘要为那次运行的摘要
+  error        message
+"""
+
+import sys
+from typing import Callable, Dict, List, Optional, TextIO, Union
+
+JSON_VERSION = 1
+
+_ACTIONS = {'tile': '平铺窗口', 'hide': '最小化窗口'}
+
+
+def _plan_text(f: dict) -> str:
+    where = f"显示器{f['monitor'] + 1} " if f.get('multi') else ""
+    if f.get('group'):
+        where = f"分组 '{f['group']}' " + where
+    if f['orientation'] == 'vertical':
+        layout = f"{where}布局方案: {f['cols']}列，每列最多{f['rows']}行"
+    else:
+        layout = f"{where}布局方案: {f['cols']}列{f['rows']}行网格"
+    return f"{layout}\n{where}窗口尺寸: 宽度={f['width']}, 高度={f['height']}"
+
+
+def _placed_text(f: dict) -> str:
+    x, y, width, height = f['rect']
+    return (f"{f['prefix']}已平铺窗口 [{f['label']}]: {f['title']}\n"
+            f"  -> 位置({x}, {y}) 大小({width}, {height})")
+
+
+# 事件的文本格式: 字符串模板或接收字段字典的函数；prefix为模拟后端的前缀
+TEMPLATES: Dict[str, Union[str, Callable[[dict], str]]] = {
+    'found': "找到终端: {title} (类名: {class_name})",
+    'terminal': "  - {title} ({class_name})",
+    'plan': _plan_text,
+    'placed': _placed_text,
+    'skipped': "窗口已在目标位置，跳过 [{label}]: {title}",
+    'hidden': "{prefix}已最小化: {title}",
+    'failed': lambda f: f"{_ACTIONS[f['action']]} '{f['title']}' 时出错: {f['error']}",
+    'timeout': lambda f: f"{_ACTIONS[f['action']]} '{f['title']}' 超时: 窗口未在截止时间内响应，已跳过",
+    'unsettled': "警告: {count} 个窗口未在 {timeout}s 内到达目标位置",
+    'result': "移动 {moved} 个，仅置顶 {raised} 个，跳过 {skipped} 个窗口",
+    'layout_saved': "已保存布局 '{name}': {count} 个窗口 -> {path}",
+    'layout_restored': "恢复布局 '{name}': 找到 {found}/{total} 个窗口",
+    'layout_missing': "  未找到窗口: {title} ({class_name})",
+    'retile': "重新平铺 '{keyword}' ({count} 个窗口)",
+    'page': lambda f: (f"第 {f['page']}/{f['pages']} 页: 显示 {f['count']} 个窗口，"
+                       f"其余 {f['total'] - f['count']} 个已最小化"),
+    'coalesced': "合并了 {count} 个排队中的同分组请求，按最后一个请求执行",
+    'served': "请求已由进程 {pid} 的平铺完成 (合并了 {count} 个请求)",
+    'error': "{message}",
+}
+
+# --quiet 时仍然输出的事件
+ERROR_KINDS = frozenset({'failed', 'timeout', 'unsettled', 'error'})
+
+
+class Reporter:
+    """
+    文本报告器
+    buffered为True时行先缓存，flush()时一次写出；为False时立即写出（直接调用TerminalTiler方法时的默认行为）
+    """
+
+    mode = 'text'
+
+    def __init__(self, buffered: bool = True, stream: Optional[TextIO] = None):
+        self.buffered = buffered
+        # 为None时每次写出时取当前的sys.stdout（守护进程会重定向它）
+        self._stream = stream
+        self._lines: List[str] = []
+        # 模拟后端的输出前缀
+        self.prefix = ''
+
+    @property
+    def stream(self) -> TextIO:
+        return self._stream or sys.stdout
+
+    def _write(self, line: str):
+        self._lines.append(line)
+        if not self.buffered:
+            self.flush()
+
+    def emit(self, kind: str, **fields):
+        """记录一个结构化事件"""
+        template = TEMPLATES[kind]
+        if callable(template):
+            self._write(template(dict(fields, prefix=self.prefix)))
+        else:
+            self._write(template.format(prefix=self.prefix, **fields))
+
+    def text(self, line: str):
+        """只在文本模式下显示的提示，没有对应的结构化事件"""
+        self._write(line)
+
+    def flush(self):
+        if self._lines:
+            stream = self.stream
+            stream.write('\n'.join(self._lines) + '\n')
+            stream.flush()
+            self._lines.clear()
+
+    def finish(self, summary: Optional[dict] = None):
+        """一次操作结束"""
+        self.flush()
+
+
+class QuietReporter(Reporter):
+    """只输出错误"""
+
+    mode = 'quiet'
+
+    @property
+    def stream(self) -> TextIO:
+        return self._stream or sys.stderr
+
+    def emit(self, kind: str, **fields):
+        if kind in ERROR_KINDS:
+            super().emit(kind, **fields)
+
+    def text(self, line: str):
+        pass
+
+
+class JsonReporter(Reporter):
+    """结束时输出一个JSON文档"""
+
+    mode = 'json'
+
+    def __init__(self, buffered: bool = True, stream: Optional[TextIO] = None):
+        super().__init__(buffered, stream)
+        self.events: List[dict] = []
+
+    def emit(self, kind: str, **fields):
+        self.events.append({'type': kind, **fields})
+
+    def text(self, line: str):
+        pass
+
+    def flush(self):
+        pass
+
+    def finish(self, summary: Optional[dict] = None):
+        import json
+        stream = self.stream
+        json.dump({'version': JSON_VERSION, 'events': self.events, 'summary': summary or {}},
+                  stream, ensure_ascii=False)
+        stream.write('\n')
+        stream.flush()
+        self.events = []
+
+
+class JsonLinesReporter(Reporter):
+    """每个事件立即写出一行JSON（由流自身缓冲），flush()时刷新流"""
+
+    mode = 'json-lines'
+
+    def __init__(self, buffered: bool = True, stream: Optional[TextIO] = None):
+        super().__init__(buffered, stream)
+        import json
+        self._dumps = json.dumps
+
+    def emit(self, kind: str, **fields):
+        self.stream.write(self._dumps({'type': kind, **fields}, ensure_ascii=False) + '\n')
+
+    def text(self, line: str):
+        pass
+
+    def flush(self):
+        self.stream.flush()
+
+    def finish(self, summary: Optional[dict] = None):
+        self.emit('summary', **(summary or {}))
+        self.flush()
+
+
+def create_reporter(args) -> Reporter:
+    """按命令行参数创建报告器"""
+    if getattr(args, 'json', False):
+        return JsonReporter()
+    if getattr(args, 'json_lines', False):
+        return JsonLinesReporter()
+    if getattr(args, 'quiet', False):
+        return QuietReporter()
+    return Reporter()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+进程元数据
+按窗口所属进程的属性（pid、可执行文件名、命令行、父进程）选择终端，不依赖会被程序改写的标题
+进程信息按 (pid, 创建时间) 缓存并保存到磁盘: 创建时间只需一次廉价的查询，
+pid被复用时创建时间不同，自动重新查询；重复运行时不必重新读取每个进程的命令行
+"""
+
+import json
+import os
+import sys
+from collections import OrderedDict
+from typing import FrozenSet, List, NamedTuple, Optional
+
+FORMAT_VERSION = 1
+
+
+class ProcessInfo(NamedTuple):
+    """一个进程的元数据"""
+    pid: int
+    ppid: int
+    # 可执行文件名（不含路径），如 powershell.exe / node
+    name: str
+    cmdline: str
+    # 进程创建时间，单位由来源决定，只用于判断pid是否被复用
+    create_time: int
+
+
+class ProcessSource:
+    """进程信息来源接口"""
+
+    def create_time(self, pid: int) -> Optional[int]:
+        """进程创建时间（廉价的查询），进程不存在或无权访问时返回None"""
+        raise NotImplementedError
+
+    def query(self, pid: int) -> Optional[ProcessInfo]:
+        """读取进程的完整信息，进程不存在时返回None"""
+        raise NotImplementedError
+
+
+class ProcFsProcessSource(ProcessSource):
+    """基于 /proc 的进程来源（Linux），root可指向测试用的目录"""
+
+    def __init__(self, root: str = '/proc'):
+        self.root = root
+
+    def _stat(self, pid: int) -> Optional[List[str]]:
+        """/proc/<pid>/stat 中进程名之后的字段，第一个为状态（第3个字段）"""
+        try:
+            with open(os.path.join(self.root, str(pid), 'stat'), encoding='utf-8',
+                      errors='replace') as f:
+                data = f.read()
+        except OSError:
+            return None
+        # 进程名在括号中，且本身可能包含空格和括号
+        return data[data.rfind(')') + 2:].split()
+
+    def create_time(self, pid: int) -> Optional[int]:
+        fields = self._stat(pid)
+        try:
+            # 第22个字段: 启动时间（系统启动后的时钟滴答数）
+            return int(fields[19]) if fields else None
+        except (IndexError, ValueError):
+            return None
+
+    def _read(self, pid: int, name: str) -> str:
+        try:
+            with open(os.path.join(self.root, str(pid), name), 'rb') as f:
+                return f.read().decode('utf-8', 'replace')
+        except OSError:
+            return ''
+
+    def query(self, pid: int) -> Optional[ProcessInfo]:
+        fields = self._stat(pid)
+        if not fields or len(fields) < 20:
+            return None
+        args = [arg for arg in self._read(pid, 'cmdline').split('\0') if arg]
+        try:
+            name = os.path.basename(os.readlink(os.path.join(self.root, str(pid), 'exe')))
+        except OSError:
+            # 其他用户的进程没有读取exe的权限
+            name = os.path.basename(args[0]) if args else self._read(pid, 'comm').strip()
+        return ProcessInfo(pid, int(fields[1]), name, ' '.join(args), int(fields[19]))
+
+
+class Win32ProcessSource(ProcessSource):
+    """
+    基于OpenProcess的进程来源（Windows）
+    创建时间来自GetProcessTimes，父进程与命令行来自NtQueryInformationProcess
+    """
+
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    # NtQueryInformationProcess 的信息类别
+    PROCESS_BASIC_INFORMATION = 0
+    PROCESS_COMMAND_LINE_INFORMATION = 60
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self._kernel32 = kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        self._ntdll = ctypes.WinDLL('ntdll')
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+        kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+        kernel32.GetProcessTimes.argtypes = (wintypes.HANDLE,) + (ctypes.POINTER(ctypes.c_ulonglong),) * 4
+        kernel32.QueryFullProcessImageNameW.argtypes = (wintypes.HANDLE, wintypes.DWORD,
+                                                        wintypes.LPWSTR, ctypes.POINTER(wintypes.DWORD))
+        self._ntdll.NtQueryInformationProcess.argtypes = (wintypes.HANDLE, ctypes.c_int, ctypes.c_void_p,
+                                                          wintypes.ULONG, ctypes.POINTER(wintypes.ULONG))
+
+        class BasicInformation(ctypes.Structure):
+            _fields_ = [('ExitStatus', ctypes.c_long), ('PebBaseAddress', ctypes.c_void_p),
+                        ('AffinityMask', ctypes.c_size_t), ('BasePriority', ctypes.c_long),
+                        ('UniqueProcessId', ctypes.c_size_t),
+                        ('InheritedFromUniqueProcessId', ctypes.c_size_t)]
+
+        class UnicodeString(ctypes.Structure):
+            _fields_ = [('Length', ctypes.c_ushort), ('MaximumLength', ctypes.c_ushort),
+                        ('Buffer', ctypes.c_void_p)]
+
+        self._basic_information = BasicInformation
+        self._unicode_string = UnicodeString
+
+    def _open(self, pid: int):
+        return self._kernel32.OpenProcess(self.PROCESS_QUERY_LIMITED_INFORMATION, False, pid) or None
+
+    def _create_time(self, handle) -> Optional[int]:
+        ctypes = self._ctypes
+        times = [ctypes.c_ulonglong() for _ in range(4)]
+        if not self._kernel32.GetProcessTimes(handle, *(ctypes.byref(t) for t in times)):
+            return None
+        # FILETIME: 自1601年起的100纳秒数
+        return times[0].value
+
+    def create_time(self, pid: int) -> Optional[int]:
+        handle = self._open(pid)
+        if handle is None:
+            return None
+        try:
+            return self._create_time(handle)
+        finally:
+            self._kernel32.CloseHandle(handle)
+
+    def _image_name(self, handle) -> str:
+        ctypes = self._ctypes
+        from ctypes import wintypes
+        size = wintypes.DWORD(32768)
+        buffer = ctypes.create_unicode_buffer(size.value)
+        if not self._kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size)):
+            return ''
+        return buffer.value.rsplit('\\', 1)[-1]
+
+    def _parent(self, handle) -> int:
+        ctypes = self._ctypes
+        info = self._basic_information()
+        status = self._ntdll.NtQueryInformationProcess(handle, self.PROCESS_BASIC_INFORMATION,
+                                                       ctypes.byref(info), ctypes.sizeof(info), None)
+        return info.InheritedFromUniqueProcessId if status == 0 else 0
+
+    def _cmdline(self, handle) -> str:
+        ctypes = self._ctypes
+        from ctypes import wintypes
+        # 先取所需长度，再读取（Windows 8.1+ 支持）
+        needed = wintypes.ULONG()
+        self._ntdll.NtQueryInformationProcess(handle, self.PROCESS_COMMAND_LINE_INFORMATION,
+                                              None, 0, ctypes.byref(needed))
+        if not needed.value:
+            return ''
+        buffer = ctypes.create_string_buffer(needed.value)
+        status = self._ntdll.NtQueryInformationProcess(handle, self.PROCESS_COMMAND_LINE_INFORMATION,
+                                                       buffer, needed, ctypes.byref(needed))
+        if status != 0:
+            return ''
+        text = self._unicode_string.from_buffer(buffer)
+        return ctypes.wstring_at(text.Buffer, text.Length // 2) if text.Buffer else ''
+
+    def query(self, pid: int) -> Optional[ProcessInfo]:
+        handle = self._open(pid)
+        if handle is None:
+            return None
+        try:
+            create_time = self._create_time(handle)
+            if create_time is None:
+                return None
+            return ProcessInfo(pid, self._parent(handle), self._image_name(handle),
+                               self._cmdline(handle), create_time)
+        finally:
+            self._kernel32.CloseHandle(handle)
+
+
+def default_process_source() -> Optional[ProcessSource]:
+    """当前平台的进程来源，不支持时返回None"""
+    if sys.platform == 'win32':
+        return Win32ProcessSource()
+    if os.path.isdir('/proc'):
+        return ProcFsProcessSource()
+    return None
+
+
+def default_cache_path() -> str:
+    """进程缓存文件: 环境变量 TERMINAL_TILER_CACHE 指定的目录，否则为用户缓存目录"""
+    directory = os.environ.get('TERMINAL_TILER_CACHE')
+    if not directory:
+        if sys.platform == 'win32':
+            base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        else:
+            base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        directory = os.path.join(base, 'lch-terminal-tiler')
+    return os.path.join(directory, 'processes.json')
+
+
+class ProcessCache:
+    """
+    pid -> 进程信息的缓存，以创建时间校验
+    path不为None时从文件加载，save()写回（只保留最近使用的max_entries项）
+    """
+
+    def __init__(self, source: ProcessSource, path: Optional[str] = None, max_entries: int = 512):
+        self.source = source
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[int, ProcessInfo]' = OrderedDict()
+        # 统计: 创建时间一致直接命中 / 需要完整查询
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        if path is not None:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, pid: int) -> Optional[ProcessInfo]:
+        """进程信息，进程已退出时返回None"""
+        create_time = self.source.create_time(pid)
+        if create_time is None:
+            if self._entries.pop(pid, None) is not None:
+                self.dirty = True
+            return None
+        cached = self._entries.get(pid)
+        if cached is not None and cached.create_time == create_time:
+            self.hits += 1
+            self._entries.move_to_end(pid)
+            return cached
+        self.misses += 1
+        info = self.source.query(pid)
+        if info is None:
+            return None
+        self._entries[pid] = info
+        self.dirty = True
+        return info
+
+    def parent(self, info: ProcessInfo) -> Optional[ProcessInfo]:
+        return self.get(info.ppid) if info.ppid else None
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != FORMAT_VERSION:
+            return
+        for entry in data.get('processes', []):
+            try:
+                info = ProcessInfo(*entry)
+            except TypeError:
+                continue
+            self._entries[info.pid] = info
+
+    def save(self):
+        """有变化时写回文件（先写临时文件再替换）"""
+        if self.path is None or not self.dirty:
+            return
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION, 'processes': [list(info) for info in self._entries.values()]},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+class ProcessSelector(NamedTuple):
+    """
+    按进程属性选择窗口，所有给出的条件都需满足
+    exe / cmdline / parent 使用与关键字相同的匹配语法（子串、通配符、re:正则、| 和 ! 排除）
+    只检查拥有窗口的进程（shell或终端程序），不遍历在其中运行的子进程
+    """
+    pids: FrozenSet[int] = frozenset()
+    exe: Optional[str] = None
+    cmdline: Optional[str] = None
+    # 父进程: 纯数字为pid，否则匹配父进程的可执行文件名
+    parent: Optional[str] = None
+
+    @classmethod
+    def from_args(cls, args) -> 'ProcessSelector':
+        return cls(frozenset(getattr(args, 'pid', None) or ()), getattr(args, 'exe', None),
+                   getattr(args, 'cmdline', None), getattr(args, 'parent', None))
+
+    @property
+    def active(self) -> bool:
+        return bool(self.pids or self.exe or self.cmdline or self.parent)
+
+    @property
+    def needs_metadata(self) -> bool:
+        """只按pid选择时不需要查询进程信息"""
+        return bool(self.exe or self.cmdline or self.parent)
+
+    def matches(self, pid: int, cache: Optional[ProcessCache]) -> bool:
+        if self.pids and pid not in self.pids:
+            return False
+        if not self.needs_metadata:
+            return True
+        info = cache.get(pid) if cache is not None else None
+        if info is None:
+            return False
+        from title_matcher import compile_query
+        if self.exe and not compile_query(self.exe).matches(info.name):
+            return False
+        if self.cmdline and not compile_query(self.cmdline).matches(info.cmdline):
+            return False
+        if self.parent:
+            if self.parent.isdigit():
+                return info.ppid == int(self.parent)
+            parent = cache.parent(info)
+            return parent is not None and compile_query(self.parent).matches(parent.name)
+        return True
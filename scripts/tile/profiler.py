@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+分阶段性能分析
+用单调高精度计时器记录各阶段（可嵌套）耗时和计数器，输出耗时分解或Chrome trace文件
+(chrome://tracing / Perfetto 可直接打开)。未启用时使用NULL_PROFILER，每个阶段只有一次空调用的开销
+"""
+
+import os
+import time
+from _thread import get_ident
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+
+class Span(NamedTuple):
+    """一次阶段记录，path为从最外层到本阶段的名称"""
+    path: Tuple[str, ...]
+    start_ns: int
+    end_ns: int
+    tid: int
+
+    @property
+    def name(self) -> str:
+        return self.path[-1]
+
+    @property
+    def duration_ns(self) -> int:
+        return self.end_ns - self.start_ns
+
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.profiler._stack.append(self.name)
+        self.start = self.profiler._clock()
+        return self
+
+    def __exit__(self, *exc):
+        profiler = self.profiler
+        end = profiler._clock()
+        path = tuple(profiler._stack)
+        profiler._stack.pop()
+        profiler.spans.append(Span(path, self.start, end, get_ident()))
+        return False
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class NullProfiler:
+    """未启用时的空实现"""
+
+    enabled = False
+
+    def phase(self, name: str):
+        return _NULL_PHASE
+
+    def count(self, name: str, value: int = 1):
+        pass
+
+    def add_span(self, name: str, start_ns: int, end_ns: int):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Profiler(NullProfiler):
+    """
+    记录阶段耗时与计数器
+    用法: with profiler.phase('enumerate'): ...；profiler.count('scanned', n)
+    """
+
+    enabled = True
+
+    def __init__(self, clock: Callable[[], int] = time.perf_counter_ns):
+        self._clock = clock
+        self._stack: List[str] = []
+        self.spans: List[Span] = []
+        self.counters: Counter = Counter()
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    def add_span(self, name: str, start_ns: int, end_ns: int):
+        """补记在启用前就已发生的阶段（如导入和参数解析）"""
+        self.spans.append(Span(tuple(self._stack) + (name,), start_ns, end_ns,
+                               get_ident()))
+
+    def totals(self) -> Dict[Tuple[str, ...], Tuple[int, int]]:
+        """按阶段路径汇总: {路径: (总耗时ns, 次数)}，按首次开始时间排序"""
+        totals: Dict[Tuple[str, ...], List[int]] = {}
+        for span in sorted(self.spans, key=lambda span: (span.start_ns, len(span.path))):
+            entry = totals.setdefault(span.path, [0, 0])
+            entry[0] += span.duration_ns
+            entry[1] += 1
+        return {path: (total, calls) for path, (total, calls) in totals.items()}
+
+    def wall_ns(self) -> int:
+        if not self.spans:
+            return 0
+        return max(span.end_ns for span in self.spans) - min(span.start_ns for span in self.spans)
+
+    def report(self) -> str:
+        """耗时分解（子阶段缩进显示在父阶段下）"""
+        wall = self.wall_ns() or 1
+        lines = [f"性能分析 (总计 {wall / 1e6:.2f} ms):",
+                 f"  {'阶段':<24} {'耗时(ms)':>10} {'占比':>7} {'次数':>5}"]
+        totals = self.totals()
+        # 按树的先序排列: 先比较各级祖先的首次出现顺序
+        order = {path: i for i, path in enumerate(totals)}
+        for path in sorted(totals, key=lambda path: [order.get(path[:i + 1], -1)
+                                                       for i in range(len(path))]):
+            total, calls = totals[path]
+            label = '  ' * (len(path) - 1) + path[-1]
+            lines.append(f"  {label:<24} {total / 1e6:>10.3f} {total / wall:>7.1%} {calls:>5}")
+        if self.counters:
+            lines.append("  计数: " + ", ".join(f"{name}={value}"
+                                                for name, value in sorted(self.counters.items())))
+        return '\n'.join(lines)
+
+    def summary(self) -> dict:
+        """结构化的汇总，供守护进程回传"""
+        return {
+            'wall_ms': round(self.wall_ns() / 1e6, 3),
+            'phases': {'/'.join(path): round(total / 1e6, 3)
+                       for path, (total, _) in self.totals().items()},
+            'counters': dict(self.counters),
+        }
+
+    def chrome_trace(self) -> dict:
+        """Chrome trace事件格式（完整事件X + 计数器事件C）"""
+        pid = os.getpid()
+        events = [{
+            'name': span.name,
+            'cat': '/'.join(span.path[:-1]) or 'tiler',
+            'ph': 'X',
+            'ts': span.start_ns / 1000,
+            'dur': span.duration_ns / 1000,
+            'pid': pid,
+            'tid': span.tid,
+        } for span in sorted(self.spans, key=lambda span: span.start_ns)]
+        if self.counters and self.spans:
+            events.append({
+                'name': 'counters',
+                'ph': 'C',
+                'ts': max(span.end_ns for span in self.spans) / 1000,
+                'pid': pid,
+                'args': dict(self.counters),
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path: str):
+        import json
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
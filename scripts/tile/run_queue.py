@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+跨进程的运行队列
+快捷键、编辑器扩展等可能在短时间内多次启动 terminal_tiler.py，各实例同时枚举并移动同一批窗口会相互争抢。
+会移动窗口的命令行运行都通过队列协调:
+  - 运行锁 (run.lock) 保证同一时间只有一个实例在平铺；守护进程的请求和监视模式的重新平铺也持有运行锁，
+    但不登记到队列（不与命令行请求合并）
+  - 每个请求登记到状态文件 (queue.json)，同一分组排队中的请求合并，只执行最后一个（后到者生效）
+  - 等待中的请求已被其他实例的运行覆盖时，直接返回那次运行的摘要，不再重复平铺
+最终状态总是与每个分组最后一个请求一致；一批同时到达的请求最多执行两次（正在进行的一次和合并后的一次）
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, NamedTuple, Optional, Sequence
+
+FORMAT_VERSION = 1
+# 等待运行锁的默认秒数
+DEFAULT_TIMEOUT = 30.0
+# 轮询锁的最长间隔（秒）
+POLL_INTERVAL = 0.05
+# 已完成运行的结果与无人处理的请求保留的秒数
+MAX_AGE = 3600.0
+
+if sys.platform == 'win32':
+    import msvcrt
+
+    def _try_lock(fd: int):
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+    def _unlock(fd: int):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _try_lock(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def default_queue_dir() -> str:
+    """队列目录，与进程缓存在同一目录下"""
+    from processes import default_cache_path
+    return os.path.join(os.path.dirname(default_cache_path()), 'queue')
+
+
+class FileLock:
+    """
+    基于文件的跨进程互斥锁（POSIX为flock，Windows为msvcrt.locking）
+    持有锁的进程退出（包括崩溃）时由系统释放
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """获得锁返回True；timeout秒内未获得返回False，timeout为None时一直等待"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.001
+        while True:
+            try:
+                _try_lock(fd)
+                self._fd = fd
+                return True
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    os.close(fd)
+                    return False
+                time.sleep(delay)
+                delay = min(delay * 2, POLL_INTERVAL)
+
+    def release(self):
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class RunOutcome(NamedTuple):
+    """一个请求的结果"""
+    summary: dict     # 覆盖本请求的那次运行的摘要
+    request: int      # 本请求的序号
+    served_by: int    # 执行那次运行的进程pid
+    ran: bool         # 是否由本进程执行
+    requests: int     # 那次运行合并的请求数
+
+
+class RunQueue:
+    """
+    运行队列
+    状态文件: {"version": 1, "next": 下一个请求序号,
+              "pending": {分组: {"request", "argv", "pid", "count", "time"}},   每个分组最后一个未执行的请求
+              "served":  {分组: {"request", "pid", "summary", "requests", "time"}}} 每个分组最近一次运行
+    状态文件只在短时间持有的状态锁 (state.lock) 内读写
+    """
+
+    def __init__(self, directory: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.directory = directory or default_queue_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, 'queue.json')
+        self._state_lock = FileLock(os.path.join(self.directory, 'state.lock'))
+        self._run_lock = FileLock(os.path.join(self.directory, 'run.lock'))
+        self._clock = clock
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == FORMAT_VERSION:
+                return state
+        except (OSError, ValueError, AttributeError):
+            pass
+        return {'version': FORMAT_VERSION, 'next': 1, 'pending': {}, 'served': {}}
+
+    def _save(self, state: dict):
+        now = self._clock()
+        for section in ('pending', 'served'):
+            state[section] = {key: entry for key, entry in state[section].items()
+                              if now - entry['time'] <= MAX_AGE}
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(temp, self.path)
+
+    @contextmanager
+    def _state(self) -> Iterator[dict]:
+        """在状态锁内读取状态，正常退出时写回"""
+        with self._state_lock:
+            state = self._load()
+            yield state
+            self._save(state)
+
+    def submit(self, key: str, argv: Sequence[str]) -> int:
+        """登记请求，替换同一分组中未执行的请求；返回请求序号"""
+        with self._state() as state:
+            request = state['next']
+            state['next'] = request + 1
+            pending = state['pending'].get(key)
+            state['pending'][key] = {'request': request, 'argv': list(argv), 'pid': os.getpid(),
+                                     'count': pending['count'] + 1 if pending else 1,
+                                     'time': self._clock()}
+        return request
+
+    def run(self, key: str, argv: Sequence[str], execute: Callable[[List[str], int], dict],
+            timeout: Optional[float] = DEFAULT_TIMEOUT) -> RunOutcome:
+        """
+        登记请求并等待运行锁，然后执行或复用结果
+        execute(argv, requests) 执行分组中最后一个请求的参数（可能来自其他进程），返回摘要
+        timeout秒内未获得运行锁时抛出TimeoutError，请求仍留在队列中，由之后的运行处理
+        """
+        request = self.submit(key, argv)
+        with self.exclusive(timeout):
+            with self._state() as state:
+                served = state['served'].get(key)
+                if served and served['request'] >= request:
+                    return RunOutcome(served['summary'], request, served['pid'], False, served['requests'])
+                pending = state['pending'].pop(key, None)
+            if pending is None:
+                # 取走本请求的进程没有记录结果就退出了: 执行本请求
+                pending = {'request': request, 'argv': list(argv), 'count': 1}
+            summary = execute(pending['argv'], pending['count'])
+            with self._state() as state:
+                state['served'][key] = {'request': pending['request'], 'pid': os.getpid(),
+                                        'summary': summary, 'requests': pending['count'],
+                                        'time': self._clock()}
+            return RunOutcome(summary, request, os.getpid(), True, pending['count'])
+
+    @contextmanager
+    def exclusive(self, timeout: Optional[float] = DEFAULT_TIMEOUT) -> Iterator[None]:
+        """
+        持有运行锁，不登记请求: 守护进程和监视模式移动窗口时与命令行运行互斥
+        timeout秒内未获得运行锁时抛出TimeoutError
+        """
+        if not self._run_lock.acquire(timeout):
+            raise TimeoutError(f"等待其他平铺进程超时 ({timeout}s)")
+        try:
+            yield
+        finally:
+            self._run_lock.release()
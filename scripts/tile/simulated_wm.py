@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+模拟窗口管理器
+在假后端基础上生成成批的真实风格窗口（终端与普通应用混合），
+并为枚举、查询、移动、显示状态切换等调用注入可配置的延迟，用于基准测试
+"""
+
+import random
+import time
+from typing import NamedTuple
+
+from window_backend import FakeWindowBackend, Rect
+
+# (类名, 标题模板) —— {n}为编号，{cmd}为终端中正在运行的命令
+TERMINAL_KINDS = [
+    ('ConsoleWindowClass', "{name}{n} - PowerShell"),
+    ('ConsoleWindowClass', "{name}{n} - Command Prompt"),
+    ('CASCADIA_HOSTING_WINDOW_CLASS', "{name}{n} - Windows Terminal"),
+    ('VirtualConsoleClass', "{name}{n} - {cmd}"),
+]
+TERMINAL_NAMES = ['gas', 'gcc', 'gds', 'api', 'worker', 'db']
+COMMANDS = ['npm run dev', 'python manage.py runserver', 'tail -f app.log', 'cargo watch', 'ssh build01']
+APP_KINDS = [
+    ('Chrome_WidgetWin_1', "{doc} - Google Chrome"),
+    ('Chrome_WidgetWin_1', "{doc} - Visual Studio Code"),
+    ('CabinetWClass', "{doc}"),
+    ('Notepad', "{doc}.txt - Notepad"),
+    ('XLMAIN', "{doc}.xlsx - Excel"),
+    ('tooltips_class32', ""),
+    ('Shell_TrayWnd', ""),
+]
+DOCS = ['README', 'report', 'Downloads', 'gas pipeline notes', 'build logs', 'Inbox']
+
+
+class Latency(NamedTuple):
+    """各类调用的模拟耗时（秒）"""
+    # 枚举时每个顶层窗口的耗时（EnumWindows回调）
+    enumerate: float = 0.0
+    # 读取类名、标题、进程、位置等单个属性
+    query: float = 0.0
+    # 移动一个窗口（同步移动或批量提交中的每个窗口）
+    move: float = 0.0
+    # 最小化/还原
+    show: float = 0.0
+
+
+def spend(seconds: float):
+    """模拟耗时: 较长的延迟用sleep，微秒级延迟用忙等以保证精度"""
+    if seconds <= 0:
+        return
+    if seconds >= 0.002:
+        time.sleep(seconds)
+        return
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class SimulatedWindowManager(FakeWindowBackend):
+    """带调用延迟的假后端"""
+
+    def __init__(self, latency: Latency = Latency(), **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    @classmethod
+    def generate(cls, count: int, terminal_ratio: float = 0.3, seed: int = 0,
+                 latency: Latency = Latency(), **kwargs) -> 'SimulatedWindowManager':
+        """生成count个顶层窗口，其中约terminal_ratio为终端，其余为普通应用和不可见的辅助窗口"""
+        rng = random.Random(seed)
+        backend = cls(latency, **kwargs)
+        width, height = backend.screen_size
+        for i in range(count):
+            rect: Rect = (rng.randrange(0, width - 400), rng.randrange(0, height - 300),
+                          rng.randrange(400, 1200), rng.randrange(300, 900))
+            if rng.random() < terminal_ratio:
+                class_name, template = rng.choice(TERMINAL_KINDS)
+                title = template.format(name=rng.choice(TERMINAL_NAMES), n=i,
+                                        cmd=rng.choice(COMMANDS))
+                backend.add_window(title, class_name, rect=rect)
+            else:
+                class_name, template = rng.choice(APP_KINDS)
+                backend.add_window(template.format(doc=rng.choice(DOCS)), class_name,
+                                   rect=rect, visible=bool(template))
+        return backend
+
+    def reset_rects(self, rect: Rect = (0, 0, 800, 600)):
+        """把所有窗口移回同一位置并还原，使下一次平铺需要移动全部窗口"""
+        for window in self.windows.values():
+            window.rect = rect
+            window.minimized = False
+
+    def list_windows(self):
+        handles = super().list_windows()
+        spend(self.latency.enumerate * len(self.windows))
+        return handles
+
+    def get_class_name(self, hwnd: int) -> str:
+        spend(self.latency.query)
+        return super().get_class_name(hwnd)
+
+    def get_title(self, hwnd: int) -> str:
+        spend(self.latency.query)
+        return super().get_title(hwnd)
+
+    def get_pid(self, hwnd: int) -> int:
+        spend(self.latency.query)
+        return super().get_pid(hwnd)
+
+    def get_rect(self, hwnd: int) -> Rect:
+        spend(self.latency.query)
+        return super().get_rect(hwnd)
+
+    def is_minimized(self, hwnd: int) -> bool:
+        spend(self.latency.query)
+        return super().is_minimized(hwnd)
+
+    def move_window(self, hwnd: int, x: int, y: int, width: int, height: int):
+        spend(self.latency.move)
+        super().move_window(hwnd, x, y, width, height)
+
+    def end_batch(self, batch):
+        spend(self.latency.move * len(batch))
+        super().end_batch(batch)
+
+    def minimize(self, hwnd: int):
+        spend(self.latency.show)
+        super().minimize(hwnd)
+
+    def restore(self, hwnd: int):
+        spend(self.latency.show)
+        super().restore(hwnd)
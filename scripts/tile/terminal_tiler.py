@@ -5,339 +5,74 @@
 支持Windows平台，默认优先竖向平铺
 """
 
-import argparse
-import sys
-import re
+# 启动速度敏感（常由热键触发）: argparse等仅在需要时导入，pywin32由后端按需加载；
+# 布局规划、显示器拓扑和字符网格只在平铺时导入，--list / --hide 不需要它们。
+# 作为脚本运行的文件不使用缓存的字节码，平铺器本身放在 tiler.py，这里只保留命令行解析和入口
 import time
-from typing import List, Tuple, Optional
-import subprocess
+# --profile 时作为导入阶段的起点
+_STARTED_NS = time.perf_counter_ns()
 
-# Windows API相关导入
-try:
-    import win32gui
-    import win32con
-    import win32api
-    HAS_WIN32 = True
-except ImportError:
-    HAS_WIN32 = False
-    print("警告: 未安装pywin32，某些功能可能不可用")
-    print("请运行: pip install pywin32")
+import os
+import sys
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, List, Tuple, Optional
 
-class TerminalTiler:
-    """终端平铺管理器"""
-    
-    def __init__(self):
-        self.screen_width = 1920
-        self.screen_height = 1080
-        if HAS_WIN32:
-            self.screen_width = win32api.GetSystemMetrics(win32con.SM_CXSCREEN)
-            self.screen_height = win32api.GetSystemMetrics(win32con.SM_CYSCREEN)
-    
-    def _calculate_optimal_grid(self, num_windows: int, prefer_vertical: bool = True) -> Tuple[int, List[int]]:
-        """
-        计算最优的网格布局
-        
-        Args:
-            num_windows: 窗口总数
-            prefer_vertical: 是否优先垂直排列
-            
-        Returns:
-            (列数, 每列的行数列表)
-        """
-        if num_windows <= 0:
-            return (0, [])
-        
-        if num_windows == 1:
-            return (1, [1])
-        
-        if num_windows == 2:
-            return (1, [2]) if prefer_vertical else (2, [1, 1])
-        
-        # 对于3个或更多窗口，使用智能布局
-        if prefer_vertical:
-            # 垂直优先：尽量少列，但避免单列过挤
-            if num_windows <= 2:
-                return (1, [num_windows])  # 2个以内单列
-            elif num_windows == 3:
-                # 3个窗口：优先2列布局，避免单列过长
-                return (2, [2, 1])  # 第一列2个，第二列1个
-            elif num_windows <= 6:
-                # 4-6个窗口用2列
-                col1_count = (num_windows + 1) // 2  # 向上取整
-                col2_count = num_windows - col1_count
-                return (2, [col1_count, col2_count])
-            elif num_windows <= 9:
-                # 7-9个窗口用3列
-                base_count = num_windows // 3
-                remainder = num_windows % 3
-                cols = [base_count] * 3
-                # 将余数分配给前面的列
-                for i in range(remainder):
-                    cols[i] += 1
-                return (3, cols)
-            else:
-                # 更多窗口，计算合适的列数
-                cols = min(4, (num_windows + 2) // 3)  # 最多4列，每列大约3个
-                base_count = num_windows // cols
-                remainder = num_windows % cols
-                col_counts = [base_count] * cols
-                for i in range(remainder):
-                    col_counts[i] += 1
-                return (cols, col_counts)
-        else:
-            # 水平优先：尽量多列，少行
-            import math
-            cols = min(num_windows, int(math.ceil(math.sqrt(num_windows))))
-            base_count = num_windows // cols
-            remainder = num_windows % cols
-            col_counts = [base_count] * cols
-            for i in range(remainder):
-                col_counts[i] += 1
-            return (cols, col_counts)
-    
-    def find_terminal_windows(self, keyword: str) -> List[Tuple[int, str]]:
-        """
-        查找包含关键字的终端窗口
-        返回: [(窗口句柄, 窗口标题), ...]
-        """
-        if not HAS_WIN32:
-            print(f"模拟查找包含 '{keyword}' 的终端窗口...")
-            return [(12345, f"模拟终端 - {keyword}1"), (12346, f"模拟终端 - {keyword}2")]
-        
-        windows = []
-        
-        def enum_window_callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd):
-                window_title = win32gui.GetWindowText(hwnd)
-                class_name = win32gui.GetClassName(hwnd)
-                
-                # 检查是否为终端窗口类型
-                terminal_classes = [
-                    'ConsoleWindowClass',  # 传统命令提示符
-                    'CASCADIA_HOSTING_WINDOW_CLASS',  # Windows Terminal
-                    'PseudoConsoleWindow',  # PowerShell
-                    'WindowsTerminal',
-                    'VirtualConsoleClass'
-                ]
-                
-                is_terminal = any(term_class in class_name for term_class in terminal_classes)
-                has_keyword = keyword.lower() in window_title.lower()
-                
-                if is_terminal and has_keyword:
-                    windows.append((hwnd, window_title))
-                    print(f"找到终端: {window_title} (类名: {class_name})")
-            
-            return True
-        
-        try:
-            win32gui.EnumWindows(enum_window_callback, windows)
-        except Exception as e:
-            print(f"枚举窗口时出错: {e}")
-        
-        return windows
-    
-    def tile_windows_vertical(self, windows: List[Tuple[int, str]], gap: int = 5):
-        """
-        智能垂直平铺窗口
-        当窗口数量较多时自动使用多列布局，并限制窗口高度避免过长
-        """
-        if not windows:
-            print("没有找到要平铺的窗口")
-            return
-        
-        num_windows = len(windows)
-        print(f"开始智能垂直平铺 {num_windows} 个窗口...")
-        
-        # 智能计算列数和行数
-        cols, rows_per_col = self._calculate_optimal_grid(num_windows, prefer_vertical=True)
-        
-        # 设置最小和最大窗口高度（用于查看日志的合理高度）
-        min_window_height = 200  # 最小高度
-        max_window_height = 600  # 最大高度，避免窗口过长
-        
-        # 计算实际窗口尺寸
-        available_width = self.screen_width - gap * (cols + 1)
-        window_width = available_width // cols
-        
-        available_height = self.screen_height - gap * (max(rows_per_col) + 1)
-        window_height = min(max_window_height, max(min_window_height, available_height // max(rows_per_col)))
-        
-        print(f"布局方案: {cols}列，每列最多{max(rows_per_col)}行")
-        print(f"窗口尺寸: 宽度={window_width}, 高度={window_height}")
-        
-        # 按列排列窗口
-        current_window = 0
-        for col in range(cols):
-            if current_window >= num_windows:
-                break
-                
-            # 计算这一列要放置的窗口数量
-            windows_in_this_col = rows_per_col[col] if col < len(rows_per_col) else 0
-            if windows_in_this_col == 0:
-                continue
-                
-            # 计算列的X位置
-            col_x = gap + col * (window_width + gap)
-            
-            # 为这一列的窗口分配位置
-            for row in range(windows_in_this_col):
-                if current_window >= num_windows:
-                    break
-                    
-                hwnd, title = windows[current_window]
-                
-                # 计算窗口位置
-                x = col_x
-                y = gap + row * (window_height + gap)
-                
-                if HAS_WIN32:
-                    try:
-                        # 确保窗口处于正常状态
-                        win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                        # 移动和调整窗口大小
-                        win32gui.SetWindowPos(
-                            hwnd, 
-                            win32con.HWND_TOP, 
-                            x, y, window_width, window_height,
-                            win32con.SWP_SHOWWINDOW
-                        )
-                        print(f"已平铺窗口 [第{col+1}列第{row+1}行]: {title}")
-                        print(f"  -> 位置({x}, {y}) 大小({window_width}, {window_height})")
-                    except Exception as e:
-                        print(f"平铺窗口 '{title}' 时出错: {e}")
-                else:
-                    print(f"模拟平铺窗口 [第{col+1}列第{row+1}行]: {title}")
-                    print(f"  -> 位置({x}, {y}) 大小({window_width}, {window_height})")
-                
-                current_window += 1
-                # 短暂延迟，让窗口有时间响应
-                time.sleep(0.1)
-    
-    def tile_windows_horizontal(self, windows: List[Tuple[int, str]], gap: int = 5):
-        """
-        智能水平平铺窗口
-        当窗口数量较多时自动使用多行布局，保持合理的窗口宽度
-        """
-        if not windows:
-            print("没有找到要平铺的窗口")
-            return
-        
-        num_windows = len(windows)
-        print(f"开始智能水平平铺 {num_windows} 个窗口...")
-        
-        # 智能计算列数和行数（水平优先）
-        cols, rows_per_col = self._calculate_optimal_grid(num_windows, prefer_vertical=False)
-        
-        # 设置最小和最大窗口宽度
-        min_window_width = 300   # 最小宽度，保证终端可读性
-        max_window_width = 800   # 最大宽度，避免窗口过宽
-        
-        # 计算实际窗口尺寸
-        available_width = self.screen_width - gap * (cols + 1)
-        window_width = min(max_window_width, max(min_window_width, available_width // cols))
-        
-        # 对于水平布局，行数就是最大的列高度
-        max_rows = max(rows_per_col) if rows_per_col else 1
-        available_height = self.screen_height - gap * (max_rows + 1)
-        window_height = available_height // max_rows
-        
-        print(f"布局方案: {cols}列{max_rows}行网格")
-        print(f"窗口尺寸: 宽度={window_width}, 高度={window_height}")
-        
-        # 按行优先排列窗口（水平平铺特色）
-        current_window = 0
-        
-        # 重新组织窗口分配逻辑 - 按行优先填充
-        window_positions = []  # [(窗口索引, 行, 列), ...]
-        
-        # 计算每行应该放多少个窗口
-        for row in range(max_rows):
-            for col in range(cols):
-                if current_window >= num_windows:
-                    break
-                # 检查这一列在当前行是否应该有窗口
-                if row < rows_per_col[col]:
-                    window_positions.append((current_window, row, col))
-                    current_window += 1
-        
-        # 根据计算好的位置放置窗口
-        for window_idx, row, col in window_positions:
-            hwnd, title = windows[window_idx]
-            
-            # 计算窗口位置
-            x = gap + col * (window_width + gap)
-            y = gap + row * (window_height + gap)
-            
-            if HAS_WIN32:
-                try:
-                    # 确保窗口处于正常状态
-                    win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                    # 移动和调整窗口大小
-                    win32gui.SetWindowPos(
-                        hwnd, 
-                        win32con.HWND_TOP, 
-                        x, y, window_width, window_height,
-                        win32con.SWP_SHOWWINDOW
-                    )
-                    print(f"已平铺窗口 [第{row+1}行第{col+1}列]: {title}")
-                    print(f"  -> 位置({x}, {y}) 大小({window_width}, {window_height})")
-                except Exception as e:
-                    print(f"平铺窗口 '{title}' 时出错: {e}")
-            else:
-                print(f"模拟平铺窗口 [第{row+1}行第{col+1}列]: {title}")
-                print(f"  -> 位置({x}, {y}) 大小({window_width}, {window_height})")
-            
-            # 短暂延迟，让窗口有时间响应
-            time.sleep(0.1)
-    
-    def list_all_terminals(self):
-        """
-        列出所有终端窗口
-        """
-        if not HAS_WIN32:
-            print("模拟模式：列出所有终端窗口")
-            terminals = [
-                "gas1 - PowerShell",
-                "gas2 - PowerShell", 
-                "gcc1 - Command Prompt",
-                "gcc2 - Command Prompt",
-                "gds - Windows Terminal"
-            ]
-            for terminal in terminals:
-                print(f"  - {terminal}")
-            return
-        
-        print("搜索所有终端窗口...")
-        all_windows = []
-        
-        def enum_all_callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd):
-                window_title = win32gui.GetWindowText(hwnd)
-                class_name = win32gui.GetClassName(hwnd)
-                
-                terminal_classes = [
-                    'ConsoleWindowClass',
-                    'CASCADIA_HOSTING_WINDOW_CLASS',
-                    'PseudoConsoleWindow',
-                    'WindowsTerminal',
-                    'VirtualConsoleClass'
-                ]
-                
-                if any(term_class in class_name for term_class in terminal_classes) and window_title:
-                    windows.append((hwnd, window_title, class_name))
-            
-            return True
-        
-        win32gui.EnumWindows(enum_all_callback, all_windows)
-        
-        if all_windows:
-            print(f"找到 {len(all_windows)} 个终端窗口:")
-            for hwnd, title, class_name in all_windows:
-                print(f"  - {title} ({class_name})")
-        else:
-            print("未找到任何终端窗口")
+from window_index import SORT_CHOICES
+from geometry import CommitResult
+from metrics import NULL_METRICS
+from tiler import TerminalTiler
 
-def main():
+if TYPE_CHECKING:
+    import argparse
+
+METRICS_FORMATS = ('jsonl', 'prom', 'off')
+
+# 命令行参数默认值，快速路径与argparse保持一致
+DEFAULTS = {
+    'keywords': [],
+    'regions': None,
+    'pid': None,
+    'exe': None,
+    'cmdline': None,
+    'parent': None,
+    'horizontal': False,
+    'gap': 5,
+    'list': False,
+    'hide': False,
+    'async_placement': False,
+    'deadline': 1.0,
+    'tolerance': 2,
+    'force': False,
+    'incremental': False,
+    'overflow': 'spill',
+    'page': None,
+    'rescan': False,
+    'lock_timeout': 30.0,
+    'cell_align': True,
+    # 环境变量 TERMINAL_TILER_METRICS 可改变默认的指标格式（如基准中设为off）
+    'metrics': os.environ.get('TERMINAL_TILER_METRICS') if os.environ.get('TERMINAL_TILER_METRICS')
+               in METRICS_FORMATS else 'jsonl',
+    'metrics_file': None,
+    'limit': None,
+    'sort_by': None,
+    'monitor': 'auto',
+    'watch': False,
+    'debounce': 0.25,
+    'save_layout': None,
+    'restore_layout': None,
+    'quiet': False,
+    'json': False,
+    'json_lines': False,
+    'profile': False,
+    'trace': None,
+    'daemon': False,
+    'address': None,
+}
+
+def build_parser() -> 'argparse.ArgumentParser':
+    """构建命令行参数解析器（守护进程也用它解析客户端请求）"""
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description="终端平铺管理器 - 搜索并平铺相关终端窗口",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -348,13 +83,32 @@ def main():
   python terminal_tiler.py --list                 # 列出所有终端窗口
   python terminal_tiler.py g --hide               # 最小化所有相关终端窗口
   python terminal_tiler.py gcc --gap 10           # 平铺gcc相关终端，窗口间距为10像素
+  python terminal_tiler.py "gcc*|gds"             # 多个模式: 通配符、子串、正则，! 开头为排除
+  python terminal_tiler.py gas --async            # 异步平铺，跳过无响应的终端
+  python terminal_tiler.py gas gcc gds --regions 50,30,20  # 多个分组按比例分区平铺
+  python terminal_tiler.py --exe node --cmdline "run dev"  # 按所属进程选择，不依赖标题
+  python terminal_tiler.py gas --watch            # 监视窗口变化，终端重启后自动重新平铺
+  python terminal_tiler.py --save-layout work     # 保存当前终端布局
+  python terminal_tiler.py --restore-layout work  # 恢复保存的布局
+  python terminal_tiler.py --daemon               # 启动常驻守护进程，配合 tiler_client.py 使用
         """
     )
     
     parser.add_argument(
-        'keyword', 
-        nargs='?',
-        help='要搜索的终端关键字 (如: gas, gcc, gds)'
+        'keywords',
+        nargs='*',
+        metavar='keyword',
+        type=parse_keyword,
+        help='要搜索的终端关键字或匹配模式 (如: gas, "gcc*|gds", "re:gas[0-9]+", "g,!gds")；'
+             '给出多个时每个关键字为一个分组，分区平铺'
+    )
+    
+    parser.add_argument(
+        '--regions',
+        type=parse_regions,
+        metavar='比例',
+        help='多个分组时各分组区域的比例，逗号分隔 (如 50,30,20，默认均分)；'
+             '竖向平铺时区域左右排列，水平平铺时上下排列'
     )
     
     parser.add_argument(
@@ -381,54 +135,586 @@ def main():
         action='store_true',
         help='隐藏所有扫描到的终端窗口'
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        '--async',
+        dest='async_placement',
+        action='store_true',
+        help='异步放置窗口，不等待无响应的窗口'
+    )
     
-    tiler = TerminalTiler()
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        default=1.0,
+        help='异步模式下每个窗口的截止时间 (秒，默认1.0，从开始处理该窗口时计算)'
+    )
+    
+    parser.add_argument(
+        '--tolerance',
+        type=int,
+        default=2,
+        help='窗口已在目标位置的判定容差 (像素，默认2)，位置未变化的窗口不会被重新移动'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='忽略当前窗口位置，重新移动所有窗口'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='增量布局: 按窗口当前位置分配槽位，窗口加入或离开时其余窗口尽量保持不动'
+    )
+    
+    parser.add_argument(
+        '--limit',
+        type=parse_limit,
+        metavar='N',
+        help='最多使用N个匹配的窗口 (多个分组时为每组N个)；不排序时找到N个即停止枚举'
+    )
+    
+    parser.add_argument(
+        '--first',
+        action='store_const',
+        const=1,
+        dest='limit',
+        help='只使用第一个匹配的窗口，等同于 --limit 1'
+    )
+    
+    parser.add_argument(
+        '--sort-by',
+        choices=SORT_CHOICES,
+        help='匹配窗口的排序方式: zorder(默认，最前面的窗口在前)、title、position(从左到右)、pid'
+    )
+    
+    parser.add_argument(
+        '--rescan',
+        action='store_true',
+        help='不使用上次运行缓存的窗口句柄，重新枚举所有窗口。缓存最多使用5分钟，'
+             '期间打开或关闭任何窗口都会自动重新枚举；但已有窗口改名后才匹配关键字时'
+             '（且不在前台），缓存过期前不会被发现，此时使用本选项'
+    )
+    
+    parser.add_argument(
+        '--no-cell-align',
+        action='store_false',
+        dest='cell_align',
+        help='不把窗口大小取整到终端的整行整列（默认取整，行列数不变时不调整大小）'
+    )
+    
+    parser.add_argument(
+        '--metrics',
+        choices=METRICS_FORMATS,
+        default=DEFAULTS['metrics'],
+        help='每次运行结束时把延迟直方图和窗口计数写到本地文件: jsonl(默认，每次追加一行增量，超过1MB轮转)、'
+             'prom(Prometheus文本格式的累计值) 或 off；默认值可由环境变量 TERMINAL_TILER_METRICS 指定'
+    )
     
+    parser.add_argument(
+        '--metrics-file',
+        metavar='FILE',
+        help='指标文件路径 (默认为缓存目录下的 metrics.jsonl / metrics.prom)'
+    )
+    
+    parser.add_argument(
+        '--lock-timeout',
+        type=float,
+        default=30.0,
+        metavar='秒',
+        help='等待其他正在平铺的实例的最长时间 (默认30秒)；同一分组排队中的请求只执行最后一个'
+    )
+    
+    parser.add_argument(
+        '--monitor',
+        type=parse_monitor,
+        default='auto',
+        help='目标显示器: 序号(1为主显示器)、all(按容量分布到所有显示器)或auto(默认，主显示器放不下时才分布)'
+    )
+    
+    overflow = parser.add_argument_group('超出屏幕容量', '窗口数超过显示器在最小窗口尺寸下的容量时的处理')
+    overflow.add_argument(
+        '--overflow',
+        choices=['spill', 'cascade', 'page'],
+        default='spill',
+        help='spill(默认): 照常排列，窗口可能超出屏幕；cascade: 每个槽位层叠多个窗口；page: 分页显示'
+    )
+    overflow.add_argument(
+        '--page',
+        type=parse_limit,
+        metavar='N',
+        help='显示第N页（从1开始），其余页的窗口最小化；隐含 --overflow page'
+    )
+    overflow.add_argument(
+        '--next-page',
+        action='store_const',
+        const='next',
+        dest='page',
+        help='显示当前显示页的下一页（最后一页之后回到第一页）'
+    )
+    
+    processes = parser.add_argument_group('进程条件', '按窗口所属进程选择终端（可与关键字组合，条件需全部满足）；'
+                                          '只检查拥有窗口的进程 (shell或终端程序本身)，不检查在其中运行的子进程')
+    processes.add_argument(
+        '--pid',
+        type=parse_pids,
+        metavar='PID',
+        help='所属进程的pid，逗号分隔多个'
+    )
+    processes.add_argument(
+        '--exe',
+        type=parse_keyword,
+        metavar='模式',
+        help='所属进程的可执行文件名 (如: pwsh.exe, "powershell*|cmd.exe")'
+    )
+    processes.add_argument(
+        '--cmdline',
+        type=parse_keyword,
+        metavar='模式',
+        help='所属进程的命令行，即启动shell时的参数 (如: "-Command npm run dev", "re:--title[= ]gas")'
+    )
+    processes.add_argument(
+        '--parent',
+        metavar='PID或模式',
+        help='父进程: 纯数字为pid，否则匹配父进程的可执行文件名'
+    )
+    
+    parser.add_argument(
+        '--save-layout',
+        metavar='NAME',
+        help='把匹配关键字（未提供时为全部终端）的窗口位置保存为命名布局'
+    )
+    
+    parser.add_argument(
+        '--restore-layout',
+        metavar='NAME',
+        help='恢复命名布局，一次批量移动所有窗口'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='持续监视窗口创建/关闭/标题变化，匹配的终端变化时自动重新平铺'
+    )
+    
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        default=0.25,
+        help='监视模式下合并连续事件的防抖时间 (秒，默认0.25)'
+    )
+    
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
+        '--quiet', '-q',
+        action='store_true',
+        help='只输出错误'
+    )
+    output.add_argument(
+        '--json',
+        action='store_true',
+        help='结束时输出一个JSON文档 (事件列表与执行摘要)，便于程序解析'
+    )
+    output.add_argument(
+        '--json-lines',
+        action='store_true',
+        help='每个事件输出一行JSON，最后一行为执行摘要'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='输出各阶段 (导入/枚举/匹配/规划/应用/输出) 耗时与计数'
+    )
+    
+    parser.add_argument(
+        '--trace',
+        metavar='FILE',
+        help='把各阶段耗时写入Chrome trace文件 (chrome://tracing 或 Perfetto 打开)，隐含 --profile'
+    )
+    
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='以守护进程方式运行，通过本地套接字接收平铺/隐藏/列出请求'
+    )
+    
+    parser.add_argument(
+        '--address',
+        help='守护进程监听地址 (unix:路径 或 tcp:主机:端口，默认按平台选择)'
+    )
+    return parser
+
+def execute(tiler: TerminalTiler, args: 'argparse.Namespace',
+            parser: Optional['argparse.ArgumentParser'] = None) -> dict:
+    """
+    执行一次列出/隐藏/平铺操作
+    返回结构化的执行摘要，供守护进程回传给客户端；--profile 时附带各阶段耗时
+    输出由 tiler.out 缓冲，在结束时一次写出（--json 时为包含事件与摘要的JSON文档）
+    """
+    profiler = tiler.profiler
+    started = time.perf_counter()
+    with profiler.phase('execute'):
+        summary = _execute(tiler, args, parser)
+    action = summary.get('action', 'none')
+    tiler.metrics.observe('tiler_operation_seconds', time.perf_counter() - started, operation=action)
+    tiler.metrics.inc('tiler_runs_total', action=action)
+    tiler.save_caches()
+    tiler.flush_metrics()
+    if tiler.process_cache is not None:
+        summary['process_cache'] = {'hits': tiler.process_cache.hits,
+                                    'misses': tiler.process_cache.misses}
+    if tiler.handle_cache is not None:
+        summary['handle_cache'] = {'hits': tiler.handle_cache.hits,
+                                   'misses': tiler.handle_cache.misses,
+                                   'stale': tiler.handle_cache.stale}
+    if profiler.enabled:
+        tiler.out.text(profiler.report())
+        summary['profile'] = profiler.summary()
+        if args.trace:
+            profiler.write_trace(args.trace)
+            tiler.out.text(f"trace已保存: {args.trace}")
+    tiler.out.finish(summary)
+    return summary
+
+def request_key(args) -> Optional[str]:
+    """
+    运行队列中的分组: 关键字和进程条件相同的请求作用于同一批窗口，排队时只执行最后一个
+    只读操作（--list、--save-layout）不需要排队，返回None；--next-page 每次都是单独的分组
+    """
+    if args.list or args.save_layout:
+        return None
+    import json
+    if args.restore_layout:
+        return json.dumps(['restore', args.restore_layout], ensure_ascii=False)
+    if args.page == 'next':
+        # 翻页是相对操作，连按三次应当翻三页: 每个请求单独一组，仍然排队但不与其他请求合并
+        return json.dumps(['next-page', os.getpid(), os.urandom(8).hex()])
+    return json.dumps([args.keywords, args.pid, args.exe, args.cmdline, args.parent], ensure_ascii=False)
+
+def parse_argv(argv: List[str]):
+    """解析命令行参数，简单调用走快速路径"""
+    return fast_args(argv) or build_parser().parse_args(argv)
+
+def execute_queued(tiler: TerminalTiler, args: 'argparse.Namespace', argv: List[str], queue,
+                   parser: Optional['argparse.ArgumentParser'] = None) -> dict:
+    """
+    通过跨进程运行队列 (run_queue.RunQueue) 执行: 同时启动的实例依次平铺，
+    同一分组排队中的请求只执行最后一个，被合并的调用方输出覆盖它的那次运行的摘要
+    """
+    out = tiler.out
+
+    def run(latest_argv: List[str], requests: int) -> dict:
+        latest = args
+        if latest_argv != argv:
+            # 执行其他进程更晚的请求，输出格式仍按本次调用的参数
+            latest = parse_argv(latest_argv)
+            tiler.configure(latest)
+            tiler.out = out
+        if requests > 1:
+            out.emit('coalesced', count=requests)
+        return execute(tiler, latest, parser)
+
+    try:
+        outcome = queue.run(request_key(args), argv, run, args.lock_timeout)
+    except TimeoutError as e:
+        out.emit('error', message=f"错误: {e}")
+        summary = {'action': 'none', 'error': 'lock timeout'}
+        out.finish(summary)
+        return summary
+    if outcome.ran:
+        return outcome.summary
+    out.emit('served', pid=outcome.served_by, count=outcome.requests)
+    summary = dict(outcome.summary, served_by=outcome.served_by)
+    out.finish(summary)
+    return summary
+
+def _execute(tiler: TerminalTiler, args: 'argparse.Namespace',
+             parser: Optional['argparse.ArgumentParser'] = None) -> dict:
     if args.list:
-        tiler.list_all_terminals()
-        return
+        terminals = tiler.list_all_terminals(args.limit, args.sort_by)
+        return {'action': 'list', 'matched': len(terminals)}
     
-    if not args.keyword:
-        print("错误: 请提供要搜索的关键字，或使用 --list 查看所有终端")
-        parser.print_help()
-        return
+    if args.save_layout:
+        saved = tiler.save_layout(args.save_layout, '|'.join(args.keywords) or None)
+        return {'action': 'save_layout', 'saved': saved}
     
-    print(f"搜索包含关键字 '{args.keyword}' 的终端窗口...")
-    windows = tiler.find_terminal_windows(args.keyword)
+    if args.restore_layout:
+        try:
+            result = tiler.restore_layout(args.restore_layout)
+        except ValueError as e:
+            tiler.out.emit('error', message=f"错误: {e}")
+            return {'action': 'restore_layout', 'error': str(e)}
+        return {
+            'action': 'restore_layout',
+            'placed': len(result.placed),
+            'moved': result.moved,
+            'skipped': len(result.skipped),
+            'failed': {str(hwnd): error for hwnd, error in result.failed.items()},
+        }
+    
+    out = tiler.out
+    keywords = args.keywords
+    if not keywords and tiler.selector is None:
+        out.emit('error', message="错误: 请提供要搜索的关键字，或使用 --list 查看所有终端")
+        if parser is not None and out.mode == 'text':
+            out.text(parser.format_help())
+        return {'action': 'none', 'error': 'missing keyword'}
+    
+    if args.regions is not None and len(args.regions) != len(keywords):
+        out.emit('error', message=f"错误: --regions 给出了 {len(args.regions)} 个比例，"
+                                  f"但有 {len(keywords)} 个关键字分组")
+        return {'action': 'none', 'error': 'regions mismatch'}
+    
+    message = None if args.hide else _monitor_error(tiler)
+    if message:
+        out.emit('error', message=message)
+        return {'action': 'none', 'error': 'monitor out of range'}
+    
+    if len(keywords) > 1:
+        return _execute_groups(tiler, args)
+    
+    keyword = keywords[0] if keywords else None
+    what = f"包含 '{keyword}'" if keyword else "满足进程条件"
+    out.text(f"搜索{what}的终端窗口...")
+    windows = tiler.find_terminal_windows(keyword, args.limit, args.sort_by)
     
     if not windows:
-        print(f"未找到包含 '{args.keyword}' 的终端窗口")
-        print("使用 --list 参数查看所有可用的终端窗口")
-        return
+        out.text(f"未找到{what}的终端窗口")
+        out.text("使用 --list 参数查看所有可用的终端窗口")
+        return {'action': 'hide' if args.hide else 'tile', 'matched': 0}
     
-    print(f"找到 {len(windows)} 个匹配的终端窗口:")
+    out.text(f"找到 {len(windows)} 个匹配的终端窗口:")
     for hwnd, title in windows:
-        print(f"  - {title}")
+        out.text(f"  - {title}")
 
     if args.hide:
-        # 最小化所有扫描到的终端窗口
-        if not HAS_WIN32:
-            print("模拟最小化所有终端窗口")
-            for hwnd, title in windows:
-                print(f"  - 已最小化: {title}")
-        else:
-            for hwnd, title in windows:
-                try:
-                    win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
-                    print(f"已最小化: {title}")
-                except Exception as e:
-                    print(f"最小化窗口 '{title}' 时出错: {e}")
-        print("终端窗口最小化完成!")
-        return
+        return _hide(tiler, windows)
     
     # 平铺窗口
     if args.horizontal:
-        tiler.tile_windows_horizontal(windows, args.gap)
+        result = tiler.tile_windows_horizontal(windows, args.gap)
     else:
-        tiler.tile_windows_vertical(windows, args.gap)
+        result = tiler.tile_windows_vertical(windows, args.gap)
+    
+    out.text("终端平铺完成!")
+    summary = _tile_summary(windows, result)
+    if tiler.shown_page is not None:
+        summary['page'], summary['pages'] = tiler.shown_page
+    return summary
+
+def _monitor_error(tiler: TerminalTiler) -> Optional[str]:
+    """--monitor 指定的显示器不存在时返回错误信息（显示器数量只有在枚举后才知道，argparse无法检查）"""
+    if not isinstance(tiler.monitor, int):
+        return None
+    count = len(tiler.topology.monitors())
+    if tiler.monitor < count:
+        return None
+    return f"错误: 显示器序号超出范围: {tiler.monitor + 1} (共 {count} 个显示器)"
+
+def _execute_groups(tiler: TerminalTiler, args: 'argparse.Namespace') -> dict:
+    """多个关键字分组: 一次枚举，各分组平铺到各自区域，一次批量提交"""
+    out = tiler.out
+    out.text(f"搜索关键字分组: {', '.join(args.keywords)}")
+    groups = tiler.find_groups(args.keywords, args.limit, args.sort_by)
+    counts = {keyword: len(windows) for keyword, windows in groups.items()}
+    windows = [window for members in groups.values() for window in members]
+    
+    if not windows:
+        out.text("未找到匹配任何分组的终端窗口")
+        out.text("使用 --list 参数查看所有可用的终端窗口")
+        return {'action': 'hide' if args.hide else 'tile', 'matched': 0, 'groups': counts}
     
-    print("终端平铺完成!")
+    for keyword, members in groups.items():
+        out.text(f"分组 '{keyword}': {len(members)} 个窗口")
+    
+    if args.hide:
+        summary = _hide(tiler, windows)
+    else:
+        result = tiler.tile_groups(groups, args.gap, args.horizontal, args.regions)
+        out.text("终端平铺完成!")
+        summary = _tile_summary(windows, result)
+    summary['groups'] = counts
+    return summary
+
+def _hide(tiler: TerminalTiler, windows: List[Tuple[int, str]]) -> dict:
+    """最小化所有扫描到的终端窗口"""
+    with tiler.profiler.phase('hide'):
+        result = tiler.hide_windows(windows)
+    tiler.out.text("终端窗口最小化完成!")
+    summary = {'action': 'hide', 'matched': len(windows)}
+    if result is not None:
+        summary['stragglers'] = result.stragglers
+    return summary
+
+def _tile_summary(windows: List[Tuple[int, str]], result: CommitResult) -> dict:
+    return {
+        'action': 'tile',
+        'matched': len(windows),
+        'placed': len(result.placed),
+        'moved': result.moved,
+        'skipped': len(result.skipped),
+        'failed': {str(hwnd): error for hwnd, error in result.failed.items()},
+        'stragglers': result.stragglers,
+    }
+
+def watch(tiler: TerminalTiler, args: 'argparse.Namespace',
+          parser: Optional['argparse.ArgumentParser'] = None):
+    """监视模式: 匹配关键字的终端创建/关闭/改名时自动重新平铺"""
+    if not args.keywords:
+        tiler.out.emit('error', message="错误: 监视模式需要提供关键字")
+        if parser is not None and tiler.out.mode == 'text':
+            tiler.out.text(parser.format_help())
+        tiler.out.finish()
+        return
+    if args.regions is not None and len(args.regions) != len(args.keywords):
+        tiler.out.emit('error', message=f"错误: --regions 给出了 {len(args.regions)} 个比例，"
+                                        f"但有 {len(args.keywords)} 个关键字分组")
+        tiler.out.finish()
+        return
+    message = _monitor_error(tiler)
+    if message:
+        tiler.out.emit('error', message=message)
+        tiler.out.finish({'action': 'none', 'error': 'monitor out of range'})
+        return
+    from run_queue import RunQueue
+    from watcher import TilerWatcher
+    queue = RunQueue()
+    source = tiler.backend.event_source()
+    # 每次重新平铺都持有运行锁，不与同时启动的命令行实例或守护进程交错移动窗口
+    watcher = TilerWatcher(tiler, args.keywords, source, debounce=args.debounce,
+                           gap=args.gap, horizontal=args.horizontal,
+                           grouped=len(args.keywords) > 1, regions=args.regions,
+                           lock=lambda: queue.exclusive(args.lock_timeout))
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        tiler.out.text("停止监视")
+    finally:
+        source.close()
+        tiler.save_caches()
+        tiler.flush_metrics()
+        tiler.out.finish({'action': 'watch', 'retiles': dict(watcher.retiles)})
+
+def parse_keyword(value: str) -> str:
+    """校验关键字查询能否编译，错误由argparse报告"""
+    from title_matcher import compile_query
+    try:
+        compile_query(value)
+    except ValueError as e:
+        import argparse
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+def parse_regions(value: str) -> List[float]:
+    """把 --regions 参数 (如 50,30,20) 转换为各区域的比例"""
+    import argparse
+    try:
+        weights = [float(part) for part in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的区域比例: {value}")
+    if any(weight <= 0 for weight in weights):
+        raise argparse.ArgumentTypeError(f"区域比例必须为正数: {value}")
+    return weights
+
+def parse_pids(value: str) -> List[int]:
+    """把 --pid 参数 (如 1234,5678) 转换为pid列表"""
+    try:
+        return [int(part) for part in value.split(',')]
+    except ValueError:
+        import argparse
+        raise argparse.ArgumentTypeError(f"无效的pid: {value}")
+
+def parse_limit(value: str) -> int:
+    """把 --limit 参数转换为正整数"""
+    import argparse
+    try:
+        limit = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的数量: {value}")
+    if limit < 1:
+        raise argparse.ArgumentTypeError(f"数量至少为1: {value}")
+    return limit
+
+def parse_monitor(value: str):
+    """把 --monitor 参数转换为 'auto' / 'all' / 从0开始的显示器序号"""
+    if value in ('auto', 'all'):
+        return value
+    import argparse
+    try:
+        index = int(value)
+    except (TypeError, ValueError):
+        raise argparse.ArgumentTypeError(f"无效的显示器参数: {value}")
+    if index < 1:
+        raise argparse.ArgumentTypeError(f"显示器序号从1开始: {value}")
+    return index - 1
+
+def fast_args(argv: List[str]) -> Optional[SimpleNamespace]:
+    """
+    快速路径: `--list` 和 `<关键字> --hide` 这类简单调用不构建argparse
+    其他参数组合和无法编译的关键字返回None，交给完整的解析器处理（报告参数错误）
+    """
+    if argv == ['--list']:
+        return SimpleNamespace(**dict(DEFAULTS, list=True))
+    if len(argv) == 2 and '--hide' in argv:
+        keyword = argv[0] if argv[1] == '--hide' else argv[1]
+        if not keyword.startswith('-'):
+            # 编译结果有缓存，查找窗口时直接复用
+            from title_matcher import compile_query
+            try:
+                compile_query(keyword)
+            except ValueError:
+                return None
+            return SimpleNamespace(**dict(DEFAULTS, keywords=[keyword], hide=True))
+    return None
+
+def main():
+    main_start = time.perf_counter_ns()
+    argv = sys.argv[1:]
+    args = fast_args(argv)
+    parser = None
+    if args is None:
+        parser = build_parser()
+        args = parser.parse_args()
+    parsed = time.perf_counter_ns()
+    
+    tiler = TerminalTiler()
+    tiler.configure(args)
+    # 指标在每次运行（守护进程为每个请求，监视模式为每批事件）结束时写出
+    if args.metrics == 'off':
+        tiler.set_metrics(NULL_METRICS)
+    else:
+        from metrics import MetricsFile
+        tiler.metrics_sink = MetricsFile(args.metrics_file, args.metrics)
+    # 启动阶段发生在确定是否启用分析之前，事后补记
+    tiler.profiler.add_span('import', _STARTED_NS, main_start)
+    tiler.profiler.add_span('parse', main_start, parsed)
+    tiler.profiler.add_span('init', parsed, time.perf_counter_ns())
+    
+    if args.daemon:
+        from tiler_daemon import TilerDaemon
+        from run_queue import RunQueue
+        TilerDaemon(tiler, args.address, parser=parser, execute=execute, queue=RunQueue()).serve_forever()
+        return
+    
+    if args.watch:
+        watch(tiler, args, parser)
+        return
+    
+    if args.keywords and not (args.list or args.save_layout or args.restore_layout):
+        # 单次命令行运行之间通过磁盘上的句柄缓存复用上次的匹配结果
+        from handle_cache import HandleCache, default_handle_cache_path
+        tiler.handle_cache = HandleCache(default_handle_cache_path(), backend=tiler.backend.name)
+    if not (args.list or args.save_layout or args.hide):
+        from cell_grid import default_cell_cache_path
+        tiler.cells_path = default_cell_cache_path()
+    if request_key(args) is None:
+        execute(tiler, args, parser)
+        return
+    # 同时启动的实例通过跨进程队列串行执行并合并重复的请求
+    from run_queue import RunQueue
+    execute_queued(tiler, args, argv, RunQueue(), parser)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+测试异步放置模式（假后端注入无响应窗口）
+"""
+
+import threading
+import time
+
+from geometry import AsyncPlacer, Placement
+from terminal_tiler import TerminalTiler
+from window_backend import FakeWindowBackend
+
+
+def make_backend(count: int, hung: int = 0, hang: float = 2.0) -> FakeWindowBackend:
+    backend = FakeWindowBackend()
+    for i in range(count):
+        hwnd = backend.add_window(f"gas{i + 1} - PowerShell")
+        if i < hung:
+            backend.hangs[hwnd] = hang
+    return backend
+
+
+def test_hung_window_reported_as_straggler():
+    backend = make_backend(8, hung=2)
+    placer = AsyncPlacer(backend, deadline=0.2)
+    placements = [Placement(hwnd, "", (i * 10, 0, 100, 100))
+                  for i, hwnd in enumerate(backend.windows)]
+
+    start = time.perf_counter()
+    result = placer.place(placements)
+    elapsed = time.perf_counter() - start
+
+    print(f"8个窗口(2个无响应)异步放置耗时: {elapsed * 1000:.1f} ms")
+    assert sorted(result.stragglers) == sorted(backend.hangs)
+    assert len(result.placed) == 6
+    # 总耗时受截止时间约束，而不是无响应窗口的阻塞时长之和
+    assert elapsed < 0.6
+
+
+def test_per_window_deadline():
+    backend = make_backend(3, hung=1, hang=0.3)
+    hung = next(iter(backend.hangs))
+    placer = AsyncPlacer(backend, deadline=0.1)
+    placements = [Placement(hwnd, "", (0, 0, 50, 50)) for hwnd in backend.windows]
+    result = placer.place(placements, deadlines={hung: 1.0})
+    assert not result.stragglers and len(result.placed) == 3
+
+
+def test_queued_windows_get_their_own_deadline():
+    """无响应的窗口占满线程池时，排队的正常窗口换到新线程上执行，而不是直接超时"""
+    backend = make_backend(6, hung=3, hang=0.5)
+    placer = AsyncPlacer(backend, deadline=0.1, max_workers=2)
+    placements = [Placement(hwnd, "", (i * 10, 0, 100, 100))
+                  for i, hwnd in enumerate(backend.windows)]
+    result = placer.place(placements)
+    assert sorted(result.stragglers) == sorted(backend.hangs)
+    assert len(result.placed) == 3 and not result.failed
+
+
+def test_hung_threads_are_capped():
+    backend = make_backend(5, hung=3, hang=0.5)
+    placer = AsyncPlacer(backend, deadline=0.05, max_workers=1, max_hung=2)
+    placements = [Placement(hwnd, "", (i * 10, 0, 100, 100))
+                  for i, hwnd in enumerate(backend.windows)]
+    result = placer.place(placements)
+    # 两个线程卡住后不再派发: 其余窗口记为失败
+    assert len(result.stragglers) == 2 and len(result.failed) == 3 and placer.hung == 2
+
+    # 仍卡住的窗口不再派发新的线程
+    started = threading.active_count()
+    again = placer.place(placements[:2])
+    assert sorted(again.stragglers) == sorted(result.stragglers) and again.commits == 0
+    assert threading.active_count() <= started
+
+    # 卡住的线程返回后释放名额
+    time.sleep(0.6)
+    assert placer.hung == 0
+    assert not placer.place(placements[2:]).failed
+
+
+def test_async_hide_does_not_stall():
+    backend = make_backend(5, hung=1)
+    tiler = TerminalTiler(backend, async_placement=True, deadline=0.2)
+    windows = tiler.find_terminal_windows("gas")
+
+    start = time.perf_counter()
+    result = tiler.hide_windows(windows)
+    elapsed = time.perf_counter() - start
+
+    assert len(result.stragglers) == 1
+    assert sum(window.minimized for window in backend.windows.values()) == 4
+    assert elapsed < 0.6
+
+
+def test_async_tile_all_responsive():
+    backend = make_backend(6)
+    tiler = TerminalTiler(backend, async_placement=True)
+    result = tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    assert len(result.placed) == 6 and not result.stragglers
+
+
+if __name__ == "__main__":
+    test_hung_window_reported_as_straggler()
+    test_per_window_deadline()
+    test_queued_windows_get_their_own_deadline()
+    test_hung_threads_are_capped()
+    test_async_hide_does_not_stall()
+    test_async_tile_all_responsive()
+    print("异步放置测试完成!")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+测试模拟窗口管理器与分阶段基准
+"""
+
+import time
+
+from bench_tiler import compare, run_suite
+from simulated_wm import Latency, SimulatedWindowManager
+from window_backend import is_terminal_class
+
+
+def test_generate_mixes_terminals_and_apps():
+    backend = SimulatedWindowManager.generate(500, terminal_ratio=0.3)
+    windows = list(backend.windows.values())
+    terminals = [w for w in windows if is_terminal_class(w.class_name)]
+    assert len(windows) == 500
+    assert 100 < len(terminals) < 200
+    assert any(not w.visible for w in windows)
+    # 同样的种子生成同样的窗口
+    again = SimulatedWindowManager.generate(500, terminal_ratio=0.3)
+    assert [w.title for w in again.windows.values()] == [w.title for w in windows]
+
+
+def test_latency_is_applied_per_window():
+    backend = SimulatedWindowManager.generate(100, latency=Latency(enumerate=0.0001))
+    start = time.perf_counter()
+    backend.list_windows()
+    assert time.perf_counter() - start >= 0.01
+
+
+def test_suite_reports_every_phase():
+    report = run_suite([50], Latency(), repeat=1)
+    for mode in ('vertical', 'horizontal'):
+        for phase in ('enumerate', 'match', 'plan', 'apply'):
+            assert f"{mode}/50/{phase}" in report['results']
+    assert "hide/50/hide" in report['results']
+
+
+def test_compare_flags_regressions():
+    baseline = {'latency_us': {}, 'results': {'a': {'median_ms': 1.0}, 'b': {'median_ms': 0.01}}}
+    current = {'latency_us': {}, 'results': {'a': {'median_ms': 2.0}, 'b': {'median_ms': 0.05}}}
+    # b变慢5倍但绝对差值很小，不算退化
+    assert compare(current, baseline) == [('a', 1.0, 2.0)]
+    assert compare(dict(current, latency_us={'move': 1}), baseline) == []
+
+
+if __name__ == "__main__":
+    test_generate_mixes_terminals_and_apps()
+    test_latency_is_applied_per_window()
+    test_suite_reports_every_phase()
+    test_compare_flags_regressions()
+    print("基准测试完成!")
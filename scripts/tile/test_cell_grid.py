@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+测试字符网格对齐
+"""
+
+from cell_grid import CellCache, CellMetrics, align_rect, grid_size, learn_metrics, same_grid
+from window_backend import FakeWindowBackend
+
+# 字符 9x17，边框和内边距 16x39
+CELLS = CellMetrics(9, 17, 16, 39)
+
+
+def xterm_tiler(make_tiler, count: int, report_cells: bool = True):
+    """count个按字符网格调整尺寸的XTerm窗口"""
+    tiler = make_tiler(count, "gas{i} - bash", class_name='XTerm', cells=CELLS)
+    tiler.backend.report_cells = report_cells
+    return tiler.backend, tiler
+
+
+def aligned(rect) -> bool:
+    return (rect[2] - CELLS.base_width) % CELLS.cell_width == 0 and \
+        (rect[3] - CELLS.base_height) % CELLS.cell_height == 0
+
+
+def test_align_rect():
+    assert grid_size(16 + 80 * 9 + 5, 39 + 24 * 17, CELLS) == (80, 24)
+    rect = align_rect((10, 20, 16 + 80 * 9 + 5, 39 + 24 * 17 + 16), CELLS)
+    assert rect == (10, 20, 16 + 80 * 9, 39 + 24 * 17)
+    # 不超出原矩形，至少一行一列
+    assert align_rect((0, 0, 10, 10), CELLS) == (0, 0, 25, 56)
+    assert same_grid((0, 0, 740, 447), (5, 5, 744, 450), CELLS)
+    assert not same_grid((0, 0, 740, 447), (0, 0, 749, 447), CELLS)
+
+
+def test_learn_metrics():
+    assert learn_metrics([(736, 447)]) is None
+    sizes = [(16 + 80 * 9, 39 + 24 * 17), (16 + 100 * 9, 39 + 30 * 17), (16 + 81 * 9, 39 + 25 * 17)]
+    # 前两个样本的公约数 (20列/6行) 与加入第三个样本后的不同: 还不可信
+    assert learn_metrics(sizes) is None
+    metrics = learn_metrics(sizes + [(16 + 90 * 9, 39 + 20 * 17)])
+    assert (metrics.cell_width, metrics.cell_height) == (9, 17)
+    assert align_rect((0, 0, 16 + 90 * 9 + 3, 39 + 20 * 17 + 3), metrics) == \
+        (0, 0, 16 + 90 * 9, 39 + 20 * 17)
+    # 8像素的字体相差16像素: 两个尺寸推算出的16是错的，不足三个不同尺寸时不推算
+    assert learn_metrics([(800, 608), (816, 624)]) is None
+    assert learn_metrics([(800, 608), (816, 624), (832, 640), (808, 616)]) is None
+    metrics = learn_metrics([(800, 608), (816, 624), (808, 616), (832, 640)])
+    assert (metrics.cell_width, metrics.cell_height) == (8, 8)
+    # 差值的公约数太小: 不按网格对齐
+    assert learn_metrics([(800, 600), (801, 603), (803, 604), (805, 605)]) is None
+
+
+def test_metrics_are_provisional_until_confirmed():
+    cache = CellCache()
+
+    def observe(cols, rows):
+        cache.observe('XTerm', (0, 0, 1000, 1000), (0, 0, 16 + cols * 8, 39 + rows * 8))
+
+    # 8像素的字体恰好每次相差两列两行: 推算出16像素的候选网格，还不对齐
+    for cols, rows in ((80, 24), (82, 26), (84, 28)):
+        observe(cols, rows)
+    assert cache.metrics('XTerm', 0, FakeWindowBackend()) is None
+    assert cache.needs_samples('XTerm')
+    # 不落在候选网格上: 丢弃候选；公约数稳定后再有一个尺寸落在网格上才缓存
+    observe(81, 25)
+    observe(90, 30)
+    assert cache.metrics('XTerm', 0, FakeWindowBackend()) is None
+    observe(70, 20)
+    assert cache.metrics('XTerm', 0, FakeWindowBackend()) == CellMetrics(8, 8, 16 % 8, 39 % 8)
+    # 学到的网格继续核对: 落在网格上时不变
+    observe(75, 21)
+    assert cache.metrics('XTerm', 0, FakeWindowBackend()) is not None
+    # 字体变化后窗口不落在网格上: 丢弃并重新学习
+    cache.observe('XTerm', (0, 0, 1000, 1000), (0, 0, 16 + 70 * 9, 39 + 20 * 17))
+    assert cache.metrics('XTerm', 0, FakeWindowBackend()) is None
+    assert cache.needs_samples('XTerm')
+
+
+def test_targets_are_aligned_and_repeat_is_noop(make_tiler):
+    backend, tiler = xterm_tiler(make_tiler, 5)
+    tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    assert all(aligned(window.rect) for window in backend.windows.values())
+    # 每个窗口类只查询一次
+    assert backend.calls['cell_metrics'] == 1
+
+    # 目标即实际尺寸: 再次平铺没有任何操作
+    result = tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    assert result.moved == 0 and len(result.skipped) == 5 and not result.unsettled
+
+
+def test_unaligned_targets_never_settle_in_place(make_tiler):
+    backend, tiler = xterm_tiler(make_tiler, 5)
+    tiler.cell_align = False
+    tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    # 终端自行对齐后与目标不同，每次平铺都会重新调整大小
+    assert tiler.tile_windows_vertical(tiler.find_terminal_windows("gas")).moved == 5
+
+
+def test_same_grid_resize_is_skipped(make_tiler):
+    backend, tiler = xterm_tiler(make_tiler, 4)
+    tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"), gap=5)
+    before = {hwnd: window.rect for hwnd, window in backend.windows.items()}
+    reflows = sum(window.reflows for window in backend.windows.values())
+
+    # 间距变小: 位置变化但行列数不变，只移动不调整大小
+    backend.commits.clear()
+    tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"), gap=1)
+    assert backend.commits
+    assert sum(window.reflows for window in backend.windows.values()) == reflows
+    for hwnd, rect in backend.commits[-1]:
+        assert rect[2:] == before[hwnd][2:]
+
+
+def test_learns_metrics_from_snapped_sizes(make_tiler):
+    backend, tiler = xterm_tiler(make_tiler, 6, report_cells=False)
+    # 不同的窗口数、方向和间距产生不同的槽位尺寸；最后一次证实推算出的候选网格
+    for count, horizontal, gap in ((6, False, 5), (6, True, 5), (4, True, 5), (2, True, 5), (2, False, 5),
+                                   (3, True, 40)):
+        assert tiler.cells.metrics('XTerm', 0, backend) is None
+        tiler.index.invalidate()
+        windows = tiler.find_terminal_windows("gas")[:count]
+        if horizontal:
+            tiler.tile_windows_horizontal(windows, gap=gap)
+        else:
+            tiler.tile_windows_vertical(windows, gap=gap)
+    metrics = tiler.cells.metrics('XTerm', 0, backend)
+    assert (metrics.cell_width, metrics.cell_height) == (9, 17)
+    # 学到的基础尺寸与实际的相差整数个字符，对齐结果相同
+    assert align_rect((0, 0, 950, 530), metrics) == align_rect((0, 0, 950, 530), CELLS)
+
+    tiler.index.invalidate()
+    tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    result = tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    assert result.moved == 0
+
+
+def test_free_sizing_classes_are_observed_once(make_tiler):
+    tiler = make_tiler()
+    backend = tiler.backend
+    windows = tiler.find_terminal_windows("gcc|gas")
+    tiler.tile_windows_vertical(windows)
+    rects = {hwnd: window.rect for hwnd, window in backend.windows.items()}
+    for count in (3, 2):
+        tiler.tile_windows_horizontal(windows[:count])
+    assert not tiler.cells.needs_samples('ConsoleWindowClass')
+
+    # 不对齐的窗口类保持原来的像素尺寸，不再读取实际尺寸
+    backend.calls.clear()
+    tiler.tile_windows_vertical(windows)
+    assert {hwnd: window.rect for hwnd, window in backend.windows.items()} == rects
+    prefetches = backend.calls['get_rect']
+    tiler.tile_windows_vertical(windows)
+    assert backend.calls['get_rect'] - prefetches <= prefetches
+
+
+def test_cache_persistence(tmp_path, make_tiler):
+    path = str(tmp_path / 'cells.json')
+    cache = CellCache(path, backend='fake')
+    backend, _ = xterm_tiler(make_tiler, 1)
+    hwnd = next(iter(backend.windows))
+    assert cache.metrics('XTerm', hwnd, backend) == CELLS
+    for size in (200, 300, 400):
+        cache.observe('Notepad', (0, 0, size, size), (0, 0, size, size))
+    for width, height in ((286, 209), (295, 226), (268, 192)):
+        cache.observe('Console', (0, 0, 300, 230), (0, 0, width, height))
+    cache.save()
+
+    loaded = CellCache(path, backend='fake')
+    assert loaded.metrics('XTerm', hwnd, backend) == CELLS
+    assert not loaded.needs_samples('Notepad') and loaded.needs_samples('Console')
+    # 学习用的样本也保存下来，跨运行累积；加载后的候选网格由之后的观察证实
+    assert loaded.metrics('Console', hwnd, FakeWindowBackend()) is None
+    loaded.observe('Console', (0, 0, 300, 230), (0, 0, 277, 243))
+    assert loaded.metrics('Console', hwnd, FakeWindowBackend()) is not None
+    assert backend.calls['cell_metrics'] == 1
+    # 学到的网格在之后的运行中继续核对，查询到的不需要
+    loaded.save()
+    reloaded = CellCache(path, backend='fake')
+    assert reloaded.needs_samples('Console') and not reloaded.needs_samples('XTerm')
+    assert len(CellCache(path, backend='x11').free) == 0
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    from conftest import fake_tiler
+    test_align_rect()
+    test_learn_metrics()
+    test_metrics_are_provisional_until_confirmed()
+    test_targets_are_aligned_and_repeat_is_noop(fake_tiler)
+    test_unaligned_targets_never_settle_in_place(fake_tiler)
+    test_same_grid_resize_is_skipped(fake_tiler)
+    test_learns_metrics_from_snapped_sizes(fake_tiler)
+    test_free_sizing_classes_are_observed_once(fake_tiler)
+    with tempfile.TemporaryDirectory() as directory:
+        test_cache_persistence(pathlib.Path(directory), fake_tiler)
+    print("字符网格测试完成!")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+测试窗口几何批量提交（使用记录调用的假后端）
+"""
+
+import time
+
+from geometry import GeometryCommitter, Placement
+from terminal_tiler import TerminalTiler
+from window_backend import FakeWindowBackend
+
+
+def make_terminals(count: int) -> FakeWindowBackend:
+    backend = FakeWindowBackend()
+    for i in range(count):
+        backend.add_window(f"gas{i + 1} - PowerShell")
+    return backend
+
+
+class SnappingBackend(FakeWindowBackend):
+    """模拟终端把高度对齐到字符行，最终尺寸与目标略有差异"""
+
+    def end_batch(self, batch):
+        super().end_batch(batch)
+        for hwnd, (x, y, width, height) in batch:
+            self.windows[hwnd].rect = (x, y, width, height - height % 16)
+
+
+def test_tile_uses_single_commit():
+    backend = make_terminals(12)
+    tiler = TerminalTiler(backend)
+    windows = tiler.find_terminal_windows("gas")
+
+    start = time.perf_counter()
+    result = tiler.tile_windows_vertical(windows)
+    elapsed = time.perf_counter() - start
+
+    print(f"12个窗口平铺耗时: {elapsed * 1000:.2f} ms")
+    assert backend.calls['end_batch'] == 1
+    assert backend.calls['move_window'] == 0
+    assert len(backend.commits[0]) == 12
+    assert result.commits == 1 and not result.failed and not result.unsettled
+    # 旧实现每个窗口固定等待0.1秒，12个窗口超过1.2秒
+    assert elapsed < 0.2
+
+
+def test_horizontal_tile_uses_single_commit():
+    backend = make_terminals(7)
+    tiler = TerminalTiler(backend)
+    tiler.tile_windows_horizontal(tiler.find_terminal_windows("gas"))
+    assert backend.calls['end_batch'] == 1
+    assert len(backend.commits[0]) == 7
+
+
+def test_minimized_restored_before_batch():
+    backend = make_terminals(3)
+    hwnds = list(backend.windows)
+    backend.windows[hwnds[0]].minimized = True
+    committer = GeometryCommitter(backend)
+    committer.commit([Placement(hwnd, "", (0, 0, 100, 100)) for hwnd in hwnds])
+    assert backend.calls['restore'] == 1 and backend.calls['end_batch'] == 1
+    assert not any(window.minimized for window in backend.windows.values())
+
+
+class FailingBatchBackend(FakeWindowBackend):
+    """批量提交失败（如窗口在提交前被关闭）"""
+
+    def end_batch(self, batch):
+        raise OSError("EndDeferWindowPos failed")
+
+
+def test_closed_window_is_isolated():
+    backend = make_terminals(3)
+    placements = [Placement(hwnd, "", (0, 0, 100, 100)) for hwnd in backend.windows]
+    backend.remove_window(placements[1].hwnd)
+    result = GeometryCommitter(backend).commit(placements)
+    assert len(result.placed) == 2
+    assert placements[1].hwnd in result.failed
+    assert backend.calls['end_batch'] == 1
+
+
+def test_failed_batch_falls_back_to_individual_moves():
+    backend = FailingBatchBackend()
+    for i in range(3):
+        backend.add_window(f"gas{i + 1}")
+    placements = [Placement(hwnd, "", (0, 0, 100, 100)) for hwnd in backend.windows]
+    result = GeometryCommitter(backend).commit(placements)
+    assert len(result.placed) == 3 and result.commits == 3
+    assert backend.calls['move_window'] == 3
+
+
+def test_settle_accepts_window_adjusted_size():
+    backend = SnappingBackend()
+    hwnd = backend.add_window("gas1")
+    result = GeometryCommitter(backend, settle_timeout=1.0).commit(
+        [Placement(hwnd, "", (0, 0, 800, 500))])
+    assert backend.windows[hwnd].rect == (0, 0, 800, 496)
+    assert not result.unsettled
+    assert result.elapsed < 0.5
+
+
+def test_idempotent_retile_skips_all_windows():
+    backend = make_terminals(6)
+    tiler = TerminalTiler(backend)
+    windows = tiler.find_terminal_windows("gas")
+    tiler.tile_windows_vertical(windows)
+    backend.calls.clear()
+
+    result = tiler.tile_windows_vertical(windows)
+    assert len(result.skipped) == 6 and result.moved == 0
+    assert backend.calls['end_batch'] == 0 and backend.calls['move_window'] == 0
+
+
+def test_diff_tolerance_minimized_and_occluded():
+    backend = FakeWindowBackend()
+    exact, nudged, hidden, covered = [backend.add_window(f"gas{i}") for i in range(4)]
+    targets = {exact: (0, 0, 400, 300), nudged: (400, 0, 400, 300),
+               hidden: (0, 300, 400, 300), covered: (400, 300, 400, 300)}
+    for hwnd, rect in targets.items():
+        backend.windows[hwnd].rect = rect
+    backend.windows[nudged].rect = (401, 1, 400, 300)
+    backend.windows[hidden].minimized = True
+    # 一个非终端窗口在Z序最上层，压住covered
+    other = backend.add_window("编辑器", 'Notepad', rect=(500, 400, 100, 100))
+    backend.windows = {other: backend.windows.pop(other), **backend.windows}
+
+    result = GeometryCommitter(backend, tolerance=2).commit(
+        [Placement(hwnd, "", rect) for hwnd, rect in targets.items()])
+
+    assert {p.hwnd for p in result.skipped} == {exact, nudged}
+    assert [p.hwnd for p in result.raised] == [covered]
+    assert result.moved == 1
+    # 仅置顶的窗口按当前矩形提交，不改变大小
+    assert (covered, targets[covered]) in backend.commits[0]
+    assert not backend.windows[hidden].minimized
+
+
+def test_force_reapplies_everything():
+    backend = make_terminals(3)
+    tiler = TerminalTiler(backend, tolerance=None)
+    windows = tiler.find_terminal_windows("gas")
+    tiler.tile_windows_vertical(windows)
+    result = tiler.tile_windows_vertical(windows)
+    assert result.moved == 3 and not result.skipped
+    assert backend.calls['end_batch'] == 2
+
+
+if __name__ == "__main__":
+    test_tile_uses_single_commit()
+    test_horizontal_tile_uses_single_commit()
+    test_minimized_restored_before_batch()
+    test_closed_window_is_isolated()
+    test_failed_batch_falls_back_to_individual_moves()
+    test_settle_accepts_window_adjusted_size()
+    test_idempotent_retile_skips_all_windows()
+    test_diff_tolerance_minimized_and_occluded()
+    test_force_reapplies_everything()
+    print("几何批量提交测试完成!")
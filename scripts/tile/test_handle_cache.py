@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+测试跨运行的句柄缓存
+"""
+
+from handle_cache import HandleCache
+from terminal_tiler import TerminalTiler
+from window_backend import FakeWindowBackend
+
+
+def new_run(backend, path, clock):
+    """模拟一次新的命令行调用: 新的平铺器（空的窗口索引），从磁盘加载句柄缓存"""
+    tiler = TerminalTiler(backend)
+    tiler.handle_cache = HandleCache(path, backend=backend.name, clock=clock)
+    return tiler
+
+
+def test_repeat_run_skips_enumeration(tmp_path, clock, run):
+    path = str(tmp_path / 'handles.json')
+    backend = FakeWindowBackend.demo()
+    for i in range(50):
+        backend.add_window(f"editor {i}", class_name='Chrome_WidgetWin_1')
+    tiler = new_run(backend, path, clock)
+    result = run(["gas"], tiler)
+    summary, found = result.summary, result.found
+    assert summary['handle_cache'] == {'hits': 0, 'misses': 1, 'stale': 0}
+    assert tiler.index.scans == 1
+
+    backend.calls.clear()
+    tiler = new_run(backend, path, clock)
+    result = run(["gas"], tiler)
+    summary, again = result.summary, result.found
+    assert again == found == ["gas1 - PowerShell", "gas2 - PowerShell"]
+    assert summary['handle_cache'] == {'hits': 1, 'misses': 0, 'stale': 0}
+    assert summary['skipped'] == 2
+    assert tiler.index.scans == 0
+    # 只读取两个缓存的窗口和前台窗口，而不是全部55个窗口
+    assert backend.calls['get_class_name'] == 3
+
+
+def test_closed_or_reused_handles_fall_back_to_scan(tmp_path, clock, run):
+    path = str(tmp_path / 'handles.json')
+    backend = FakeWindowBackend.demo()
+    gas = [hwnd for hwnd, window in backend.windows.items() if window.title.startswith('gas')]
+    run(["gas"], new_run(backend, path, clock))
+
+    backend.remove_window(gas[0])
+    tiler = new_run(backend, path, clock)
+    result = run(["gas"], tiler)
+    summary, found = result.summary, result.found
+    assert summary['handle_cache']['stale'] == 1 and tiler.index.scans == 1
+    assert found == ["gas2 - PowerShell"]
+
+    # 句柄被其他进程的窗口复用
+    backend.windows[gas[1]].pid = 4242
+    summary = run(["gas"], new_run(backend, path, clock)).summary
+    assert summary['handle_cache']['stale'] == 1
+
+    # 标题不再匹配
+    backend.set_title(gas[1], "vim")
+    result = run(["gas"], new_run(backend, path, clock))
+    summary, found = result.summary, result.found
+    assert summary['handle_cache']['stale'] == 1 and found == []
+
+
+def test_new_foreground_terminal_triggers_scan(tmp_path, clock, run):
+    path = str(tmp_path / 'handles.json')
+    backend = FakeWindowBackend.demo()
+    run(["gas"], new_run(backend, path, clock))
+    backend.add_window("gas3 - PowerShell")
+    result = run(["gas"], new_run(backend, path, clock))
+    summary, found = result.summary, result.found
+    assert summary['handle_cache']['stale'] == 1
+    assert found == ["gas1 - PowerShell", "gas2 - PowerShell", "gas3 - PowerShell"]
+
+    # 窗口集合不变、前台是不匹配的窗口时缓存仍然有效
+    backend.foreground = next(hwnd for hwnd, window in backend.windows.items()
+                              if window.title.startswith('gcc1'))
+    summary = run(["gas"], new_run(backend, path, clock)).summary
+    assert summary['handle_cache']['hits'] == 1
+
+
+def test_background_window_triggers_scan(tmp_path, clock, run):
+    path = str(tmp_path / 'handles.json')
+    backend = FakeWindowBackend.demo()
+    run(["gas"], new_run(backend, path, clock))
+    # 在后台打开的终端: 前台窗口不变，但可见窗口集合变化
+    foreground = backend.foreground
+    backend.add_window("gas3 - PowerShell")
+    backend.foreground = foreground
+    result = run(["gas"], new_run(backend, path, clock))
+    summary, found = result.summary, result.found
+    assert summary['handle_cache']['stale'] == 1
+    assert found == ["gas1 - PowerShell", "gas2 - PowerShell", "gas3 - PowerShell"]
+
+    # 关闭不相关的窗口同样重新枚举
+    backend.remove_window(foreground)
+    summary = run(["gas"], new_run(backend, path, clock)).summary
+    assert summary['handle_cache']['stale'] == 1
+    summary = run(["gas"], new_run(backend, path, clock)).summary
+    assert summary['handle_cache']['hits'] == 1
+
+
+def test_expiry_and_rescan(tmp_path, clock, run):
+    path = str(tmp_path / 'handles.json')
+    backend = FakeWindowBackend.demo()
+    run(["gas"], new_run(backend, path, clock))
+    clock.now += 301
+    tiler = new_run(backend, path, clock)
+    summary = run(["gas"], tiler).summary
+    assert summary['handle_cache']['misses'] == 1 and tiler.index.scans == 1
+
+    tiler = new_run(backend, path, clock)
+    summary = run(["gas", "--rescan"], tiler).summary
+    assert summary['handle_cache'] == {'hits': 0, 'misses': 0, 'stale': 0}
+    assert tiler.index.scans == 1
+
+
+def test_groups_keep_first_match(tmp_path, clock, run):
+    path = str(tmp_path / 'handles.json')
+    backend = FakeWindowBackend.demo()
+    first = run(["gas", "g"], new_run(backend, path, clock)).summary
+    tiler = new_run(backend, path, clock)
+    summary = run(["gas", "g"], tiler).summary
+    assert summary['handle_cache']['hits'] == 1 and tiler.index.scans == 0
+    assert summary['groups'] == first['groups'] == {'gas': 2, 'g': 3}
+
+    # 窗口改名后归入前面的分组: 分组成员变化，需要重新枚举
+    gcc = next(hwnd for hwnd, window in backend.windows.items() if window.title.startswith('gcc1'))
+    backend.set_title(gcc, "gas3 - Command Prompt")
+    summary = run(["gas", "g"], new_run(backend, path, clock)).summary
+    assert summary['handle_cache']['stale'] == 1
+    assert summary['groups'] == {'gas': 3, 'g': 2}
+
+
+def test_file_safety(tmp_path, clock, run):
+    path = tmp_path / 'handles.json'
+    backend = FakeWindowBackend.demo()
+    # 没有匹配的结果不缓存
+    run(["nothing"], new_run(backend, str(path), clock))
+    assert not path.exists()
+
+    run(["gas"], new_run(backend, str(path), clock))
+    assert len(HandleCache(str(path), backend='fake')) == 1
+    # 其他后端的句柄不通用
+    assert len(HandleCache(str(path), backend='win32')) == 0
+
+    path.write_text("{not json")
+    result = run(["gas"], new_run(backend, str(path), clock))
+    summary, found = result.summary, result.found
+    assert summary['handle_cache']['misses'] == 1 and len(found) == 2
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    from conftest import FakeClock, run_cli
+    for test in (test_repeat_run_skips_enumeration, test_closed_or_reused_handles_fall_back_to_scan,
+                 test_new_foreground_terminal_triggers_scan, test_background_window_triggers_scan,
+                 test_expiry_and_rescan,
+                 test_groups_keep_first_match, test_file_safety):
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory), FakeClock(), run_cli)
+    print("句柄缓存测试完成!")
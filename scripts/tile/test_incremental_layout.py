@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+测试最小代价分配与增量布局
+"""
+
+import itertools
+import random
+
+from assignment import min_cost_assignment, move_cost
+from bench_relayout import _activate, run_comparison
+from layout_planner import plan_incremental, plan_layout
+
+WORK_AREA = (0, 0, 1920, 1040)
+
+
+def test_assignment_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(200):
+        rows = rng.randint(1, 5)
+        cols = rng.randint(rows, 6)
+        cost = [[rng.randint(0, 40) for _ in range(cols)] for _ in range(rows)]
+        best = min(sum(cost[i][p[i]] for i in range(rows))
+                   for p in itertools.permutations(range(cols), rows))
+        order = min_cost_assignment(cost)
+        assert len(set(order)) == rows
+        assert sum(cost[i][order[i]] for i in range(rows)) == best
+    assert min_cost_assignment([]) == []
+
+
+def test_unchanged_set_in_any_order_stays_put():
+    plan = plan_layout(6, WORK_AREA)
+    current = list(plan.rects)
+    random.Random(1).shuffle(current)
+    new_plan, order = plan_incremental(current, WORK_AREA)
+    assert [new_plan.rects[slot] for slot in order] == current
+
+
+def test_leaving_window_leaves_others_in_place():
+    plan = plan_layout(8, WORK_AREA)
+    current = list(plan.rects)
+    del current[3]
+    new_plan, order = plan_incremental(current, WORK_AREA)
+    kept = sum(new_plan.rects[slot] == rect for slot, rect in zip(order, current))
+    # 网格从 3/3/2 变为 3/2/2: 只有中间一列底部的窗口需要补到空出的位置
+    assert kept == 6
+    naive = sum(target == rect for target, rect in zip(plan_layout(7, WORK_AREA).rects, current))
+    assert naive < kept
+
+
+def test_joining_window_fills_hole():
+    # 上一次离开时保留了空位，新窗口直接放进去
+    plan = plan_layout(8, WORK_AREA)
+    current = list(plan.rects[:7]) + [None]
+    new_plan, order = plan_incremental(current, WORK_AREA)
+    assert [new_plan.rects[slot] for slot in order[:7]] == list(plan.rects[:7])
+    assert new_plan.rects[order[7]] == plan.rects[7]
+
+
+def test_untiled_windows_leave_no_empty_column():
+    rng = random.Random(5)
+    for count in range(2, 9):
+        scattered = [(rng.randrange(0, 1200), rng.randrange(0, 500), 800, 600) for _ in range(count)]
+        for current in (scattered, [None] * count):
+            plan, order = plan_incremental(current, WORK_AREA)
+            # 与普通平铺的网格和顺序相同，没有空槽位
+            assert plan == plan_layout(count, WORK_AREA)
+            assert order == list(range(count))
+
+
+def test_minimal_cost_over_naive():
+    rng = random.Random(3)
+    for count in (3, 5, 9):
+        current = [(rng.randrange(0, 1500), rng.randrange(0, 800), 800, 600) for _ in range(count)]
+        plan, order = plan_incremental(current, WORK_AREA, slack=0)
+        chosen = sum(move_cost(rect, plan.rects[slot]) for rect, slot in zip(current, order))
+        naive = sum(move_cost(rect, target) for rect, target in zip(current, plan.rects))
+        assert chosen <= naive
+
+
+def test_tiler_incremental_ignores_zorder_changes(make_tiler):
+    tiler = make_tiler(6)
+    backend = tiler.backend
+    tiler.incremental = True
+    tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+
+    # 激活窗口改变了枚举顺序: 增量布局不移动任何窗口
+    _activate(backend, list(backend.windows)[4])
+    tiler.index.invalidate()
+    result = tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    assert result.moved == 0 and len(result.skipped) == 6
+
+    # 完整重新布局按新的顺序放置，会移动窗口
+    tiler.incremental = False
+    tiler.index.invalidate()
+    assert tiler.tile_windows_vertical(tiler.find_terminal_windows("gas")).moved > 0
+
+
+def test_tiler_incremental_first_run_matches_full_layout(make_tiler):
+    for count in (2, 3, 4):
+        layouts = []
+        for incremental in (True, False):
+            tiler = make_tiler(count)
+            tiler.incremental = incremental
+            tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+            layouts.append([window.rect for window in tiler.backend.windows.values()])
+        # 首次增量平铺不留空列: 与完整布局的网格相同
+        assert layouts[0] == layouts[1]
+
+
+def test_benchmark_incremental_moves_fewer_windows():
+    report = run_comparison([4, 12], steps=20)
+    for modes in report['results'].values():
+        assert modes['incremental']['moved'] < modes['full']['moved']
+        assert modes['incremental']['displacement'] < modes['full']['displacement']
+    # 同样的种子结果可复现
+    assert run_comparison([4], steps=20)['results']['4'] == report['results']['4']
+
+
+if __name__ == "__main__":
+    from conftest import fake_tiler
+    test_assignment_matches_brute_force()
+    test_unchanged_set_in_any_order_stays_put()
+    test_leaving_window_leaves_others_in_place()
+    test_joining_window_fills_hole()
+    test_untiled_windows_leave_no_empty_column()
+    test_minimal_cost_over_naive()
+    test_tiler_incremental_ignores_zorder_changes(fake_tiler)
+    test_tiler_incremental_first_run_matches_full_layout(fake_tiler)
+    test_benchmark_incremental_moves_fewer_windows()
+    print("增量布局测试完成!")
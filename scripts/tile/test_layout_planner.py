@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+测试布局规划器
+"""
+
+import random
+import time
+
+import layout_planner
+from layout_planner import (HORIZONTAL, HORIZONTAL_CONSTRAINTS, VERTICAL, VERTICAL_CONSTRAINTS,
+                            LayoutConstraints, calculate_grid, plan_fits, plan_layout,
+                            solve_grid)
+
+SCREEN = (0, 0, 1920, 1080)
+
+
+def test_plan_keeps_legacy_grid_where_it_fits():
+    for count in range(1, 21):
+        for orientation in (VERTICAL, HORIZONTAL):
+            plan = plan_layout(count, SCREEN, 5, orientation=orientation)
+            cols, rows_per_col = calculate_grid(count, orientation == VERTICAL)
+            assert plan.cols == cols and list(plan.rows_per_col) == rows_per_col
+            assert len(plan.rects) == count == len(set(plan.slots))
+
+
+def test_solver_fixes_legacy_overflow():
+    # 手工方案最多4列，24个窗口每列6行时低于最小高度，超出屏幕
+    plan = plan_layout(24, SCREEN, 5)
+    assert plan.cols > 4
+    assert plan_fits(plan, SCREEN)
+    assert plan.window_height >= VERTICAL_CONSTRAINTS.min_height
+
+
+def random_case(rng: random.Random):
+    width, height = rng.randrange(640, 5120), rng.randrange(480, 2880)
+    gap = rng.randrange(0, 21)
+    orientation = rng.choice((VERTICAL, HORIZONTAL))
+    min_width, min_height = rng.randrange(0, 400), rng.randrange(0, 300)
+    constraints = LayoutConstraints(
+        min_width, rng.choice((None, min_width + rng.randrange(1, 1000))),
+        min_height, rng.choice((None, min_height + rng.randrange(1, 800))))
+    return (rng.randrange(0, 40), 300) + (width, height), gap, constraints, orientation
+
+
+def feasible(count, width, height, gap, constraints) -> bool:
+    """是否存在窗口不小于最小尺寸的均分网格"""
+    for cols in range(1, count + 1):
+        rows = -(-count // cols)
+        if ((width - gap * (cols + 1)) // cols >= max(constraints.min_width, 1)
+                and (height - gap * (rows + 1)) // rows >= max(constraints.min_height, 1)):
+            return True
+    return False
+
+
+def test_property_feasible_counts_always_fit():
+    """只要存在放得下的网格，规划结果就全部在工作区内且满足尺寸约束"""
+    rng = random.Random(16)
+    checked = 0
+    for _ in range(200):
+        area, gap, constraints, orientation = random_case(rng)
+        for count in range(1, 40):
+            if not feasible(count, area[2], area[3], gap, constraints):
+                break
+            plan = plan_layout(count, area, gap, constraints, orientation)
+            assert plan_fits(plan, area), (count, area, gap, constraints, orientation)
+            assert all(x >= area[0] and y >= area[1] for x, y, _, _ in plan.rects)
+            assert constraints.min_width <= plan.window_width
+            assert constraints.min_height <= plan.window_height
+            if constraints.max_width is not None:
+                assert plan.window_width <= constraints.max_width
+            if constraints.max_height is not None:
+                assert plan.window_height <= constraints.max_height
+            assert len(plan.rects) == count == len(set(plan.slots))
+            checked += 1
+    assert checked > 1000
+
+
+def test_property_solution_is_optimal_or_legacy():
+    """求解结果的评分不低于任何放得下的方案，或为接近最优的手工方案"""
+    rng = random.Random(61)
+    for _ in range(300):
+        (_, _, width, height), gap, constraints, orientation = random_case(rng)
+        count = rng.randrange(1, 60)
+        cols, rows_per_col = solve_grid(count, width, height, gap, constraints, orientation)
+        assert sum(rows_per_col) == count and len(rows_per_col) == cols
+        score = layout_planner._grid_score(count, cols, width, height, gap, constraints,
+                                           layout_planner.TERMINAL_ASPECT)
+        best = max((layout_planner._grid_score(count, c, width, height, gap, constraints,
+                                               layout_planner.TERMINAL_ASPECT) or 0)
+                   for c in range(1, count + 1))
+        if best == 0:
+            continue
+        assert score is not None
+        assert score >= best * (1 - layout_planner.LEGACY_SLACK) - 1e-9
+        if score < best - 1e-9:
+            assert (cols, list(rows_per_col)) == calculate_grid(count, orientation == VERTICAL)
+
+
+def test_solver_is_memoized():
+    solve_grid.cache_clear()
+    solve_grid(500, 1920, 1080, 5, HORIZONTAL_CONSTRAINTS, HORIZONTAL)
+    solve_grid(500, 1920, 1080, 5, HORIZONTAL_CONSTRAINTS, HORIZONTAL)
+    assert solve_grid.cache_info().hits == 1
+
+
+def test_vertical_fills_columns_horizontal_fills_rows():
+    vertical = plan_layout(3, SCREEN, 5, orientation=VERTICAL)
+    assert vertical.slots == ((0, 0), (0, 1), (1, 0))
+    horizontal = plan_layout(3, SCREEN, 5, orientation=HORIZONTAL)
+    assert horizontal.slots == ((0, 0), (1, 0), (0, 1))
+
+
+def test_work_area_origin_and_constraints():
+    plan = plan_layout(1, (1920, 40, 1920, 1040), 10, LayoutConstraints(max_height=500))
+    assert plan.rects == ((1930, 50, 1900, 500),)
+
+
+def test_numpy_and_python_paths_agree():
+    if layout_planner._numpy() is None:
+        print("未安装NumPy，跳过向量化路径比较")
+        return
+    threshold = layout_planner.NUMPY_THRESHOLD
+    try:
+        for count in (300, 1001):
+            for orientation in (VERTICAL, HORIZONTAL):
+                plan_layout.cache_clear()
+                layout_planner.NUMPY_THRESHOLD = threshold
+                vectorized = plan_layout(count, (10, 20) + SCREEN[2:], 5, orientation=orientation)
+                plan_layout.cache_clear()
+                layout_planner.NUMPY_THRESHOLD = count + 1
+                python = plan_layout(count, (10, 20) + SCREEN[2:], 5, orientation=orientation)
+                assert vectorized == python
+    finally:
+        layout_planner.NUMPY_THRESHOLD = threshold
+        plan_layout.cache_clear()
+
+
+def test_plans_are_memoized_and_fast():
+    plan_layout.cache_clear()
+    start = time.perf_counter()
+    first = plan_layout(5000, SCREEN, 5)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        again = plan_layout(5000, SCREEN, 5)
+    warm = (time.perf_counter() - start) / 1000
+
+    print(f"5000个槽位: 首次 {cold * 1e6:.0f} us，缓存命中 {warm * 1e6:.2f} us")
+    assert again is first
+    assert plan_layout.cache_info().hits >= 1000
+    assert warm < 50e-6
+
+
+if __name__ == "__main__":
+    test_plan_keeps_legacy_grid_where_it_fits()
+    test_solver_fixes_legacy_overflow()
+    test_property_feasible_counts_always_fit()
+    test_property_solution_is_optimal_or_legacy()
+    test_solver_is_memoized()
+    test_vertical_fills_columns_horizontal_fills_rows()
+    test_work_area_origin_and_constraints()
+    test_numpy_and_python_paths_agree()
+    test_plans_are_memoized_and_fast()
+    print("布局规划器测试完成!")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+测试布局快照的保存、解析与恢复
+"""
+
+import time
+
+import pytest
+
+from layouts import LayoutStore, SnapshotEntry, resolve
+from window_backend import WindowRecord
+
+
+def layout_tiler(make_tiler, tmp_path, count: int = 20):
+    """count个终端窗口，布局快照保存在tmp_path"""
+    tiler = make_tiler(count)
+    tiler.layout_store = LayoutStore(str(tmp_path))
+    return tiler.backend, tiler, list(tiler.backend.windows)
+
+
+def test_save_and_restore_in_one_batch(tmp_path, make_tiler):
+    backend, tiler, hwnds = layout_tiler(make_tiler, tmp_path)
+    tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    saved = {hwnd: backend.windows[hwnd].rect for hwnd in hwnds}
+    assert tiler.save_layout("work", "gas") == 20
+
+    # 打乱窗口后恢复
+    for hwnd in hwnds:
+        backend.windows[hwnd].rect = (0, 0, 800, 600)
+    backend.minimize(hwnds[3])
+    scans, commits = tiler.index.scans, len(backend.commits)
+
+    start = time.perf_counter()
+    result = tiler.restore_layout("work")
+    elapsed = time.perf_counter() - start
+
+    assert {hwnd: backend.windows[hwnd].rect for hwnd in hwnds} == saved
+    assert not backend.windows[hwnds[3]].minimized
+    assert len(result.placed) == 20
+    assert tiler.index.scans == scans + 1
+    assert len(backend.commits) == commits + 1
+    assert elapsed < 0.5
+
+
+def test_restore_reminimizes_and_skips_unchanged(tmp_path, make_tiler):
+    backend, tiler, hwnds = layout_tiler(make_tiler, tmp_path, 3)
+    tiler.tile_windows_horizontal(tiler.find_terminal_windows("gas"))
+    backend.minimize(hwnds[0])
+    tiler.save_layout("mixed")
+    result = tiler.restore_layout("mixed")
+    assert backend.windows[hwnds[0]].minimized
+    assert len(result.skipped) == 2
+
+
+def test_resolve_prefers_exact_title_then_pid_then_stem():
+    entries = [
+        SnapshotEntry("gas1 - PowerShell", "ConsoleWindowClass", 1, (0, 0, 10, 10)),
+        SnapshotEntry("gas2 - PowerShell", "ConsoleWindowClass", 2, (10, 0, 10, 10)),
+        SnapshotEntry("gcc - Command Prompt", "ConsoleWindowClass", 3, (20, 0, 10, 10)),
+        SnapshotEntry("gds - Windows Terminal", "CASCADIA_HOSTING_WINDOW_CLASS", 4, (30, 0, 10, 10)),
+    ]
+    records = [
+        # 终端重启: 标题相同，进程不同
+        WindowRecord(101, "gas1 - PowerShell", "ConsoleWindowClass", 91, (0, 0, 1, 1)),
+        # 同一进程，标题随执行的命令变化
+        WindowRecord(102, "npm run dev", "ConsoleWindowClass", 2, (0, 0, 1, 1)),
+        # 重启且命令不同，只有终端名相同
+        WindowRecord(103, "gcc - make", "ConsoleWindowClass", 93, (0, 0, 1, 1)),
+    ]
+    pairs, missing = resolve(entries, records)
+    assert [(entry.pid, record.hwnd) for entry, record in pairs] == [(1, 101), (2, 102), (3, 103)]
+    assert [entry.pid for entry in missing] == [4]
+
+
+def test_store_round_trip_and_errors(tmp_path):
+    store = LayoutStore(str(tmp_path))
+    entries = [SnapshotEntry("gas1", "ConsoleWindowClass", 7, (1, 2, 3, 4), True)]
+    store.save("a", entries)
+    assert store.load("a") == entries
+    assert store.names() == ["a"]
+    with pytest.raises(ValueError):
+        store.load("missing")
+    with pytest.raises(ValueError):
+        store.path("../escape")
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    from conftest import fake_tiler
+    test_save_and_restore_in_one_batch(pathlib.Path(tempfile.mkdtemp()), fake_tiler)
+    test_restore_reminimizes_and_skips_unchanged(pathlib.Path(tempfile.mkdtemp()), fake_tiler)
+    test_resolve_prefers_exact_title_then_pid_then_stem()
+    test_store_round_trip_and_errors(pathlib.Path(tempfile.mkdtemp()))
+    print("布局快照测试完成!")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+测试长期运行指标
+"""
+
+import json
+import os
+import threading
+
+from metrics import NULL_METRICS, Metrics, MetricsFile, desktop_class, parse_prometheus
+from output import Reporter
+
+
+def test_recording_and_aggregation():
+    metrics = Metrics(buckets=(0.01, 0.1))
+    metrics.inc('tiler_windows_total', 3, result='moved')
+    metrics.inc('tiler_windows_total', result='moved')
+    for value in (0.005, 0.05, 0.5):
+        metrics.observe('tiler_settle_seconds', value, window_class='XTerm')
+    with metrics.time('tiler_operation_seconds', operation='plan'):
+        pass
+
+    delta = metrics.drain()
+    assert delta.counters[('tiler_windows_total', (('result', 'moved'),))] == 4
+    state = delta.histograms[('tiler_settle_seconds', (('window_class', 'XTerm'),))]
+    # 每个区间一个样本，+Inf 一个；总和与次数
+    assert state[:3] == [1, 1, 1] and abs(state[3] - 0.555) < 1e-9 and state[4] == 3
+    assert metrics.value('tiler_operation_seconds', operation='plan') == 1
+    # 已汇总的记录不会重复写出，累计值保留
+    assert not metrics.drain()
+    assert metrics.value('tiler_windows_total', result='moved') == 4
+
+
+def test_null_metrics_records_nothing():
+    NULL_METRICS.inc('tiler_windows_total', result='moved')
+    NULL_METRICS.observe('tiler_settle_seconds', 0.1)
+    with NULL_METRICS.time('tiler_operation_seconds', operation='plan'):
+        pass
+    assert not NULL_METRICS.enabled
+    assert desktop_class(10) == '<64' and desktop_class(300) == '<1024' and desktop_class(5000) == '>=1024'
+
+
+def test_concurrent_recording_is_not_lost():
+    metrics = Metrics()
+    threads = [threading.Thread(target=lambda: [metrics.inc('hits', worker=1) for _ in range(5000)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # 记录的同时汇总
+    drained = 0
+    while any(thread.is_alive() for thread in threads):
+        drained += sum(metrics.drain().counters.values())
+    for thread in threads:
+        thread.join()
+    drained += sum(metrics.drain().counters.values())
+    assert drained == 40000 == metrics.value('hits', worker=1)
+
+
+def test_prometheus_file_accumulates(tmp_path):
+    path = str(tmp_path / 'metrics.prom')
+    sink = MetricsFile(path, 'prom')
+    for _ in range(2):
+        metrics = Metrics(buckets=(0.1,))
+        metrics.inc('tiler_failures_total', action='tile', window_class='Con"sole')
+        metrics.observe('tiler_settle_seconds', 0.05, window_class='XTerm')
+        sink.write(metrics.drain())
+
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    assert '# TYPE tiler_settle_seconds histogram' in text
+    assert '# TYPE tiler_failures_total counter' in text
+    samples, _ = parse_prometheus(text)
+    assert samples['tiler_failures_total{action="tile",window_class="Con\\"sole"}'] == 2
+    assert samples['tiler_settle_seconds_bucket{window_class="XTerm",le="0.1"}'] == 2
+    assert samples['tiler_settle_seconds_bucket{window_class="XTerm",le="+Inf"}'] == 2
+    assert samples['tiler_settle_seconds_count{window_class="XTerm"}'] == 2
+    assert abs(samples['tiler_settle_seconds_sum{window_class="XTerm"}'] - 0.1) < 1e-9
+
+
+def test_jsonl_file_rotates(tmp_path):
+    path = str(tmp_path / 'metrics.jsonl')
+    sink = MetricsFile(path, 'jsonl', max_bytes=400, backups=2)
+    metrics = Metrics()
+    for i in range(20):
+        metrics.inc('tiler_runs_total', action='tile')
+        metrics.observe('tiler_operation_seconds', 0.01 * i, operation='tile')
+        sink.write(metrics.drain())
+    # 没有新记录时不写出
+    sink.write(metrics.drain())
+
+    assert os.path.exists(path + '.1') and os.path.exists(path + '.2')
+    assert not os.path.exists(path + '.3')
+    lines = []
+    for name in (path + '.2', path + '.1', path):
+        assert os.path.getsize(name) <= 400
+        with open(name, encoding='utf-8') as f:
+            lines.extend(json.loads(line) for line in f)
+    assert lines[-1]['counters'] == [{'name': 'tiler_runs_total', 'labels': {'action': 'tile'}, 'value': 1}]
+    assert lines[-1]['histograms'][0]['count'] == 1
+    assert len(lines) < 20
+
+
+def test_rotation_counts_bytes(tmp_path):
+    path = str(tmp_path / 'metrics.jsonl')
+    sink = MetricsFile(path, 'jsonl', max_bytes=400, backups=1)
+    metrics = Metrics()
+    for _ in range(10):
+        # 中文标签在UTF-8中每个字符占3个字节
+        metrics.inc('tiler_failures_total', action='tile', window_class='控制台窗口类' * 4)
+        sink.write(metrics.drain())
+    for name in (path, path + '.1'):
+        assert os.path.getsize(name) <= 400
+
+
+def test_tiler_counts_windows_and_failures(make_tiler):
+    tiler = make_tiler()
+    backend = tiler.backend
+    windows = tiler.find_terminal_windows("gas")
+    tiler.tile_windows_vertical(windows)
+    tiler.tile_windows_vertical(windows)
+    metrics = tiler.metrics
+    assert metrics.value('tiler_windows_total', result='matched') == len(windows)
+    assert metrics.value('tiler_windows_total', result='moved') == len(windows)
+    assert metrics.value('tiler_windows_total', result='skipped') == len(windows)
+    assert metrics.value('tiler_operation_seconds', operation='plan') == 2
+    assert metrics.value('tiler_backend_call_seconds', call='end_batch') == 1
+    assert metrics.value('tiler_enumerate_seconds', desktop='<64') == 1
+
+    # 平铺前窗口被关闭: 按窗口类记为失败
+    class_name = backend.get_class_name(windows[0][0])
+    backend.remove_window(windows[0][0])
+    tiler.tile_windows_horizontal(windows)
+    assert metrics.value('tiler_windows_total', result='failed') == 1
+    assert metrics.value('tiler_failures_total', action='tile', window_class=class_name) == 1
+    assert sum(state[-1] for (name, _), state in metrics.totals.histograms.items()
+               if name == 'tiler_settle_seconds') >= len(windows)
+
+
+def test_each_run_is_flushed(tmp_path, make_tiler, run):
+    tiler = make_tiler()
+    path = str(tmp_path / 'metrics.jsonl')
+    tiler.metrics_sink = MetricsFile(path)
+    for argv in (['gas'], ['gas', '--hide']):
+        run(argv, tiler, reporter=Reporter)
+
+    with open(path, encoding='utf-8') as f:
+        runs = [json.loads(line) for line in f]
+    assert len(runs) == 2
+    actions = [{counter['labels']['action'] for counter in run['counters']
+                if counter['name'] == 'tiler_runs_total'} for run in runs]
+    assert actions == [{'tile'}, {'hide'}]
+    hidden = [counter['value'] for counter in runs[1]['counters']
+              if counter['labels'].get('result') == 'hidden']
+    assert hidden and hidden[0] > 0
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    from conftest import fake_tiler, run_cli
+    test_recording_and_aggregation()
+    test_null_metrics_records_nothing()
+    test_concurrent_recording_is_not_lost()
+    for test in (test_prometheus_file_accumulates, test_jsonl_file_rotates, test_rotation_counts_bytes):
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory))
+    with tempfile.TemporaryDirectory() as directory:
+        test_each_run_is_flushed(pathlib.Path(directory), fake_tiler, run_cli)
+    test_tiler_counts_windows_and_failures(fake_tiler)
+    print("指标测试完成!")
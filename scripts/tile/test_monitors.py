@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+测试多显示器拓扑与按工作区平铺（使用可伪造的显示器来源）
+"""
+
+from types import SimpleNamespace
+
+from layout_planner import distribute
+from monitors import Monitor, MonitorTopology, StaticMonitorSource, Win32MonitorSource
+from terminal_tiler import parse_monitor
+
+PRIMARY = Monitor(0, (0, 0, 1920, 1080), (0, 0, 1920, 1040), True)
+SECONDARY = Monitor(1, (1920, 0, 2560, 1440), (1920, 0, 2560, 1440), False, 144)
+
+
+def test_topology_cached_until_signature_changes(clock):
+    source = StaticMonitorSource([PRIMARY])
+    topology = MonitorTopology(source, check_interval=1.0, clock=clock)
+    topology.monitors()
+    topology.monitors()
+    clock.now = 5
+    topology.monitors()
+    assert source.enumerations == 1
+
+    source.monitors.append(SECONDARY)
+    clock.now = 10
+    assert len(topology.monitors()) == 2
+    assert source.enumerations == 2
+
+    topology.invalidate()
+    topology.monitors()
+    assert source.enumerations == 3
+
+
+class FakeWin32Api:
+    """EnumDisplayMonitors/GetMonitorInfo 返回可修改的显示器信息 (RECT为左上右下)"""
+
+    def __init__(self):
+        self.infos = {1: {'Monitor': (0, 0, 1920, 1080), 'Work': (0, 0, 1920, 1040), 'Flags': 1}}
+
+    def EnumDisplayMonitors(self, hdc, clip):
+        return [(hmonitor, None, None) for hmonitor in self.infos]
+
+    def GetMonitorInfo(self, hmonitor):
+        return self.infos[hmonitor]
+
+
+def test_win32_signature_covers_work_area():
+    source = Win32MonitorSource.__new__(Win32MonitorSource)
+    source._win32api = api = FakeWin32Api()
+    source._win32con = SimpleNamespace(MONITORINFOF_PRIMARY=1)
+    before = source.signature()
+    assert source.enumerate()[0].work_area == (0, 0, 1920, 1040)
+    # 任务栏移到左侧: 显示器数量和虚拟屏幕范围不变，工作区变化
+    api.infos[1] = dict(api.infos[1], Work=(60, 0, 1920, 1080))
+    assert source.signature() != before
+    assert source.enumerate()[0].work_area == (60, 0, 1860, 1080)
+
+
+def test_tiles_inside_work_area(make_tiler):
+    tiler = make_tiler(2, monitors=[PRIMARY])
+    result = tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    assert all(y + height <= 1040 for _, y, _, height in (p.rect for p in result.placed))
+
+
+def test_large_group_spreads_across_monitors(make_tiler):
+    tiler = make_tiler(40, monitors=[PRIMARY, SECONDARY])
+    result = tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    on_secondary = [p for p in result.placed if p.rect[0] >= 1920]
+    assert 0 < len(on_secondary) < 40
+    for placement in result.placed:
+        x, y, width, height = placement.rect
+        area = SECONDARY.work_area if x >= 1920 else PRIMARY.work_area
+        assert y + height <= area[1] + area[3]
+        # 第二个显示器DPI为144，最小高度按1.5倍缩放
+        assert height >= (300 if x >= 1920 else 200)
+
+
+def test_small_group_stays_on_primary_unless_all(make_tiler):
+    tiler = make_tiler(4, monitors=[PRIMARY, SECONDARY])
+    windows = tiler.find_terminal_windows("gas")
+    result = tiler.tile_windows_vertical(windows)
+    assert all(p.rect[0] < 1920 for p in result.placed)
+
+    tiler.monitor = 'all'
+    result = tiler.tile_windows_vertical(windows)
+    assert any(p.rect[0] >= 1920 for p in result.placed)
+
+
+def test_target_monitor_selection(make_tiler):
+    tiler = make_tiler(3, monitors=[PRIMARY, SECONDARY])
+    tiler.monitor = parse_monitor("2")
+    result = tiler.tile_windows_horizontal(tiler.find_terminal_windows("gas"))
+    assert all(p.rect[0] >= 1920 for p in result.placed)
+
+
+def test_missing_monitor_is_an_argument_error(make_tiler, run):
+    tiler = make_tiler(3, monitors=[PRIMARY])
+    result = run(['gas', '--monitor', '5'], tiler)
+    assert result.summary == {'action': 'none', 'error': 'monitor out of range'}
+    assert [event['type'] for event in result.events] == ['error']
+    assert "显示器序号超出范围: 5 (共 1 个显示器)" in result.events[0]['message']
+    assert not tiler.backend.calls['end_batch']
+
+    # 隐藏窗口不需要显示器
+    assert run(['gas', '--monitor', '5', '--hide'], tiler).summary == {'action': 'hide', 'matched': 3}
+
+
+def test_distribute_by_capacity():
+    assert distribute(10, [8, 12]) == [4, 6]
+    assert distribute(3, [0, 0]) == [2, 1]
+    assert sum(distribute(17, [5, 9, 3])) == 17
+
+
+if __name__ == "__main__":
+    from conftest import FakeClock, fake_tiler, run_cli
+    test_topology_cached_until_signature_changes(FakeClock())
+    test_win32_signature_covers_work_area()
+    test_tiles_inside_work_area(fake_tiler)
+    test_large_group_spreads_across_monitors(fake_tiler)
+    test_small_group_stays_on_primary_unless_all(fake_tiler)
+    test_target_monitor_selection(fake_tiler)
+    test_missing_monitor_is_an_argument_error(fake_tiler, run_cli)
+    test_distribute_by_capacity()
+    print("多显示器测试完成!")
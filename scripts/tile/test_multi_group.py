@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+测试多个关键字分组的分区平铺
+"""
+
+import io
+
+from layout_planner import HORIZONTAL, split_regions
+from output import JsonReporter
+from terminal_tiler import TerminalTiler
+from watcher import TilerWatcher
+from window_backend import FakeWindowBackend
+
+
+def test_split_regions_share_gaps():
+    regions = split_regions((0, 0, 1920, 1040), [50, 30, 20], gap=10)
+    assert [region[2] for region in regions] == [970, 582, 388]
+    # 相邻区域重叠一个间距，区域内部再各留边缘间距
+    for left, right in zip(regions, regions[1:]):
+        assert right[0] == left[0] + left[2] - 10
+    assert regions[-1][0] + regions[-1][2] == 1920
+
+    rows = split_regions((0, 40, 1920, 1000), [1, 1], gap=0, orientation=HORIZONTAL)
+    assert rows == [(0, 40, 1920, 500), (0, 540, 1920, 500)]
+
+
+def test_groups_enumerated_once_and_committed_in_one_batch(run):
+    backend = FakeWindowBackend.demo()
+    tiler = TerminalTiler(backend)
+    result = run(["gas", "gcc", "gds", "--regions", "50,30,20"], tiler)
+    events, summary = result.events, result.summary
+    assert summary['groups'] == {'gas': 2, 'gcc': 2, 'gds': 1}
+    assert summary['moved'] == 5
+    assert tiler.index.scans == 1
+    assert len(backend.commits) == 1
+    assert [event['group'] for event in events if event['type'] == 'plan'] == ['gas', 'gcc', 'gds']
+
+    rects = {backend.windows[hwnd].title.split()[0]: rect for hwnd, rect in backend.commits[0]}
+    # 各分组在自己的区域内，从左到右排列
+    assert rects['gas1'][0] < rects['gcc1'][0] < rects['gds'][0]
+    assert rects['gas1'][2] > rects['gcc1'][2] > rects['gds'][2]
+
+
+def test_window_joins_first_matching_group(run):
+    result = run(["gas", "g"])
+    events, summary = result.events, result.summary
+    assert summary['groups'] == {'gas': 2, 'g': 3}
+    groups = [event['group'] for event in events if event['type'] == 'found']
+    assert groups == ['gas', 'gas', 'g', 'g', 'g']
+
+
+def test_empty_group_gives_space_to_others(run):
+    backend = FakeWindowBackend.demo()
+    run(["gas", "nothing"], TerminalTiler(backend))
+    tiled = {hwnd: rect for hwnd, rect in backend.commits[0]}
+    width = FakeWindowBackend.demo().get_screen_size()[0]
+    assert all(rect[2] > width // 2 for rect in tiled.values())
+
+
+def test_regions_must_match_groups(run):
+    summary = run(["gas", "gcc", "--regions", "60,30,10"]).summary
+    assert summary['error'] == 'regions mismatch'
+
+
+def test_single_keyword_unchanged(run):
+    summary = run(["gas"]).summary
+    assert 'groups' not in summary
+    assert summary['matched'] == 2
+
+
+def test_grouped_watcher_retiles_all_regions_in_one_commit():
+    backend = FakeWindowBackend.demo()
+    source = backend.event_source()
+    tiler = TerminalTiler(backend)
+    tiler.out = JsonReporter(stream=io.StringIO())
+    watcher = TilerWatcher(tiler, ['gas', 'gcc'], source, grouped=True, regions=[2, 1])
+    watcher.refresh(force=True)
+    commits = len(backend.commits)
+
+    backend.add_window("gcc3 - Command Prompt")
+    assert watcher.refresh() == ['gcc']
+    assert len(backend.commits) == commits + 1
+    # gas分组的位置不变，提交器只移动gcc分组
+    moved = {backend.windows[hwnd].title for hwnd, _ in backend.commits[-1]}
+    assert moved == {"gcc1 - Command Prompt", "gcc2 - Command Prompt", "gcc3 - Command Prompt"}
+
+
+if __name__ == "__main__":
+    from conftest import run_cli
+    test_split_regions_share_gaps()
+    test_groups_enumerated_once_and_committed_in_one_batch(run_cli)
+    test_window_joins_first_matching_group(run_cli)
+    test_empty_group_gives_space_to_others(run_cli)
+    test_regions_must_match_groups(run_cli)
+    test_single_keyword_unchanged(run_cli)
+    test_grouped_watcher_retiles_all_regions_in_one_commit()
+    print("分区平铺测试完成!")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+测试输出层（文本缓冲、安静模式与JSON结构）
+"""
+
+import io
+import json
+
+from output import JsonLinesReporter, QuietReporter, Reporter
+
+
+def test_text_output_is_buffered_until_finish():
+    stream = io.StringIO()
+    reporter = Reporter(stream=stream)
+    reporter.emit('hidden', hwnd=1, title="gas1")
+    reporter.text("完成")
+    assert stream.getvalue() == ""
+    reporter.finish()
+    assert stream.getvalue() == "已最小化: gas1\n完成\n"
+
+
+def test_json_document_schema(run):
+    summary, text = run(["gas", "--json"])
+    document = json.loads(text)
+    assert document['version'] == 1
+    assert document['summary'] == summary
+    kinds = [event['type'] for event in document['events']]
+    assert kinds == ['found', 'found', 'plan', 'placed', 'placed', 'result']
+    placed = document['events'][3]
+    assert set(placed) == {'type', 'hwnd', 'title', 'label', 'rect'}
+    assert len(placed['rect']) == 4
+
+
+def test_json_lines_end_with_summary(run):
+    summary, text = run(["gcc", "--json-lines"], reporter=JsonLinesReporter)
+    lines = [json.loads(line) for line in text.splitlines()]
+    assert lines[-1] == dict(summary, type='summary')
+    assert [line['type'] for line in lines[:2]] == ['found', 'found']
+
+
+def test_quiet_reports_only_errors():
+    stream = io.StringIO()
+    reporter = QuietReporter(stream=stream)
+    reporter.emit('placed', hwnd=1, title="gas1", label="", rect=(0, 0, 1, 1))
+    reporter.text("终端平铺完成!")
+    reporter.emit('failed', hwnd=2, title="gas2", action='tile', error="拒绝访问")
+    reporter.finish()
+    assert stream.getvalue() == "平铺窗口 'gas2' 时出错: 拒绝访问\n"
+
+
+def test_missing_keyword_is_structured_error(run):
+    result = run(["--json"])
+    assert result.summary['error'] == 'missing keyword'
+    assert result.events[0]['type'] == 'error'
+
+
+if __name__ == "__main__":
+    from conftest import run_cli
+    test_text_output_is_buffered_until_finish()
+    test_json_document_schema(run_cli)
+    test_json_lines_end_with_summary(run_cli)
+    test_quiet_reports_only_errors()
+    test_missing_keyword_is_structured_error(run_cli)
+    print("输出层测试完成!")
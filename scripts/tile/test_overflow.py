@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+测试窗口数超过显示器容量时的层叠和分页
+"""
+
+from layout_planner import cascade_rects
+
+# 1920x1040工作区垂直平铺的容量
+CAPACITY = 30
+# 两位序号，按标题排序即按序号分页
+TITLE = "gas{i:02d} - PowerShell"
+
+
+def on_screen(rect, size=(1920, 1080)):
+    x, y, width, height = rect
+    return x >= 0 and y >= 0 and x + width <= size[0] and y + height <= size[1]
+
+
+def test_cascade_rects_stay_inside_slot():
+    slot = (100, 50, 600, 400)
+    for depth in (1, 2, 5, 40):
+        rects = cascade_rects(slot, depth)
+        assert len(rects) == depth
+        for x, y, width, height in rects:
+            assert x >= 100 and y >= 50 and x + width <= 700 and y + height <= 450
+        # 每层都露出标题栏
+        assert len({rect[:2] for rect in rects}) == depth
+    assert cascade_rects(slot, 0) == []
+
+
+def test_spill_is_default(make_tiler):
+    tiler = make_tiler(40, TITLE)
+    backend = tiler.backend
+    tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    assert not all(on_screen(window.rect) for window in backend.windows.values())
+
+
+def test_cascade_keeps_every_window_on_screen(make_tiler):
+    tiler = make_tiler(40, TITLE)
+    backend = tiler.backend
+    tiler.overflow = 'cascade'
+    result = tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+    assert len(result.placed) == 40
+    assert all(on_screen(window.rect) for window in backend.windows.values())
+    # 一次批量提交，不最小化任何窗口
+    assert backend.calls['end_batch'] == 1 and backend.calls['minimize'] == 0
+    assert len({window.rect for window in backend.windows.values()}) == 40
+
+
+def test_page_shows_one_page_and_minimizes_the_rest(make_tiler, run):
+    tiler = make_tiler(70, TITLE)
+    backend = tiler.backend
+    result = run(["gas", "--page", "2"], tiler)
+    summary, events = result.summary, result.events
+    assert (summary['page'], summary['pages'], summary['placed']) == (2, 3, CAPACITY)
+    page = next(event for event in events if event['type'] == 'page')
+    assert (page['count'], page['total']) == (CAPACITY, 70)
+    shown = [window for window in backend.windows.values() if not window.minimized]
+    assert sorted(window.title for window in shown) == [f"gas{i:02d} - PowerShell"
+                                                         for i in range(30, 60)]
+    assert all(on_screen(window.rect) for window in shown)
+    assert backend.calls['minimize'] == 40
+
+    # 超出范围的页码显示最后一页
+    summary = run(["gas", "--page", "9"], tiler).summary
+    assert (summary['page'], summary['placed']) == (3, 10)
+
+
+def test_next_page_cycles(make_tiler, run):
+    tiler = make_tiler(70, TITLE)
+    backend = tiler.backend
+    pages = []
+    for _ in range(4):
+        summary = run(["gas", "--next-page"], tiler).summary
+        pages.append(summary['page'])
+    # 开始时所有窗口都显示，第一个显示中的页视为当前页
+    assert pages == [2, 3, 1, 2]
+
+    # 所有窗口都已最小化时从第一页开始
+    for window in backend.windows.values():
+        window.minimized = True
+    summary = run(["gas", "--next-page"], tiler).summary
+    assert summary['page'] == 1
+
+
+def test_page_flip_work_is_proportional_to_page_size(make_tiler, run):
+    for count in (70, 700):
+        tiler = make_tiler(count, TITLE)
+        backend = tiler.backend
+        run(["gas", "--page", "1"], tiler)
+        backend.calls.clear()
+        run(["gas", "--next-page"], tiler)
+        # 只最小化上一页仍显示的窗口，只移动当前页的窗口
+        assert backend.calls['minimize'] == CAPACITY
+        assert backend.calls['end_batch'] == 1
+        assert len(backend.commits[-1]) == CAPACITY
+        # 只逐个检查显示状态会变化的窗口 (上一页和下一页)，其他页各检查一个窗口
+        pages = -(-count // CAPACITY)
+        assert backend.calls['is_minimized'] <= pages + 2 * CAPACITY
+
+
+def test_minimize_batch_reports_failures(make_tiler):
+    backend = make_tiler(3, TITLE).backend
+    hwnds = list(backend.windows)
+    backend.remove_window(hwnds[1])
+    failed = backend.minimize_batch(hwnds)
+    assert list(failed) == [hwnds[1]]
+    assert backend.windows[hwnds[0]].minimized and backend.windows[hwnds[2]].minimized
+
+
+if __name__ == "__main__":
+    from conftest import fake_tiler, run_cli
+    test_cascade_rects_stay_inside_slot()
+    test_spill_is_default(fake_tiler)
+    test_cascade_keeps_every_window_on_screen(fake_tiler)
+    test_page_shows_one_page_and_minimizes_the_rest(fake_tiler, run_cli)
+    test_next_page_cycles(fake_tiler, run_cli)
+    test_page_flip_work_is_proportional_to_page_size(fake_tiler, run_cli)
+    test_minimize_batch_reports_failures(fake_tiler)
+    print("超出容量测试完成!")
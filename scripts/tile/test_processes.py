@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+测试按进程属性选择窗口与进程信息缓存（使用构造的 /proc 目录）
+"""
+
+import os
+import sys
+
+from processes import ProcessCache, ProcFsProcessSource, ProcessSelector
+from terminal_tiler import TerminalTiler
+from window_backend import FakeWindowBackend
+
+# pid -> (父进程, 进程名, 命令行, 启动时间)
+PROCESSES = {
+    100: (1, 'explorer.exe', ['explorer.exe'], 50),
+    200: (100, 'pwsh.exe', ['pwsh.exe', '-NoExit'], 60),
+    300: (200, 'node', ['node', 'server.js', '--port', '8080'], 70),
+    400: (200, 'python', ['python', 'manage.py', 'runserver'], 80),
+    500: (1, 'weird) (name', ['weird'], 90),
+}
+
+
+def write_process(root, pid: int, ppid: int, name: str, args, start: int):
+    directory = os.path.join(str(root), str(pid))
+    os.makedirs(directory, exist_ok=True)
+    # 字段: pid (comm) state ppid ... 第22个字段为启动时间
+    fields = ['S', str(ppid)] + ['0'] * 17 + [str(start), '0']
+    with open(os.path.join(directory, 'stat'), 'w') as f:
+        f.write(f"{pid} ({name}) " + ' '.join(fields) + '\n')
+    with open(os.path.join(directory, 'cmdline'), 'wb') as f:
+        f.write('\0'.join(args).encode() + b'\0')
+    with open(os.path.join(directory, 'comm'), 'w') as f:
+        f.write(name[:15] + '\n')
+
+
+def fake_proc(root):
+    for pid, (ppid, name, args, start) in PROCESSES.items():
+        write_process(root, pid, ppid, name, args, start)
+    return ProcFsProcessSource(str(root))
+
+
+class CountingSource(ProcFsProcessSource):
+    def __init__(self, root):
+        super().__init__(root)
+        self.queries = 0
+
+    def query(self, pid):
+        self.queries += 1
+        return super().query(pid)
+
+
+def process_tiler(tmp_path):
+    """每个终端窗口属于一个进程；标题故意与进程无关"""
+    backend = FakeWindowBackend()
+    backend.processes = fake_proc(tmp_path / 'proc')
+    for pid, title in ((200, "Administrator: PowerShell"), (300, "npm"),
+                       (400, "npm"), (500, "weird")):
+        backend.add_window(title, pid=pid)
+    tiler = TerminalTiler(backend)
+    tiler.process_cache = ProcessCache(backend.processes, str(tmp_path / 'processes.json'))
+    return backend, tiler
+
+
+def test_procfs_source(tmp_path):
+    source = fake_proc(tmp_path)
+    info = source.query(300)
+    assert (info.pid, info.ppid, info.name, info.create_time) == (300, 200, 'node', 70)
+    assert info.cmdline == "node server.js --port 8080"
+    assert source.query(500).ppid == 1
+    assert source.create_time(999) is None and source.query(999) is None
+
+
+def test_procfs_current_process():
+    if not os.path.isdir('/proc'):
+        return
+    info = ProcFsProcessSource().query(os.getpid())
+    assert info.ppid == os.getppid()
+    assert info.name.startswith('python') or os.path.basename(sys.executable) == info.name
+
+
+def test_cache_hits_reuse_and_persistence(tmp_path):
+    root = tmp_path / 'proc'
+    fake_proc(root)
+    path = str(tmp_path / 'processes.json')
+    source = CountingSource(str(root))
+    cache = ProcessCache(source, path)
+    assert cache.get(300).name == 'node'
+    assert cache.get(300).name == 'node'
+    assert (cache.hits, cache.misses, source.queries) == (1, 1, 1)
+
+    # pid被复用: 启动时间不同，重新查询
+    write_process(root, 300, 1, 'vim', ['vim'], 999)
+    assert cache.get(300).name == 'vim'
+    assert source.queries == 2
+    cache.save()
+
+    # 下一次运行从文件加载，未变化的进程不再完整查询
+    source = CountingSource(str(root))
+    cache = ProcessCache(source, path)
+    assert cache.get(300).name == 'vim'
+    assert source.queries == 0 and cache.hits == 1
+
+    # 进程退出后从缓存中移除
+    os.remove(root / '300' / 'stat')
+    assert cache.get(300) is None
+    assert len(cache) == 0 and cache.dirty
+
+
+def test_select_by_process_ignores_titles(tmp_path, run):
+    _, tiler = process_tiler(tmp_path)
+    assert run(["--exe", "node"], tiler).found == ["npm"]
+    assert run(["--cmdline", "manage.py runserver"], tiler).found == ["npm"]
+    assert run(["--parent", "pwsh*"], tiler).found == ["npm", "npm"]
+    assert run(["--parent", "200", "--exe", "python"], tiler).found == ["npm"]
+    assert run(["--pid", "200,500"], tiler).found == ["Administrator: PowerShell", "weird"]
+    # 关键字与进程条件同时满足
+    assert run(["npm", "--cmdline", "re:--port[= ]8080"], tiler).found == ["npm"]
+    assert run(["npm", "--exe", "pwsh.exe"], tiler).found == []
+
+
+def test_repeated_runs_hit_cache(tmp_path, run):
+    backend, tiler = process_tiler(tmp_path)
+    summary = run(["--exe", "node|python"], tiler).summary
+    # 四个终端窗口的进程各查询一次
+    assert summary['process_cache'] == {'hits': 0, 'misses': 4}
+    assert os.path.exists(tiler.process_cache.path)
+
+    # 新的进程（例如下一次命令行调用）从磁盘加载缓存
+    fresh = TerminalTiler(backend)
+    fresh.process_cache = ProcessCache(backend.processes, tiler.process_cache.path)
+    result = run(["--exe", "node|python"], fresh)
+    summary, found = result.summary, result.found
+    assert found == ["npm", "npm"]
+    assert summary['process_cache'] == {'hits': 4, 'misses': 0}
+
+
+def test_pid_only_selector_needs_no_metadata():
+    selector = ProcessSelector(pids=frozenset({7}))
+    assert selector.active and not selector.needs_metadata
+    assert selector.matches(7, None) and not selector.matches(8, None)
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    from conftest import run_cli
+    for test in (test_procfs_source, test_cache_hits_reuse_and_persistence):
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory))
+    for test in (test_select_by_process_ignores_titles, test_repeated_runs_hit_cache):
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory), run_cli)
+    test_procfs_current_process()
+    test_pid_only_selector_needs_no_metadata()
+    print("进程选择测试完成!")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+测试分阶段性能分析
+"""
+
+import json
+
+from output import Reporter
+from profiler import NULL_PROFILER, Profiler
+from terminal_tiler import TerminalTiler
+from window_backend import FakeWindowBackend
+
+
+def test_nested_phases_and_counters(step_clock):
+    profiler = Profiler(clock=step_clock)
+    with profiler.phase('execute'):
+        with profiler.phase('enumerate'):
+            profiler.count('scanned', 5)
+        with profiler.phase('apply'):
+            with profiler.phase('batch'):
+                pass
+    totals = profiler.totals()
+    assert list(totals) == [('execute',), ('execute', 'enumerate'), ('execute', 'apply'),
+                            ('execute', 'apply', 'batch')]
+    assert totals[('execute', 'apply')] == (3_000_000, 1)
+    assert profiler.counters['scanned'] == 5
+
+    report = profiler.report()
+    assert "    batch" in report and "scanned=5" in report
+
+
+def test_chrome_trace_format(tmp_path, step_clock):
+    profiler = Profiler(clock=step_clock)
+    with profiler.phase('plan'):
+        profiler.count('matched', 2)
+    path = tmp_path / "trace.json"
+    profiler.write_trace(str(path))
+    events = json.loads(path.read_text(encoding='utf-8'))['traceEvents']
+    assert events[0]['ph'] == 'X' and events[0]['name'] == 'plan' and events[0]['dur'] == 1000
+    assert events[-1]['ph'] == 'C' and events[-1]['args'] == {'matched': 2}
+
+
+def test_disabled_profiler_records_nothing(run):
+    tiler = TerminalTiler(FakeWindowBackend.demo())
+    assert tiler.profiler is NULL_PROFILER
+    summary = run(["gas"], tiler).summary
+    assert 'profile' not in summary
+    with NULL_PROFILER.phase('x'):
+        NULL_PROFILER.count('y')
+
+
+def test_profile_flag_reports_every_phase(run):
+    result = run(["gas", "--profile"], reporter=Reporter)
+    summary = result.summary
+    phases = summary['profile']['phases']
+    for phase in ('execute/enumerate', 'execute/match', 'execute/plan', 'execute/apply',
+                  'execute/apply/batch', 'execute/output'):
+        assert phase in phases
+    assert summary['profile']['counters']['matched'] == 2
+    assert summary['profile']['counters']['moved'] == 2
+    assert "性能分析" in result.output
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    from conftest import StepClock, run_cli
+    test_nested_phases_and_counters(StepClock())
+    test_chrome_trace_format(pathlib.Path(tempfile.mkdtemp()), StepClock())
+    test_disabled_profiler_records_nothing(run_cli)
+    test_profile_flag_reports_every_phase(run_cli)
+    print("性能分析测试完成!")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+测试跨进程运行锁与请求合并
+"""
+
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from output import JsonReporter
+from run_queue import FileLock, RunQueue
+from terminal_tiler import TerminalTiler, build_parser, execute_queued, request_key
+from window_backend import FakeWindowBackend
+
+HAS_FORK = 'fork' in multiprocessing.get_all_start_methods()
+
+
+def _worker(directory, log, name, barrier, results):
+    """一个模拟的命令行实例: 同时启动，执行时记录开始/结束时间并耗时0.2秒"""
+    def run(argv, requests):
+        start = time.time()
+        time.sleep(0.2)
+        with open(log, 'a') as f:
+            f.write(json.dumps({'pid': os.getpid(), 'argv': argv, 'start': start, 'end': time.time(),
+                                'requests': requests}) + '\n')
+        return {'ran': argv[-1]}
+
+    queue = RunQueue(directory)
+    barrier.wait()
+    outcome = queue.run('gas', ['gas', name], run, timeout=10)
+    results.put((name, outcome.request, outcome.summary['ran'], outcome.ran))
+
+
+@pytest.mark.skipif(not HAS_FORK, reason="当前平台不支持fork")
+def test_burst_is_serialized_and_coalesced(tmp_path):
+    context = multiprocessing.get_context('fork')
+    log = str(tmp_path / 'runs.log')
+    count = 8
+    barrier = context.Barrier(count)
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=(str(tmp_path / 'queue'), log, f"w{i}",
+                                                       barrier, results))
+                 for i in range(count)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get(timeout=20) for _ in processes]
+    for process in processes:
+        process.join(10)
+        assert process.exitcode == 0
+
+    with open(log) as f:
+        runs = [json.loads(line) for line in f]
+    # 运行互不重叠
+    runs.sort(key=lambda run: run['start'])
+    for previous, current in zip(runs, runs[1:]):
+        assert previous['end'] <= current['start']
+    # 同时到达的8个请求最多执行两次，且合计覆盖全部请求
+    assert 1 <= len(runs) <= 2
+    assert sum(run['requests'] for run in runs) == count
+    # 最后一次运行执行最后登记的请求
+    last = max(outcomes, key=lambda outcome: outcome[1])
+    assert runs[-1]['argv'] == ['gas', last[0]]
+    # 每个调用方都得到覆盖它的那次运行的结果
+    assert sum(ran for *_, ran in outcomes) == len(runs)
+    for _, _, served, _ in outcomes:
+        assert served in [run['argv'][-1] for run in runs]
+
+
+def test_groups_are_not_coalesced_together(tmp_path):
+    queue = RunQueue(str(tmp_path))
+    executed = []
+
+    def run(argv, requests):
+        executed.append(argv)
+        return {}
+
+    for keyword in ('gas', 'gcc', 'gas'):
+        outcome = queue.run(keyword, [keyword], run)
+        assert outcome.ran and outcome.requests == 1
+    assert executed == [['gas'], ['gcc'], ['gas']]
+
+
+def test_lock_timeout(tmp_path):
+    queue = RunQueue(str(tmp_path))
+    holder = FileLock(os.path.join(str(tmp_path), 'run.lock'))
+    assert holder.acquire()
+    try:
+        started = time.monotonic()
+        try:
+            queue.run('gas', ['gas'], lambda argv, requests: {}, timeout=0.1)
+            assert False, "应当超时"
+        except TimeoutError:
+            pass
+        assert time.monotonic() - started < 2
+    finally:
+        holder.release()
+    # 超时的请求留在队列中，由下一次运行合并执行
+    outcome = queue.run('gas', ['gas', '--horizontal'], lambda argv, requests: {'requests': requests})
+    assert outcome.summary == {'requests': 2}
+
+
+def test_corrupt_state_is_reset(tmp_path):
+    queue = RunQueue(str(tmp_path))
+    with open(queue.path, 'w') as f:
+        f.write("{not json")
+    assert queue.run('gas', ['gas'], lambda argv, requests: {'ok': True}).summary == {'ok': True}
+
+
+def test_tiler_runs_latest_request_of_group(tmp_path):
+    """等待运行锁期间同一分组来了更晚的请求: 按更晚的请求平铺，输出格式仍按本次调用"""
+    backend = FakeWindowBackend.demo()
+    tiler = TerminalTiler(backend)
+    argv = ['gas', '--json']
+    args = build_parser().parse_args(argv)
+    tiler.configure(args)
+    stream = io.StringIO()
+    tiler.out = JsonReporter(stream=stream)
+
+    queue = RunQueue(str(tmp_path))
+    holder = FileLock(os.path.join(str(tmp_path), 'run.lock'))
+    holder.acquire()
+    thread = threading.Thread(target=execute_queued, args=(tiler, args, argv, queue))
+    thread.start()
+    key = request_key(args)
+    while key not in queue._load()['pending']:
+        time.sleep(0.01)
+    later = queue.submit(key, ['gas', '--horizontal'])
+    holder.release()
+    thread.join(10)
+
+    document = json.loads(stream.getvalue())
+    assert [event for event in document['events'] if event['type'] == 'coalesced'] == \
+        [{'type': 'coalesced', 'count': 2}]
+    plan = next(event for event in document['events'] if event['type'] == 'plan')
+    assert plan['orientation'] == 'horizontal'
+    assert queue._load()['served'][key]['request'] == later
+
+
+def test_read_only_actions_are_not_queued():
+    parser = build_parser()
+    assert request_key(parser.parse_args(['--list'])) is None
+    assert request_key(parser.parse_args(['gas', '--save-layout', 'dev'])) is None
+    assert request_key(parser.parse_args(['gas'])) == request_key(parser.parse_args(['gas', '--hide']))
+    assert request_key(parser.parse_args(['gas'])) != request_key(parser.parse_args(['gcc']))
+    # 翻页是相对操作: 连续的 --next-page 仍然排队，但互不合并，也不合并其他请求
+    pages = {request_key(parser.parse_args(['gas', '--next-page'])) for _ in range(3)}
+    assert None not in pages and len(pages) == 3
+    assert request_key(parser.parse_args(['gas'])) not in pages
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    tests = [test_groups_are_not_coalesced_together, test_lock_timeout, test_corrupt_state_is_reset,
+             test_tiler_runs_latest_request_of_group]
+    if HAS_FORK:
+        tests.insert(0, test_burst_is_serialized_and_coalesced)
+    else:
+        print("跳过 test_burst_is_serialized_and_coalesced: 当前平台不支持fork")
+    for test in tests:
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory))
+    test_read_only_actions_are_not_queued()
+    print("运行队列测试完成!")
@@ -4,6 +4,7 @@
 """
 
 from terminal_tiler import TerminalTiler
+from layout_planner import VERTICAL, VERTICAL_CONSTRAINTS, plan_layout
 import sys
 
 def test_grid_calculation():
@@ -19,6 +20,9 @@ def test_grid_calculation():
     print("-" * 50)
     for num in test_cases:
         cols, rows_per_col = tiler._calculate_optimal_grid(num, prefer_vertical=True)
+        # 与平铺时实际使用的布局一致
+        plan = plan_layout(num, tiler.target_monitor.work_area, orientation=VERTICAL)
+        assert (cols, rows_per_col) == (plan.cols, list(plan.rows_per_col))
         total_check = sum(rows_per_col)
         status = "✓" if total_check == num else "✗"
         print(f"{num:2d}个窗口 -> {cols}列 {rows_per_col} {status}")
@@ -76,20 +80,13 @@ def show_window_size_examples():
     for name, num_windows in scenarios:
         print(f"{name} - 垂直平铺:")
         
-        # 计算垂直布局
-        cols, rows_per_col = tiler._calculate_optimal_grid(num_windows, prefer_vertical=True)
+        # 与平铺器使用同一个布局规划器
+        plan = plan_layout(num_windows, (0, 0, tiler.screen_width, tiler.screen_height), gap,
+                           orientation=VERTICAL)
         
-        available_width = tiler.screen_width - gap * (cols + 1)
-        window_width = available_width // cols
-        
-        max_window_height = 600  # 限制最大高度
-        min_window_height = 200
-        available_height = tiler.screen_height - gap * (max(rows_per_col) + 1)
-        window_height = min(max_window_height, max(min_window_height, available_height // max(rows_per_col)))
-        
-        print(f"  布局: {cols}列，每列{rows_per_col}行")
-        print(f"  尺寸: {window_width}x{window_height} (宽x高)")
-        print(f"  高度限制: 最小{min_window_height}px，最大{max_window_height}px")
+        print(f"  布局: {plan.cols}列，每列{list(plan.rows_per_col)}行")
+        print(f"  尺寸: {plan.window_width}x{plan.window_height} (宽x高)")
+        print(f"  高度限制: 最小{VERTICAL_CONSTRAINTS.min_height}px，最大{VERTICAL_CONSTRAINTS.max_height}px")
         print()
 
 if __name__ == "__main__":
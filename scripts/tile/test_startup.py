@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+测试终端平铺管理器的快速启动路径
+"""
+
+import os
+import sys
+
+from bench_startup import imported_modules
+from terminal_tiler import build_parser, fast_args
+
+# 快速路径上不应导入的模块
+HEAVY_MODULES = {'argparse', 'subprocess', 'threading', 'socket', 'win32gui'}
+# 只在平铺时使用的模块，列出窗口时不应导入
+TILING_MODULES = {'layout_planner', 'assignment', 'monitors', 'cell_grid', 'json'}
+
+
+def test_fast_path_matches_parser():
+    for argv in (['--list'], ['gas', '--hide'], ['--hide', 'gcc']):
+        fast = fast_args(argv)
+        assert fast is not None
+        assert vars(fast) == vars(build_parser().parse_args(argv))
+
+
+def test_other_arguments_use_parser():
+    assert fast_args(['gas']) is None
+    assert fast_args(['gas', '--hide', '--async']) is None
+    assert fast_args(['--hide', '--list']) is None
+    # 无效的关键字由完整的解析器报告为参数错误，而不是在枚举窗口时出错
+    assert fast_args(['re:[', '--hide']) is None
+
+
+def test_invalid_keyword_with_hide_is_an_argument_error():
+    import subprocess
+    out = subprocess.run([sys.executable, 'terminal_tiler.py', 're:[', '--hide'],
+                         cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True)
+    assert out.returncode == 2
+    assert "枚举窗口时出错" not in out.stdout + out.stderr
+
+
+def test_list_and_hide_skip_heavy_imports():
+    for argv in (['--list'], ['gas', '--hide']):
+        loaded = set(imported_modules(argv))
+        assert not loaded & HEAVY_MODULES, loaded & HEAVY_MODULES
+
+
+def test_list_skips_tiling_modules():
+    loaded = set(imported_modules(['--list']))
+    assert not loaded & TILING_MODULES, loaded & TILING_MODULES
+    assert 'layout_planner' not in imported_modules(['gas', '--hide'])
+
+
+def test_import_does_not_print():
+    import subprocess
+    out = subprocess.run([sys.executable, '-c', 'import terminal_tiler'],
+                         cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True, check=True)
+    assert out.stdout == ""
+
+
+if __name__ == "__main__":
+    test_fast_path_matches_parser()
+    test_other_arguments_use_parser()
+    test_invalid_keyword_with_hide_is_an_argument_error()
+    test_list_and_hide_skip_heavy_imports()
+    test_list_skips_tiling_modules()
+    test_import_does_not_print()
+    print("快速启动测试完成!")
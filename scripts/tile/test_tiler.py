@@ -3,7 +3,10 @@
 终端平铺管理器测试脚本
 """
 
-from terminal_tiler import TerminalTiler
+import contextlib
+import io
+
+from terminal_tiler import TerminalTiler, build_parser
 import sys
 
 def test_terminal_tiler():
@@ -31,5 +34,21 @@ def test_terminal_tiler():
     
     print("\n=== 测试完成 ===")
 
+def test_argument_errors_keep_message():
+    """参数转换错误显示具体原因，而不是argparse的通用提示"""
+    for argv, message in ((['gas', '--monitor', '0'], "显示器序号从1开始"),
+                          (['gas', '--regions', '1,x'], "无效的区域比例"),
+                          (['--pid', 'abc'], "无效的pid"),
+                          (['gas', '--limit', '0'], "数量至少为1")):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            try:
+                build_parser().parse_args(argv)
+                assert False, "应当报错"
+            except SystemExit:
+                pass
+        assert message in stderr.getvalue()
+
 if __name__ == "__main__":
     test_terminal_tiler()
+    test_argument_errors_keep_message()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+测试终端平铺守护进程（Unix套接字 + 假后端）
+"""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from run_queue import FileLock, RunQueue
+from terminal_tiler import TerminalTiler
+from tiler_daemon import TilerClient, TilerDaemon
+from window_backend import FakeWindowBackend
+
+
+def start_daemon(backend: FakeWindowBackend, queue=None):
+    directory = tempfile.mkdtemp()
+    daemon = TilerDaemon(TerminalTiler(backend), f"unix:{os.path.join(directory, 'tiler.sock')}",
+                         token_path=os.path.join(directory, 'daemon.token'), queue=queue)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    assert daemon.ready.wait(5)
+    return daemon, thread
+
+
+def test_daemon_round_trip_and_latency():
+    backend = FakeWindowBackend.demo()
+    daemon, thread = start_daemon(backend)
+    try:
+        with TilerClient(daemon.address, token_path=daemon.token_path) as client:
+            assert client.request(action='ping')['ok']
+
+            response = client.request(["gas", "--horizontal"])
+            assert response['ok']
+            assert response['result']['placed'] == 2
+            assert "终端平铺完成" in response['output']
+
+            start = time.perf_counter()
+            for _ in range(50):
+                client.request(["gcc"])
+            average = (time.perf_counter() - start) / 50
+            print(f"守护进程平均请求延迟: {average * 1000:.2f} ms")
+            assert average < 0.01
+
+            listed = client.request(["--list"])
+            assert "gds - Windows Terminal" in listed['output']
+        # 窗口索引保持在守护进程中，多次请求只构建一次
+        assert daemon.tiler.index.scans == 1
+    finally:
+        daemon.shutdown()
+        thread.join(5)
+
+
+def test_daemon_reports_bad_arguments_and_shuts_down():
+    daemon, thread = start_daemon(FakeWindowBackend.demo())
+    with TilerClient(daemon.address, token_path=daemon.token_path) as client:
+        response = client.request(["--gap", "abc"])
+        assert not response['ok']
+        assert client.request(action='shutdown')['ok']
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not os.path.exists(daemon.address[len("unix:"):])
+
+
+def raw_request(daemon: TilerDaemon, payload: bytes) -> list:
+    """不经过TilerClient直接发送，返回守护进程回复的所有行（连接关闭为止）"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(5)
+    sock.connect(daemon.address[len("unix:"):])
+    with sock, sock.makefile('rwb') as stream:
+        stream.write(payload)
+        stream.flush()
+        sock.shutdown(socket.SHUT_WR)
+        return [json.loads(line) for line in stream]
+
+
+def test_requests_without_token_are_rejected():
+    backend = FakeWindowBackend.demo()
+    daemon, thread = start_daemon(backend)
+    try:
+        # 令牌文件只有当前用户可读
+        assert os.stat(daemon.token_path).st_mode & 0o077 == 0
+        request = json.dumps({'id': 1, 'argv': ['gas']}).encode() + b'\n'
+        assert raw_request(daemon, request + request) == [{'id': 1, 'ok': False, 'error': "未授权的请求"}]
+        forged = json.dumps({'id': 2, 'token': 'x' * 64, 'action': 'shutdown'}).encode() + b'\n'
+        assert not raw_request(daemon, forged)[0]['ok']
+        # 跨协议的HTTP请求: 第一行不是JSON，断开连接，不会处理请求体
+        http = b'POST / HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n' + request
+        assert len(raw_request(daemon, http)) == 1
+        assert backend.calls['move_window'] == 0 and not backend.commits
+        assert thread.is_alive()
+    finally:
+        daemon.shutdown()
+        thread.join(5)
+    assert not os.path.exists(daemon.token_path)
+
+
+def test_path_writing_options_are_rejected():
+    daemon, thread = start_daemon(FakeWindowBackend.demo())
+    target = os.path.join(tempfile.mkdtemp(), 'written.json')
+    try:
+        with TilerClient(daemon.address, token_path=daemon.token_path) as client:
+            for argv in (['gas', '--trace', target], ['gas', '--metrics-file', target],
+                         ['gas', '--save-layout', 'work']):
+                response = client.request(argv)
+                assert not response['ok'] and argv[1] in response['error']
+        assert not os.path.exists(target)
+    finally:
+        daemon.shutdown()
+        thread.join(5)
+
+
+def test_mutating_requests_hold_the_run_lock():
+    directory = tempfile.mkdtemp()
+    backend = FakeWindowBackend.demo()
+    daemon, thread = start_daemon(backend, RunQueue(directory))
+    holder = FileLock(os.path.join(directory, 'run.lock'))
+    try:
+        with TilerClient(daemon.address, token_path=daemon.token_path) as client:
+            assert holder.acquire()
+            try:
+                # 命令行实例正在平铺: 只读请求照常处理，移动窗口的请求等待运行锁
+                assert client.request(["--list"])['ok']
+                response = client.request(["gas", "--lock-timeout", "0.1"])
+                assert not response['ok'] and "超时" in response['error']
+                assert not backend.commits
+            finally:
+                holder.release()
+            assert client.request(["gas"])['result']['placed'] == 2
+    finally:
+        daemon.shutdown()
+        thread.join(5)
+
+
+if __name__ == "__main__":
+    test_daemon_round_trip_and_latency()
+    test_daemon_reports_bad_arguments_and_shuts_down()
+    test_requests_without_token_are_rejected()
+    test_path_writing_options_are_rejected()
+    test_mutating_requests_hold_the_run_lock()
+    print("守护进程测试完成!")
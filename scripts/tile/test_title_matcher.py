@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+测试标题匹配器的查询解析与匹配
+"""
+
+import pytest
+
+from title_matcher import (GLOB, LITERAL, REGEX, Term, compile_query, glob_to_regex,
+                           literal_trie_regex, parse_query)
+
+TITLES = [
+    "gas1 - PowerShell",
+    "gas12 - PowerShell",
+    "GAS - logs",
+    "gcc1 - Command Prompt",
+    "gcc-build - Command Prompt",
+    "gds - Windows Terminal",
+    "node.js - server",
+    "gas (dev) - bash",
+    "C++ build | gcc",
+]
+
+
+def selected(query: str):
+    return [TITLES[i] for i in compile_query(query).select(TITLES)]
+
+
+def test_parse_query_kinds():
+    assert parse_query("gcc*|gds") == [Term(GLOB, "gcc*"), Term(LITERAL, "gds")]
+    assert parse_query("re:gas[0-9]+, !gas12") == [Term(REGEX, "gas[0-9]+"),
+                                                   Term(LITERAL, "gas12", True)]
+    # 括号内的分隔符不切分；没有前缀时不按正则处理
+    assert parse_query("re:gas(1|2)") == [Term(REGEX, "gas(1|2)")]
+    assert parse_query("gas (dev)") == [Term(LITERAL, "gas (dev)")]
+    assert parse_query("C++") == [Term(LITERAL, "C++")]
+    assert parse_query("re:gas.1|glob:g?s") == [Term(REGEX, "gas.1"), Term(GLOB, "g?s")]
+
+
+def test_literal_is_case_insensitive_substring():
+    assert selected("gas") == TITLES[:3] + ["gas (dev) - bash"]
+    assert compile_query("GaS").literal == "gas"
+    assert selected("node.js") == ["node.js - server"]
+
+
+def test_glob_and_regex():
+    assert selected("gcc*|gds") == TITLES[3:6] + ["C++ build | gcc"]
+    assert selected("re:gas[0-9]+") == TITLES[:2]
+    assert selected("re:^gcc[0-9]") == ["gcc1 - Command Prompt"]
+    assert selected("glob:g?s -") == ["GAS - logs", "gds - Windows Terminal"]
+    assert glob_to_regex("*gas[!0-9]*") == "gas[^0-9]"
+
+
+def test_special_characters_match_literally():
+    """标题中的括号、+ 等字符按原样匹配"""
+    assert selected("gas (dev)") == ["gas (dev) - bash"]
+    assert selected("(DEV)") == ["gas (dev) - bash"]
+    assert selected("c++") == ["C++ build | gcc"]
+    assert compile_query("gas (dev)").literal == "gas (dev)"
+    # 含分隔符的关键字: 按条件匹配，整个关键字按原文出现时也匹配
+    assert selected("build | gcc") == ["gcc1 - Command Prompt", "gcc-build - Command Prompt",
+                                       "C++ build | gcc"]
+    assert compile_query("c++ build | gcc").matches("C++ build | gcc")
+
+
+def test_excludes():
+    assert selected("g,!gds,!gcc") == TITLES[:3] + ["gas (dev) - bash"]
+    # 只有排除条件时匹配其余全部
+    assert selected("!powershell") == TITLES[2:]
+
+
+def test_literal_trie_keeps_shortest_prefix():
+    assert literal_trie_regex(["gas", "gas1", "gcc", "gds"]) == "g(?:as|cc|ds)"
+    assert selected("gas1|gcc|gas") == TITLES[:5] + TITLES[7:]
+
+
+def test_invalid_pattern_raises():
+    with pytest.raises(ValueError):
+        compile_query("re:gas(")
+
+
+def test_matches_agrees_with_select():
+    for query in ["gas", "gcc*|gds", "re:gas[0-9]+", "g,!gds", "!gas", "gas (dev)"]:
+        matcher = compile_query(query)
+        assert [i for i, title in enumerate(TITLES) if matcher.matches(title)] \
+            == matcher.select(TITLES)
+
+
+if __name__ == "__main__":
+    test_parse_query_kinds()
+    test_literal_is_case_insensitive_substring()
+    test_glob_and_regex()
+    test_special_characters_match_literally()
+    test_excludes()
+    test_literal_trie_keeps_shortest_prefix()
+    test_matches_agrees_with_select()
+    print("标题匹配测试完成!")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+测试事件驱动的监视模式（使用假后端产生的合成事件流）
+"""
+
+import contextlib
+import io
+import threading
+import time
+
+from output import Reporter
+from terminal_tiler import TerminalTiler
+from watcher import TilerWatcher
+from window_backend import FakeWindowBackend
+from window_events import DISPLAY, WindowEvent
+
+
+def make_watcher(debounce: float = 0.01):
+    backend = FakeWindowBackend()
+    source = backend.event_source()
+    gas = backend.add_windows([("gas1 - PowerShell", 'ConsoleWindowClass'),
+                               ("gas2 - PowerShell", 'ConsoleWindowClass')])
+    backend.add_window("gcc1 - Command Prompt")
+    tiler = TerminalTiler(backend)
+    watcher = TilerWatcher(tiler, ['gas', 'gcc'], source, debounce=debounce)
+    # 初始平铺，并丢弃构造窗口时产生的事件
+    watcher.refresh(force=True)
+    source.wait(0)
+    return backend, source, tiler, watcher, gas
+
+
+def test_burst_coalesced_into_one_retile():
+    backend, source, tiler, watcher, _ = make_watcher()
+    scans = tiler.index.scans
+    for i in range(3, 8):
+        backend.add_window(f"gas{i} - PowerShell")
+    source.close()
+    watcher.run()
+
+    assert watcher.batches == 1
+    assert watcher.events == 5
+    assert tiler.index.scans == scans + 2  # 启动时一次，这批事件一次
+    assert watcher.retiles == {'gas': 2, 'gcc': 2}  # 两次为启动时的强制平铺
+    assert len(watcher._members['gas']) == 7
+
+
+def test_only_affected_group_is_retiled():
+    backend, source, tiler, watcher, gas = make_watcher()
+    gcc_rects = {hwnd: window.rect for hwnd, window in backend.windows.items()
+                 if 'gcc' in window.title}
+    backend.remove_window(gas[0])
+    assert watcher.process(source.wait(0)) == ['gas']
+    assert {hwnd: backend.windows[hwnd].rect for hwnd in gcc_rects} == gcc_rects
+
+
+def test_title_change_moves_window_between_groups():
+    backend, source, tiler, watcher, gas = make_watcher()
+    backend.set_title(gas[1], "gcc2 - Command Prompt")
+    assert watcher.process(source.wait(0)) == ['gas', 'gcc']
+    assert gas[1] in watcher._members['gcc']
+
+
+def test_irrelevant_events_do_not_enumerate():
+    backend, source, tiler, watcher, _ = make_watcher()
+    scans = tiler.index.scans
+    backend.add_window("gas docs - Browser", class_name='Chrome_WidgetWin_1')
+    backend.remove_window(backend.add_window("notepad", class_name='Notepad'))
+    assert watcher.process(source.wait(0)) == []
+    assert watcher.ignored == 3
+    assert tiler.index.scans == scans
+
+    # 终端改名但分组成员不变: 枚举一次，不重新平铺
+    backend.set_title(watcher._members['gas'][0], "gas1 - npm run dev")
+    assert watcher.process(source.wait(0)) == []
+
+
+def test_display_change_retiles_all_groups():
+    backend, source, tiler, watcher, _ = make_watcher()
+    source.push(WindowEvent(DISPLAY))
+    assert watcher.process(source.wait(0)) == ['gas', 'gcc']
+
+
+def test_idle_while_nothing_changes():
+    backend, source, tiler, watcher, _ = make_watcher()
+    calls = sum(backend.calls.values())
+    thread = threading.Thread(target=watcher.run, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+    # 启动时的一次刷新之后不再访问后端
+    idle_calls = sum(backend.calls.values())
+    time.sleep(0.3)
+    assert sum(backend.calls.values()) == idle_calls
+    assert idle_calls > calls
+
+    backend.add_window("gas9 - PowerShell")
+    source.close()
+    thread.join(2)
+    assert not thread.is_alive()
+    assert len(watcher._members['gas']) == 3
+
+
+def test_each_refresh_holds_the_lock():
+    backend, source, tiler, watcher, gas = make_watcher()
+    held = []
+
+    @contextlib.contextmanager
+    def lock():
+        held.append(True)
+        yield
+        held[-1] = False
+
+    watcher.lock = lock
+    backend.remove_window(gas[0])
+    assert watcher.process(source.wait(0)) == ['gas']
+    assert held == [False]
+
+    # 等待运行锁超时: 报告错误，成员不更新，下一批事件时重试
+    def busy():
+        raise TimeoutError("等待其他平铺进程超时 (0.1s)")
+
+    watcher.lock = busy
+    tiler.out = Reporter(stream=io.StringIO())
+    backend.remove_window(gas[1])
+    assert watcher.process(source.wait(0)) == []
+    tiler.out.flush()
+    assert "等待其他平铺进程超时" in tiler.out.stream.getvalue()
+    assert gas[1] in watcher._members['gas']
+    watcher.lock = lock
+    assert watcher.process([WindowEvent(DISPLAY)]) == ['gas', 'gcc']
+    assert gas[1] not in watcher._members['gas']
+
+
+if __name__ == "__main__":
+    test_burst_coalesced_into_one_retile()
+    test_only_affected_group_is_retiled()
+    test_title_change_moves_window_between_groups()
+    test_irrelevant_events_do_not_enumerate()
+    test_display_change_retiles_all_groups()
+    test_idle_while_nothing_changes()
+    test_each_refresh_holds_the_lock()
+    print("监视模式测试完成!")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+测试终端窗口索引（使用假窗口后端）
+"""
+
+import io
+import time
+
+from output import Reporter
+from window_backend import FakeWindowBackend, is_terminal_class
+from window_index import WindowIndex, order_records
+from terminal_tiler import TerminalTiler
+
+
+def make_desktop(num_other: int = 400) -> FakeWindowBackend:
+    """构造一个包含大量非终端窗口的桌面"""
+    backend = FakeWindowBackend()
+    for i in range(num_other):
+        backend.add_window(f"文档{i} - Notepad", 'Notepad')
+    backend.add_windows([
+        ("gas1 - PowerShell", 'ConsoleWindowClass'),
+        ("gas2 - PowerShell", 'ConsoleWindowClass'),
+        ("gcc1 - Command Prompt", 'ConsoleWindowClass'),
+        ("GDS - Windows Terminal", 'CASCADIA_HOSTING_WINDOW_CLASS'),
+    ])
+    return backend
+
+
+def test_terminal_class_lookup():
+    assert is_terminal_class('ConsoleWindowClass')
+    assert is_terminal_class('Microsoft.WindowsTerminal_8wekyb3d8bbwe')
+    assert not is_terminal_class('Notepad')
+    # 短类名只按完整的词匹配
+    assert is_terminal_class('foot') and is_terminal_class('gnome-terminal-server')
+    assert is_terminal_class('XTerm') and is_terminal_class('UXTerm') and is_terminal_class('xterm')
+    for class_name in ('footnote', 'Bigfoot', 'kittyhawk', 'MyKittyApp', 'best-256colors', 'NotXTermLike'):
+        assert not is_terminal_class(class_name), class_name
+
+
+def test_single_enumeration_serves_all_queries():
+    backend = make_desktop()
+    tiler = TerminalTiler(backend)
+
+    gas = tiler.find_terminal_windows("gas")
+    gds = tiler.find_terminal_windows("gds")
+    tiler.list_all_terminals()
+    tiler.hide_windows(gas)
+
+    assert [title for _, title in gas] == ["gas1 - PowerShell", "gas2 - PowerShell"]
+    assert len(gds) == 1
+    assert backend.calls['list_windows'] == 1
+    # 只有终端窗口才会读取标题
+    assert backend.calls['get_title'] == 4
+    assert backend.calls['minimize'] == 2
+
+
+def test_find_any_uses_one_snapshot():
+    backend = make_desktop()
+    index = WindowIndex(backend)
+    groups = index.find_any(["gas", "gcc", "missing"])
+    assert [len(groups[k]) for k in ("gas", "gcc", "missing")] == [2, 1, 0]
+    assert index.scans == 1
+
+
+def test_ttl_and_invalidate(clock):
+    backend = make_desktop(10)
+    index = WindowIndex(backend, ttl=1.0, clock=clock)
+
+    index.find("gas")
+    clock.now = 0.5
+    index.find("gas")
+    assert index.scans == 1 and index.hits == 1
+
+    clock.now = 1.5
+    index.find("gas")
+    assert index.scans == 2
+
+    index.invalidate()
+    index.find("gas")
+    assert index.scans == 3
+
+
+def test_enumeration_timing():
+    """测量大量窗口下的枚举与查询耗时"""
+    backend = make_desktop(5000)
+    index = WindowIndex(backend)
+    start = time.perf_counter()
+    index.find_any(["gas", "gcc", "gds"])
+    elapsed = time.perf_counter() - start
+    print(f"5004个窗口枚举+3次查询耗时: {elapsed * 1000:.2f} ms")
+    assert backend.calls['get_title'] == 4
+
+
+def make_busy_desktop(num_other: int = 5000) -> FakeWindowBackend:
+    """匹配的终端在Z序最前面，后面是大量其他窗口和更多终端"""
+    backend = FakeWindowBackend()
+    backend.add_windows([("gas1 - PowerShell", 'ConsoleWindowClass'),
+                         ("gas2 - PowerShell", 'ConsoleWindowClass')])
+    for i in range(num_other):
+        backend.add_window(f"文档{i} - Notepad", 'Notepad')
+        if i % 1000 == 999:
+            backend.add_window(f"gas{i} - PowerShell")
+    return backend
+
+
+def test_limit_short_circuits_enumeration():
+    backend = make_busy_desktop()
+    tiler = TerminalTiler(backend)
+    windows = tiler.find_terminal_windows("gas", limit=2)
+    assert [title for _, title in windows] == ["gas1 - PowerShell", "gas2 - PowerShell"]
+    # 找到两个窗口后停止，其余5005个窗口不再被查询
+    assert backend.calls['get_class_name'] == 2
+    # 不完整的枚举不保存为快照
+    assert tiler.index.scans == 0
+
+    # 完整枚举后保存快照，之后的查询直接使用
+    assert len(tiler.find_terminal_windows("gas")) == 7
+    backend.calls.clear()
+    assert len(tiler.find_terminal_windows("gas", limit=3)) == 3
+    assert backend.calls['get_class_name'] == 0
+
+
+def test_first_and_sort_by_from_command_line(run):
+    backend = make_busy_desktop(100)
+    assert run(["gas", "--first", "--hide"], TerminalTiler(backend)).summary['matched'] == 1
+    assert backend.calls['minimize'] == 1
+
+    # 排序需要看到所有匹配的窗口，再取前N个
+    tiler = TerminalTiler(backend)
+    windows = tiler.find_terminal_windows("gas", limit=1, sort_by='title')
+    assert windows[0][1] == "gas1 - PowerShell"
+    windows = tiler.find_terminal_windows("gas", sort_by='title')
+    assert [title for _, title in windows][:2] == ["gas1 - PowerShell", "gas2 - PowerShell"]
+
+
+def test_order_records_matches_full_sort():
+    records = make_busy_desktop(3000).terminal_records(list(range(1001, 4006)))
+    for sort_by in ('title', 'pid', 'position'):
+        full = order_records(records, sort_by)
+        assert order_records(iter(records), sort_by, 2) == full[:2]
+    assert order_records(iter(records), None, 3) == records[:3]
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def test_list_streams_output():
+    backend = FakeWindowBackend()
+    for i in range(120):
+        backend.add_window(f"shell{i}")
+    tiler = TerminalTiler(backend)
+    stream = CountingStream()
+    tiler.out = Reporter(stream=stream)
+    listed = tiler.list_all_terminals()
+    # 结束前已经分两次写出了前100个窗口
+    assert len(listed) == 120 and stream.writes == 2
+    tiler.out.finish()
+    assert stream.getvalue().count("shell") == 120
+    assert len(tiler.list_all_terminals(limit=5, sort_by='title')) == 5
+
+
+if __name__ == "__main__":
+    from conftest import FakeClock, run_cli
+    test_terminal_class_lookup()
+    test_single_enumeration_serves_all_queries()
+    test_find_any_uses_one_snapshot()
+    test_ttl_and_invalidate(FakeClock())
+    test_enumeration_timing()
+    test_limit_short_circuits_enumeration()
+    test_first_and_sort_by_from_command_line(run_cli)
+    test_order_records_matches_full_sort()
+    test_list_streams_output()
+    print("窗口索引测试完成!")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+测试X11后端
+纯函数的测试总是运行；集成测试需要xcffib和Xvfb，缺少时跳过
+"""
+
+import os
+import shutil
+import struct
+import subprocess
+import time
+
+import pytest
+
+from terminal_tiler import TerminalTiler
+from x11_backend import (MOVERESIZE_FLAGS, P_BASE_SIZE, P_MIN_SIZE, P_RESIZE_INC, client_size,
+                         frame_rect, has_xcb, parse_wm_class, size_hints_metrics)
+
+HAS_XVFB = has_xcb() and shutil.which('Xvfb') is not None
+
+
+def test_parse_wm_class():
+    assert parse_wm_class(b"gnome-terminal-server\0Gnome-terminal\0") == "Gnome-terminal"
+    assert parse_wm_class(b"xterm\0") == "xterm"
+    assert parse_wm_class(b"") == ""
+
+
+def test_frame_and_client_rects():
+    # 边框 (左, 右, 上, 下)
+    extents = (2, 2, 30, 2)
+    rect = frame_rect((102, 230), (796, 568), extents)
+    assert rect == (100, 200, 800, 600)
+    assert client_size(rect, extents) == (796, 568)
+    assert client_size((0, 0, 3, 3), extents) == (1, 1)
+
+
+def test_moveresize_flags():
+    # 西北重力，x/y/宽/高有效，来源为分页器
+    assert MOVERESIZE_FLAGS & 0xFF == 1
+    assert (MOVERESIZE_FLAGS >> 8) & 0xF == 0xF
+    assert MOVERESIZE_FLAGS >> 12 == 2
+
+
+def test_size_hints_metrics():
+    extents = (2, 2, 30, 2)
+    # xterm: 字符 9x17，基础尺寸 4x4
+    hints = [P_RESIZE_INC | P_BASE_SIZE | P_MIN_SIZE, 0, 0, 0, 0, 13, 21, 0, 0, 9, 17, 0, 0, 0, 0, 4, 4, 1]
+    assert tuple(size_hints_metrics(hints, extents)) == (9, 17, 8, 36)
+    # 没有基础尺寸时使用最小尺寸
+    hints[0] = P_RESIZE_INC | P_MIN_SIZE
+    assert tuple(size_hints_metrics(hints, extents)) == (9, 17, 17, 53)
+    # 不按字符对齐的终端
+    hints[9] = hints[10] = 1
+    assert size_hints_metrics(hints, extents) is None
+    assert size_hints_metrics([], extents) is None
+
+
+def _start_xvfb():
+    display = next(n for n in range(99, 200) if not os.path.exists(f"/tmp/.X11-unix/X{n}"))
+    process = subprocess.Popen(['Xvfb', f':{display}', '-screen', '0', '1920x1080x24', '-nolisten', 'tcp'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    import xcffib
+    deadline = time.time() + 10
+    while True:
+        try:
+            return process, f':{display}', xcffib.connect(display=f':{display}')
+        except Exception:
+            if time.time() > deadline:
+                process.kill()
+                raise
+            time.sleep(0.1)
+
+
+def _create_windows(conn, specs):
+    """在辅助连接上创建窗口并发布 _NET_CLIENT_LIST（裸Xvfb没有窗口管理器）"""
+    import xcffib.xproto as xproto
+    core = conn.core
+    screen = conn.get_setup().roots[conn.pref_screen]
+    atoms = {name: core.InternAtom(False, len(name), name).reply().atom
+             for name in ('_NET_CLIENT_LIST', '_NET_WM_NAME', '_NET_WM_PID', 'UTF8_STRING')}
+    windows = []
+    for title, wm_class, pid in specs:
+        wid = conn.generate_id()
+        core.CreateWindow(screen.root_depth, wid, screen.root, 0, 0, 300, 200, 0,
+                          xproto.WindowClass.InputOutput, screen.root_visual, 0, [])
+        data = wm_class.encode()
+        core.ChangeProperty(xproto.PropMode.Replace, wid, xproto.Atom.WM_CLASS, xproto.Atom.STRING,
+                            8, len(data), data)
+        data = title.encode()
+        core.ChangeProperty(xproto.PropMode.Replace, wid, atoms['_NET_WM_NAME'], atoms['UTF8_STRING'],
+                            8, len(data), data)
+        core.ChangeProperty(xproto.PropMode.Replace, wid, atoms['_NET_WM_PID'], xproto.Atom.CARDINAL,
+                            32, 1, struct.pack('=I', pid))
+        core.MapWindow(wid)
+        windows.append(wid)
+    core.ChangeProperty(xproto.PropMode.Replace, screen.root, atoms['_NET_CLIENT_LIST'], xproto.Atom.WINDOW,
+                        32, len(windows), struct.pack(f'={len(windows)}I', *windows))
+    conn.flush()
+    return windows
+
+
+@pytest.mark.skipif(not HAS_XVFB, reason="需要xcffib和Xvfb")
+def test_xvfb_tiling_is_pipelined():
+    from x11_backend import X11Backend
+    process, display, helper = _start_xvfb()
+    try:
+        windows = _create_windows(helper, [
+            ("gas1 - bash", "gnome-terminal-server\0Gnome-terminal\0", 201),
+            ("gas2 - bash", "xterm\0XTerm\0", 202),
+            ("gas3 - vim", "kitty\0kitty\0", 203),
+            ("gas - Mozilla Firefox", "Navigator\0firefox\0", 204),
+        ])
+        backend = X11Backend(display)
+        tiler = TerminalTiler(backend)
+
+        trips = backend.round_trips
+        found = tiler.find_terminal_windows("gas")
+        # 列表一次往返，WM_CLASS一次，标题/进程/位置一次
+        assert backend.round_trips - trips <= 3
+        assert sorted(hwnd for hwnd, _ in found) == sorted(windows[:3])
+        assert backend.get_pid(windows[0]) == 201
+
+        flushes = backend.flushes
+        tiler.tile_windows_vertical(found)
+        # 所有移动在一次flush中发出
+        assert backend.flushes - flushes == 1
+        rects = [backend.get_rect(hwnd) for hwnd in windows[:3]]
+        assert len(set(rects)) == 3 and all(rect[2] > 300 for rect in rects)
+
+        # 已在目标位置: 不再发出任何修改
+        flushes = backend.flushes
+        tiler.tile_windows_vertical(tiler.find_terminal_windows("gas"))
+        assert backend.flushes == flushes
+        backend.close()
+    finally:
+        helper.disconnect()
+        process.kill()
+        process.wait()
+
+
+if __name__ == "__main__":
+    test_parse_wm_class()
+    test_frame_and_client_rects()
+    test_moveresize_flags()
+    test_size_hints_metrics()
+    if HAS_XVFB:
+        test_xvfb_tiling_is_pipelined()
+    else:
+        print("跳过 test_xvfb_tiling_is_pipelined: 需要xcffib和Xvfb")
+    print("X11后端测试完成!")
@@ -0,0 +1,790 @@
+#!/usr/bin/env python3
+"""
+终端平铺管理器的核心
+查找、列出、平铺和隐藏终端窗口；命令行解析与入口见 terminal_tiler.py。
+与入口脚本分开是为了使用缓存的字节码: 作为脚本运行的文件每次启动都要重新编译
+"""
+
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Sequence, Tuple, Optional
+
+from window_backend import Rect, WindowBackend, WindowRecord, create_backend
+from window_index import SORT_KEYS, WindowIndex, order_records
+from geometry import AsyncPlacer, CommitResult, GeometryCommitter, Placement
+from profiler import NULL_PROFILER, Profiler
+from metrics import NULL_METRICS, Metrics
+from output import Reporter, create_reporter
+
+if TYPE_CHECKING:
+    from cell_grid import CellCache
+    from monitors import Monitor, MonitorTopology
+
+# --list 流式输出时每列出多少个窗口写出一次
+LIST_FLUSH_EVERY = 50
+
+class TerminalTiler:
+    """终端平铺管理器"""
+    
+    def __init__(self, backend: Optional[WindowBackend] = None, index_ttl: float = 2.0,
+                 async_placement: bool = False, deadline: float = 1.0,
+                 tolerance: Optional[int] = 2):
+        self.backend = backend or create_backend()
+        # 所有查找/列出/隐藏操作共用的窗口索引
+        self.index = WindowIndex(self.backend, ttl=index_ttl)
+        # 布局方案统一通过批量提交器应用，已在目标位置的窗口（容差tolerance像素）会被跳过
+        self.committer = GeometryCommitter(self.backend, tolerance=tolerance)
+        # 异步模式: 不等待单个窗口响应，超过截止时间的窗口记为掉队者
+        self.async_placement = async_placement
+        # 增量布局: 按窗口当前位置分配槽位，窗口加入/离开时其余窗口尽量不动
+        self.incremental = False
+        # 窗口数超过显示器容量时的处理: 'spill' 照常排列（超出屏幕），'cascade' 每个槽位层叠多个窗口，
+        # 'page' 分页显示；page为显示的页码（从1开始）、'next' 下一页或 'current' 当前显示的页
+        self.overflow = 'spill'
+        self.page = None
+        # 最近一次分页平铺显示的 (页码, 总页数)
+        self.shown_page: Optional[Tuple[int, int]] = None
+        self.placer = AsyncPlacer(self.backend, deadline=deadline, tolerance=tolerance)
+        self.screen_width = 1920
+        self.screen_height = 1080
+        try:
+            self.screen_width, self.screen_height = self.backend.get_screen_size()
+        except Exception:
+            pass
+        # 显示器拓扑（工作区、DPI），首次使用时创建
+        self._topology = None
+        # 目标显示器: 'auto' 主显示器放不下时按容量分布到其他显示器，'all' 总是分布，整数为显示器序号
+        self.monitor = 'auto'
+        # 布局快照存储，首次使用时创建
+        self.layout_store = None
+        # 按进程属性选择窗口的条件（None为不限制）与进程信息缓存（首次使用时创建）
+        self.selector = None
+        self.process_cache = None
+        # 跨运行的句柄缓存（None为不使用，命令行运行时由main创建）；rescan为True时总是完整枚举
+        self.handle_cache = None
+        self.rescan = False
+        # 按窗口类缓存的字符网格，首次使用时创建（cells_path由main设置时保存在磁盘上）；
+        # cell_align为True时目标矩形取整到整行整列
+        self._cells = None
+        self.cells_path: Optional[str] = None
+        self.cell_align = True
+        # 找到的窗口的类名，对齐时按类查找字符网格
+        self._classes: Dict[int, str] = {}
+        self.profiler = NULL_PROFILER
+        # 长期运行指标: 总是在内存中记录，metrics_sink不为None时（命令行运行时由main设置）
+        # 由flush_metrics写出到文件
+        self.metrics = NULL_METRICS
+        self.metrics_sink = None
+        self.set_metrics(Metrics())
+        # 输出层: 直接调用方法时立即输出，命令行运行时由configure换成缓冲/JSON报告器
+        self.out = Reporter(buffered=False)
+        self.out.prefix = self._prefix
+    
+    def set_profiler(self, profiler):
+        """启用（或用NULL_PROFILER关闭）各阶段的计时"""
+        self.profiler = profiler
+        self.index.profiler = profiler
+        self.committer.profiler = profiler
+    
+    def set_metrics(self, metrics):
+        """启用（或用NULL_METRICS关闭）指标记录"""
+        self.metrics = metrics
+        self.index.metrics = metrics
+        self.committer.metrics = metrics
+        self.placer.metrics = metrics
+    
+    def flush_metrics(self):
+        """把上次写出以来的指标增量写到文件（未设置metrics_sink时只在内存中累计）"""
+        if not self.metrics.enabled:
+            return
+        delta = self.metrics.drain()
+        if self.metrics_sink is not None:
+            try:
+                self.metrics_sink.write(delta)
+            except OSError as e:
+                self.out.emit('error', message=f"写出指标时出错: {e}")
+    
+    def configure(self, args):
+        """按命令行参数调整放置选项（守护进程中每个请求都会调用）"""
+        self.async_placement = args.async_placement
+        self.placer.deadline = args.deadline
+        tolerance = None if args.force else args.tolerance
+        self.committer.tolerance = tolerance
+        self.placer.tolerance = tolerance
+        self.monitor = args.monitor
+        self.incremental = args.incremental
+        self.page = args.page
+        self.overflow = 'page' if args.page is not None else args.overflow
+        self.rescan = args.rescan
+        self.cell_align = args.cell_align
+        self.selector = None
+        if args.pid or args.exe or args.cmdline or args.parent:
+            from processes import ProcessSelector
+            self.selector = ProcessSelector.from_args(args)
+        self.set_profiler(Profiler() if args.profile or args.trace else NULL_PROFILER)
+        self.out = create_reporter(args)
+        self.out.prefix = self._prefix
+    
+    @property
+    def topology(self) -> 'MonitorTopology':
+        """显示器拓扑（工作区、DPI），缓存并在显示器变化时重新枚举"""
+        if self._topology is None:
+            from monitors import MonitorTopology, StaticMonitorSource
+            try:
+                source = self.backend.monitor_source()
+            except Exception:
+                source = StaticMonitorSource.single(self.screen_width, self.screen_height)
+            self._topology = MonitorTopology(source)
+        return self._topology
+    
+    @property
+    def cells(self) -> 'CellCache':
+        """按窗口类缓存的字符网格"""
+        if self._cells is None:
+            from cell_grid import CellCache
+            self._cells = CellCache(self.cells_path, backend=self.backend.name)
+        return self._cells
+    
+    @property
+    def _prefix(self) -> str:
+        """模拟后端的输出前缀"""
+        return "模拟" if self.backend.simulated else ""
+    
+    def _calculate_optimal_grid(self, num_windows: int, prefer_vertical: bool = True,
+                                gap: int = 5) -> Tuple[int, List[int]]:
+        """
+        在目标显示器上平铺num_windows个窗口时实际使用的网格布局 (列数, 每列的行数)，
+        与 _plan_region 相同，见 layout_planner.solve_grid
+        """
+        from layout_planner import (HORIZONTAL, HORIZONTAL_CONSTRAINTS, VERTICAL, VERTICAL_CONSTRAINTS,
+                                    scale_constraints, solve_grid)
+        orientation = VERTICAL if prefer_vertical else HORIZONTAL
+        monitor = self.target_monitor
+        base = VERTICAL_CONSTRAINTS if prefer_vertical else HORIZONTAL_CONSTRAINTS
+        _, _, width, height = monitor.work_area
+        cols, rows_per_col = solve_grid(num_windows, width, height, gap,
+                                        scale_constraints(base, monitor.scale), orientation)
+        return cols, list(rows_per_col)
+    
+    @property
+    def target_monitor(self) -> 'Monitor':
+        """不分布到多个显示器时使用的显示器: 指定的显示器，默认为主显示器"""
+        if isinstance(self.monitor, int):
+            return self.topology.get(self.monitor)
+        return self.topology.primary()
+    
+    @property
+    def work_area(self) -> Rect:
+        """平铺使用的工作区 (x, y, 宽, 高)，默认为主显示器去掉任务栏后的区域"""
+        return self.target_monitor.work_area
+    
+    def _target_monitors(self, count: int, gap: int, orientation: str) -> List[Tuple['Monitor', int]]:
+        """
+        决定窗口在各显示器上的数量
+        主显示器放不下（窗口会小于最小尺寸或超出屏幕）时按各显示器容量比例分布
+        """
+        from layout_planner import (HORIZONTAL_CONSTRAINTS, VERTICAL, VERTICAL_CONSTRAINTS, capacity,
+                                    distribute, scale_constraints)
+        if isinstance(self.monitor, int):
+            return [(self.topology.get(self.monitor), count)]
+        monitors = self.topology.monitors()
+        base = VERTICAL_CONSTRAINTS if orientation == VERTICAL else HORIZONTAL_CONSTRAINTS
+        capacities = [capacity(monitor.work_area, gap, scale_constraints(base, monitor.scale), orientation)
+                      for monitor in monitors]
+        if len(monitors) == 1 or (self.monitor != 'all' and count <= capacities[0]):
+            return [(monitors[0], count)]
+        return list(zip(monitors, distribute(count, capacities)))
+    
+    def _plan_placements(self, windows: List[Tuple[int, str]], gap: int,
+                         orientation: str) -> List[Placement]:
+        """
+        按显示器分组规划布局，返回整个布局方案
+        """
+        targets = [(monitor, count) for monitor, count in
+                   self._target_monitors(len(windows), gap, orientation) if count]
+        multi = len(targets) > 1
+        
+        placements = []
+        start = 0
+        for monitor, count in targets:
+            chunk = windows[start:start + count]
+            start += count
+            where = f"显示器{monitor.index + 1} " if multi else ""
+            placements.extend(self._plan_region(chunk, gap, orientation, monitor,
+                                                monitor.work_area, where, multi=multi))
+        return placements
+    
+    def _plan_region(self, windows: List[Tuple[int, str]], gap: int, orientation: str,
+                     monitor: 'Monitor', area: Rect, where: str = "", **fields) -> List[Placement]:
+        """
+        在显示器上的一个区域内规划布局，fields附加到plan事件
+        """
+        from layout_planner import (HORIZONTAL_CONSTRAINTS, VERTICAL, VERTICAL_CONSTRAINTS,
+                                    plan_incremental, plan_layout, scale_constraints)
+        vertical = orientation == VERTICAL
+        base = VERTICAL_CONSTRAINTS if vertical else HORIZONTAL_CONSTRAINTS
+        constraints = scale_constraints(base, monitor.scale)
+        if self.incremental:
+            plan, order = plan_incremental(self._current_rects(windows), area, gap, constraints,
+                                           orientation)
+        else:
+            plan = plan_layout(len(windows), area, gap, constraints, orientation)
+            order = range(len(windows))
+        self.out.emit('plan', monitor=monitor.index, orientation=orientation,
+                      cols=plan.cols, rows=plan.max_rows,
+                      width=plan.window_width, height=plan.window_height, **fields)
+        
+        placements = []
+        for (hwnd, title), slot in zip(windows, order):
+            col, row = plan.slots[slot]
+            label = f"第{col+1}列第{row+1}行" if vertical else f"第{row+1}行第{col+1}列"
+            placements.append(Placement(hwnd, title, plan.rects[slot], where + label))
+        return placements
+    
+    def _current_rects(self, windows: List[Tuple[int, str]]) -> List[Optional[Rect]]:
+        """窗口的当前矩形，最小化或无法读取的窗口为None"""
+        backend = self.backend
+        backend.prefetch([hwnd for hwnd, _ in windows])
+        rects = []
+        for hwnd, _ in windows:
+            try:
+                rects.append(None if backend.is_minimized(hwnd) else backend.get_rect(hwnd))
+            except Exception:
+                rects.append(None)
+        return rects
+    
+    def _processes(self):
+        """进程信息缓存，当前平台无法读取进程信息时返回None"""
+        if self.process_cache is None:
+            source = self.backend.process_source()
+            if source is None:
+                return None
+            from processes import ProcessCache, default_cache_path
+            self.process_cache = ProcessCache(source, default_cache_path())
+        return self.process_cache
+    
+    def _select(self, records: Iterable[WindowRecord]) -> Iterator[WindowRecord]:
+        """逐个产生满足进程条件 (--pid / --exe / --cmdline / --parent) 的窗口"""
+        selector = self.selector
+        if selector is None:
+            yield from records
+            return
+        cache = None
+        if selector.needs_metadata:
+            cache = self._processes()
+            if cache is None:
+                self.out.emit('error', message="错误: 当前平台无法读取进程信息")
+                return
+        for record in records:
+            if selector.matches(record.pid, cache):
+                yield record
+    
+    def filter_records(self, records: List[WindowRecord]) -> List[WindowRecord]:
+        """按进程条件过滤窗口"""
+        if self.selector is None or not records:
+            return records
+        with self.profiler.phase('process'):
+            return list(self._select(records))
+    
+    def save_caches(self):
+        """把本次运行更新过的缓存写回磁盘"""
+        if self.handle_cache is not None:
+            self.profiler.count('handle_hits', self.handle_cache.hits)
+            self.profiler.count('handle_misses', self.handle_cache.misses + self.handle_cache.stale)
+            try:
+                self.handle_cache.save()
+            except OSError as e:
+                self.out.emit('error', message=f"保存句柄缓存时出错: {e}")
+        try:
+            if self._cells is not None:
+                self._cells.save()
+        except OSError as e:
+            self.out.emit('error', message=f"保存字符网格缓存时出错: {e}")
+        if self.process_cache is not None:
+            self.profiler.count('process_hits', self.process_cache.hits)
+            self.profiler.count('process_misses', self.process_cache.misses)
+            try:
+                self.process_cache.save()
+            except OSError as e:
+                self.out.emit('error', message=f"保存进程缓存时出错: {e}")
+    
+    def _match_groups(self, keywords: Sequence[str]) -> List[List[WindowRecord]]:
+        """
+        各关键字分组标题匹配的终端窗口（按关键字顺序，尚未按进程条件过滤）
+        有句柄缓存时先校验上次运行的结果，缓存不可用时才枚举所有顶层窗口
+        """
+        cache = self.handle_cache
+        if cache is not None and not self.rescan:
+            with self.profiler.phase('handle_cache'):
+                groups = cache.lookup(keywords, self.backend)
+            if groups is not None:
+                return groups
+        if len(keywords) == 1:
+            groups = [self.index.find(keywords[0])]
+        else:
+            groups = list(self.index.find_groups(keywords).values())
+        if cache is not None:
+            cache.store(keywords, groups, self.index.signature)
+        return groups
+    
+    def _stream_matches(self, keyword: Optional[str]) -> Iterator[WindowRecord]:
+        """
+        逐个产生标题匹配关键字的终端窗口（keyword为None时为所有终端）
+        句柄缓存不可用时边枚举边匹配；只有完整迭代后才更新句柄缓存
+        """
+        cache = self.handle_cache if keyword else None
+        if cache is not None and not self.rescan:
+            with self.profiler.phase('handle_cache'):
+                groups = cache.lookup([keyword], self.backend)
+            if groups is not None:
+                yield from groups[0]
+                return
+        matched = []
+        for record in self.index.stream(keyword):
+            matched.append(record)
+            yield record
+        if cache is not None:
+            cache.store([keyword], [matched], self.index.signature)
+    
+    def iter_terminal_windows(self, keyword: Optional[str]) -> Iterator[WindowRecord]:
+        """
+        逐个产生匹配关键字且满足进程条件的终端窗口（不输出事件）
+        调用方得到足够的窗口后停止迭代，剩余的窗口不会被查询
+        """
+        return self._select(self._stream_matches(keyword))
+    
+    def find_terminal_windows(self, keyword: Optional[str], limit: Optional[int] = None,
+                              sort_by: Optional[str] = None) -> List[Tuple[int, str]]:
+        """
+        查找标题匹配关键字（子串、通配符或正则）且满足进程条件的终端窗口
+        keyword为None时只按进程条件选择
+        limit: 最多返回的窗口数；不排序时找到足够的窗口即停止枚举
+        sort_by: 排序方式，见 window_index.SORT_KEYS（默认按Z序）
+        返回: [(窗口句柄, 窗口标题), ...]
+        """
+        windows = []
+        try:
+            if limit is not None:
+                with self.profiler.phase('enumerate'):
+                    records = order_records(self.iter_terminal_windows(keyword), sort_by, limit)
+            else:
+                if keyword:
+                    records = self._match_groups([keyword])[0]
+                else:
+                    records = [record for record in self.index.terminals() if record.title]
+                records = order_records(self.filter_records(records), sort_by)
+            with self.profiler.phase('output'):
+                emit = self.out.emit
+                for record in records:
+                    windows.append((record.hwnd, record.title))
+                    self._classes[record.hwnd] = record.class_name
+                    emit('found', hwnd=record.hwnd, title=record.title, class_name=record.class_name)
+        except Exception as e:
+            self.out.emit('error', message=f"枚举窗口时出错: {e}")
+        self.profiler.count('matched', len(windows))
+        self.metrics.inc('tiler_windows_total', len(windows), result='matched')
+        
+        return windows
+    
+    def find_groups(self, keywords: Sequence[str], limit: Optional[int] = None,
+                    sort_by: Optional[str] = None) -> Dict[str, List[Tuple[int, str]]]:
+        """
+        一次枚举查找多个关键字分组，同时匹配多个分组的窗口只归入第一个分组
+        limit / sort_by 作用于每个分组
+        返回: {关键字: [(窗口句柄, 窗口标题), ...]}，按关键字顺序
+        """
+        groups: Dict[str, List[Tuple[int, str]]] = {keyword: [] for keyword in keywords}
+        try:
+            matched = {keyword: order_records(self.filter_records(records), sort_by, limit)
+                       for keyword, records in zip(keywords, self._match_groups(keywords))}
+            with self.profiler.phase('output'):
+                emit = self.out.emit
+                for keyword, records in matched.items():
+                    for record in records:
+                        groups[keyword].append((record.hwnd, record.title))
+                        self._classes[record.hwnd] = record.class_name
+                        emit('found', hwnd=record.hwnd, title=record.title,
+                             class_name=record.class_name, group=keyword)
+        except Exception as e:
+            self.out.emit('error', message=f"枚举窗口时出错: {e}")
+        matched = sum(len(windows) for windows in groups.values())
+        self.profiler.count('matched', matched)
+        self.metrics.inc('tiler_windows_total', matched, result='matched')
+        
+        return groups
+    
+    def tile_groups(self, groups: Dict[str, List[Tuple[int, str]]], gap: int = 5,
+                    horizontal: bool = False,
+                    weights: Optional[Sequence[float]] = None) -> Optional[CommitResult]:
+        """
+        把多个分组平铺到同一显示器的相邻区域，所有分组一次批量提交
+        weights为各分组区域的比例（默认均分）；没有窗口的分组不占区域，空间按比例分给其他分组
+        """
+        if weights is None:
+            weights = [1] * len(groups)
+        active = [(keyword, windows, weight)
+                  for (keyword, windows), weight in zip(groups.items(), weights) if windows]
+        if not active:
+            self.out.text("没有找到要平铺的窗口")
+            return None
+        
+        from layout_planner import HORIZONTAL, VERTICAL, split_regions
+        orientation = HORIZONTAL if horizontal else VERTICAL
+        monitor = self.target_monitor
+        self.out.text(f"开始分区平铺 {len(active)} 个分组...")
+        with self.profiler.phase('plan'), self.metrics.time('tiler_operation_seconds', operation='plan'):
+            regions = split_regions(monitor.work_area, [weight for _, _, weight in active],
+                                    gap, orientation)
+            placements = []
+            for (keyword, windows, _), region in zip(active, regions):
+                placements.extend(self._plan_region(windows, gap, orientation, monitor, region,
+                                                    f"{keyword} ", multi=False, group=keyword))
+        return self._apply_placements(placements)
+    
+    def tile_windows_vertical(self, windows: List[Tuple[int, str]], gap: int = 5):
+        """
+        智能垂直平铺窗口
+        当窗口数量较多时自动使用多列布局，并限制窗口高度避免过长
+        """
+        if not windows:
+            self.out.text("没有找到要平铺的窗口")
+            return
+        
+        num_windows = len(windows)
+        self.out.text(f"开始智能垂直平铺 {num_windows} 个窗口...")
+        
+        # 按列排列，高度限制在 VERTICAL_CONSTRAINTS 范围内
+        from layout_planner import VERTICAL
+        return self._tile(windows, gap, VERTICAL)
+    
+    def tile_windows_horizontal(self, windows: List[Tuple[int, str]], gap: int = 5):
+        """
+        智能水平平铺窗口
+        当窗口数量较多时自动使用多行布局，保持合理的窗口宽度
+        """
+        if not windows:
+            self.out.text("没有找到要平铺的窗口")
+            return
+        
+        num_windows = len(windows)
+        self.out.text(f"开始智能水平平铺 {num_windows} 个窗口...")
+        
+        # 按行优先填充，宽度限制在 HORIZONTAL_CONSTRAINTS 范围内
+        from layout_planner import HORIZONTAL
+        return self._tile(windows, gap, HORIZONTAL)
+    
+    def _tile(self, windows: List[Tuple[int, str]], gap: int, orientation: str) -> CommitResult:
+        """规划并应用布局；窗口数超过显示器容量时按 self.overflow 层叠或分页"""
+        self.shown_page = None
+        with self.profiler.phase('plan'), self.metrics.time('tiler_operation_seconds', operation='plan'):
+            size = self._overflow_capacity(gap, orientation)
+            if size and len(windows) > size and self.overflow == 'page':
+                return self._tile_page(windows, gap, orientation, size)
+            if size and len(windows) > size and self.overflow == 'cascade':
+                placements = self._plan_cascade(windows, gap, orientation, size)
+            else:
+                placements = self._plan_placements(windows, gap, orientation)
+        return self._apply_placements(placements)
+    
+    def _overflow_capacity(self, gap: int, orientation: str) -> int:
+        """目标显示器上不超出屏幕、且满足最小尺寸时最多能平铺的窗口数（不处理溢出时为0）"""
+        if self.overflow == 'spill':
+            return 0
+        from layout_planner import (HORIZONTAL_CONSTRAINTS, VERTICAL, VERTICAL_CONSTRAINTS, capacity,
+                                    scale_constraints)
+        if isinstance(self.monitor, int):
+            monitors = [self.topology.get(self.monitor)]
+        else:
+            monitors = self.topology.monitors()
+        base = VERTICAL_CONSTRAINTS if orientation == VERTICAL else HORIZONTAL_CONSTRAINTS
+        return max(1, sum(capacity(monitor.work_area, gap, scale_constraints(base, monitor.scale),
+                                   orientation) for monitor in monitors))
+    
+    def _plan_cascade(self, windows: List[Tuple[int, str]], gap: int, orientation: str,
+                      size: int) -> List[Placement]:
+        """只规划size个槽位，第i个槽位层叠第 i, i+size, i+2*size ... 个窗口"""
+        from layout_planner import CASCADE_OFFSET, cascade_rects
+        self.out.text(f"窗口数超过容量 {size}，每个槽位层叠 {-(-len(windows) // size)} 层")
+        stacks = {hwnd: windows[index::size] for index, (hwnd, _) in enumerate(windows[:size])}
+        monitors = self.topology.monitors()
+        placements = []
+        for slot in self._plan_placements(windows[:size], gap, orientation):
+            x, y = slot.rect[:2]
+            monitor = next((m for m in monitors if m.work_area[0] <= x < m.work_area[0] + m.work_area[2]
+                            and m.work_area[1] <= y < m.work_area[1] + m.work_area[3]), monitors[0])
+            stack = stacks[slot.hwnd]
+            rects = cascade_rects(slot.rect, len(stack), int(CASCADE_OFFSET * monitor.scale))
+            for depth, ((hwnd, title), rect) in enumerate(zip(stack, rects)):
+                placements.append(Placement(hwnd, title, rect, f"{slot.label} 第{depth + 1}层"))
+        return placements
+    
+    def _tile_page(self, windows: List[Tuple[int, str]], gap: int, orientation: str,
+                   size: int) -> CommitResult:
+        """
+        分页: 只移动/还原当前页的窗口，其他页中仍显示的窗口一批最小化
+        窗口按标题排序后分页，每页只检查一个窗口的显示状态，只有显示中的页逐个检查；
+        每次调用的操作量与页大小成正比，与分组大小无关
+        """
+        ordered = sorted(windows, key=lambda window: (window[1].lower(), window[0]))
+        pages = [ordered[start:start + size] for start in range(0, len(ordered), size)]
+        shown_pages = self._shown_pages(pages)
+        if self.page in ('next', 'current'):
+            visible = shown_pages[0] if shown_pages else -1
+            index = (visible + 1) % len(pages) if self.page == 'next' else max(visible, 0)
+        else:
+            index = min(self.page or 1, len(pages)) - 1
+        shown = pages[index]
+        self.shown_page = (index + 1, len(pages))
+        self.out.emit('page', page=index + 1, pages=len(pages), count=len(shown), total=len(windows))
+        placements = self._plan_placements(shown, gap, orientation)
+        result = self._apply_placements(placements)
+        
+        # 只最小化其他页中仍在显示的窗口
+        backend = self.backend
+        others = [window for i in shown_pages if i != index for window in pages[i]]
+        backend.prefetch([hwnd for hwnd, _ in others])
+        visible = []
+        for hwnd, title in others:
+            try:
+                if not backend.is_minimized(hwnd):
+                    visible.append((hwnd, title))
+            except Exception:
+                continue
+        if visible:
+            with self.profiler.phase('hide'):
+                self.hide_windows(visible)
+        return result
+    
+    def _shown_pages(self, pages: List[List[Tuple[int, str]]]) -> List[int]:
+        """
+        显示中的页的序号: 同一页的窗口一起还原、一起最小化，每页只检查第一个窗口
+        （而不是每次翻页都检查分组中的所有窗口）
+        """
+        backend = self.backend
+        backend.prefetch([page[0][0] for page in pages])
+        shown = []
+        for index, page in enumerate(pages):
+            try:
+                if not backend.is_minimized(page[0][0]):
+                    shown.append(index)
+            except Exception:
+                continue
+        return shown
+    
+    def _apply_placements(self, placements: List[Placement]) -> CommitResult:
+        """
+        一次性提交布局方案并输出结果
+        """
+        profiler = self.profiler
+        metrics = self.metrics
+        if self.cell_align or metrics.enabled:
+            with profiler.phase('cells'):
+                placements = self._annotate(placements)
+        with profiler.phase('apply'), metrics.time('tiler_operation_seconds', operation='apply'):
+            if self.async_placement:
+                result = self.placer.place(placements)
+            else:
+                result = self.committer.commit(placements)
+        if self.cell_align and not self.async_placement:
+            with profiler.phase('cells'):
+                self._observe_cells(placements, result)
+        profiler.count('moved', result.moved)
+        profiler.count('raised', len(result.raised))
+        profiler.count('skipped', len(result.skipped))
+        profiler.count('failed', len(result.failed))
+        profiler.count('stragglers', len(result.stragglers))
+        self._count_result(placements, result)
+        with profiler.phase('output'):
+            self._print_result(placements, result)
+        return result
+    
+    def _class_name(self, hwnd: int) -> str:
+        class_name = self._classes.get(hwnd)
+        if class_name is None:
+            try:
+                class_name = self.backend.get_class_name(hwnd)
+            except Exception:
+                class_name = ''
+            self._classes[hwnd] = class_name
+        return class_name
+    
+    def _annotate(self, placements: List[Placement]) -> List[Placement]:
+        """
+        记录每个窗口的类名（指标按窗口类统计）；cell_align时把已知字符网格的窗口的
+        目标矩形取整到整行整列（不超出原来的槽位）
+        """
+        from cell_grid import align_rect
+        annotated = []
+        for placement in placements:
+            class_name = self._class_name(placement.hwnd)
+            placement = placement._replace(class_name=class_name)
+            if self.cell_align:
+                metrics = self.cells.metrics(class_name, placement.hwnd, self.backend)
+                if metrics is not None:
+                    placement = placement._replace(rect=align_rect(placement.rect, metrics), cells=metrics)
+            annotated.append(placement)
+        return annotated
+    
+    def _observe_cells(self, placements: List[Placement], result: CommitResult):
+        """字符网格未知或是学到的窗口调整大小后读取实际尺寸，供字符网格缓存学习和核对"""
+        moved = {placement.hwnd for placement in result.placed} - {placement.hwnd for placement in result.raised}
+        observed = [placement for placement in placements if placement.hwnd in moved
+                    and self.cells.needs_samples(self._class_name(placement.hwnd))]
+        if not observed:
+            return
+        backend = self.backend
+        backend.prefetch([placement.hwnd for placement in observed])
+        for placement in observed:
+            try:
+                actual = backend.get_rect(placement.hwnd)
+            except Exception:
+                continue
+            self.cells.observe(self._class_name(placement.hwnd), placement.rect, actual)
+    
+    def _count_result(self, placements: List[Placement], result: CommitResult):
+        """窗口计数与按窗口类的失败计数"""
+        inc = self.metrics.inc
+        for name, count in (('moved', result.moved), ('raised', len(result.raised)),
+                            ('skipped', len(result.skipped)), ('failed', len(result.failed)),
+                            ('stragglers', len(result.stragglers))):
+            if count:
+                inc('tiler_windows_total', count, result=name)
+        if result.failed or result.stragglers:
+            classes = {placement.hwnd: placement.class_name for placement in placements}
+            for hwnd in result.failed:
+                inc('tiler_failures_total', action='tile', window_class=classes.get(hwnd, ''))
+            for hwnd in result.stragglers:
+                inc('tiler_failures_total', action='tile_timeout', window_class=classes.get(hwnd, ''))
+    
+    def _count_hidden(self, hwnds: List[int], failed: Iterable[int]):
+        failed = set(failed)
+        inc = self.metrics.inc
+        if len(hwnds) > len(failed):
+            inc('tiler_windows_total', len(hwnds) - len(failed), result='hidden')
+        for hwnd in failed:
+            inc('tiler_failures_total', action='hide', window_class=self._class_name(hwnd))
+    
+    def _print_result(self, placements: List[Placement], result: CommitResult):
+        emit = self.out.emit
+        skipped = {placement.hwnd for placement in result.skipped}
+        for placement in placements:
+            hwnd, title = placement.hwnd, placement.title
+            if hwnd in result.failed:
+                emit('failed', hwnd=hwnd, title=title, action='tile', error=result.failed[hwnd])
+            elif hwnd in result.stragglers:
+                emit('timeout', hwnd=hwnd, title=title, action='tile')
+            elif hwnd in skipped:
+                emit('skipped', hwnd=hwnd, title=title, label=placement.label)
+            else:
+                emit('placed', hwnd=hwnd, title=title, label=placement.label, rect=placement.rect)
+        if result.unsettled:
+            emit('unsettled', count=len(result.unsettled), timeout=self.committer.settle_timeout)
+        emit('result', moved=result.moved, raised=len(result.raised), skipped=len(result.skipped))
+    
+    def list_all_terminals(self, limit: Optional[int] = None,
+                           sort_by: Optional[str] = None) -> List[WindowRecord]:
+        """
+        列出所有终端窗口
+        不排序时边枚举边输出（每LIST_FLUSH_EVERY个窗口写出一次），窗口很多时也能立即看到结果
+        """
+        self.out.text("搜索所有终端窗口...")
+        records: Iterable[WindowRecord] = self.index.stream()
+        if sort_by in SORT_KEYS:
+            records = order_records(records, sort_by, limit)
+        elif limit is not None:
+            records = islice(records, limit)
+        
+        listed = []
+        emit = self.out.emit
+        for record in records:
+            if not listed:
+                self.out.text("终端窗口:")
+            listed.append(record)
+            emit('terminal', hwnd=record.hwnd, title=record.title, class_name=record.class_name)
+            if len(listed) % LIST_FLUSH_EVERY == 0:
+                self.out.flush()
+        
+        if listed:
+            self.out.text(f"共 {len(listed)} 个终端窗口")
+        else:
+            self.out.text("未找到任何终端窗口")
+        return listed
+    
+    def _layouts(self):
+        if self.layout_store is None:
+            from layouts import LayoutStore
+            self.layout_store = LayoutStore()
+        return self.layout_store
+    
+    def save_layout(self, name: str, keyword: Optional[str] = None) -> int:
+        """
+        保存匹配关键字（未提供时为全部终端）的窗口位置和状态为命名布局
+        返回保存的窗口数
+        """
+        from layouts import SnapshotEntry
+        store = self._layouts()
+        snap = self.index.snapshot(refresh=True)
+        records = snap.match(keyword) if keyword else [r for r in snap.records if r.title]
+        entries = []
+        for record in records:
+            try:
+                minimized = self.backend.is_minimized(record.hwnd)
+            except Exception:
+                # 窗口在保存过程中被关闭
+                continue
+            entries.append(SnapshotEntry(record.title, record.class_name, record.pid,
+                                         record.rect, minimized))
+        store.save(name, entries)
+        self.out.emit('layout_saved', name=name, count=len(entries), path=store.path(name))
+        return len(entries)
+    
+    def restore_layout(self, name: str) -> CommitResult:
+        """
+        恢复命名布局: 一次枚举重新找到窗口，全部位置一次批量提交
+        """
+        from layouts import resolve
+        store = self._layouts()
+        try:
+            entries = store.load(name)
+        except ValueError as e:
+            names = store.names()
+            raise ValueError(f"{e}，可用布局: {', '.join(names)}" if names else str(e))
+        pairs, missing = resolve(entries, self.index.snapshot(refresh=True).records)
+        self.out.emit('layout_restored', name=name, found=len(pairs), total=len(entries))
+        for entry in missing:
+            self.out.emit('layout_missing', title=entry.title, class_name=entry.class_name)
+        
+        placements = [Placement(record.hwnd, record.title, entry.rect, f"布局 {name}")
+                      for entry, record in pairs if not entry.minimized]
+        result = self._apply_placements(placements)
+        minimized = [(record.hwnd, record.title) for entry, record in pairs if entry.minimized]
+        if minimized:
+            self.hide_windows(minimized)
+        return result
+    
+    def hide_windows(self, windows: List[Tuple[int, str]]):
+        """
+        最小化给定的终端窗口
+        """
+        emit = self.out.emit
+        hwnds = [hwnd for hwnd, _ in windows]
+        if self.async_placement:
+            with self.metrics.time('tiler_operation_seconds', operation='hide'):
+                result = self.placer.hide(hwnds)
+            self._count_hidden(hwnds, list(result.failed) + result.stragglers)
+            for hwnd, title in windows:
+                if hwnd in result.failed:
+                    emit('failed', hwnd=hwnd, title=title, action='hide', error=result.failed[hwnd])
+                elif hwnd in result.stragglers:
+                    emit('timeout', hwnd=hwnd, title=title, action='hide')
+                else:
+                    emit('hidden', hwnd=hwnd, title=title)
+            return result
+        
+        with self.metrics.time('tiler_backend_call_seconds', call='minimize_batch'):
+            failed = self.backend.minimize_batch(hwnds)
+        self._count_hidden(hwnds, failed)
+        for hwnd, title in windows:
+            if hwnd in failed:
+                emit('failed', hwnd=hwnd, title=title, action='hide', error=failed[hwnd])
+            else:
+                emit('hidden', hwnd=hwnd, title=title)
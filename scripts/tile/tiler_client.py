@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+终端平铺守护进程的命令行客户端
+参数与 terminal_tiler.py 相同，请求转发给已启动的守护进程执行:
+  python terminal_tiler.py --daemon      # 先启动守护进程
+  python tiler_client.py gas --horizontal
+"""
+
+import sys
+
+from tiler_daemon import TilerClient
+
+
+def main() -> int:
+    argv = sys.argv[1:]
+    try:
+        with TilerClient() as client:
+            if argv == ['--shutdown']:
+                response = client.request(action='shutdown')
+            else:
+                response = client.request(argv)
+    except OSError as e:
+        print(f"无法连接终端平铺守护进程: {e}")
+        print("请先运行: python terminal_tiler.py --daemon")
+        return 2
+
+    if response.get('output'):
+        sys.stdout.write(response['output'])
+    if not response.get('ok'):
+        print(f"错误: {response.get('error')}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
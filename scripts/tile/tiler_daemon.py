@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+终端平铺守护进程
+常驻进程保持TerminalTiler实例、屏幕尺寸和窗口索引，
+通过本地套接字接收请求，避免每次操作都重新启动Python并导入pywin32
+
+协议: 每行一个UTF-8编码的JSON对象
+  请求: {"id": 1, "token": "...", "argv": ["gas", "--horizontal"]}   与命令行参数一致
+        {"id": 2, "token": "...", "action": "ping"} / {"id": 3, "token": "...", "action": "shutdown"}
+  响应: {"id": 1, "ok": true, "result": {...}, "output": "...", "elapsed_ms": 0.8}
+
+认证: 本机的其他进程（或浏览器通过跨协议请求）都能连接TCP端口，
+守护进程启动时生成随机令牌写入只有当前用户可读的令牌文件 (缓存目录下的 daemon.token)，
+每个请求都必须带上该令牌；令牌不符或不是JSON的请求直接断开连接。
+守护进程中不接受写入任意路径的参数 (--trace、--metrics-file、--save-layout)
+
+会移动窗口的请求持有运行队列 (run_queue.RunQueue) 的跨进程运行锁，不与同时启动的命令行实例交错
+"""
+
+import hmac
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Optional, Tuple
+
+DEFAULT_PORT = 47291
+# 守护进程中不接受的参数: 会写入请求指定的路径
+PATH_WRITING_OPTIONS = (('trace', '--trace'), ('metrics_file', '--metrics-file'),
+                        ('save_layout', '--save-layout'))
+
+
+def default_token_path() -> str:
+    """令牌文件，与进程缓存在同一目录（按用户隔离）"""
+    from processes import default_cache_path
+    return os.path.join(os.path.dirname(default_cache_path()), 'daemon.token')
+
+
+def write_token(path: str) -> str:
+    """生成新的随机令牌，写入只有当前用户可读写的文件"""
+    import secrets
+    token = secrets.token_hex(32)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if os.path.exists(path):
+        os.unlink(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w', encoding='ascii') as f:
+        f.write(token)
+    return token
+
+
+def read_token(path: Optional[str] = None) -> str:
+    with open(path or default_token_path(), encoding='ascii') as f:
+        return f.read().strip()
+
+
+def default_address() -> str:
+    """默认监听地址: Windows使用本机TCP端口，其他平台使用Unix套接字"""
+    override = os.environ.get('TERMINAL_TILER_ADDRESS')
+    if override:
+        return override
+    if sys.platform == 'win32' or not hasattr(socket, 'AF_UNIX'):
+        return f"tcp:127.0.0.1:{DEFAULT_PORT}"
+    return "unix:" + os.path.join(tempfile.gettempdir(), f"lch-terminal-tiler-{os.getuid()}.sock")
+
+
+def parse_address(address: str) -> Tuple[int, object]:
+    """把 unix:路径 / tcp:主机:端口 解析为 (地址族, 套接字地址)"""
+    scheme, _, rest = address.partition(':')
+    if scheme == 'unix':
+        return socket.AF_UNIX, rest
+    if scheme == 'tcp':
+        host, _, port = rest.rpartition(':')
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    raise ValueError(f"无法识别的地址: {address}")
+
+
+class TilerDaemon:
+    """
+    平铺守护进程
+    每个连接一个线程，请求处理通过锁串行执行；
+    queue不为None时，会移动窗口的请求还持有它的跨进程运行锁（由 terminal_tiler.main 传入）
+    """
+
+    def __init__(self, tiler, address: Optional[str] = None, parser=None, execute=None,
+                 token_path: Optional[str] = None, queue=None):
+        self.tiler = tiler
+        self.address = address or default_address()
+        self.token_path = token_path or default_token_path()
+        # serve_forever启动时生成
+        self._token: Optional[str] = None
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._stopping = False
+        if parser is None or execute is None:
+            # 延迟导入，客户端只需要本模块的协议部分
+            import terminal_tiler
+            parser = parser or terminal_tiler.build_parser()
+            execute = execute or terminal_tiler.execute
+        self._parser = parser
+        self._execute = execute
+        self.queue = queue
+
+    def authorized(self, request) -> bool:
+        """请求是否带有本次启动生成的令牌"""
+        token = request.get('token') if isinstance(request, dict) else None
+        return (self._token is not None and isinstance(token, str)
+                and hmac.compare_digest(token.encode('utf-8'), self._token.encode('utf-8')))
+
+    def handle(self, request: dict) -> dict:
+        """处理单个（已认证的）请求"""
+        start = time.perf_counter()
+        response = {'id': request.get('id'), 'ok': True}
+        action = request.get('action')
+        if action == 'ping':
+            response['result'] = {'pid': os.getpid()}
+        elif action == 'shutdown':
+            response['result'] = {}
+            threading.Thread(target=self.shutdown, daemon=True).start()
+        elif 'argv' in request:
+            response.update(self._run_argv(request['argv']))
+        else:
+            response.update(ok=False, error=f"未知请求: {action}")
+        response['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        return response
+
+    def _run_argv(self, argv) -> dict:
+        output = io.StringIO()
+        with self._lock, redirect_stdout(output), redirect_stderr(output):
+            try:
+                args = self._parser.parse_args([str(arg) for arg in argv])
+                if args.daemon:
+                    return {'ok': False, 'error': "守护进程中不能再启动守护进程"}
+                if args.watch:
+                    return {'ok': False, 'error': "守护进程中不能使用 --watch"}
+                for dest, option in PATH_WRITING_OPTIONS:
+                    if getattr(args, dest, None):
+                        return {'ok': False, 'error': f"守护进程中不能使用 {option}，请直接运行 terminal_tiler.py"}
+                self.tiler.configure(args)
+                from terminal_tiler import request_key
+                if self.queue is not None and request_key(args) is not None:
+                    with self.queue.exclusive(args.lock_timeout):
+                        result = self._execute(self.tiler, args, self._parser)
+                else:
+                    result = self._execute(self.tiler, args, self._parser)
+                return {'result': result, 'output': output.getvalue()}
+            except SystemExit as e:
+                # argparse在参数错误或--help时会退出
+                return {'ok': e.code in (0, None), 'output': output.getvalue(),
+                        'error': None if e.code in (0, None) else "参数错误"}
+            except Exception as e:
+                return {'ok': False, 'output': output.getvalue(), 'error': str(e)}
+
+    def _serve_connection(self, conn: socket.socket):
+        with conn, conn.makefile('rwb') as stream:
+            for line in stream:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if not self.authorized(request):
+                    # 不是本用户的客户端（或HTTP等其他协议的请求）: 回复后断开，不处理后续内容
+                    response = {'id': request.get('id') if isinstance(request, dict) else None,
+                                'ok': False, 'error': "未授权的请求"}
+                    stream.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                    stream.flush()
+                    return
+                response = self.handle(request)
+                stream.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                stream.flush()
+
+    def serve_forever(self):
+        """监听并处理请求，直到收到shutdown请求"""
+        family, addr = parse_address(self.address)
+        if family == getattr(socket, 'AF_UNIX', None) and os.path.exists(addr):
+            os.unlink(addr)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.bind(addr)
+        sock.listen(16)
+        self._sock = sock
+        self._token = write_token(self.token_path)
+        print(f"终端平铺守护进程已启动: {self.address}")
+        self.ready.set()
+        try:
+            while not self._stopping:
+                try:
+                    conn, _ = sock.accept()
+                except OSError:
+                    break
+                if family == socket.AF_INET:
+                    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+        finally:
+            sock.close()
+            if family == getattr(socket, 'AF_UNIX', None) and os.path.exists(addr):
+                os.unlink(addr)
+            try:
+                if read_token(self.token_path) == self._token:
+                    os.unlink(self.token_path)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        """停止守护进程"""
+        self._stopping = True
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+
+
+class TilerClient:
+    """守护进程的轻量客户端，保持单个连接复用"""
+
+    def __init__(self, address: Optional[str] = None, timeout: float = 5.0,
+                 token_path: Optional[str] = None):
+        self.address = address or default_address()
+        # 令牌文件不存在时守护进程没有运行，与连接失败一样抛出OSError
+        self._token = read_token(token_path)
+        family, addr = parse_address(self.address)
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(addr)
+        if family == socket.AF_INET:
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._stream = self._sock.makefile('rwb')
+        self._next_id = 0
+
+    def request(self, argv=None, action: Optional[str] = None) -> dict:
+        """发送请求并等待响应"""
+        self._next_id += 1
+        request: dict = {'id': self._next_id, 'token': self._token}
+        if argv is not None:
+            request['argv'] = list(argv)
+        else:
+            request['action'] = action
+        self._stream.write(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+        self._stream.flush()
+        line = self._stream.readline()
+        if not line:
+            raise ConnectionError("守护进程已断开连接")
+        return json.loads(line)
+
+    def close(self):
+        self._stream.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+窗口标题匹配器
+把查询语句编译一次（按查询缓存），之后每个标题只需一次扫描即可判定是否匹配
+
+查询语法（`|` 或 `,` 分隔多个条件，满足任一包含条件且不满足任何排除条件即匹配，不区分大小写）:
+  gas                 子串（其中的 ( ) + 等字符按原样匹配，如 "gas (dev)"、"C++"）
+  gcc*|gds            通配符 (含 * 或 ? 时按通配符处理，可使用 [...]) 与子串组合
+  re:gas[0-9]+        正则表达式，只在显式加 re: 前缀时使用
+  g,!gds              以 ! 开头为排除条件
+  glob:a[bc]          显式指定为通配符
+整个关键字按原文出现在标题中时总是匹配，标题本身含有 | , * 等字符时不会因被当作语法而漏掉
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+LITERAL = 'literal'
+GLOB = 'glob'
+REGEX = 'regex'
+
+_GLOB_CHARS = set('*?')
+_OPENERS = {'(': ')', '[': ']', '{': '}'}
+
+
+class Term(NamedTuple):
+    """查询中的一个条件"""
+    kind: str
+    text: str
+    exclude: bool = False
+
+
+def _split(query: str) -> List[str]:
+    """按顶层的 | 和 , 切分，括号内与转义的分隔符不切分"""
+    parts, current, closers = [], [], []
+    escaped = False
+    for ch in query:
+        if escaped:
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif closers and ch == closers[-1]:
+            closers.pop()
+        elif ch in _OPENERS and (not closers or closers[-1] != ']'):
+            closers.append(_OPENERS[ch])
+        elif not closers and ch in '|,':
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(ch)
+    parts.append(''.join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_query(query: str) -> List[Term]:
+    """把查询语句解析为条件列表"""
+    terms = []
+    for part in _split(query):
+        exclude = part.startswith('!')
+        if exclude:
+            part = part[1:]
+        if part.startswith('re:'):
+            kind, part = REGEX, part[3:]
+        elif part.startswith('glob:'):
+            kind, part = GLOB, part[5:]
+        elif _GLOB_CHARS.intersection(part):
+            kind = GLOB
+        else:
+            kind = LITERAL
+        if part:
+            terms.append(Term(kind, part, exclude))
+    return terms
+
+
+def glob_to_regex(pattern: str) -> str:
+    """通配符转为（不锚定的）正则: * 任意字符，? 单个字符，[...] / [!...] 字符集"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        ch = pattern[i]
+        i += 1
+        if ch == '*':
+            if not out or out[-1] != '.*':
+                out.append('.*')
+        elif ch == '?':
+            out.append('.')
+        elif ch == '[':
+            end = pattern.find(']', i + 1 if pattern[i:i + 1] in ('!', ']') else i)
+            if end < 0:
+                out.append(re.escape(ch))
+                continue
+            body = pattern[i:end].replace('\\', '\\\\')
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            out.append(f'[{body}]')
+            i = end + 1
+        else:
+            out.append(re.escape(ch))
+    # 子串匹配下首尾的 * 没有意义
+    while out and out[0] == '.*':
+        out.pop(0)
+    while out and out[-1] == '.*':
+        out.pop()
+    return ''.join(out)
+
+
+def literal_trie_regex(words: Sequence[str]) -> str:
+    """
+    多个子串合并为按公共前缀分解的交替式（Aho-Corasick式的前缀共享），
+    正则引擎对每个位置只需沿一条前缀路径比较
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word.lower():
+            node = node.setdefault(ch, {})
+        # 子串匹配时较短的词已足够，更长的延续可以丢弃
+        node.clear()
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        if '' in node:
+            return ''
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items())]
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    return build(trie)
+
+
+def _compile(terms: Sequence[Term]) -> Optional['re.Pattern']:
+    """把同一侧（包含或排除）的条件合并为一个正则，没有条件时返回None"""
+    if not terms:
+        return None
+    parts = []
+    literals = [term.text for term in terms if term.kind == LITERAL]
+    if literals:
+        parts.append(literal_trie_regex(literals))
+    for term in terms:
+        if term.kind == LITERAL:
+            continue
+        pattern = glob_to_regex(term.text) if term.kind == GLOB else term.text
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"无效的匹配模式 '{term.text}': {e}")
+        parts.append(pattern)
+    return re.compile('|'.join(f'(?:{part})' for part in parts), re.IGNORECASE)
+
+
+class TitleMatcher:
+    """编译后的查询"""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.terms = parse_query(query)
+        includes = [term for term in self.terms if not term.exclude]
+        excludes = [term for term in self.terms if term.exclude]
+        whole = query.strip()
+        if includes and self.terms != [Term(LITERAL, whole)]:
+            # 关键字按原文出现在标题中时也匹配（如标题 "a|b" 或 "x, y"）
+            includes.append(Term(LITERAL, whole))
+        self._include = _compile(includes)
+        self._exclude = _compile(excludes)
+        # 只有一个子串条件时（最常见的用法）直接在预先小写的标题上用 in 判断
+        self.literal: Optional[str] = None
+        if not excludes and len(includes) <= 1 and all(t.kind == LITERAL for t in includes):
+            self.literal = includes[0].text.lower() if includes else ''
+
+    def matches(self, title: str) -> bool:
+        if self.literal is not None:
+            return self.literal in title.lower()
+        if self._include is not None and self._include.search(title) is None:
+            return False
+        return self._exclude is None or self._exclude.search(title) is None
+
+    def select(self, titles: Sequence[str], lower_titles: Optional[Sequence[str]] = None) -> List[int]:
+        """返回匹配的标题下标；提供小写标题时子串查询不再重复转换大小写"""
+        if self.literal is not None:
+            needle = self.literal
+            if lower_titles is None:
+                lower_titles = [title.lower() for title in titles]
+            return [i for i, title in enumerate(lower_titles) if needle in title]
+        include, exclude = self._include, self._exclude
+        include_search = include.search if include is not None else None
+        exclude_search = exclude.search if exclude is not None else None
+        return [i for i, title in enumerate(titles)
+                if (include_search is None or include_search(title) is not None)
+                and (exclude_search is None or exclude_search(title) is None)]
+
+    def __repr__(self) -> str:
+        return f"TitleMatcher({self.query!r})"
+
+
+@lru_cache(maxsize=128)
+def compile_query(query: str) -> TitleMatcher:
+    """编译查询（按查询语句缓存）；模式无效时抛出ValueError"""
+    return TitleMatcher(query)
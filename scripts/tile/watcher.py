@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+事件驱动的监视模式 (--watch)
+等待窗口事件而不是轮询；一串连续事件在防抖窗口内合并为一次处理，
+只重新平铺成员发生变化的关键字分组，位置未变的窗口由提交器跳过
+分区模式 (grouped) 下各分组共用一个显示器的相邻区域，任一分组变化时所有分组一起规划、一次提交
+"""
+
+import time
+from collections import Counter
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List, Optional, Sequence, Tuple
+
+from window_backend import is_terminal_class
+from window_events import DESTROY, DISPLAY, EventSource, WindowEvent
+
+
+class TilerWatcher:
+    """
+    监视终端窗口变化并自动重新平铺
+    debounce秒内没有新事件才开始处理；事件持续不断时最多推迟max_delay秒
+    每次重新枚举和平铺都在lock()返回的上下文中进行（命令行运行时为跨进程的运行锁）
+    """
+
+    # 空闲时等待事件的超时，仅用于让Ctrl+C在Windows上也能及时生效
+    IDLE_WAKEUP = 1.0
+
+    def __init__(self, tiler, keywords: Sequence[str], source: EventSource,
+                 debounce: float = 0.25, max_delay: float = 2.0, gap: int = 5,
+                 horizontal: bool = False, grouped: bool = False,
+                 regions: Optional[Sequence[float]] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 lock: Callable[[], ContextManager] = nullcontext):
+        self.tiler = tiler
+        self.keywords = list(keywords)
+        self.source = source
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.gap = gap
+        self.horizontal = horizontal
+        self.grouped = grouped
+        self.regions = regions
+        self._clock = clock
+        self.lock = lock
+        # 各分组当前的窗口句柄（按平铺顺序）
+        self._members: Dict[str, Tuple[int, ...]] = {}
+        # 句柄 -> 是否为终端窗口；窗口类名不会变化，按句柄缓存
+        self._is_terminal: Dict[int, bool] = {}
+        # 统计: 处理的批次数 / 收到的事件数 / 被忽略的事件数 / 各分组重新平铺次数
+        self.batches = 0
+        self.events = 0
+        self.ignored = 0
+        self.retiles: Counter = Counter()
+
+    def _known(self, hwnd: int) -> bool:
+        return any(hwnd in members for members in self._members.values())
+
+    def _terminal(self, hwnd: int) -> bool:
+        cached = self._is_terminal.get(hwnd)
+        if cached is None:
+            try:
+                cached = is_terminal_class(self.tiler.backend.get_class_name(hwnd))
+            except Exception:
+                # 窗口可能在事件到达前已被关闭
+                return False
+            self._is_terminal[hwnd] = cached
+        return cached
+
+    def _relevant(self, event: WindowEvent) -> bool:
+        """事件是否可能改变某个分组的成员"""
+        if event.kind == DISPLAY:
+            return True
+        if event.kind == DESTROY:
+            self._is_terminal.pop(event.hwnd, None)
+            return self._known(event.hwnd)
+        return self._terminal(event.hwnd)
+
+    def _retile(self, keyword: str, windows: List[Tuple[int, str]]):
+        self.tiler.out.emit('retile', keyword=keyword, count=len(windows))
+        if self.horizontal:
+            self.tiler.tile_windows_horizontal(windows, self.gap)
+        else:
+            self.tiler.tile_windows_vertical(windows, self.gap)
+        if self.tiler.page == 'next':
+            # --next-page 只在第一次平铺时翻页，之后的重新平铺保持当前显示的页
+            self.tiler.page = 'current'
+        self.retiles[keyword] += 1
+        self.tiler.metrics.inc('tiler_runs_total', action='retile')
+
+    def _retile_groups(self, changed: List[str], groups: Dict[str, list]):
+        """分区模式: 所有分组重新规划，未移动的窗口由提交器跳过"""
+        windows = {keyword: [(record.hwnd, record.title) for record in groups[keyword]]
+                   for keyword in self.keywords}
+        for keyword in changed:
+            self.tiler.out.emit('retile', keyword=keyword, count=len(windows[keyword]))
+            self.retiles[keyword] += 1
+        self.tiler.tile_groups(windows, self.gap, self.horizontal, self.regions)
+        self.tiler.metrics.inc('tiler_runs_total', action='retile')
+
+    def refresh(self, force: bool = False) -> List[str]:
+        """
+        重新枚举一次，成员变化（或force）的分组重新平铺
+        返回重新平铺的关键字；等待运行锁超时时报告错误，本批不处理（成员不更新，下一批事件时重试）
+        """
+        try:
+            with self.lock():
+                return self._refresh(force)
+        except TimeoutError as e:
+            self.tiler.out.emit('error', message=f"错误: {e}")
+            return []
+
+    def _refresh(self, force: bool) -> List[str]:
+        self.tiler.index.invalidate()
+        index = self.tiler.index
+        groups = index.find_groups(self.keywords) if self.grouped else index.find_any(self.keywords)
+        # 进程条件 (--exe 等)
+        groups = {keyword: self.tiler.filter_records(records) for keyword, records in groups.items()}
+        retiled = []
+        for keyword in self.keywords:
+            members = tuple(record.hwnd for record in groups[keyword])
+            if not force and members == self._members.get(keyword):
+                continue
+            self._members[keyword] = members
+            if members and not self.grouped:
+                self._retile(keyword, [(record.hwnd, record.title) for record in groups[keyword]])
+            retiled.append(keyword)
+        if retiled and self.grouped:
+            self._retile_groups(retiled, groups)
+        return retiled
+
+    def process(self, events: List[WindowEvent]) -> List[str]:
+        """处理一批（已合并的）事件，返回重新平铺的关键字"""
+        self.batches += 1
+        self.events += len(events)
+        relevant = [event for event in events if self._relevant(event)]
+        self.ignored += len(events) - len(relevant)
+        if not relevant:
+            return []
+        display = any(event.kind == DISPLAY for event in relevant)
+        if display:
+            self.tiler.topology.invalidate()
+        # 显示器变化时所有分组都需要按新的工作区重新平铺
+        return self.refresh(force=display)
+
+    def _collect(self, events: List[WindowEvent]) -> List[WindowEvent]:
+        """防抖: 持续收集事件，直到安静debounce秒或达到max_delay"""
+        deadline = self._clock() + self.max_delay
+        while True:
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                break
+            more = self.source.wait(min(self.debounce, remaining))
+            if not more:
+                break
+            events.extend(more)
+        return events
+
+    def run(self, max_batches: Optional[int] = None):
+        """先平铺一次，然后等待事件直到事件来源关闭"""
+        out = self.tiler.out
+        out.text(f"监视关键字: {', '.join(self.keywords)} (防抖 {self.debounce}s，Ctrl+C 退出)")
+        self.refresh(force=True)
+        out.flush()
+        self.tiler.flush_metrics()
+        while not self.source.closed:
+            if max_batches is not None and self.batches >= max_batches:
+                break
+            events = self.source.wait(self.IDLE_WAKEUP)
+            if events:
+                self.process(self._collect(events))
+                # 每批处理完立即输出，指标随之写出
+                out.flush()
+                self.tiler.flush_metrics()
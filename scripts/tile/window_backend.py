@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+窗口后端抽象
+把平铺器依赖的窗口系统调用收敛到一个接口上，
+Windows下由pywin32实现，Linux桌面由X11后端（x11_backend.py，基于xcffib）实现，
+其他平台或测试中使用假后端
+"""
+
+import itertools
+import os
+import re
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Windows API相关模块，首次使用Windows后端时才导入（见 has_win32）
+win32gui = win32con = win32api = win32process = ctypes = None
+_HAS_WIN32: Optional[bool] = None
+
+
+def has_win32() -> bool:
+    """按需导入pywin32，返回是否可用"""
+    global win32gui, win32con, win32api, win32process, ctypes, _HAS_WIN32
+    if _HAS_WIN32 is None:
+        try:
+            import win32gui
+            import win32con
+            import win32api
+            import win32process
+            import ctypes
+            _HAS_WIN32 = True
+        except ImportError:
+            _HAS_WIN32 = False
+    return _HAS_WIN32
+
+# win32con中未必提供的常量
+SWP_ASYNCWINDOWPOS = 0x4000
+
+# 矩形统一使用 (x, y, 宽, 高)
+Rect = Tuple[int, int, int, int]
+
+# 终端窗口类名（按子串匹配）
+TERMINAL_CLASSES = (
+    'ConsoleWindowClass',  # 传统命令提示符
+    'CASCADIA_HOSTING_WINDOW_CLASS',  # Windows Terminal
+    'PseudoConsoleWindow',  # PowerShell
+    'WindowsTerminal',
+    'VirtualConsoleClass',
+    # X11终端的WM_CLASS（类名部分）
+    'Gnome-terminal',
+    'konsole',
+    'XTerm',
+    'UXTerm',
+    'URxvt',
+    'Alacritty',
+    'kitty',
+    'Tilix',
+    'Terminator',
+    'Xfce4-terminal',
+    'Mate-terminal',
+    'Lxterminal',
+    'st-256color',
+    'org.wezfurlong.wezterm',
+    'foot',
+)
+
+# 类名中作为完整的词出现才算匹配（前后不是字母或数字），如应用包名
+# Microsoft.WindowsTerminal_8wekyb3d8bbwe；'foot'、'kitty' 不匹配 footnote、kittyhawk
+_TERMINAL_CLASS_PATTERN = re.compile(
+    r'(?<![0-9a-z])(?:' + '|'.join(re.escape(name) for name in TERMINAL_CLASSES) + r')(?![0-9a-z])',
+    re.IGNORECASE)
+
+# 类名 -> 是否终端 的预计算查找表，首次遇到的类名才做匹配
+_TERMINAL_CLASS_CACHE: Dict[str, bool] = {name: True for name in TERMINAL_CLASSES}
+
+
+def is_terminal_class(class_name: str) -> bool:
+    """判断窗口类名是否属于终端窗口"""
+    cached = _TERMINAL_CLASS_CACHE.get(class_name)
+    if cached is None:
+        cached = _TERMINAL_CLASS_PATTERN.search(class_name) is not None
+        _TERMINAL_CLASS_CACHE[class_name] = cached
+    return cached
+
+
+def window_signature(handles: Iterable[int]) -> Tuple[int, int]:
+    """
+    可见顶层窗口集合的签名 (数量, 句柄集合的哈希)，与顺序无关
+    整数的哈希不随进程变化，可以跨运行比较；有窗口打开或关闭时签名改变
+    """
+    handles = frozenset(handles)
+    return len(handles), hash(handles)
+
+
+class WindowRecord(NamedTuple):
+    """一次枚举得到的紧凑窗口记录"""
+    hwnd: int
+    title: str
+    class_name: str
+    pid: int
+    rect: Rect
+
+
+class WindowBackend:
+    """
+    窗口系统后端接口
+    子类需实现枚举、查询和显示相关的基础调用
+    """
+
+    name = 'base'
+    # 模拟后端不会真正操作窗口，输出中以"模拟"标注
+    simulated = False
+
+    def list_windows(self) -> List[int]:
+        """返回所有可见顶层窗口句柄（按Z序）"""
+        raise NotImplementedError
+
+    def get_class_name(self, hwnd: int) -> str:
+        raise NotImplementedError
+
+    def get_title(self, hwnd: int) -> str:
+        raise NotImplementedError
+
+    def get_pid(self, hwnd: int) -> int:
+        raise NotImplementedError
+
+    def get_rect(self, hwnd: int) -> Rect:
+        raise NotImplementedError
+
+    def get_screen_size(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def monitor_source(self):
+        """显示器信息来源，默认把整个屏幕视为单个显示器"""
+        from monitors import StaticMonitorSource
+        return StaticMonitorSource.single(*self.get_screen_size())
+
+    def event_source(self):
+        """窗口事件来源，默认不产生任何事件"""
+        from window_events import QueueEventSource
+        return QueueEventSource()
+
+    def process_source(self):
+        """窗口所属进程的信息来源，默认按平台选择（不支持时为None）"""
+        from processes import default_process_source
+        return default_process_source()
+
+    def minimize(self, hwnd: int):
+        raise NotImplementedError
+
+    def restore(self, hwnd: int):
+        raise NotImplementedError
+
+    def move_window(self, hwnd: int, x: int, y: int, width: int, height: int):
+        raise NotImplementedError
+
+    def is_minimized(self, hwnd: int) -> bool:
+        raise NotImplementedError
+
+    # ---- 批量读取，默认逐个查询，能流水线化请求的后端可覆盖 ----
+
+    def terminal_records(self, handles: Sequence[int]) -> List[WindowRecord]:
+        """读取终端窗口的记录；先按类名过滤，非终端窗口不再读取标题、进程和位置"""
+        return list(self.iter_terminal_records(handles))
+
+    def iter_terminal_records(self, handles: Sequence[int]) -> Iterator[WindowRecord]:
+        """逐个读取终端窗口的记录，调用方停止迭代后不再查询剩余的窗口"""
+        for hwnd in handles:
+            try:
+                class_name = self.get_class_name(hwnd)
+                if not is_terminal_class(class_name):
+                    continue
+                record = WindowRecord(
+                    hwnd,
+                    self.get_title(hwnd),
+                    class_name,
+                    self.get_pid(hwnd),
+                    self.get_rect(hwnd),
+                )
+            except Exception:
+                # 枚举过程中窗口可能已被关闭
+                continue
+            yield record
+
+    def prefetch(self, hwnds: Sequence[int]):
+        """预先读取这些窗口的位置和最小化状态，供随后的get_rect/is_minimized使用；默认不做处理"""
+        pass
+
+    def foreground_window(self) -> Optional[int]:
+        """当前前台窗口，无法获取时返回None"""
+        return None
+
+    def cell_metrics(self, hwnd: int):
+        """
+        窗口的字符网格 (cell_grid.CellMetrics)，无法查询时返回None（由平铺器观察实际尺寸学习）
+        """
+        return None
+
+    # ---- 批量几何提交，默认逐个移动，支持延迟提交的后端可覆盖 ----
+
+    def begin_batch(self, count: int):
+        """开始一批窗口位置修改，返回批次对象"""
+        return []
+
+    def defer_window_pos(self, batch, hwnd: int, rect: Rect):
+        """把一次窗口位置修改加入批次，返回（可能更新后的）批次对象"""
+        batch.append((hwnd, rect))
+        return batch
+
+    def end_batch(self, batch):
+        """一次性提交批次中的所有修改"""
+        for hwnd, (x, y, width, height) in batch:
+            self.move_window(hwnd, x, y, width, height)
+
+    def minimize_batch(self, hwnds: Sequence[int]) -> Dict[int, str]:
+        """最小化一组窗口，返回失败的窗口及原因；默认逐个最小化"""
+        failed = {}
+        for hwnd in hwnds:
+            try:
+                self.minimize(hwnd)
+            except Exception as e:
+                failed[hwnd] = str(e)
+        return failed
+
+    # ---- 异步调用，不等待目标窗口处理完消息；默认退化为同步调用 ----
+
+    def move_window_async(self, hwnd: int, rect: Rect):
+        x, y, width, height = rect
+        self.move_window(hwnd, x, y, width, height)
+
+    def minimize_async(self, hwnd: int):
+        self.minimize(hwnd)
+
+    def restore_async(self, hwnd: int):
+        self.restore(hwnd)
+
+
+class Win32Backend(WindowBackend):
+    """基于pywin32的Windows后端"""
+
+    name = 'win32'
+
+    def __init__(self):
+        if not has_win32():
+            raise RuntimeError("未安装pywin32，无法使用Windows后端")
+
+    def list_windows(self) -> List[int]:
+        handles: List[int] = []
+
+        def enum_window_callback(hwnd, handles):
+            if win32gui.IsWindowVisible(hwnd):
+                handles.append(hwnd)
+            return True
+
+        win32gui.EnumWindows(enum_window_callback, handles)
+        return handles
+
+    def get_class_name(self, hwnd: int) -> str:
+        return win32gui.GetClassName(hwnd)
+
+    def foreground_window(self) -> Optional[int]:
+        return win32gui.GetForegroundWindow() or None
+
+    def get_title(self, hwnd: int) -> str:
+        return win32gui.GetWindowText(hwnd)
+
+    def get_pid(self, hwnd: int) -> int:
+        return win32process.GetWindowThreadProcessId(hwnd)[1]
+
+    def get_rect(self, hwnd: int) -> Rect:
+        left, top, right, bottom = win32gui.GetWindowRect(hwnd)
+        return (left, top, right - left, bottom - top)
+
+    def get_screen_size(self) -> Tuple[int, int]:
+        return (win32api.GetSystemMetrics(win32con.SM_CXSCREEN),
+                win32api.GetSystemMetrics(win32con.SM_CYSCREEN))
+
+    def monitor_source(self):
+        from monitors import Win32MonitorSource
+        return Win32MonitorSource()
+
+    def event_source(self):
+        from window_events import Win32EventSource
+        return Win32EventSource()
+
+    def minimize(self, hwnd: int):
+        win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
+
+    def restore(self, hwnd: int):
+        win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+
+    def move_window(self, hwnd: int, x: int, y: int, width: int, height: int):
+        win32gui.SetWindowPos(
+            hwnd,
+            win32con.HWND_TOP,
+            x, y, width, height,
+            win32con.SWP_SHOWWINDOW
+        )
+
+    def is_minimized(self, hwnd: int) -> bool:
+        return bool(win32gui.IsIconic(hwnd))
+
+    def begin_batch(self, count: int):
+        # [HDWP, 上一个窗口, 需要重绘的屏幕范围]，后续窗口依次插在上一个窗口之后，整组保持在最上层
+        return [win32gui.BeginDeferWindowPos(count), win32con.HWND_TOP, None]
+
+    def defer_window_pos(self, batch, hwnd: int, rect: Rect):
+        x, y, width, height = rect
+        # 批次内不逐个重绘（SWP_NOREDRAW），新旧位置都计入生效后统一重绘的范围
+        for left, top, right, bottom in (win32gui.GetWindowRect(hwnd), (x, y, x + width, y + height)):
+            if batch[2] is not None:
+                left, top = min(left, batch[2][0]), min(top, batch[2][1])
+                right, bottom = max(right, batch[2][2]), max(bottom, batch[2][3])
+            batch[2] = (left, top, right, bottom)
+        batch[0] = win32gui.DeferWindowPos(
+            batch[0], hwnd, batch[1],
+            x, y, width, height,
+            win32con.SWP_SHOWWINDOW | win32con.SWP_NOACTIVATE | win32con.SWP_NOREDRAW
+        )
+        batch[1] = hwnd
+        return batch
+
+    def end_batch(self, batch):
+        win32gui.EndDeferWindowPos(batch[0])
+        # 只让系统重新绘制受影响的范围（含移走后露出的其他窗口），
+        # 不向其他进程的窗口发送WM_SETREDRAW，它们不会因消息丢失而停止重绘
+        if batch[2] is not None:
+            win32gui.RedrawWindow(win32gui.GetDesktopWindow(), batch[2], None,
+                                  win32con.RDW_ERASE | win32con.RDW_FRAME |
+                                  win32con.RDW_INVALIDATE | win32con.RDW_ALLCHILDREN)
+
+    def move_window_async(self, hwnd: int, rect: Rect):
+        x, y, width, height = rect
+        win32gui.SetWindowPos(
+            hwnd,
+            win32con.HWND_TOP,
+            x, y, width, height,
+            win32con.SWP_SHOWWINDOW | win32con.SWP_NOACTIVATE | SWP_ASYNCWINDOWPOS
+        )
+
+    def minimize_async(self, hwnd: int):
+        ctypes.windll.user32.ShowWindowAsync(hwnd, win32con.SW_MINIMIZE)
+
+    def restore_async(self, hwnd: int):
+        ctypes.windll.user32.ShowWindowAsync(hwnd, win32con.SW_RESTORE)
+
+
+
+class FakeWindow:
+    """假后端中的一个窗口"""
+
+    def __init__(self, hwnd: int, title: str, class_name: str, pid: int,
+                 rect: Rect, visible: bool = True, cells=None):
+        self.hwnd = hwnd
+        self.title = title
+        self.class_name = class_name
+        self.pid = pid
+        self.rect = rect
+        self.visible = visible
+        self.minimized = False
+        # 字符网格 (CellMetrics)，设置时窗口像终端一样把大小向下对齐到整行整列
+        self.cells = cells
+        # 行列数变化（终端重排滚动缓冲区）的次数
+        self.reflows = 0
+
+    def resize(self, rect: Rect):
+        if self.cells is None:
+            self.rect = rect
+            return
+        from cell_grid import align_rect, same_grid
+        rect = align_rect(rect, self.cells)
+        if not same_grid(self.rect, rect, self.cells):
+            self.reflows += 1
+        self.rect = rect
+
+
+class FakeWindowBackend(WindowBackend):
+    """
+    内存中的假窗口后端
+    用于非Windows平台的模拟运行和测试，记录每种调用的次数
+    """
+
+    name = 'fake'
+    simulated = True
+
+    def __init__(self, screen_size: Tuple[int, int] = (1920, 1080), monitors=None):
+        self.screen_size = screen_size
+        # 可选的显示器列表 [Monitor, ...]，默认与screen_size一致的单显示器
+        self.monitors = monitors
+        self.windows: Dict[int, FakeWindow] = {}
+        self.calls: Counter = Counter()
+        # 每次批量提交的内容 [[(句柄, 矩形), ...], ...]
+        self.commits: List[List[Tuple[int, Rect]]] = []
+        # 模拟无响应的窗口: 句柄 -> 每次同步调用阻塞的秒数
+        self.hangs: Dict[int, float] = {}
+        # 调用event_source()后，添加/移除窗口和修改标题会产生对应的窗口事件
+        self.events = None
+        # 可选的进程信息来源，默认按平台选择
+        self.processes = None
+        # 前台窗口，新添加的窗口成为前台窗口
+        self.foreground: Optional[int] = None
+        # 为False时cell_metrics()不返回窗口的字符网格（模拟无法查询、需要学习的平台）
+        self.report_cells = True
+        self._next_hwnd = itertools.count(1001)
+
+    @classmethod
+    def demo(cls) -> 'FakeWindowBackend':
+        """未安装pywin32时使用的演示窗口集合"""
+        backend = cls()
+        for title, class_name in [
+            ("gas1 - PowerShell", 'ConsoleWindowClass'),
+            ("gas2 - PowerShell", 'ConsoleWindowClass'),
+            ("gcc1 - Command Prompt", 'ConsoleWindowClass'),
+            ("gcc2 - Command Prompt", 'ConsoleWindowClass'),
+            ("gds - Windows Terminal", 'CASCADIA_HOSTING_WINDOW_CLASS'),
+        ]:
+            backend.add_window(title, class_name)
+        return backend
+
+    def add_window(self, title: str, class_name: str = 'ConsoleWindowClass',
+                   pid: Optional[int] = None, rect: Rect = (0, 0, 800, 600),
+                   visible: bool = True, cells=None) -> int:
+        """添加一个假窗口，返回其句柄；cells为字符网格时窗口大小按整行整列对齐"""
+        hwnd = next(self._next_hwnd)
+        self.windows[hwnd] = FakeWindow(hwnd, title, class_name,
+                                        pid if pid is not None else hwnd + 10000,
+                                        rect, visible, cells)
+        self.foreground = hwnd
+        self._emit('create', hwnd)
+        return hwnd
+
+    def add_windows(self, specs: Iterable[Tuple[str, str]]) -> List[int]:
+        """批量添加 (标题, 类名) 形式的假窗口"""
+        return [self.add_window(title, class_name) for title, class_name in specs]
+
+    def remove_window(self, hwnd: int):
+        if self.windows.pop(hwnd, None) is not None:
+            self._emit('destroy', hwnd)
+
+    def set_title(self, hwnd: int, title: str):
+        self.windows[hwnd].title = title
+        self._emit('title', hwnd)
+
+    def _emit(self, kind: str, hwnd: int):
+        if self.events is not None:
+            from window_events import WindowEvent
+            self.events.push(WindowEvent(kind, hwnd))
+
+    def list_windows(self) -> List[int]:
+        self.calls['list_windows'] += 1
+        return [hwnd for hwnd, window in self.windows.items() if window.visible]
+
+    def get_class_name(self, hwnd: int) -> str:
+        self.calls['get_class_name'] += 1
+        return self.windows[hwnd].class_name
+
+    def get_title(self, hwnd: int) -> str:
+        self.calls['get_title'] += 1
+        return self.windows[hwnd].title
+
+    def get_pid(self, hwnd: int) -> int:
+        self.calls['get_pid'] += 1
+        return self.windows[hwnd].pid
+
+    def get_rect(self, hwnd: int) -> Rect:
+        self.calls['get_rect'] += 1
+        return self.windows[hwnd].rect
+
+    def get_screen_size(self) -> Tuple[int, int]:
+        return self.screen_size
+
+    def foreground_window(self) -> Optional[int]:
+        self.calls['foreground_window'] += 1
+        return self.foreground if self.foreground in self.windows else None
+
+    def cell_metrics(self, hwnd: int):
+        self.calls['cell_metrics'] += 1
+        return self.windows[hwnd].cells if self.report_cells else None
+
+    def monitor_source(self):
+        if self.monitors is None:
+            return super().monitor_source()
+        from monitors import StaticMonitorSource
+        return StaticMonitorSource(self.monitors)
+
+    def process_source(self):
+        if self.processes is None:
+            return super().process_source()
+        return self.processes
+
+    def event_source(self):
+        if self.events is None:
+            from window_events import QueueEventSource
+            self.events = QueueEventSource()
+        return self.events
+
+    def _block(self, hwnd: int):
+        """对无响应的窗口发送消息时会阻塞调用方"""
+        delay = self.hangs.get(hwnd)
+        if delay:
+            time.sleep(delay)
+
+    def minimize(self, hwnd: int):
+        self.calls['minimize'] += 1
+        self._block(hwnd)
+        self.windows[hwnd].minimized = True
+
+    def restore(self, hwnd: int):
+        self.calls['restore'] += 1
+        self._block(hwnd)
+        self.windows[hwnd].minimized = False
+
+    def move_window(self, hwnd: int, x: int, y: int, width: int, height: int):
+        self.calls['move_window'] += 1
+        self._block(hwnd)
+        window = self.windows[hwnd]
+        window.resize((x, y, width, height))
+        window.minimized = False
+
+    def is_minimized(self, hwnd: int) -> bool:
+        self.calls['is_minimized'] += 1
+        return self.windows[hwnd].minimized
+
+    def defer_window_pos(self, batch, hwnd: int, rect: Rect):
+        if hwnd not in self.windows:
+            raise KeyError(f"无效的窗口句柄: {hwnd}")
+        batch.append((hwnd, rect))
+        return batch
+
+    def end_batch(self, batch):
+        self.calls['end_batch'] += 1
+        self.commits.append(list(batch))
+        for hwnd, _ in batch:
+            self._block(hwnd)
+        for hwnd, rect in batch:
+            window = self.windows[hwnd]
+            window.resize(rect)
+            window.minimized = False
+
+
+def create_backend(name: Optional[str] = None) -> WindowBackend:
+    """
+    创建窗口后端
+    name或环境变量TERMINAL_TILER_BACKEND可指定 win32 / x11 / fake，默认按平台选择
+    """
+    name = name or os.environ.get('TERMINAL_TILER_BACKEND')
+    if name == 'fake':
+        return FakeWindowBackend.demo()
+    if name == 'x11' or (name is None and sys.platform != 'win32' and os.environ.get('DISPLAY')):
+        from x11_backend import X11Backend, has_xcb
+        if name == 'x11' or has_xcb():
+            return X11Backend()
+        # 写到stderr，不影响 --json 输出
+        print("警告: 未安装xcffib，无法操作X11窗口", file=sys.stderr)
+        print("请运行: pip install xcffib", file=sys.stderr)
+        return FakeWindowBackend.demo()
+    if name == 'win32' or has_win32():
+        return Win32Backend()
+    print("警告: 未安装pywin32，某些功能可能不可用", file=sys.stderr)
+    print("请运行: pip install pywin32", file=sys.stderr)
+    return FakeWindowBackend.demo()
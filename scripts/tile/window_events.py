@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+窗口事件来源
+--watch 模式订阅窗口创建/销毁/标题变化事件，而不是轮询枚举窗口；
+事件来源是抽象的，Windows下使用SetWinEventHook，测试中可以手动推送合成事件
+"""
+
+import queue
+import threading
+from typing import List, NamedTuple, Optional
+
+# 事件类型
+CREATE = 'create'
+DESTROY = 'destroy'
+TITLE = 'title'
+# 显示器拓扑变化（分辨率、显示器插拔）
+DISPLAY = 'display'
+
+
+class WindowEvent(NamedTuple):
+    """一个窗口事件"""
+    kind: str
+    hwnd: int = 0
+
+
+class EventSource:
+    """窗口事件来源接口"""
+
+    closed = False
+
+    def wait(self, timeout: Optional[float] = None) -> List[WindowEvent]:
+        """
+        阻塞直到有事件或超时，返回期间积累的全部事件
+        超时或已关闭时返回空列表
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """停止产生事件，唤醒正在等待的调用方"""
+        raise NotImplementedError
+
+
+class QueueEventSource(EventSource):
+    """基于队列的事件来源，push() 推送事件；也用作测试中的合成事件流"""
+
+    def __init__(self):
+        self._queue: 'queue.Queue[Optional[WindowEvent]]' = queue.Queue()
+        self.closed = False
+
+    def push(self, event: WindowEvent):
+        self._queue.put(event)
+
+    def wait(self, timeout: Optional[float] = None) -> List[WindowEvent]:
+        if self.closed:
+            return []
+        try:
+            pending = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        # None是close()放入的结束标记
+        if None in pending:
+            self.closed = True
+        return [event for event in pending if event is not None]
+
+    def close(self):
+        self._queue.put(None)
+
+
+class Win32EventSource(QueueEventSource):
+    """
+    基于SetWinEventHook的事件来源
+    钩子安装在专用线程上（进程外回调需要该线程运行消息循环），回调只把事件放入队列，
+    过滤和平铺在等待事件的线程中进行；
+    同一线程上的隐藏顶层窗口接收分辨率、工作区（任务栏）和DPI变化的广播，产生DISPLAY事件
+    """
+
+    EVENT_OBJECT_DESTROY = 0x8001
+    EVENT_OBJECT_SHOW = 0x8002
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    OBJID_WINDOW = 0
+    CHILDID_SELF = 0
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    WM_QUIT = 0x0012
+    WM_SETTINGCHANGE = 0x001A
+    WM_DISPLAYCHANGE = 0x007E
+    WM_DPICHANGED = 0x02E0
+    SPI_SETWORKAREA = 0x002F
+
+    def __init__(self):
+        super().__init__()
+        self._thread_id: Optional[int] = None
+        self._hooked = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._pump, name='win-event-hook', daemon=True)
+        self._thread.start()
+        self._hooked.wait()
+        if self._error is not None:
+            raise RuntimeError(f"无法安装窗口事件钩子: {self._error}")
+
+    def _pump(self):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        kinds = {
+            self.EVENT_OBJECT_SHOW: CREATE,
+            self.EVENT_OBJECT_DESTROY: DESTROY,
+            self.EVENT_OBJECT_NAMECHANGE: TITLE,
+        }
+        proc_type = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                       wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+        def callback(hook, event, hwnd, id_object, id_child, thread_id, time_ms):
+            # 只关心窗口本身，忽略窗口内部对象（滚动条、光标等）的事件
+            if hwnd and id_object == self.OBJID_WINDOW and id_child == self.CHILDID_SELF:
+                self.push(WindowEvent(kinds[event], hwnd))
+
+        # 回调对象必须在钩子存在期间保持引用
+        self._callback = proc_type(callback)
+        flags = self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+        try:
+            hooks = [
+                # 窗口显示时标题和类名已可读取，比EVENT_OBJECT_CREATE更适合作为"新窗口"事件
+                user32.SetWinEventHook(self.EVENT_OBJECT_DESTROY, self.EVENT_OBJECT_SHOW,
+                                       0, self._callback, 0, 0, flags),
+                user32.SetWinEventHook(self.EVENT_OBJECT_NAMECHANGE, self.EVENT_OBJECT_NAMECHANGE,
+                                       0, self._callback, 0, 0, flags),
+            ]
+            if not all(hooks):
+                raise ctypes.WinError()
+            display_window = self._display_window(ctypes, wintypes, user32)
+            self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        except Exception as e:
+            self._error = e
+            self._hooked.set()
+            return
+        self._hooked.set()
+
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        user32.DestroyWindow.argtypes = [wintypes.HWND]
+        user32.DestroyWindow(display_window)
+        user32.UnregisterClassW.argtypes = [wintypes.LPCWSTR, wintypes.HINSTANCE]
+        user32.UnregisterClassW(self._display_class, self._instance)
+        for hook in hooks:
+            user32.UnhookWinEvent(hook)
+
+    def _display_window(self, ctypes, wintypes, user32):
+        """
+        创建接收显示变化广播的隐藏顶层窗口（消息专用窗口收不到广播）
+        WM_DISPLAYCHANGE: 分辨率或显示器插拔；WM_SETTINGCHANGE(SPI_SETWORKAREA): 任务栏移动或大小变化；
+        WM_DPICHANGED: 缩放比例变化
+        """
+        lresult = ctypes.c_ssize_t
+        proc_type = ctypes.WINFUNCTYPE(lresult, wintypes.HWND, wintypes.UINT,
+                                       wintypes.WPARAM, wintypes.LPARAM)
+        user32.DefWindowProcW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+        user32.DefWindowProcW.restype = lresult
+
+        def window_proc(hwnd, message, wparam, lparam):
+            if message in (self.WM_DISPLAYCHANGE, self.WM_DPICHANGED) or \
+                    (message == self.WM_SETTINGCHANGE and wparam == self.SPI_SETWORKAREA):
+                self.push(WindowEvent(DISPLAY))
+            return user32.DefWindowProcW(hwnd, message, wparam, lparam)
+
+        class WNDCLASSW(ctypes.Structure):
+            _fields_ = [('style', wintypes.UINT), ('lpfnWndProc', proc_type),
+                        ('cbClsExtra', ctypes.c_int), ('cbWndExtra', ctypes.c_int),
+                        ('hInstance', wintypes.HINSTANCE), ('hIcon', wintypes.HICON),
+                        ('hCursor', wintypes.HANDLE), ('hbrBackground', wintypes.HBRUSH),
+                        ('lpszMenuName', wintypes.LPCWSTR), ('lpszClassName', wintypes.LPCWSTR)]
+
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+        instance = self._instance = kernel32.GetModuleHandleW(None)
+        # 窗口过程同样必须在窗口存在期间保持引用；每个事件来源注册自己的窗口类，回调推送到各自的队列
+        self._window_proc = proc_type(window_proc)
+        self._display_class = f"TerminalTilerDisplay{id(self):x}"
+        window_class = WNDCLASSW(lpfnWndProc=self._window_proc, hInstance=instance,
+                                 lpszClassName=self._display_class)
+        if not user32.RegisterClassW(ctypes.byref(window_class)):
+            raise ctypes.WinError()
+        user32.CreateWindowExW.restype = wintypes.HWND
+        user32.CreateWindowExW.argtypes = [wintypes.DWORD, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+                                           ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                           wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID]
+        hwnd = user32.CreateWindowExW(0, self._display_class, None, 0, 0, 0, 0, 0,
+                                      None, None, instance, None)
+        if not hwnd:
+            raise ctypes.WinError()
+        return hwnd
+
+    def close(self):
+        if self._thread_id is not None:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+            self._thread_id = None
+        super().close()
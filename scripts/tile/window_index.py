@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+终端窗口索引
+一次枚举构建所有终端窗口的紧凑记录，带TTL缓存，
+查找、列出、隐藏以及多关键字查询共用同一份快照；
+只需要前几个结果时可以边枚举边匹配（stream），得到足够的窗口后不再查询其余窗口
+"""
+
+import heapq
+import time
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from metrics import NULL_METRICS, desktop_class
+from profiler import NULL_PROFILER
+from title_matcher import compile_query
+from window_backend import WindowBackend, WindowRecord, window_signature
+
+
+# --sort-by 的排序键；zorder为枚举顺序（最前面的窗口在前），不需要排序
+SORT_KEYS: Dict[str, Callable[[WindowRecord], object]] = {
+    'title': lambda record: record.title.lower(),
+    'position': lambda record: (record.rect[0], record.rect[1]),
+    'pid': lambda record: record.pid,
+}
+SORT_CHOICES = ('zorder',) + tuple(SORT_KEYS)
+
+
+def order_records(records: Iterable[WindowRecord], sort_by: Optional[str] = None,
+                  limit: Optional[int] = None) -> List[WindowRecord]:
+    """
+    按sort_by排序并只保留前limit个
+    不排序时只从records中取出需要的数量，流式的来源因此可以提前结束
+    """
+    key = SORT_KEYS.get(sort_by) if sort_by else None
+    if key is None:
+        return list(islice(records, limit))
+    if limit is None:
+        return sorted(records, key=key)
+    return heapq.nsmallest(limit, records, key=key)
+
+
+class WindowSnapshot:
+    """某一时刻的终端窗口快照，预先计算小写标题用于匹配"""
+
+    def __init__(self, records: List[WindowRecord], taken_at: float, scanned: int,
+                 signature: Optional[Tuple[int, int]] = None):
+        self.records = records
+        self.taken_at = taken_at
+        # 本次枚举扫描过的顶层窗口总数
+        self.scanned = scanned
+        # 枚举时可见顶层窗口集合的签名，见 window_signature
+        self.signature = signature
+        self._titles = [record.title for record in records]
+        self._lower_titles = [title.lower() for title in self._titles]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def match(self, keyword: str) -> List[WindowRecord]:
+        """
+        返回标题匹配查询的终端窗口（不区分大小写）
+        查询可以是子串、通配符、正则或它们的组合，见 title_matcher
+        """
+        matcher = compile_query(keyword)
+        records = self.records
+        return [records[i] for i in matcher.select(self._titles, self._lower_titles)]
+
+
+class WindowIndex:
+    """
+    终端窗口索引
+    在TTL内重复查询直接使用缓存的快照，invalidate()可强制下次重新枚举
+    """
+
+    def __init__(self, backend: WindowBackend, ttl: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.backend = backend
+        self.ttl = ttl
+        self._clock = clock
+        self._snapshot: Optional[WindowSnapshot] = None
+        # 统计: 实际枚举次数 / 缓存命中次数
+        self.scans = 0
+        self.hits = 0
+        self.profiler = NULL_PROFILER
+        self.metrics = NULL_METRICS
+
+    def _build(self) -> WindowSnapshot:
+        started = time.perf_counter()
+        with self.profiler.phase('enumerate'):
+            snap = self._enumerate()
+        # 按顶层窗口数分区间，观察枚举耗时随桌面规模的变化
+        self.metrics.observe('tiler_enumerate_seconds', time.perf_counter() - started,
+                             desktop=desktop_class(snap.scanned))
+        self.profiler.count('scanned', snap.scanned)
+        self.profiler.count('terminals', len(snap))
+        return snap
+
+    def _enumerate(self) -> WindowSnapshot:
+        handles = self.backend.list_windows()
+        records = self.backend.terminal_records(handles)
+        self.scans += 1
+        return WindowSnapshot(records, self._clock(), len(handles), window_signature(handles))
+
+    def snapshot(self, refresh: bool = False) -> WindowSnapshot:
+        """获取当前快照，过期或refresh=True时重新枚举"""
+        snap = self._snapshot
+        if (refresh or snap is None
+                or self._clock() - snap.taken_at >= self.ttl):
+            snap = self._snapshot = self._build()
+        else:
+            self.hits += 1
+        return snap
+
+    def invalidate(self):
+        """丢弃缓存的快照"""
+        self._snapshot = None
+
+    @property
+    def signature(self) -> Optional[Tuple[int, int]]:
+        """最近一次完整枚举时可见顶层窗口集合的签名，没有快照时为None"""
+        return self._snapshot.signature if self._snapshot is not None else None
+
+    def stream(self, keyword: Optional[str] = None) -> Iterator[WindowRecord]:
+        """
+        逐个产生标题匹配查询的终端窗口（keyword为None时为所有有标题的终端）
+        快照有效时直接从快照中产生；否则边枚举边匹配，调用方停止迭代后不再查询剩余窗口，
+        完整迭代结束时保存为新的快照
+        """
+        snap = self._snapshot
+        if snap is not None and self._clock() - snap.taken_at < self.ttl:
+            self.hits += 1
+            yield from (snap.match(keyword) if keyword else [r for r in snap.records if r.title])
+            return
+        matcher = compile_query(keyword) if keyword else None
+        taken_at = self._clock()
+        handles = self.backend.list_windows()
+        records = []
+        try:
+            for record in self.backend.iter_terminal_records(handles):
+                records.append(record)
+                if record.title and (matcher is None or matcher.matches(record.title)):
+                    yield record
+        finally:
+            self.profiler.count('terminals', len(records))
+        self.scans += 1
+        self.profiler.count('scanned', len(handles))
+        self._snapshot = WindowSnapshot(records, taken_at, len(handles), window_signature(handles))
+
+    def terminals(self) -> List[WindowRecord]:
+        """所有终端窗口"""
+        return list(self.snapshot().records)
+
+    def find(self, keyword: str) -> List[WindowRecord]:
+        """查找标题匹配查询的终端窗口"""
+        snap = self.snapshot()
+        with self.profiler.phase('match'):
+            return snap.match(keyword)
+
+    def find_any(self, keywords: Iterable[str]) -> Dict[str, List[WindowRecord]]:
+        """在同一份快照上查询多个关键字"""
+        snap = self.snapshot()
+        with self.profiler.phase('match'):
+            return {keyword: snap.match(keyword) for keyword in keywords}
+
+    def find_groups(self, keywords: Iterable[str]) -> Dict[str, List[WindowRecord]]:
+        """
+        在同一份快照上查询多个关键字分组
+        同时匹配多个分组的窗口只归入第一个分组
+        """
+        assigned = set()
+        groups = {}
+        for keyword, records in self.find_any(keywords).items():
+            groups[keyword] = [record for record in records if record.hwnd not in assigned]
+            assigned.update(record.hwnd for record in groups[keyword])
+        return groups
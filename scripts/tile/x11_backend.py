@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+X11后端 (EWMH)
+通过 _NET_CLIENT_LIST_STACKING 枚举客户端窗口，按 WM_CLASS 识别终端，
+用 _NET_MOVERESIZE_WINDOW 移动和调整大小（没有支持EWMH的窗口管理器时直接ConfigureWindow）
+基于XCB (xcffib)，所有请求在同一个连接上流水线发送:
+读取先发出整批请求再统一取回应答，N个窗口只需固定几次往返；
+修改只进入发送缓冲，一次平铺只flush一次
+"""
+
+import struct
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from cell_grid import CellMetrics
+from monitors import BASE_DPI, Monitor, MonitorSource
+from window_backend import Rect, WindowBackend, WindowRecord, is_terminal_class
+
+_HAS_XCB: Optional[bool] = None
+
+
+def has_xcb() -> bool:
+    """是否安装了xcffib"""
+    global _HAS_XCB
+    if _HAS_XCB is None:
+        try:
+            import xcffib.xproto  # noqa: F401
+            _HAS_XCB = True
+        except ImportError:
+            _HAS_XCB = False
+    return _HAS_XCB
+
+
+# 连接时一次往返取回的原子
+ATOM_NAMES = (
+    'WM_CLASS', 'WM_NAME', 'WM_STATE', 'WM_CHANGE_STATE', 'WM_NORMAL_HINTS',
+    'UTF8_STRING', '_NET_SUPPORTED', '_NET_CLIENT_LIST', '_NET_CLIENT_LIST_STACKING',
+    '_NET_WM_NAME', '_NET_WM_PID', '_NET_FRAME_EXTENTS', '_NET_WORKAREA', '_NET_CURRENT_DESKTOP',
+    '_NET_WM_STATE', '_NET_WM_STATE_HIDDEN', '_NET_WM_STATE_MAXIMIZED_VERT',
+    '_NET_WM_STATE_MAXIMIZED_HORZ', '_NET_MOVERESIZE_WINDOW', '_NET_ACTIVE_WINDOW',
+)
+
+# _NET_MOVERESIZE_WINDOW 的标志: 西北重力（x/y为含边框窗口的左上角）| x、y、宽、高有效 | 来源为分页器类工具
+MOVERESIZE_FLAGS = 1 | (0xF << 8) | (2 << 12)
+# EWMH客户端消息中的来源标识: 分页器类工具
+SOURCE_PAGER = 2
+_NET_WM_STATE_REMOVE = 0
+# ICCCM WM_STATE 中的最小化状态
+ICONIC_STATE = 3
+# WM_NORMAL_HINTS (WM_SIZE_HINTS) 的标志: 最小尺寸、尺寸增量、基础尺寸
+P_MIN_SIZE = 1 << 4
+P_RESIZE_INC = 1 << 6
+P_BASE_SIZE = 1 << 8
+# 属性最长读取的32位单元数
+MAX_PROPERTY = 1 << 16
+# 逐个产生记录时每批流水线读取的窗口数
+STREAM_CHUNK = 128
+
+Extents = Tuple[int, int, int, int]
+NO_EXTENTS: Extents = (0, 0, 0, 0)
+
+
+def _bytes(value) -> bytes:
+    buf = getattr(value, 'buf', None)
+    if buf is not None:
+        return bytes(buf())
+    return b''.join(value)
+
+
+def _cardinals(reply) -> List[int]:
+    """32位属性的值列表（窗口、原子、整数）"""
+    if reply is None or reply.format != 32:
+        return []
+    data = _bytes(reply.value)
+    count = len(data) // 4
+    return list(struct.unpack(f'={count}I', data[:count * 4]))
+
+
+def _text(reply) -> str:
+    if reply is None or reply.format != 8:
+        return ''
+    return _bytes(reply.value).decode('utf-8', 'replace')
+
+
+def parse_wm_class(data: bytes) -> str:
+    """WM_CLASS为 "实例名\\0类名\\0"，返回类名（没有类名时为实例名）"""
+    parts = [part for part in data.split(b'\0') if part]
+    return parts[-1].decode('utf-8', 'replace') if parts else ''
+
+
+def frame_rect(origin: Tuple[int, int], size: Tuple[int, int], extents: Extents) -> Rect:
+    """客户区在根窗口中的位置和大小，加上窗口管理器边框 (左, 右, 上, 下)，得到整个窗口的矩形"""
+    left, right, top, bottom = extents
+    return (origin[0] - left, origin[1] - top, size[0] + left + right, size[1] + top + bottom)
+
+
+def client_size(rect: Rect, extents: Extents) -> Tuple[int, int]:
+    """整个窗口为rect时客户区的大小"""
+    left, right, top, bottom = extents
+    return max(1, rect[2] - left - right), max(1, rect[3] - top - bottom)
+
+
+def size_hints_metrics(hints: Sequence[int], extents: Extents) -> Optional[CellMetrics]:
+    """
+    由WM_SIZE_HINTS的尺寸增量得到字符网格: 客户区宽为 基础宽度 + 列数 * 宽度增量，
+    没有基础尺寸时按ICCCM使用最小尺寸；整个窗口再加上窗口管理器边框
+    没有大于1的尺寸增量（不按字符对齐的终端）时返回None
+    """
+    if len(hints) < 11 or not hints[0] & P_RESIZE_INC or hints[9] <= 1 or hints[10] <= 1:
+        return None
+    flags = hints[0]
+    if flags & P_BASE_SIZE and len(hints) >= 17:
+        base = hints[15], hints[16]
+    elif flags & P_MIN_SIZE:
+        base = hints[5], hints[6]
+    else:
+        base = 0, 0
+    left, right, top, bottom = extents
+    return CellMetrics(hints[9], hints[10], base[0] + left + right, base[1] + top + bottom)
+
+
+def _intersect(a: Rect, b: Rect) -> Optional[Rect]:
+    left, top = max(a[0], b[0]), max(a[1], b[1])
+    right, bottom = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    if right <= left or bottom <= top:
+        return None
+    return (left, top, right - left, bottom - top)
+
+
+def _u32(value: int) -> int:
+    """负坐标（主显示器左侧/上方的显示器）按32位无符号数发送"""
+    return value & 0xFFFFFFFF
+
+
+class X11Backend(WindowBackend):
+    """基于xcffib的X11后端，适用于遵循EWMH的窗口管理器（GNOME、KDE、Xfce、i3等）"""
+
+    name = 'x11'
+
+    def __init__(self, display: Optional[str] = None):
+        if not has_xcb():
+            raise RuntimeError("未安装xcffib，无法使用X11后端")
+        import xcffib
+        import xcffib.xproto
+        self._xcffib = xcffib
+        self._xproto = xcffib.xproto
+        self.conn = xcffib.connect(display=display)
+        self.core = self.conn.core
+        screen = self.conn.get_setup().roots[self.conn.pref_screen]
+        self.root = screen.root
+        self.screen_size = (screen.width_in_pixels, screen.height_in_pixels)
+        # 统计: 等待应答的次数（每次取回一整批应答）与flush次数
+        self.round_trips = 0
+        self.flushes = 0
+        cookies = [self.core.InternAtom(False, len(name), name) for name in ATOM_NAMES]
+        self.atoms: Dict[str, int] = {name: reply.atom for name, reply in
+                                      zip(ATOM_NAMES, self._collect(cookies))}
+        supported = set(_cardinals(self._collect([self._property(self.root, '_NET_SUPPORTED')])[0]))
+        # 没有窗口管理器（如裸Xvfb）时直接配置窗口
+        self.ewmh_moveresize = self.atoms['_NET_MOVERESIZE_WINDOW'] in supported
+        # 最近一次读取的窗口边框 (左, 右, 上, 下)，移动时换算客户区大小
+        self._extents: Dict[int, Extents] = {}
+        # prefetch读取的 (是否最小化, 矩形)，任何修改或重新枚举后失效
+        self._prefetched: Dict[int, Tuple[bool, Rect]] = {}
+
+    def close(self):
+        self.conn.disconnect()
+
+    # ---- 请求与应答 ----
+
+    def _property(self, window: int, name: str, length: int = 1024):
+        return self.core.GetProperty(False, window, self.atoms[name],
+                                     self._xproto.GetPropertyType.Any, 0, length)
+
+    def _collect(self, cookies: Sequence) -> list:
+        """
+        取回一批请求的应答（第一次等待时整批请求一起发出，只有一次往返的延迟）
+        窗口已关闭等错误的应答为None
+        """
+        self.round_trips += 1
+        replies = []
+        for cookie in cookies:
+            try:
+                replies.append(cookie.reply())
+            except Exception:
+                replies.append(None)
+        return replies
+
+    def _geometry_cookies(self, hwnd: int) -> tuple:
+        return (self._property(hwnd, '_NET_FRAME_EXTENTS'),
+                self.core.GetGeometry(hwnd),
+                self.core.TranslateCoordinates(hwnd, self.root, 0, 0))
+
+    def _rect(self, hwnd: int, extents_reply, geometry, origin) -> Optional[Rect]:
+        if geometry is None or origin is None:
+            return None
+        extents = tuple(_cardinals(extents_reply)[:4])
+        extents = self._extents[hwnd] = extents if len(extents) == 4 else NO_EXTENTS
+        return frame_rect((origin.dst_x, origin.dst_y), (geometry.width, geometry.height), extents)
+
+    def _state_cookies(self, hwnd: int) -> tuple:
+        return (self._property(hwnd, '_NET_WM_STATE'), self._property(hwnd, 'WM_STATE'))
+
+    def _minimized(self, net_state, wm_state) -> bool:
+        if self.atoms['_NET_WM_STATE_HIDDEN'] in _cardinals(net_state):
+            return True
+        state = _cardinals(wm_state)
+        return bool(state) and state[0] == ICONIC_STATE
+
+    def _single(self, cookies: tuple, hwnd: int) -> list:
+        replies = self._collect(cookies)
+        if all(reply is None for reply in replies):
+            raise RuntimeError(f"无效的窗口: {hwnd:#x}")
+        return replies
+
+    # ---- 枚举与查询 ----
+
+    def list_windows(self) -> List[int]:
+        """客户端窗口，栈顶在前"""
+        self._prefetched.clear()
+        stacking, clients = self._collect([
+            self._property(self.root, '_NET_CLIENT_LIST_STACKING', MAX_PROPERTY),
+            self._property(self.root, '_NET_CLIENT_LIST', MAX_PROPERTY),
+        ])
+        stacked = _cardinals(stacking)
+        if stacked:
+            return stacked[::-1]
+        return _cardinals(clients)
+
+    def terminal_records(self, handles: Sequence[int]) -> List[WindowRecord]:
+        """两次往返: 先取回所有窗口的WM_CLASS，再取回终端窗口的标题、进程和位置"""
+        classes = self._collect([self._property(hwnd, 'WM_CLASS') for hwnd in handles])
+        terminals = []
+        for hwnd, reply in zip(handles, classes):
+            class_name = parse_wm_class(_bytes(reply.value)) if reply is not None else ''
+            if class_name and is_terminal_class(class_name):
+                terminals.append((hwnd, class_name))
+        if not terminals:
+            return []
+
+        cookies = []
+        for hwnd, _ in terminals:
+            cookies.extend((self._property(hwnd, '_NET_WM_NAME'), self._property(hwnd, 'WM_NAME'),
+                            self._property(hwnd, '_NET_WM_PID')))
+            cookies.extend(self._geometry_cookies(hwnd))
+        replies = self._collect(cookies)
+        records = []
+        for i, (hwnd, class_name) in enumerate(terminals):
+            net_name, wm_name, pid, extents, geometry, origin = replies[i * 6:i * 6 + 6]
+            rect = self._rect(hwnd, extents, geometry, origin)
+            if rect is None:
+                # 窗口已关闭
+                continue
+            pids = _cardinals(pid)
+            records.append(WindowRecord(hwnd, _text(net_name) or _text(wm_name), class_name,
+                                        pids[0] if pids else 0, rect))
+        return records
+
+    def iter_terminal_records(self, handles: Sequence[int]) -> Iterator[WindowRecord]:
+        """按批流水线读取，调用方停止迭代后不再发出剩余窗口的请求"""
+        for start in range(0, len(handles), STREAM_CHUNK):
+            yield from self.terminal_records(handles[start:start + STREAM_CHUNK])
+
+    def prefetch(self, hwnds: Sequence[int]):
+        """一次往返读取所有窗口的最小化状态和位置"""
+        cookies = []
+        for hwnd in hwnds:
+            cookies.extend(self._state_cookies(hwnd))
+            cookies.extend(self._geometry_cookies(hwnd))
+        replies = self._collect(cookies)
+        self._prefetched.clear()
+        for i, hwnd in enumerate(hwnds):
+            net_state, wm_state, extents, geometry, origin = replies[i * 5:i * 5 + 5]
+            rect = self._rect(hwnd, extents, geometry, origin)
+            if rect is not None:
+                self._prefetched[hwnd] = (self._minimized(net_state, wm_state), rect)
+
+    def get_class_name(self, hwnd: int) -> str:
+        reply, = self._single((self._property(hwnd, 'WM_CLASS'),), hwnd)
+        return parse_wm_class(_bytes(reply.value))
+
+    def get_title(self, hwnd: int) -> str:
+        net_name, wm_name = self._single((self._property(hwnd, '_NET_WM_NAME'),
+                                          self._property(hwnd, 'WM_NAME')), hwnd)
+        return _text(net_name) or _text(wm_name)
+
+    def get_pid(self, hwnd: int) -> int:
+        reply, = self._single((self._property(hwnd, '_NET_WM_PID'),), hwnd)
+        pids = _cardinals(reply)
+        return pids[0] if pids else 0
+
+    def get_rect(self, hwnd: int) -> Rect:
+        cached = self._prefetched.get(hwnd)
+        if cached is not None:
+            return cached[1]
+        rect = self._rect(hwnd, *self._collect(self._geometry_cookies(hwnd)))
+        if rect is None:
+            raise RuntimeError(f"无效的窗口: {hwnd:#x}")
+        return rect
+
+    def is_minimized(self, hwnd: int) -> bool:
+        cached = self._prefetched.get(hwnd)
+        if cached is not None:
+            return cached[0]
+        return self._minimized(*self._collect(self._state_cookies(hwnd)))
+
+    def get_screen_size(self) -> Tuple[int, int]:
+        return self.screen_size
+
+    def foreground_window(self) -> Optional[int]:
+        reply, = self._collect([self._property(self.root, '_NET_ACTIVE_WINDOW')])
+        active = _cardinals(reply)
+        return active[0] if active and active[0] else None
+
+    def cell_metrics(self, hwnd: int) -> Optional[CellMetrics]:
+        """一次往返读取WM_NORMAL_HINTS和窗口边框"""
+        hints, extents = self._collect([self._property(hwnd, 'WM_NORMAL_HINTS', 18),
+                                        self._property(hwnd, '_NET_FRAME_EXTENTS')])
+        extents = tuple(_cardinals(extents)[:4])
+        return size_hints_metrics(_cardinals(hints), extents if len(extents) == 4 else NO_EXTENTS)
+
+    def monitor_source(self):
+        return X11MonitorSource(self)
+
+    # ---- 修改（只进入发送缓冲，由flush一起发出） ----
+
+    def _flush(self):
+        self.conn.flush()
+        self.flushes += 1
+
+    def _client_message(self, window: int, message: str, data: Sequence[int]):
+        """向根窗口发送EWMH/ICCCM客户端消息，由窗口管理器处理"""
+        xproto = self._xproto
+        values = [_u32(value) for value in data] + [0] * (5 - len(data))
+        event = xproto.ClientMessageEvent.synthetic(
+            format=32, window=window, type=self.atoms[message],
+            data=xproto.ClientMessageData.synthetic(values, 'I' * 5))
+        self.core.SendEvent(False, self.root,
+                            xproto.EventMask.SubstructureRedirect | xproto.EventMask.SubstructureNotify,
+                            event.pack())
+
+    def _queue_move(self, hwnd: int, rect: Rect):
+        xproto = self._xproto
+        x, y = rect[0], rect[1]
+        width, height = client_size(rect, self._extents.get(hwnd, NO_EXTENTS))
+        # 最大化的窗口不接受移动，先取消最大化
+        self._client_message(hwnd, '_NET_WM_STATE', [
+            _NET_WM_STATE_REMOVE, self.atoms['_NET_WM_STATE_MAXIMIZED_VERT'],
+            self.atoms['_NET_WM_STATE_MAXIMIZED_HORZ'], SOURCE_PAGER])
+        if self.ewmh_moveresize:
+            self._client_message(hwnd, '_NET_MOVERESIZE_WINDOW', [MOVERESIZE_FLAGS, x, y, width, height])
+        else:
+            config = xproto.ConfigWindow
+            self.core.ConfigureWindow(hwnd, config.X | config.Y | config.Width | config.Height,
+                                      [_u32(x), _u32(y), width, height])
+        self.core.ConfigureWindow(hwnd, xproto.ConfigWindow.StackMode, [xproto.StackMode.Above])
+
+    def move_window(self, hwnd: int, x: int, y: int, width: int, height: int):
+        self._prefetched.clear()
+        self._queue_move(hwnd, (x, y, width, height))
+        self._flush()
+
+    def begin_batch(self, count: int):
+        return []
+
+    def defer_window_pos(self, batch, hwnd: int, rect: Rect):
+        batch.append((hwnd, rect))
+        return batch
+
+    def end_batch(self, batch):
+        """整批移动一次flush"""
+        self._prefetched.clear()
+        for hwnd, rect in batch:
+            self._queue_move(hwnd, rect)
+        self._flush()
+
+    def minimize(self, hwnd: int):
+        self._prefetched.clear()
+        self._client_message(hwnd, 'WM_CHANGE_STATE', [ICONIC_STATE])
+        self._flush()
+
+    def minimize_batch(self, hwnds: Sequence[int]) -> Dict[int, str]:
+        """所有最小化请求一次flush"""
+        self._prefetched.clear()
+        for hwnd in hwnds:
+            self._client_message(hwnd, 'WM_CHANGE_STATE', [ICONIC_STATE])
+        self._flush()
+        return {}
+
+    def restore(self, hwnd: int):
+        """还原请求不单独flush，随后续的移动（同一批次）一起发出"""
+        self._prefetched.clear()
+        self.core.MapWindow(hwnd)
+        self._client_message(hwnd, '_NET_ACTIVE_WINDOW', [SOURCE_PAGER])
+
+    def restore_async(self, hwnd: int):
+        self.restore(hwnd)
+        self._flush()
+
+
+class X11MonitorSource(MonitorSource):
+    """
+    RandR显示器 + EWMH工作区 (_NET_WORKAREA，不含面板)
+    没有RandR 1.5时把整个根窗口视为单个显示器
+    """
+
+    def __init__(self, backend: X11Backend):
+        self.backend = backend
+
+    def _screen(self) -> Tuple[Rect, Rect]:
+        """根窗口区域与当前桌面的工作区，一次往返"""
+        backend = self.backend
+        geometry, workarea, desktop = backend._collect([
+            backend.core.GetGeometry(backend.root),
+            backend._property(backend.root, '_NET_WORKAREA', MAX_PROPERTY),
+            backend._property(backend.root, '_NET_CURRENT_DESKTOP'),
+        ])
+        screen = (0, 0, geometry.width, geometry.height) if geometry else (0, 0) + backend.screen_size
+        areas = _cardinals(workarea)
+        current = (_cardinals(desktop) or [0])[0]
+        area = tuple(areas[current * 4:current * 4 + 4]) or tuple(areas[:4])
+        return screen, area if len(area) == 4 else screen
+
+    def enumerate(self) -> List[Monitor]:
+        screen, workarea = self._screen()
+        outputs = []
+        try:
+            import xcffib.randr
+            randr = self.backend.conn(xcffib.randr.key)
+            for info in randr.GetMonitors(self.backend.root, True).reply().monitors:
+                outputs.append(((info.x, info.y, info.width, info.height), bool(info.primary)))
+        except Exception:
+            pass
+        if not outputs:
+            outputs = [(screen, True)]
+        # 主显示器在前，其余按从左到右、从上到下
+        outputs.sort(key=lambda item: (not item[1], item[0][0], item[0][1]))
+        if not any(primary for _, primary in outputs):
+            outputs[0] = (outputs[0][0], True)
+        # _NET_WORKAREA覆盖所有显示器，与各显示器求交近似为各自的工作区
+        return [Monitor(i, rect, _intersect(rect, workarea) or rect, primary, BASE_DPI)
+                for i, (rect, primary) in enumerate(outputs)]
+
+    def signature(self):
+        return self._screen()
@@ -4,8 +4,11 @@ import * as fs from 'fs';
 import { OpsItem, WorkspaceNotice, NoticeFile } from './configManager';
 import { OpsTreeDataProvider } from './treeDataProvider';
 import { NoticeCollectionProvider } from './noticeCollectionProvider';
+import { parseTilerCommand, sendTilerRequest, TilerDaemonUnavailable } from './tilerClient';
 
 export class CommandHandler {
+    private tilerOutput: vscode.OutputChannel | undefined;
+
     constructor(
         private treeDataProvider: OpsTreeDataProvider,
         private noticeCollectionProvider: NoticeCollectionProvider
@@ -100,6 +103,12 @@ export class CommandHandler {
             return;
         }
 
+        // Route terminal_tiler.py commands to the tiler daemon when it is running
+        const tilerArgs = parseTilerCommand(item.command);
+        if (tilerArgs && await this.runViaTilerDaemon(item, tilerArgs)) {
+            return;
+        }
+
         try {
             const terminal = vscode.window.createTerminal(`LCH Ops: ${item.name}`);
             
@@ -116,6 +125,35 @@ export class CommandHandler {
         }
     }
 
+    private async runViaTilerDaemon(item: OpsItem, args: string[]): Promise<boolean> {
+        let response;
+        try {
+            response = await sendTilerRequest(args);
+        } catch (error) {
+            if (error instanceof TilerDaemonUnavailable) {
+                // No daemon listening, fall back to running the script in a terminal
+                return false;
+            }
+            // The request reached the daemon; running it again in a terminal would tile twice
+            vscode.window.showErrorMessage(`Terminal tiler daemon request failed: ${error}`);
+            return true;
+        }
+
+        if (!this.tilerOutput) {
+            this.tilerOutput = vscode.window.createOutputChannel('LCH Terminal Tiler');
+        }
+        if (response.output) {
+            this.tilerOutput.append(response.output);
+        }
+        if (response.ok) {
+            vscode.window.setStatusBarMessage(`LCH Ops: ${item.name} (${response.elapsed_ms ?? 0} ms)`, 3000);
+        } else {
+            vscode.window.showErrorMessage(`Terminal tiler failed: ${response.error}`);
+            this.tilerOutput.show(true);
+        }
+        return true;
+    }
+
     async openInTerminal(item: OpsItem): Promise<void> {
         if (!item.path) {
             vscode.window.showErrorMessage('No path specified for this item');
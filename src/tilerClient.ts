@@ -0,0 +1,177 @@
+import * as fs from 'fs';
+import * as net from 'net';
+import * as os from 'os';
+import * as path from 'path';
+
+// Must match DEFAULT_PORT / default_address() in scripts/tile/tiler_daemon.py
+const DEFAULT_PORT = 47291;
+const TILER_SCRIPT = 'terminal_tiler.py';
+
+export interface TilerResponse {
+    id?: number;
+    ok: boolean;
+    result?: unknown;
+    output?: string;
+    error?: string;
+    elapsed_ms?: number;
+}
+
+/**
+ * Per-user token written by the daemon on start-up; every request must carry it.
+ * Must match default_token_path() in scripts/tile/tiler_daemon.py.
+ */
+function tokenPath(): string {
+    let directory = process.env.TERMINAL_TILER_CACHE;
+    if (!directory) {
+        const base = process.platform === 'win32'
+            ? (process.env.LOCALAPPDATA || os.homedir())
+            : (process.env.XDG_CACHE_HOME || path.join(os.homedir(), '.cache'));
+        directory = path.join(base, 'lch-terminal-tiler');
+    }
+    return path.join(directory, 'daemon.token');
+}
+
+function readToken(): string | undefined {
+    try {
+        return fs.readFileSync(tokenPath(), 'ascii').trim();
+    } catch {
+        return undefined;
+    }
+}
+
+function connectOptions(): net.NetConnectOpts {
+    const address = process.env.TERMINAL_TILER_ADDRESS;
+    if (address) {
+        if (address.startsWith('unix:')) {
+            return { path: address.slice('unix:'.length) };
+        }
+        const rest = address.replace(/^tcp:/, '');
+        const sep = rest.lastIndexOf(':');
+        return { host: rest.slice(0, sep) || '127.0.0.1', port: Number(rest.slice(sep + 1)) };
+    }
+    if (process.platform === 'win32') {
+        return { host: '127.0.0.1', port: DEFAULT_PORT };
+    }
+    const uid = process.getuid ? process.getuid() : 0;
+    return { path: path.join(os.tmpdir(), `lch-terminal-tiler-${uid}.sock`) };
+}
+
+/**
+ * If the command runs terminal_tiler.py through python, return the arguments
+ * passed to the script; otherwise return undefined.
+ */
+export function parseTilerCommand(command: string): string[] | undefined {
+    const tokens: string[] = [];
+    const pattern = /"([^"]*)"|'([^']*)'|(\S+)/g;
+    let match: RegExpExecArray | null;
+    while ((match = pattern.exec(command)) !== null) {
+        tokens.push(match[1] ?? match[2] ?? match[3]);
+    }
+
+    const scriptIndex = tokens.findIndex(token => path.basename(token.replace(/\\/g, '/')) === TILER_SCRIPT);
+    if (scriptIndex < 1 || !/^(python[0-9.]*|py)(\.exe)?$/i.test(path.basename(tokens[0].replace(/\\/g, '/')))) {
+        return undefined;
+    }
+
+    const args = tokens.slice(scriptIndex + 1);
+    // The daemon cannot start another daemon or a long-running watch, and refuses options that
+    // write to a path; let those run in a terminal
+    const terminalOnly = ['--daemon', '--address', '--watch', '--trace', '--metrics-file', '--save-layout'];
+    if (args.some(arg => terminalOnly.includes(arg.split('=')[0]))) {
+        return undefined;
+    }
+    return args;
+}
+
+/**
+ * Raised when no daemon accepted the connection. The request was never sent,
+ * so callers can safely fall back to running the script in a terminal.
+ */
+export class TilerDaemonUnavailable extends Error {
+    constructor(message: string) {
+        super(message);
+        this.name = 'TilerDaemonUnavailable';
+    }
+}
+
+const UNAVAILABLE_CODES = new Set(['ECONNREFUSED', 'ENOENT']);
+
+/**
+ * Send one request to a running tiler daemon.
+ *
+ * Rejects with TilerDaemonUnavailable if no daemon handled the request:
+ * connection refused, socket missing, no answer within connectTimeoutMs, or
+ * the daemon closed the connection before writing any response (it crashed or
+ * refused the request). Once a response has started, or the daemon has kept
+ * the request longer than responseTimeoutMs, failures reject with a plain
+ * Error: the daemon may already be moving windows, so the command must not be
+ * run a second time. The default response timeout covers the daemon waiting
+ * up to 30 s (--lock-timeout) for another tiler process.
+ */
+export function sendTilerRequest(argv: string[], connectTimeoutMs = 2000,
+                                 responseTimeoutMs = 40000): Promise<TilerResponse> {
+    const token = readToken();
+    if (token === undefined) {
+        // The daemon writes the token when it starts; without it no daemon is running
+        return Promise.reject(new TilerDaemonUnavailable('Tiler daemon token not found'));
+    }
+    return new Promise((resolve, reject) => {
+        const socket = net.connect(connectOptions());
+        let buffer = '';
+        let sent = false;
+        let settled = false;
+
+        const settle = (error?: Error, response?: TilerResponse) => {
+            if (settled) {
+                return;
+            }
+            settled = true;
+            if (error) {
+                socket.destroy();
+                reject(error);
+            } else {
+                socket.end();
+                resolve(response as TilerResponse);
+            }
+        };
+
+        socket.setEncoding('utf8');
+        socket.setNoDelay(true);
+        socket.setTimeout(connectTimeoutMs, () => {
+            settle(sent
+                ? new Error(`Tiler daemon did not answer within ${responseTimeoutMs} ms`)
+                : new TilerDaemonUnavailable('Tiler daemon did not accept the connection'));
+        });
+        socket.on('connect', () => {
+            sent = true;
+            socket.setTimeout(responseTimeoutMs);
+            socket.write(JSON.stringify({ id: 1, token, argv }) + '\n');
+        });
+        socket.on('data', chunk => {
+            buffer += chunk;
+            const newline = buffer.indexOf('\n');
+            if (newline >= 0) {
+                try {
+                    settle(undefined, JSON.parse(buffer.slice(0, newline)) as TilerResponse);
+                } catch (error) {
+                    settle(error as Error);
+                }
+            }
+        });
+        socket.on('error', (error: NodeJS.ErrnoException) => {
+            if (!sent && error.code && UNAVAILABLE_CODES.has(error.code)) {
+                settle(new TilerDaemonUnavailable(error.message));
+            } else {
+                settle(error);
+            }
+        });
+        socket.on('close', () => {
+            // Runs after 'end' and after 'error'; only settles if neither a response nor an error did
+            if (buffer) {
+                settle(new Error('Tiler daemon closed the connection in the middle of a response'));
+            } else {
+                settle(new TilerDaemonUnavailable('Tiler daemon closed the connection without answering'));
+            }
+        });
+    });
+}